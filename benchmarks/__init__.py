@@ -0,0 +1 @@
+"""Offline benchmarks for the document analysis and fee simulator packages."""
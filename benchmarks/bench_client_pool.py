@@ -0,0 +1,49 @@
+"""Benchmark per-request LLM client construction against the pooled client registry.
+
+Runs against a local stub server, so no API key or network access is needed.
+
+Usage:
+    python -m benchmarks.bench_client_pool --requests 200
+"""
+import argparse
+import time
+
+import openai
+
+from benchmarks.stub_server import StubServer
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.clients import clear_clients, get_openai_client
+
+
+def _run(server: StubServer, requests: int, pooled: bool) -> dict:
+    server.connections = server.requests = 0
+    start = time.perf_counter()
+    for i in range(requests):
+        if pooled:
+            client = get_openai_client(api_key="bench", base_url=server.base_url)
+        else:
+            client = openai.OpenAI(api_key="bench", base_url=server.base_url)
+        DocumentAnalyzer(client=client).analyze(f"Document {i}", use_cache=False)
+        if not pooled:
+            client.close()
+    elapsed = time.perf_counter() - start
+    return {"req_per_sec": requests / elapsed, "ms_per_req": elapsed / requests * 1000,
+            "connections": server.connections}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with StubServer() as server:
+        print(f"{'mode':>12} {'req/sec':>10} {'ms/req':>8} {'connections':>12}")
+        for label, pooled in (("per-request", False), ("pooled", True)):
+            result = _run(server, args.requests, pooled)
+            print(f"{label:>12} {result['req_per_sec']:>10.1f} {result['ms_per_req']:>8.2f} "
+                  f"{result['connections']:>12}")
+        clear_clients()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark the combined report against running both apps one after the other.
+
+Writes a synthetic fee schedule of ``--pages`` pages and analyzes it against
+a ``StubServer`` with ``--latency`` seconds per LLM request, ``--runs``
+times each way:
+
+* sequential: ``process_document`` of the document analyzer, then of the
+  fee simulator, each extracting the PDF itself,
+* combined: ``run_combined``, which extracts once and runs both analyses
+  concurrently.
+
+Caches are disabled so every run does the same work.
+
+Usage:
+    python -m benchmarks.bench_combined --pages 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.load_test import ANALYSIS_JSON, configure
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic_pdf import build_fee_schedule_pdf
+from fee_simulator import main as fee_main
+from fee_simulator.services.combined import run_combined
+from single_doc_analyze import main as single_main
+
+
+def _sequential(path: str) -> None:
+    single_main.process_document(path)
+    fee_main.process_document(path)
+
+
+def _combined(path: str) -> None:
+    report = asyncio.run(run_combined(path))
+    for result in report:
+        if isinstance(result, Exception):
+            raise result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mock server seconds per LLM request")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, StubServer(
+        latency=args.latency, responses={"analysis": ANALYSIS_JSON}
+    ) as server:
+        configure(server)
+        path = os.path.join(tmp, "schedule.pdf")
+        with open(path, "wb") as f:
+            f.write(build_fee_schedule_pdf(args.pages, seed=0))
+        for name, run in (("sequential", _sequential), ("combined", _combined)):
+            requests = server.requests
+            times = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                run(path)
+                times.append(time.perf_counter() - start)
+            print(f"{name:<11} median {statistics.median(times):6.3f}s  "
+                  f"LLM requests per run {(server.requests - requests) / args.runs:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark the deterministic fee engine against per-scenario calculation.
+
+A synthetic rate table with ``--participants`` x ``--orders`` combinations
+of ``--tiers`` volume tiers is simulated for ``--months`` monthly volumes
+of every combination, once with ``FeeEngine.simulate_all`` and once with a
+plain Python loop looking up each scenario's tier. Before the engine each
+such "what if" was a full LLM call over the document.
+
+Usage:
+    python -m benchmarks.bench_fee_engine --participants 10 --orders 6 --tiers 5 --months 1000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from fee_simulator.models.schemas import FeeRate, RateTable
+from fee_simulator.services.fee_engine import FeeEngine
+
+
+def _table(participants: int, orders: int, tiers: int, rng: random.Random) -> RateTable:
+    return RateTable(rates=[
+        FeeRate(
+            participant_type=f"Participant {p}",
+            order_type=f"Order type {o}",
+            volume_tier=f"Tier {t + 1}",
+            min_volume=t * 10_000_000,
+            fee_per_unit=round(rng.uniform(0, 0.003), 4),
+            rebate_per_unit=round(rng.uniform(0, 0.003), 4),
+        )
+        for p in range(participants) for o in range(orders) for t in range(tiers)
+    ])
+
+
+def _loop(table: RateTable, volumes: list) -> float:
+    groups = {}
+    for rate in table.rates:
+        groups.setdefault((rate.participant_type, rate.order_type), []).append(rate)
+    net = 0.0
+    for rates in groups.values():
+        rates = sorted(rates, key=lambda rate: rate.min_volume)
+        for volume in volumes:
+            rate = next((rate for rate in reversed(rates) if rate.min_volume <= volume), rates[0])
+            net += volume * (rate.fee_per_unit - rate.rebate_per_unit)
+    return net
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--participants", type=int, default=10)
+    parser.add_argument("--orders", type=int, default=6)
+    parser.add_argument("--tiers", type=int, default=5)
+    parser.add_argument("--months", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    table = _table(args.participants, args.orders, args.tiers, rng)
+    volumes = np.random.default_rng(args.seed).uniform(0, args.tiers * 12_000_000, args.months)
+    scenarios = args.participants * args.orders * args.months
+
+    start = time.perf_counter()
+    engine = FeeEngine(table)
+    results = engine.simulate_all(volumes)
+    engine_net = sum(result.net.sum() for result in results.values())
+    engine_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loop_net = _loop(table, volumes.tolist())
+    loop_time = time.perf_counter() - start
+
+    assert abs(engine_net - loop_net) <= 1e-6 * max(1.0, abs(loop_net)), (engine_net, loop_net)
+    print(f"{scenarios} scenarios ({len(table.rates)} rates)")
+    print(f"engine  {engine_time * 1000:8.1f} ms  ({scenarios / engine_time:,.0f} scenarios/s, incl. building)")
+    print(f"loop    {loop_time * 1000:8.1f} ms  ({scenarios / loop_time:,.0f} scenarios/s)")
+
+
+if __name__ == "__main__":
+    main()
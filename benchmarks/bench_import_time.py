@@ -0,0 +1,141 @@
+"""Measure the import time of each entry point and guard it against regressions.
+
+Each module in ``--modules`` (by default the web apps, headless CLIs, batch
+and job CLIs of both packages) is imported ``--runs`` times in a fresh
+interpreter under ``python -X importtime``. Reported per module: the median
+time its import added on top of interpreter startup, and the top-level
+packages that took longest to import.
+
+Gradio, the provider SDKs and pypdf must only be imported on first use, and
+python-dotenv only when an entry point calls ``config.load_env()``, so a
+module that loads any of ``FORBIDDEN`` while being imported fails the run.
+``--save`` writes the median times as JSON. ``--baseline`` compares against
+such a file and exits with status 1 if a module got slower by more than
+``--threshold`` (and by more than ``--min-delta`` seconds).
+
+Usage:
+    python -m benchmarks.bench_import_time --save imports.json
+    python -m benchmarks.bench_import_time --baseline imports.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple
+
+MODULES = [
+    "single_doc_analyze.main",
+    "single_doc_analyze.cli",
+    "single_doc_analyze.batch",
+    "single_doc_analyze.jobs",
+    "fee_simulator.main",
+    "fee_simulator.cli",
+    "fee_simulator.batch",
+    "fee_simulator.jobs",
+]
+FORBIDDEN = ("gradio", "openai", "anthropic", "pypdf", "dotenv")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Import(NamedTuple):
+    """One line of ``-X importtime`` output, times in microseconds."""
+    name: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> List[Import]:
+    """Parse the ``-X importtime`` lines of a process's stderr."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The header line.
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        imports.append(Import(stripped, (len(name) - len(stripped) - 1) // 2, int(fields[0]), int(fields[1])))
+    return imports
+
+
+def _importtime(code: str) -> List[Import]:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{process.stderr[-2000:]}")
+    return parse_importtime(process.stderr)
+
+
+def measure(module: str, startup: set) -> tuple:
+    """Seconds importing ``module`` took, the imports it made and the forbidden packages among them."""
+    imports = [entry for entry in _importtime(f"import {module}") if entry.name not in startup]
+    seconds = sum(entry.cumulative_us for entry in imports if entry.depth == 0) / 1e6
+    forbidden = sorted({entry.name for entry in imports if entry.name in FORBIDDEN})
+    return seconds, imports, forbidden
+
+
+def heaviest(imports: List[Import], count: int = 5) -> List[Import]:
+    """The top-level packages (other than this repository's) that took longest to import."""
+    packages = [
+        entry for entry in imports
+        if "." not in entry.name and entry.name not in ("single_doc_analyze", "fee_simulator")
+    ]
+    return sorted(packages, key=lambda entry: entry.cumulative_us, reverse=True)[:count]
+
+
+def find_regressions(results: Dict[str, float], baseline: Dict[str, float],
+                     threshold: float, min_delta: float) -> List[str]:
+    """Describe each module whose import got slower than ``baseline`` by more than the threshold."""
+    regressions = []
+    for module, after in results.items():
+        before = baseline.get(module)
+        if before is not None and after > before * (1 + threshold) and after - before > min_delta:
+            regressions.append(f"{module}: {before:.3f}s -> {after:.3f}s")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", help="Write the median import times to this JSON file")
+    parser.add_argument("--baseline", help="Fail if import times regressed against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore changes below this many seconds")
+    args = parser.parse_args()
+
+    # Modules every interpreter imports at startup are not charged to the entry points.
+    startup = {entry.name for entry in _importtime("pass")}
+    results = {}
+    failures = []
+    for module in args.modules:
+        runs = [measure(module, startup) for _ in range(args.runs)]
+        results[module] = statistics.median(seconds for seconds, _, _ in runs)
+        _, imports, forbidden = runs[-1]
+        print(f"{module:<26} {results[module]:6.3f}s  "
+              + "  ".join(f"{entry.name} {entry.cumulative_us / 1000:.0f} ms" for entry in heaviest(imports)))
+        if forbidden:
+            failures.append(f"{module} imports {', '.join(forbidden)}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += [f"REGRESSION {regression}" for regression in
+                         find_regressions(results, json.load(f), args.threshold, args.min_delta)]
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+    if args.baseline:
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
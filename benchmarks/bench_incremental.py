@@ -0,0 +1,71 @@
+"""Benchmark re-analysis of a revised document with and without the version store.
+
+Builds a synthetic PDF, analyzes it, edits one page and analyzes the revision
+again. LLM calls go to a local stub server, so no API key is needed.
+
+Usage:
+    python -m benchmarks.bench_incremental --pages 200
+"""
+import argparse
+import random
+import tempfile
+import time
+from io import BytesIO
+
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic_pdf import build_pdf, make_page_lines
+from single_doc_analyze.config import settings
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.clients import get_openai_client
+from single_doc_analyze.services.pdf_service import extract_pages_incremental
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.services.version_store import DocumentVersionStore
+
+
+def _analyze(server: StubServer, pdf: bytes, store) -> dict:
+    server.requests = 0
+    analyzer = DocumentAnalyzer(
+        client=get_openai_client(api_key="bench", base_url=server.base_url),
+        cache=MemoryResponseCache(),
+        versions=store,
+    )
+    start = time.perf_counter()
+    pages = extract_pages_incremental(BytesIO(pdf), store)
+    extracted = time.perf_counter()
+    analyzer.analyze_pages(pages, doc_id="schedule.pdf")
+    done = time.perf_counter()
+    return {"extract": extracted - start, "total": done - start, "llm_requests": server.requests}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server response time in seconds")
+    args = parser.parse_args()
+    # Measure the version store alone, not the whole-file extraction cache.
+    settings["EXTRACTION_CACHE_PATH"] = ""
+    settings["VERSION_STORE_PATH"] = ""
+    # Keep provider rate limits out of the timings.
+    settings["OPENAI_RPM"] = settings["OPENAI_TPM"] = 1e12
+
+    rng = random.Random(0)
+    pages = [make_page_lines(i + 1, 45, rng) for i in range(args.pages)]
+    original = build_pdf(pages)
+    pages[args.pages // 2] = pages[args.pages // 2] + ["Revised: the customer rebate is now $0.20 per contract."]
+    revised = build_pdf(pages)
+
+    with tempfile.TemporaryDirectory() as tmp, StubServer(latency=args.latency) as server:
+        store = DocumentVersionStore(f"{tmp}/versions.sqlite3")
+        runs = [
+            ("original", _analyze(server, original, store)),
+            ("revision, no store", _analyze(server, revised, None)),
+            ("revision, store", _analyze(server, revised, store)),
+        ]
+
+    print(f"{'run':>20} {'extract s':>10} {'total s':>8} {'LLM requests':>13}")
+    for label, result in runs:
+        print(f"{label:>20} {result['extract']:>10.2f} {result['total']:>8.2f} {result['llm_requests']:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark job throughput against the number of worker processes.
+
+Submits ``--documents`` distinct synthetic PDFs to a fresh job queue and
+times how long a ``WorkerPool`` of each size takes to finish them. LLM calls
+go to a local stub server that waits ``--latency`` seconds per request, so no
+API key is needed. With ``MAX_RETRIES=0`` each job is one extraction plus
+one LLM call.
+
+Usage:
+    python -m benchmarks.bench_job_queue --documents 24 --workers 1 2 4 --latency 1.0
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic_pdf import build_synthetic_pdf
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=24)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=1.0, help="stub LLM latency in seconds")
+    parser.add_argument("--pages", type=int, default=5, help="pages per synthetic PDF")
+    args = parser.parse_args()
+
+    with StubServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        # Worker processes are spawned and read their settings from the environment.
+        os.environ.update({
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": server.base_url,
+            "MAX_RETRIES": "0",
+            "RESPONSE_CACHE_BACKEND": "none",
+            "EXTRACTION_CACHE_PATH": "",
+        })
+        from single_doc_analyze.jobs import analyze_document_job
+        from single_doc_analyze.services.job_queue import DONE, FAILED, QUEUED, JobQueue, WorkerPool
+
+        documents = [build_synthetic_pdf(args.pages, seed=seed) for seed in range(args.documents)]
+        for workers in args.workers:
+            path = os.path.join(tmp, f"jobs-{workers}.sqlite3")
+            queue = JobQueue(path)
+            jobs = [queue.submit(document, {"doc_id": f"bench-{i}.pdf"}) for i, document in enumerate(documents)]
+            pool = WorkerPool(path, analyze_document_job, workers, poll_interval=0.05)
+            pool.start()
+            # Measure from the first claim, not from process start-up.
+            while queue.counts()[QUEUED] == len(jobs):
+                time.sleep(0.01)
+            start = time.perf_counter()
+            while queue.counts()[DONE] + queue.counts()[FAILED] < len(jobs):
+                pool.supervise()
+                time.sleep(0.02)
+            elapsed = time.perf_counter() - start
+            pool.stop()
+            counts = queue.counts()
+            print(f"workers={workers:<3} {counts[DONE]} done, {counts[FAILED]} failed in {elapsed:6.2f}s "
+                  f"({len(jobs) / elapsed:5.2f} jobs/s)")
+            queue.close()
+
+
+if __name__ == "__main__":
+    main()
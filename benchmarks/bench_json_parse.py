@@ -0,0 +1,117 @@
+"""Benchmark JSON response parsing: the extraction/repair path against the old one.
+
+The old path strips code fences, then runs ``json.loads`` and
+``model_class(**parsed)``. The new ``parse_json_response`` extracts the
+outermost object in one pass, validates with ``model_validate_json`` and
+repairs only text that is not valid JSON.
+
+Three measurements:
+
+* recovery on the fuzz corpus in ``benchmarks/data`` (each line has ``case``,
+  ``model``, ``content`` and whether the content is ``recoverable``),
+* recovery on random truncations of valid responses (``--fuzz``),
+* parse time on clean responses with ``--scenarios`` fee scenarios.
+
+Every failure to parse is a paid LLM retry in the analyzers.
+
+Usage:
+    python -m benchmarks.bench_json_parse --scenarios 5 100 1000 --fuzz 2000
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from fee_simulator.models.schemas import FeeScenarioAnalysis
+from single_doc_analyze.models.schemas import DocumentAnalysis, EvaluationResult
+from single_doc_analyze.utils.json_utils import clean_json_response, parse_json_response
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "json_fuzz_corpus.jsonl"
+
+MODELS = {
+    "DocumentAnalysis": DocumentAnalysis,
+    "EvaluationResult": EvaluationResult,
+    "FeeScenarioAnalysis": FeeScenarioAnalysis,
+}
+
+
+def legacy_parse(content, model_class):
+    try:
+        return model_class(**json.loads(clean_json_response(content)))
+    except Exception as e:
+        raise ValueError(str(e))
+
+
+def _parses(parse, content, model_class) -> bool:
+    try:
+        parse(content, model_class)
+    except ValueError:
+        return False
+    return True
+
+
+def _scenarios(count: int) -> str:
+    return json.dumps({"scenarios": [
+        {
+            "participant_type": f"Participant {i}",
+            "volume_tier": f"Tier {i % 4 + 1}",
+            "order_type": "Adding liquidity" if i % 2 else "Removing liquidity",
+            "estimated_fee": f"${i % 30 / 10000:.4f}",
+            "rebate": f"${i % 20 / 10000:.4f}",
+            "notes": "Rebate applies to displayed orders above the monthly volume threshold.",
+        }
+        for i in range(count)
+    ]}, indent=2)
+
+
+def _per_call(parse, content, model_class, min_seconds: float = 0.2) -> float:
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        parse(content, model_class)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--scenarios", type=int, nargs="+", default=[5, 100, 1000])
+    parser.add_argument("--fuzz", type=int, default=2000, help="random truncations to try")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    print(f"fuzz corpus ({len(records)} responses, {sum(r['recoverable'] for r in records)} recoverable):")
+    for name, parse in (("old", legacy_parse), ("new", parse_json_response)):
+        results = [_parses(parse, r["content"], MODELS[r["model"]]) for r in records]
+        wrong = [r["case"] for r, ok in zip(records, results) if ok != r["recoverable"]]
+        print(f"  {name}: parsed {sum(results)}/{len(records)}, unexpected results: {len(wrong)}")
+
+    rng = random.Random(args.seed)
+    clean = [(r["content"], MODELS[r["model"]]) for r in records if r["case"] == "clean"]
+    clean.append((_scenarios(20), FeeScenarioAnalysis))
+    truncations = []
+    for _ in range(args.fuzz):
+        content, model_class = rng.choice(clean)
+        truncations.append((content[:rng.randrange(1, len(content))], model_class))
+    print(f"random truncations ({args.fuzz}):")
+    for name, parse in (("old", legacy_parse), ("new", parse_json_response)):
+        recovered = sum(_parses(parse, content, model_class) for content, model_class in truncations)
+        print(f"  {name}: recovered {recovered} ({recovered / args.fuzz:.0%})")
+
+    print("parse time on clean responses:")
+    for count in args.scenarios:
+        content = _scenarios(count)
+        old = _per_call(legacy_parse, content, FeeScenarioAnalysis)
+        new = _per_call(parse_json_response, content, FeeScenarioAnalysis)
+        print(f"  {count:>5} scenarios ({len(content) / 1024:.0f} KiB): "
+              f"old {old * 1e6:9.0f} us  new {new * 1e6:9.0f} us  ({old / new:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
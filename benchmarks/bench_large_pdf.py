@@ -0,0 +1,100 @@
+"""Measure the peak memory of processing a very large PDF in memory vs. memory-bounded.
+
+Writes a synthetic document of ``--pages`` pages (a fee schedule for the
+fee simulator) and runs the app's ``process_document`` on it against a
+``StubServer``, each mode in a fresh subprocess so peak RSS is measured in
+isolation:
+
+* in-memory: the PDF is handed over as an in-memory upload and extracted
+  into one string, as before the memory-bounded mode existed,
+* windowed: the PDF is memory-mapped from disk and, having at least
+  ``LARGE_PDF_PAGES`` pages, spooled ``PAGE_WINDOW`` pages at a time and
+  analyzed chunk by chunk,
+* ceiling: read from disk with LARGE_PDF_PAGES off and ``MAX_RSS_MB`` set
+  to ``--max-rss``, so extraction degrades to the spool once the process
+  crosses the ceiling. The ceiling is only checked while extracting, so it
+  has to sit below the RSS reached there to take effect.
+
+Caches are disabled so every mode does the same work.
+
+Usage:
+    python -m benchmarks.bench_large_pdf --pages 2000
+    python -m benchmarks.bench_large_pdf --app fee_simulator --pages 2000 --max-rss 70
+"""
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from benchmarks.load_test import ANALYSIS_JSON, APPS, configure, write_documents
+from benchmarks.stub_server import StubServer
+
+MODES = ("in-memory", "windowed", "ceiling")
+
+
+def _run_mode(app: str, mode: str, path: str, base_url: str, root_url: str, max_rss: int) -> dict:
+    if app == "fee_simulator":
+        from fee_simulator.config import settings
+        from fee_simulator.main import process_document
+    else:
+        from single_doc_analyze.config import settings
+        from single_doc_analyze.main import process_document
+    configure(SimpleNamespace(base_url=base_url, root_url=root_url))
+    settings["LARGE_PDF_PAGES"] = 1 if mode == "windowed" else 0
+    settings["MAX_RSS_MB"] = max_rss if mode == "ceiling" else 0
+    document = path
+    if mode == "in-memory":
+        with open(path, "rb") as f:
+            document = io.BytesIO(f.read())
+
+    start = time.perf_counter()
+    output = process_document(document)
+    elapsed = time.perf_counter() - start
+    if output.startswith("❌"):
+        raise RuntimeError(output)
+    return {
+        "elapsed": elapsed,
+        # ru_maxrss is reported in kilobytes on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", choices=APPS, default="single_doc_analyze")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--max-rss", type=int, default=80, help="MAX_RSS_MB of the ceiling mode")
+    parser.add_argument("--run-mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--root-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(_run_mode(args.app, args.run_mode, args.path, args.base_url, args.root_url, args.max_rss)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp, StubServer(responses={"analysis": ANALYSIS_JSON}) as server:
+        path = write_documents(tmp, args.app, 1, args.pages)[0]
+        print(f"{'mode':>10} {'seconds':>8} {'peak RSS MB':>12} {'LLM requests':>13}")
+        for mode in args.modes:
+            requests = server.requests
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_large_pdf", "--app", args.app,
+                 "--run-mode", mode, "--path", path, "--base-url", server.base_url,
+                 "--root-url", server.root_url, "--max-rss", str(args.max_rss)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>10} {result['elapsed']:>8.1f} {result['peak_rss_mb']:>12.1f} "
+                  f"{server.requests - requests:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Benchmark the per-call cost of the stage timers with metrics disabled and enabled.
+
+Usage:
+    python -m benchmarks.bench_metrics_overhead --iterations 1000000
+"""
+import argparse
+import time
+
+from single_doc_analyze.config import settings
+from single_doc_analyze.utils.metrics import stage, trace
+
+
+def _loop(iterations: int, instrumented: bool) -> float:
+    start = time.perf_counter()
+    if instrumented:
+        for _ in range(iterations):
+            with stage("bench"):
+                pass
+    else:
+        for _ in range(iterations):
+            pass
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    baseline = _loop(args.iterations, False)
+    settings["METRICS_ENABLED"] = False
+    disabled = _loop(args.iterations, True)
+    with trace():
+        traced = _loop(args.iterations, True)
+    settings["METRICS_ENABLED"] = True
+    enabled = _loop(args.iterations, True)
+
+    print(f"{'mode':>10} {'ns/stage':>10}")
+    for label, ns in (("disabled", disabled), ("traced", traced), ("enabled", enabled)):
+        print(f"{label:>10} {ns - baseline:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
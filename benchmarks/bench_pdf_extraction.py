@@ -0,0 +1,88 @@
+"""Benchmark PDF text extraction: legacy loop vs. the streaming, page-parallel engine.
+
+Each variant runs in a fresh subprocess so that peak RSS is measured in isolation.
+
+Usage:
+    python -m benchmarks.bench_pdf_extraction --pages 200 500
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_pdf import build_synthetic_pdf
+
+VARIANTS = ("legacy", "sequential", "parallel")
+
+
+def legacy_extract_text_from_pdf(pdf_file) -> str:
+    """The original implementation: double extract_text() and quadratic += building."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_file)
+    full_text = ""
+    for page in reader.pages:
+        if page.extract_text():
+            full_text += page.extract_text() + "\n"
+    return full_text.strip()
+
+
+def _run_variant(variant: str, path: str, workers: int) -> dict:
+    from single_doc_analyze.services.pdf_service import iter_pdf_pages
+
+    start = time.perf_counter()
+    if variant == "legacy":
+        text = legacy_extract_text_from_pdf(path)
+    elif variant == "sequential":
+        text = "\n".join(t for t in iter_pdf_pages(path, workers=1) if t).strip()
+    else:
+        text = "\n".join(t for t in iter_pdf_pages(path, workers=workers, parallel_threshold=1) if t).strip()
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed": elapsed,
+        "chars": len(text),
+        # ru_maxrss is reported in kilobytes on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 500])
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--run-variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_variant:
+        print(json.dumps(_run_variant(args.run_variant, args.path, args.workers)))
+        return
+
+    print(f"{'pages':>6} {'variant':>11} {'pages/sec':>10} {'peak RSS MB':>12} {'workers RSS MB':>15}")
+    for page_count in args.pages:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(build_synthetic_pdf(page_count))
+        try:
+            for variant in args.variants:
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_pdf_extraction",
+                     "--run-variant", variant, "--path", f.name, "--workers", str(args.workers)],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"{page_count:>6} {variant:>11} {page_count / result['elapsed']:>10.1f} "
+                    f"{result['peak_rss_mb']:>12.1f} {result['children_peak_rss_mb']:>15.1f}"
+                )
+        finally:
+            os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
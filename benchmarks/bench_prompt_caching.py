@@ -0,0 +1,106 @@
+"""Benchmark provider prompt caching of evaluator retries and repeated fee analyses.
+
+A local stub server simulates the providers' prompt caches and charges
+``--prefill-tokens-per-second`` for every uncached prompt token before the
+first response token. For each provider, and for Anthropic with
+``PROMPT_CACHING`` on and off (OpenAI caches prefixes automatically):
+
+* retry: a document analysis request for a synthetic fee schedule of
+  ``--pages`` pages, then the same request with evaluator feedback appended,
+* repeat: ``FeeAnalyzer.analyze`` run twice on the schedule, bypassing the
+  response cache.
+
+Reported per case: the latency of the first and second request and the
+share of the second request's prompt read from the cache.
+
+Usage:
+    python -m benchmarks.bench_prompt_caching --pages 10 --prefill-tokens-per-second 20000
+"""
+import argparse
+import time
+
+from benchmarks.stub_server import TOKEN_CHARS, StubServer
+from benchmarks.synthetic_pdf import make_fee_schedule_pages
+from fee_simulator.config import settings as fee_settings
+from fee_simulator.services.analyzer import FeeAnalyzer
+from fee_simulator.services.clients import get_anthropic_client as fee_anthropic_client
+from fee_simulator.services.clients import get_openai_client as fee_openai_client
+from fee_simulator.services.response_cache import MemoryResponseCache
+from single_doc_analyze.config import settings as single_settings
+from single_doc_analyze.prompts.templates import build_feedback, build_prompt
+from single_doc_analyze.services.analyzer import SYSTEM_MESSAGE
+from single_doc_analyze.services.clients import get_anthropic_client, get_openai_client
+from single_doc_analyze.services.router import Backend, request
+
+FEEDBACK = "The risks are too generic. Name the fee tiers whose thresholds are ambiguous."
+
+
+def _client(server: StubServer, provider: str, fee: bool = False):
+    if provider == "anthropic":
+        return (fee_anthropic_client if fee else get_anthropic_client)("bench", server.root_url)
+    return (fee_openai_client if fee else get_openai_client)("bench", server.base_url)
+
+
+def _timed(call) -> float:
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def _measure(server: StubServer, first, second) -> tuple:
+    """Latency of both calls and the share of the second call's prompt tokens read from the cache."""
+    first_seconds = _timed(first)
+    prompt_tokens, cached = server.prompt_tokens, server.cache_read_tokens
+    second_seconds = _timed(second)
+    share = (server.cache_read_tokens - cached) / max(1, server.prompt_tokens - prompt_tokens)
+    return first_seconds, second_seconds, share
+
+
+def _retry(server: StubServer, provider: str, document: str) -> tuple:
+    client = _client(server, provider)
+    backend = Backend(provider, "bench")
+    prompt = build_prompt(document)
+    return _measure(
+        server,
+        lambda: request(client, backend, SYSTEM_MESSAGE, prompt),
+        lambda: request(client, backend, SYSTEM_MESSAGE, prompt, build_feedback(FEEDBACK))
+    )
+
+
+def _repeat(server: StubServer, provider: str, document: str) -> tuple:
+    analyzer = FeeAnalyzer(
+        _client(server, "openai", fee=True), _client(server, "anthropic", fee=True), cache=MemoryResponseCache()
+    )
+
+    def run():
+        analyzer.analyze(document, provider, use_cache=False)
+
+    return _measure(server, run, run)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=20000.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server latency before prefill")
+    args = parser.parse_args()
+
+    document = "\n\n".join("\n".join(page) for page in make_fee_schedule_pages(args.pages, seed=0))
+    for settings in (single_settings, fee_settings):
+        settings["METRICS_ENABLED"] = False
+        settings["SIMILARITY_REUSE"] = False
+        settings["ROUTER_BACKENDS"] = ""
+    print(f"fee schedule of {args.pages} pages, ~{len(document) // TOKEN_CHARS} tokens; "
+          f"prefill {args.prefill_tokens_per_second:.0f} tokens/s")
+    for case, run in (("retry", _retry), ("repeat", _repeat)):
+        for provider, caching in (("openai", True), ("anthropic", False), ("anthropic", True)):
+            for settings in (single_settings, fee_settings):
+                settings["PROMPT_CACHING"] = caching
+            with StubServer(latency=args.latency, prefill_tokens_per_second=args.prefill_tokens_per_second) as server:
+                first, second, share = run(server, provider, document)
+            label = f"{case} {provider}" + ("" if provider == "openai" else f" caching {'on' if caching else 'off'}")
+            print(f"{label:<28} first {first:6.3f}s  second {second:6.3f}s  {share:6.1%} of its prompt cached")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark prompt compression of extracted PDF text (pure CPU, no LLM calls).
+
+Extracts synthetic fee schedules of ``--pages`` pages (see
+``make_fee_schedule_pages``) and the sample PDFs from the test data, then
+compresses the page texts with each package's ``compress_pages``. Reported
+per document and package: estimated tokens before and after, the share
+saved, compression time and, for the synthetic schedules, the share of
+fee table rows still present verbatim (fee line recall).
+
+Usage:
+    python -m benchmarks.bench_prompt_compression --pages 20 100 300
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_pdf import build_pdf, make_fee_schedule_pages
+from fee_simulator.utils import preprocess as fee_preprocess
+from single_doc_analyze.services.pdf_service import iter_pdf_pages
+from single_doc_analyze.utils import preprocess as single_preprocess
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLES = [ROOT / "single_doc_analyze" / "tests" / "test_data" / "sample.pdf",
+           ROOT / "fee_simulator" / "tests" / "test_data" / "sample.pdf"]
+PACKAGES = {"single_doc_analyze": single_preprocess, "fee_simulator": fee_preprocess}
+
+
+def _extract(path) -> list:
+    return list(iter_pdf_pages(str(path), use_cache=False))
+
+
+def _report(name: str, pages: list, fee_lines: list) -> None:
+    for package, module in PACKAGES.items():
+        start = time.perf_counter()
+        result = module.compress_pages(pages)
+        elapsed = time.perf_counter() - start
+        saved = 1 - result.tokens_after / result.tokens_before if result.tokens_before else 0.0
+        recall = f"  fee line recall {sum(line in result.text for line in fee_lines) / len(fee_lines):6.1%}" \
+            if fee_lines else ""
+        print(f"{name:<26} {package:<19} tokens {result.tokens_before:>8} -> {result.tokens_after:>8} "
+              f"({saved:5.1%} saved)  {elapsed * 1000:8.1f} ms{recall}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 100, 300])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.pages:
+            schedule = make_fee_schedule_pages(count, args.seed)
+            path = os.path.join(tmp, f"schedule_{count}.pdf")
+            with open(path, "wb") as f:
+                f.write(build_pdf(schedule))
+            fee_lines = [" ".join(line.split()) for page in schedule for line in page if "$" in line]
+            _report(f"fee schedule, {count} pages", _extract(path), fee_lines)
+    for path in SAMPLES:
+        if path.exists():
+            _report(f"{path.parent.parent.parent.name} sample", _extract(path), [])
+
+
+if __name__ == "__main__":
+    main()
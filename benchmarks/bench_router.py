@@ -0,0 +1,93 @@
+"""Benchmark provider routing and hedged requests against tail latency.
+
+Two local stub servers stand in for two providers. The primary usually
+answers in ``--latency`` seconds, but ``--slow-fraction`` of its requests
+take ``--slow-latency``. The secondary always answers in
+``--secondary-latency`` seconds. Each mode sends ``--warmup`` requests to
+fill the latency window, then ``--requests`` sequential requests through
+``route``, and reports their latency distribution and the number of those
+requests each backend received:
+
+* primary: the primary backend alone,
+* fastest: ``ROUTER_STRATEGY=fastest``, with the slower secondary listed first,
+* hedged: the primary first, hedged to the secondary past its p95.
+
+Usage:
+    python -m benchmarks.bench_router --requests 200 --latency 0.1 --slow-latency 1.0
+"""
+import argparse
+import logging
+import statistics
+import time
+
+from benchmarks.stub_server import StubServer
+from single_doc_analyze.config import settings
+from single_doc_analyze.services.clients import get_openai_client
+from single_doc_analyze.services.router import Backend, clear_backend_stats, request, route
+from single_doc_analyze.utils.stats import percentile
+
+PRIMARY = Backend("openai", "primary")
+SECONDARY = Backend("openai", "secondary")
+
+
+def _run(clients: dict, backends: list, servers: list, requests: int, warmup: int) -> dict:
+    clear_backend_stats()
+
+    def send(i: int) -> None:
+        route(backends, lambda backend: request(clients[backend], backend, "You are a stub.", f"Document {i}"))
+
+    for i in range(warmup):
+        send(i)
+    for server in servers:
+        server.requests = 0
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        send(i)
+        latencies.append(time.perf_counter() - start)
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.mean(latencies),
+        "sent": [server.requests for server in servers],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="primary latency in seconds")
+    parser.add_argument("--slow-fraction", type=float, default=0.02, help="share of slow primary requests")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="latency of slow primary requests")
+    parser.add_argument("--secondary-latency", type=float, default=0.15)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # Keep the account-level request pacing out of the measurement.
+    settings.update(OPENAI_RPM=1e9, OPENAI_TPM=1e12)
+
+    primary = StubServer(latency=args.latency, slow_fraction=args.slow_fraction, slow_latency=args.slow_latency)
+    secondary = StubServer(latency=args.secondary_latency)
+    with primary, secondary:
+        clients = {
+            PRIMARY: get_openai_client("bench", primary.base_url),
+            SECONDARY: get_openai_client("bench", secondary.base_url),
+        }
+        modes = [
+            ("primary", [PRIMARY], {}),
+            ("fastest", [SECONDARY, PRIMARY], {"ROUTER_STRATEGY": "fastest"}),
+            ("hedged", [PRIMARY, SECONDARY], {"ROUTER_HEDGE": True}),
+        ]
+        defaults = {"ROUTER_STRATEGY": settings["ROUTER_STRATEGY"], "ROUTER_HEDGE": settings["ROUTER_HEDGE"]}
+        for name, backends, overrides in modes:
+            settings.update(defaults, **overrides)
+            result = _run(clients, backends, [primary, secondary], args.requests, args.warmup)
+            print(f"{name:<8} p50 {result['p50'] * 1000:6.0f} ms  p95 {result['p95'] * 1000:6.0f} ms  "
+                  f"p99 {result['p99'] * 1000:6.0f} ms  mean {result['mean'] * 1000:6.0f} ms  "
+                  f"requests primary/secondary {result['sent'][0]}/{result['sent'][1]}")
+        settings.update(defaults)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark the rule-based pre-evaluator against recorded LLM evaluations.
+
+Each corpus line is a JSON object with ``source_text``, ``analysis`` (a
+DocumentAnalysis) and ``evaluation`` (the recorded EvaluationResult). The
+bundled corpus in ``benchmarks/data`` is small and hand-labelled; point
+``--corpus`` at verdicts recorded from real evaluator runs for a better estimate.
+
+Reports how many LLM evaluations the rules avoid, how often the local
+verdicts agree with the recorded ones, and the cost of a local evaluation.
+
+Usage:
+    python -m benchmarks.bench_rule_evaluator --accept 0.85 --reject 0.5
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from single_doc_analyze.models.schemas import DocumentAnalysis, EvaluationResult
+from single_doc_analyze.services.rule_evaluator import rule_verdict
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "recorded_evaluations.jsonl"
+
+
+def _load(path: Path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [
+            (
+                record.get("source_text"),
+                DocumentAnalysis.model_validate(record["analysis"]),
+                EvaluationResult.model_validate(record["evaluation"]),
+            )
+            for record in map(json.loads, f)
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--accept", type=float, default=0.85, help="score at or above which to accept locally")
+    parser.add_argument("--reject", type=float, default=0.5, help="score below which to reject locally")
+    parser.add_argument("--repeat", type=int, default=200, help="timing repetitions over the corpus")
+    args = parser.parse_args()
+
+    records = _load(args.corpus)
+    decided = agreed = false_accepts = false_rejects = 0
+    for source_text, analysis, recorded in records:
+        verdict = rule_verdict(analysis, source_text, args.accept, args.reject)
+        if verdict is None:
+            continue
+        decided += 1
+        if verdict.is_acceptable == recorded.is_acceptable:
+            agreed += 1
+        elif verdict.is_acceptable:
+            false_accepts += 1
+        else:
+            false_rejects += 1
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for source_text, analysis, _ in records:
+            rule_verdict(analysis, source_text, args.accept, args.reject)
+    per_call = (time.perf_counter() - start) / (args.repeat * len(records))
+
+    print(f"records:              {len(records)}")
+    print(f"decided locally:      {decided} ({decided / len(records):.0%} of LLM evaluations avoided)")
+    print(f"escalated to the LLM: {len(records) - decided}")
+    if decided:
+        print(f"agreement:            {agreed}/{decided} ({agreed / decided:.0%})")
+    print(f"false accepts:        {false_accepts}")
+    print(f"false rejects:        {false_rejects}")
+    print(f"local evaluation:     {per_call * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark near-duplicate lookups in the similarity index (pure CPU).
+
+The index is filled with ``--documents`` entries. ``--originals`` of them are
+synthetic documents of ``--words`` words; the rest are random signatures,
+which is what MinHash yields for unrelated documents, so filling the index
+does not need to hash 100k texts. Reported:
+
+* the time to compute a signature for a ``--words``-word document,
+* the insert rate while filling the index,
+* lookup latency (``query_signature``) and the share of revised originals
+  found at ``SIMILARITY_ADAPT_THRESHOLD``, for revisions replacing each of
+  ``--edits`` fractions of the words,
+* lookup latency and false matches for unrelated documents.
+
+Usage:
+    python -m benchmarks.bench_similarity_index --documents 100000 --edits 0.002 0.01 0.02 0.05
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from single_doc_analyze.config import settings
+from single_doc_analyze.services.similarity_index import NUM_PERM, SimilarityIndex, minhash_signature
+from single_doc_analyze.utils.stats import percentile
+
+NAMESPACE = "bench"
+
+
+def _document(rng: random.Random, vocabulary: list, words: int) -> list:
+    return [rng.choice(vocabulary) for _ in range(words)]
+
+
+def _revise(rng: random.Random, vocabulary: list, words: list, fraction: float) -> list:
+    revised = list(words)
+    for position in rng.sample(range(len(words)), int(len(words) * fraction)):
+        revised[position] = rng.choice(vocabulary)
+    return revised
+
+
+def _lookups(index: SimilarityIndex, signatures: list, threshold: float) -> tuple:
+    latencies = []
+    matches = []
+    for signature in signatures:
+        start = time.perf_counter()
+        matches.append(index.query_signature(signature, NAMESPACE, threshold))
+        latencies.append(time.perf_counter() - start)
+    return latencies, matches
+
+
+def _report(name: str, latencies: list, found: str) -> None:
+    print(f"{name:<22} p50 {percentile(latencies, 50) * 1e6:6.0f} us  p99 {percentile(latencies, 99) * 1e6:6.0f} us  "
+          f"{found}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--originals", type=int, default=500)
+    parser.add_argument("--words", type=int, default=3000)
+    parser.add_argument("--edits", type=float, nargs="+", default=[0.002, 0.01, 0.02, 0.05])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    vocabulary = [f"term{i}" for i in range(20000)]
+    threshold = settings["SIMILARITY_ADAPT_THRESHOLD"]
+
+    originals = [_document(rng, vocabulary, args.words) for _ in range(args.originals)]
+    texts = [" ".join(words) for words in originals]
+    start = time.perf_counter()
+    signatures = [minhash_signature(text) for text in texts]
+    signature_time = (time.perf_counter() - start) / len(texts)
+    print(f"signature of a {args.words}-word document: {signature_time * 1000:.2f} ms")
+
+    index = SimilarityIndex()
+    background = np.random.default_rng(args.seed).integers(
+        0, 2**32, (args.documents - args.originals, NUM_PERM), dtype=np.uint32
+    )
+    start = time.perf_counter()
+    for text, signature in zip(texts, signatures):
+        index.add(text, NAMESPACE, "{}", signature)
+    for i, signature in enumerate(background):
+        index.add(f"unrelated document {i}", NAMESPACE, "{}", signature)
+    elapsed = time.perf_counter() - start
+    print(f"indexed {len(index)} documents: {len(index) / elapsed:,.0f} inserts/s")
+
+    for fraction in args.edits:
+        revisions = [" ".join(_revise(rng, vocabulary, words, fraction)) for words in originals]
+        latencies, matches = _lookups(index, [minhash_signature(text) for text in revisions], threshold)
+        found = [match is not None and match.text == text for match, text in zip(matches, texts)]
+        similarity = statistics.mean(match.similarity for match in matches if match is not None) if any(found) else 0.0
+        _report(f"{fraction:.1%} of words revised", latencies,
+                f"found {sum(found)}/{len(found)} (mean similarity {similarity:.2f})")
+
+    unrelated = [minhash_signature(" ".join(_document(rng, vocabulary, args.words))) for _ in range(args.originals)]
+    latencies, matches = _lookups(index, unrelated, threshold)
+    _report("unrelated documents", latencies, f"false matches {sum(match is not None for match in matches)}")
+
+
+if __name__ == "__main__":
+    main()
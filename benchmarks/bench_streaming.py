@@ -0,0 +1,55 @@
+"""Benchmark time to first useful output with and without streaming.
+
+LLM calls go to a local stub server that waits ``--latency`` seconds before
+the first token and spreads the rest of the completion over
+``--generation-seconds``, so no API key is needed.
+
+Usage:
+    python -m benchmarks.bench_streaming --latency 0.5 --generation-seconds 10
+"""
+import argparse
+import time
+
+from benchmarks.stub_server import ANALYSIS_JSON, StubServer
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.clients import get_openai_client
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+
+TOKEN_CHARS = 4
+
+
+def _analyzer(server: StubServer) -> DocumentAnalyzer:
+    return DocumentAnalyzer(
+        client=get_openai_client(api_key="bench", base_url=server.base_url), cache=MemoryResponseCache()
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--generation-seconds", type=float, default=10.0, help="seconds to generate the completion")
+    args = parser.parse_args()
+
+    tokens = -(-len(ANALYSIS_JSON) // TOKEN_CHARS)
+    with StubServer(latency=args.latency, token_delay=args.generation_seconds / tokens) as server:
+        start = time.perf_counter()
+        # Without streaming the generation time is simulated after the first token as well.
+        server.latency = args.latency + args.generation_seconds
+        _analyzer(server).analyze("A short document.")
+        blocking = time.perf_counter() - start
+
+        server.latency = args.latency
+        start = time.perf_counter()
+        first_useful = None
+        for update in _analyzer(server).analyze_stream("A short document."):
+            if first_useful is None and update.partial.get("summary"):
+                first_useful = time.perf_counter() - start
+        streamed = time.perf_counter() - start
+
+    print(f"{'mode':>10} {'first output s':>15} {'complete s':>11}")
+    print(f"{'blocking':>10} {blocking:>15.2f} {blocking:>11.2f}")
+    print(f"{'streaming':>10} {first_useful:>15.2f} {streamed:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Load-test ``process_document`` of both apps against a local mock LLM server.
+
+Writes ``--documents`` synthetic PDFs of ``--pages`` pages per app (fee
+schedules for the fee simulator), then runs ``process_document`` on all of
+them at each ``--concurrency`` level. LLM calls go to a ``StubServer`` with
+the given latency, token rate and injected error rate, so no API key is
+needed; caches and similarity reuse are disabled so every run does the
+same work. The mock answers with an analysis that passes the rule-based
+pre-evaluation of the synthetic documents, so a document normally takes
+one LLM call. Reported per app and concurrency level: throughput, document
+latency percentiles, failed documents, LLM requests, peak RSS and the mean
+seconds per document spent in each pipeline stage.
+
+``--save`` writes the results as JSON. ``--baseline`` compares against such
+a file and exits with status 1 if throughput dropped, or a latency
+percentile or stage time grew, by more than ``--threshold`` (and by more
+than ``--min-delta`` seconds), so the run can gate CI.
+
+Usage:
+    python -m benchmarks.load_test --documents 20 --pages 20 --concurrency 1 4 --save baseline.json
+    python -m benchmarks.load_test --documents 20 --pages 20 --concurrency 1 4 --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic_pdf import build_fee_schedule_pdf, build_synthetic_pdf
+from fee_simulator import main as fee_main
+from fee_simulator.config import settings as fee_settings
+from fee_simulator.utils.metrics import REGISTRY as FEE_REGISTRY
+from single_doc_analyze import main as single_main
+from single_doc_analyze.config import settings as single_settings
+from single_doc_analyze.utils.metrics import REGISTRY as SINGLE_REGISTRY
+from single_doc_analyze.utils.stats import percentile
+
+APPS = ("single_doc_analyze", "fee_simulator")
+ANALYSIS_JSON = json.dumps({
+    "summary": "The schedule sets monthly fees and rebates for exchange participants. "
+               "Rates depend on the volume tier and whether an order adds or removes liquidity.",
+    "key_topics": ["Customer rebate tiers", "Market maker fees", "Monthly volume pricing"],
+    "risks_or_issues": ["Billing disputes over executed contracts", "Rebate tier thresholds may change monthly"],
+    "recommended_actions": ["Review the monthly volume tier for each participant",
+                            "Reconcile invoices against executed transaction volume"],
+})
+
+
+def configure(server: StubServer) -> None:
+    """Point both apps at ``server`` and turn off everything that would skip work on repeat runs."""
+    for settings in (single_settings, fee_settings):
+        settings["OPENAI_API_KEY"] = "bench"
+        settings["OPENAI_BASE_URL"] = server.base_url
+        settings["EXTRACTION_CACHE_PATH"] = ""
+        settings["RESPONSE_CACHE_BACKEND"] = "none"
+        settings["INCREMENTAL_ANALYSIS"] = False
+        settings["SIMILARITY_REUSE"] = False
+        settings["ROUTER_BACKENDS"] = ""
+        settings["SHOW_TIMINGS"] = False
+        settings["METRICS_ENABLED"] = True
+        # Keep provider rate limits out of the timings.
+        settings["OPENAI_RPM"] = settings["OPENAI_TPM"] = 1e12
+    fee_settings["ANTHROPIC_API_KEY"] = "bench"
+    fee_settings["ANTHROPIC_BASE_URL"] = server.root_url
+    fee_settings["ANTHROPIC_RPM"] = fee_settings["ANTHROPIC_TPM"] = 1e12
+
+
+def write_documents(directory: str, app: str, documents: int, pages: int) -> List[str]:
+    paths = []
+    for i in range(documents):
+        pdf = build_fee_schedule_pdf(pages, seed=i) if app == "fee_simulator" else build_synthetic_pdf(pages, seed=i)
+        path = os.path.join(directory, f"{app}_{i}.pdf")
+        with open(path, "wb") as f:
+            f.write(pdf)
+        paths.append(path)
+    return paths
+
+
+def run(app: str, paths: List[str], concurrency: int, server: StubServer, provider: str = "openai") -> Dict[str, float]:
+    """Process ``paths`` with ``concurrency`` threads and return the measurements."""
+    registry = FEE_REGISTRY if app == "fee_simulator" else SINGLE_REGISTRY
+    process: Callable[[str], str] = (
+        (lambda path: fee_main.process_document(path, provider)) if app == "fee_simulator"
+        else single_main.process_document
+    )
+    registry.reset()
+    requests, errors = server.requests, server.errors
+
+    def timed(path: str) -> tuple:
+        start = time.perf_counter()
+        output = process(path)
+        return time.perf_counter() - start, output.startswith("❌")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(timed, paths))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for latency, _ in results]
+    result = {
+        "throughput": len(paths) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "failed": sum(failed for _, failed in results),
+        "llm_requests": server.requests - requests,
+        "llm_errors": server.errors - errors,
+        # ru_maxrss is reported in kilobytes on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    for name, (_, seconds) in sorted(registry.stage_totals().items()):
+        result[f"stage:{name}"] = seconds / len(paths)
+    return result
+
+
+def find_regressions(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                     threshold: float, min_delta: float) -> List[str]:
+    """Describe each measurement that got worse than ``baseline`` by more than the threshold.
+
+    Higher throughput is better; for latency percentiles and stage times
+    lower is better. Runs and measurements missing from either side are skipped.
+    """
+    regressions = []
+    for run_name, current in results.items():
+        for key, before in baseline.get(run_name, {}).items():
+            after = current.get(key)
+            if after is None:
+                continue
+            if key == "throughput":
+                worse = after < before * (1 - threshold)
+            elif key in ("p50", "p95", "p99") or key.startswith("stage:"):
+                worse = after > before * (1 + threshold) and after - before > min_delta
+            else:
+                continue
+            if worse:
+                regressions.append(f"{run_name} {key}: {before:.4f} -> {after:.4f}")
+    return regressions
+
+
+def _report(run_name: str, result: Dict[str, float]) -> None:
+    print(f"{run_name:<28} {result['throughput']:>7.2f} docs/s  p50 {result['p50']:6.3f}s  p95 {result['p95']:6.3f}s  "
+          f"p99 {result['p99']:6.3f}s  failed {result['failed']:.0f}  LLM requests {result['llm_requests']:.0f} "
+          f"({result['llm_errors']:.0f} failed)  "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    stages = [(key[len("stage:"):], value) for key, value in result.items() if key.startswith("stage:")]
+    print("    " + "  ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in stages))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", nargs="+", choices=APPS, default=list(APPS))
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--provider", choices=("openai", "anthropic"), default="openai",
+                        help="Provider for the fee simulator")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock server time to first token in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Fail if results regressed against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--min-delta", type=float, default=0.01, help="Ignore timing changes below this many seconds")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, StubServer(
+        latency=args.latency, tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+        responses={"analysis": ANALYSIS_JSON},
+    ) as server:
+        configure(server)
+        for app in args.apps:
+            paths = write_documents(tmp, app, args.documents, args.pages)
+            for concurrency in args.concurrency:
+                run_name = f"{app} x{concurrency}"
+                results[run_name] = run(app, paths, concurrency, server, args.provider)
+                _report(run_name, results[run_name])
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.threshold, args.min_delta)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
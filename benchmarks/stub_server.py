@@ -0,0 +1,544 @@
+"""Local stand-in for the OpenAI chat completions and Anthropic messages endpoints.
+
+Requests to a path ending in ``/messages`` get Anthropic-shaped responses,
+all others OpenAI-shaped ones. The reply is a canned payload picked from the
+prompt (see ``payload_kind``): a ``DocumentAnalysis``, an evaluation, a
+``FeeScenarioAnalysis`` or a rate table; pass ``responses`` to override them.
+
+Counts accepted TCP connections so benchmarks can show connection reuse, and
+can answer with 429s (explicitly queued, or whenever more than
+``max_in_flight`` requests are open) to exercise rate limiting, or with 500s
+for an ``error_rate`` share of requests. Streaming requests get server-sent
+events paced by ``token_delay``; with ``tokens_per_second`` set, tokens are
+paced at that rate and non-streaming responses also wait for the whole
+generation. A ``slow_fraction`` of requests takes ``slow_latency`` instead
+of ``latency`` to simulate tail latency.
+
+The OpenAI Files and Batches endpoints and the Anthropic Message Batches
+endpoints are stood in for as well. A batch ends ``batch_latency`` seconds
+after it was created; each of its requests fails at ``error_rate``.
+
+Provider prompt caching is simulated: an Anthropic request reads the prefix
+up to its ``cache_control`` breakpoint from the cache if an earlier request
+wrote the same prefix, and an OpenAI request reads its longest prefix (in
+128-token steps from 1024 tokens) seen before. The usage reports the cached
+tokens, and with ``prefill_tokens_per_second`` set, the uncached prompt
+tokens (~4 characters each) add to the time to first token.
+"""
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANALYSIS_JSON = json.dumps({
+    "summary": "Stub summary.",
+    "key_topics": ["Stub topic"],
+    "risks_or_issues": ["Stub risk"],
+    "recommended_actions": ["Stub action"],
+})
+EVALUATION_JSON = json.dumps({"is_acceptable": True, "feedback": "The analysis meets the requirements."})
+FEES_JSON = json.dumps({"scenarios": [
+    {
+        "participant_type": "Customer",
+        "volume_tier": "Tier 1",
+        "order_type": "Adding liquidity",
+        "estimated_fee": "$0.00 per contract",
+        "rebate": "$0.25 per contract",
+        "notes": "Stub scenario.",
+    },
+    {
+        "participant_type": "Market Maker",
+        "volume_tier": "All tiers",
+        "order_type": "Removing liquidity",
+        "estimated_fee": "$0.50 per contract",
+        "rebate": "$0.00 per contract",
+        "notes": "Stub scenario.",
+    },
+]})
+RATE_TABLE_JSON = json.dumps({"rates": [
+    {
+        "participant_type": "Customer",
+        "order_type": "Adding liquidity",
+        "volume_tier": "Tier 1",
+        "min_volume": 0,
+        "fee_per_unit": 0.0,
+        "rebate_per_unit": 0.25,
+        "unit": "contract",
+    },
+]})
+PAYLOADS = {"analysis": ANALYSIS_JSON, "evaluation": EVALUATION_JSON, "fees": FEES_JSON, "rate_table": RATE_TABLE_JSON}
+TOKEN_CHARS = 4
+# Reported for every request; completion tokens are the ~4-character chunks sent.
+PROMPT_TOKENS = 10
+OPENAI_CACHE_MIN_CHARS = 1024 * TOKEN_CHARS
+OPENAI_CACHE_STEP_CHARS = 128 * TOKEN_CHARS
+INSTRUCTION_CHARS = 200
+
+
+def request_text(request: dict) -> str:
+    """The system prompt and message texts of an OpenAI or Anthropic request body."""
+    parts = []
+    for content in [request.get("system")] + [message.get("content") for message in request.get("messages", [])]:
+        if isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+        elif content:
+            parts.append(content)
+    return "\n".join(parts)
+
+
+def reply(request: dict, responses: Dict[str, str]) -> tuple:
+    """The canned payload answering a request body, its ~4-character tokens and the usage.
+
+    The usage is (uncached prompt, completion, cache read, cache write) tokens.
+    """
+    payload = responses[payload_kind(request_text(request))]
+    tokens = [payload[i:i + TOKEN_CHARS] for i in range(0, len(payload), TOKEN_CHARS)]
+    return payload, tokens, (PROMPT_TOKENS, len(tokens), 0, 0)
+
+
+def _openai_usage(usage: tuple) -> dict:
+    prompt = usage[0] + usage[2]
+    return {
+        "prompt_tokens": prompt, "completion_tokens": usage[1], "total_tokens": prompt + usage[1],
+        "prompt_tokens_details": {"cached_tokens": usage[2]},
+    }
+
+
+def completion_body(request: dict, payload: str, usage: tuple) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": request.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": payload},
+            "finish_reason": "stop",
+        }],
+        "usage": _openai_usage(usage),
+    }
+
+
+def message_body(request: dict, payload: str, usage: tuple) -> dict:
+    return {
+        "id": "msg_stub",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", "stub"),
+        "content": [{"type": "text", "text": payload}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": usage[0], "output_tokens": usage[1],
+                  "cache_read_input_tokens": usage[2], "cache_creation_input_tokens": usage[3]},
+    }
+
+
+def payload_kind(text: str) -> str:
+    """Which canned payload answers a prompt: evaluation, rate_table, fees or analysis.
+
+    Only the start of the text is read, where the system prompt and the
+    instructions are, so document text does not change the answer.
+    """
+    lowered = text[:INSTRUCTION_CHARS].lower()
+    if "evaluator" in lowered:
+        return "evaluation"
+    if "rate table" in lowered:
+        return "rate_table"
+    if "fee" in lowered:
+        return "fees"
+    return "analysis"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/files"):
+            self._send_json(200, self.server.create_file(self.headers.get("Content-Type", ""), body))
+            return
+        if path.endswith("/messages/batches"):
+            self._send_json(200, self.server.create_message_batch(json.loads(body)))
+            return
+        if path.endswith("/batches"):
+            self._send_json(200, self.server.create_batch(json.loads(body)))
+            return
+        request = json.loads(body or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.in_flight += 1
+            throttle = self.server.pending_429 > 0 or (
+                self.server.max_in_flight is not None and self.server.in_flight > self.server.max_in_flight
+            )
+            if self.server.pending_429 > 0:
+                self.server.pending_429 -= 1
+            if throttle:
+                self.server.throttled += 1
+            latency = self.server.latency
+            if self.server.slow_fraction and self.server.random.random() < self.server.slow_fraction:
+                latency = self.server.slow_latency
+            fail = not throttle and self.server.error_rate and self.server.random.random() < self.server.error_rate
+            if fail:
+                self.server.errors += 1
+        anthropic = path.endswith("/messages")
+        payload, tokens, usage = reply(request, self.server.responses)
+        cache_read, cache_write, prefill = self.server.prompt_cache(request, anthropic)
+        usage = (usage[0], usage[1], cache_read, cache_write)
+        latency += prefill
+        try:
+            if throttle:
+                self._send_429()
+            elif fail:
+                time.sleep(latency)
+                self._send_error(anthropic)
+            elif request.get("stream"):
+                time.sleep(latency)
+                if anthropic:
+                    self._send_message_stream(request, tokens, usage)
+                else:
+                    self._send_stream(request, tokens, usage)
+            else:
+                time.sleep(latency + (len(tokens) / self.server.tokens_per_second if self.server.tokens_per_second else 0))
+                if anthropic:
+                    self._send_message(request, payload, usage)
+                else:
+                    self._send_completion(request, payload, usage)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        parts = path.split("/")
+        if "/files/" in path and path.endswith("/content"):
+            content = self.server.files.get(parts[-2])
+            if content is None:
+                self._send_json(404, {"error": {"message": "No such file", "type": "invalid_request_error"}})
+            else:
+                self._send_bytes(200, content, "application/octet-stream")
+        elif "/messages/batches/" in path and path.endswith("/results"):
+            self._send_bytes(200, self.server.message_batch_results(parts[-2]), "application/binary")
+        elif "/messages/batches/" in path:
+            self._send_json(200, self.server.message_batch(parts[-1]))
+        elif "/batches/" in path:
+            self._send_json(200, self.server.batch(parts[-1]))
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def _send_json(self, status: int, payload: dict):
+        self._send_bytes(status, json.dumps(payload).encode(), "application/json")
+
+    def _send_bytes(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, anthropic: bool):
+        if anthropic:
+            self._send_json(500, {"type": "error", "error": {"type": "api_error", "message": "Injected error"}})
+        else:
+            self._send_json(500, {"error": {"message": "Injected error", "type": "server_error", "code": None}})
+
+    def _send_429(self):
+        body = json.dumps({
+            "error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}
+        }).encode()
+        self.send_response(429)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Retry-After", str(self.server.retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_stream(self, request: dict, tokens: list, usage: tuple):
+        """Send the completion as server-sent events, one ~4-character token every ``token_delay`` seconds."""
+        self._start_events()
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(self.server.token_delay)
+            self._send_event({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            })
+        self._send_event({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": request.get("model", "stub"),
+            "choices": [],
+            "usage": _openai_usage(usage),
+        })
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+    def _send_message_stream(self, request: dict, tokens: list, usage: tuple):
+        """Anthropic counterpart of ``_send_stream``."""
+        self._start_events()
+        message = message_body(request, "", usage)
+        message["content"] = []
+        message["usage"]["output_tokens"] = 0
+        self._send_event({"type": "message_start", "message": message}, "message_start")
+        self._send_event({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+                         "content_block_start")
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(self.server.token_delay)
+            self._send_event({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}},
+                             "content_block_delta")
+        self._send_event({"type": "content_block_stop", "index": 0}, "content_block_stop")
+        self._send_event({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                          "usage": {"output_tokens": usage[1]}}, "message_delta")
+        self._send_event({"type": "message_stop"}, "message_stop")
+        self._send_chunk(b"")
+
+    def _send_event(self, payload: dict, event: Optional[str] = None):
+        prefix = f"event: {event}\n" if event else ""
+        self._send_chunk(f"{prefix}data: {json.dumps(payload)}\n\n".encode())
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_completion(self, request: dict, payload: str, usage: tuple):
+        self._send_json(200, completion_body(request, payload, usage))
+
+    def _send_message(self, request: dict, payload: str, usage: tuple):
+        self._send_json(200, message_body(request, payload, usage))
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port: int = 0, latency: float = 0.0,
+                 max_in_flight: Optional[int] = None, retry_after: float = 0.0, token_delay: float = 0.0,
+                 slow_fraction: float = 0.0, slow_latency: float = 0.0, seed: int = 0,
+                 tokens_per_second: Optional[float] = None, error_rate: float = 0.0,
+                 responses: Optional[Dict[str, str]] = None, batch_latency: float = 0.0,
+                 prefill_tokens_per_second: Optional[float] = None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.tokens_per_second = tokens_per_second
+        self.token_delay = token_delay or (1 / tokens_per_second if tokens_per_second else 0.0)
+        self.error_rate = error_rate
+        self.responses = {**PAYLOADS, **(responses or {})}
+        self.slow_fraction = slow_fraction
+        self.slow_latency = slow_latency
+        self.random = random.Random(seed)
+        self.pending_429 = 0
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.throttled = 0
+        self.errors = 0
+        self.batch_latency = batch_latency
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.prompt_prefixes = set()
+        self.prompt_tokens = 0
+        self.cache_read_tokens = 0
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, dict] = {}
+        self.batch_requests = 0
+        self._ids = itertools.count(1)
+
+    def prompt_cache(self, request: dict, anthropic: bool) -> Tuple[int, int, float]:
+        """The prompt tokens read from and written to the simulated prompt cache, and the prefill seconds."""
+        text = request_text(request)
+        read, write = 0, 0
+        if anthropic:
+            # Text up to the last cache_control breakpoint, in the order the API caches it.
+            parts, prefix = [], None
+            for content in [request.get("system")] + [message.get("content") for message in request.get("messages", [])]:
+                for block in content if isinstance(content, list) else [{"text": content or ""}]:
+                    parts.append(block.get("text", ""))
+                    if block.get("cache_control"):
+                        prefix = "\n".join(parts)
+            if prefix is not None:
+                key = hashlib.sha256(prefix.encode()).hexdigest()
+                with self.lock:
+                    hit = key in self.prompt_prefixes
+                    self.prompt_prefixes.add(key)
+                read, write = (len(prefix) // TOKEN_CHARS, 0) if hit else (0, len(prefix) // TOKEN_CHARS)
+        elif len(text) >= OPENAI_CACHE_MIN_CHARS:
+            digest, keys = hashlib.sha256(), []
+            for end in range(OPENAI_CACHE_STEP_CHARS, len(text) + 1, OPENAI_CACHE_STEP_CHARS):
+                digest.update(text[end - OPENAI_CACHE_STEP_CHARS:end].encode())
+                if end >= OPENAI_CACHE_MIN_CHARS:
+                    keys.append((end, digest.hexdigest()))
+            with self.lock:
+                read = max((end for end, key in keys if key in self.prompt_prefixes), default=0) // TOKEN_CHARS
+                self.prompt_prefixes.update(key for _, key in keys)
+        with self.lock:
+            self.prompt_tokens += len(text) // TOKEN_CHARS
+            self.cache_read_tokens += read
+        uncached = max(0, len(text) // TOKEN_CHARS - read)
+        return read, write, uncached / self.prefill_tokens_per_second if self.prefill_tokens_per_second else 0.0
+
+    def _fails(self) -> bool:
+        with self.lock:
+            fail = bool(self.error_rate) and self.random.random() < self.error_rate
+            self.errors += fail
+            return fail
+
+    def create_file(self, content_type: str, body: bytes) -> dict:
+        """Store the file of a multipart upload."""
+        form = BytesParser(policy=default_policy).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        fields = {part.get_param("name", header="content-disposition"): part for part in form.iter_parts()}
+        content = fields["file"].get_payload(decode=True)
+        file_id = f"file-stub{next(self._ids)}"
+        with self.lock:
+            self.files[file_id] = content
+        return {
+            "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": fields["file"].get_filename(), "purpose": fields["purpose"].get_content().strip(),
+            "status": "processed",
+        }
+
+    def _register_batch(self, batch: dict, requests: List[dict]) -> dict:
+        with self.lock:
+            self.batches[batch["id"]] = {"batch": batch, "requests": requests, "created": time.monotonic()}
+            self.batch_requests += len(requests)
+        return batch
+
+    def _finished_batch(self, batch_id: str) -> Optional[dict]:
+        """The batch record once ``batch_latency`` has passed, answering its requests on first access."""
+        record = self.batches[batch_id]
+        if time.monotonic() - record["created"] < self.batch_latency:
+            return None
+        if "results" not in record:
+            record["results"] = [
+                (item, None if self._fails() else reply(body, self.responses))
+                for item, body in record["requests"]
+            ]
+        return record
+
+    def create_batch(self, request: dict) -> dict:
+        """Start an OpenAI batch over the JSONL requests of an uploaded file."""
+        lines = [json.loads(line) for line in self.files[request["input_file_id"]].splitlines() if line.strip()]
+        return self._register_batch({
+            "id": f"batch_stub{next(self._ids)}", "object": "batch", "endpoint": request["endpoint"],
+            "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+            "status": "in_progress", "created_at": int(time.time()), "output_file_id": None,
+            "error_file_id": None, "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+        }, [(line["custom_id"], line["body"]) for line in lines])
+
+    def batch(self, batch_id: str) -> dict:
+        record = self._finished_batch(batch_id)
+        if record is None:
+            return self.batches[batch_id]["batch"]
+        batch = record["batch"]
+        if batch["status"] == "completed":
+            return batch
+        requests = dict(record["requests"])
+        output, errors = [], []
+        for custom_id, result in record["results"]:
+            if result is None:
+                errors.append({"id": f"batch_req_{custom_id}", "custom_id": custom_id, "response": {
+                    "status_code": 500,
+                    "body": {"error": {"message": "Injected error", "type": "server_error"}},
+                }, "error": None})
+            else:
+                output.append({"id": f"batch_req_{custom_id}", "custom_id": custom_id, "response": {
+                    "status_code": 200, "body": completion_body(requests[custom_id], result[0], result[2]),
+                }, "error": None})
+        for key, lines in (("output_file_id", output), ("error_file_id", errors)):
+            if lines:
+                file_id = f"file-stub{next(self._ids)}"
+                self.files[file_id] = "".join(json.dumps(line) + "\n" for line in lines).encode()
+                batch[key] = file_id
+        batch.update(status="completed", request_counts={
+            "total": len(output) + len(errors), "completed": len(output), "failed": len(errors),
+        })
+        return batch
+
+    def create_message_batch(self, request: dict) -> dict:
+        """Start an Anthropic message batch."""
+        requests = request["requests"]
+        return self._register_batch({
+            "id": f"msgbatch_stub{next(self._ids)}", "type": "message_batch", "processing_status": "in_progress",
+            "request_counts": {"processing": len(requests), "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": "2025-01-01T00:00:00Z", "expires_at": "2025-01-02T00:00:00Z", "ended_at": None,
+            "archived_at": None, "cancel_initiated_at": None, "results_url": None,
+        }, [(item["custom_id"], item["params"]) for item in requests])
+
+    def message_batch(self, batch_id: str) -> dict:
+        record = self._finished_batch(batch_id)
+        if record is None:
+            return self.batches[batch_id]["batch"]
+        failed = sum(result is None for _, result in record["results"])
+        record["batch"].update(
+            processing_status="ended", ended_at="2025-01-01T00:00:01Z",
+            results_url=f"{self.base_url}/messages/batches/{batch_id}/results",
+            request_counts={"processing": 0, "succeeded": len(record["results"]) - failed, "errored": failed,
+                            "canceled": 0, "expired": 0},
+        )
+        return record["batch"]
+
+    def message_batch_results(self, batch_id: str) -> bytes:
+        record = self.batches[batch_id]
+        requests = dict(record["requests"])
+        lines = []
+        for custom_id, result in record["results"]:
+            if result is None:
+                outcome = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": "api_error", "message": "Injected error",
+                }}}
+            else:
+                outcome = {"type": "succeeded", "message": message_body(requests[custom_id], result[0], result[2])}
+            lines.append(json.dumps({"custom_id": custom_id, "result": outcome}) + "\n")
+        return "".join(lines).encode()
+
+    def throttle_next(self, count: int) -> None:
+        """Answer the next ``count`` requests with 429 Too Many Requests."""
+        with self.lock:
+            self.pending_429 += count
+
+    @property
+    def root_url(self) -> str:
+        """Base URL for the Anthropic SDK, which adds ``/v1`` itself."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.root_url}/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,124 @@
+"""Synthetic PDF generator used by the benchmarks.
+
+Builds text-only PDFs by hand so the benchmarks do not need an extra
+PDF-writing dependency.
+"""
+import argparse
+import random
+from typing import List, Optional
+
+_WORDS = (
+    "fee rebate tier participant customer market maker professional order "
+    "contract volume liquidity exchange schedule penny symbol complex simple "
+    "transaction charge monthly average daily executed electronically floor "
+    "billing dispute invoice member pricing section provision qualify rate"
+).split()
+_LEGAL_WORDS = (
+    "shall member exchange rule pursuant provided however notwithstanding "
+    "agreement obligation party liability applicable law regulation notice "
+    "termination amendment effective period written consent affiliate"
+).split()
+_PARTICIPANTS = ("Customer", "Market Maker", "Professional", "Broker-Dealer", "Firm")
+_ORDER_TYPES = ("Adding liquidity", "Removing liquidity", "Opening auction", "Closing auction")
+DISCLAIMER = "This schedule is provided for information only and does not amend the Exchange Rules."
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_page_lines(page_number: int, lines: int = 45, rng: Optional[random.Random] = None) -> List[str]:
+    """Generate pseudo fee-schedule lines for one page."""
+    rng = rng or random.Random(page_number)
+    body = [
+        " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 14))).capitalize() + "."
+        for _ in range(lines)
+    ]
+    return [f"Section {page_number}"] + body + [f"Page {page_number}"]
+
+
+def make_fee_schedule_pages(page_count: int, seed: int = 0) -> List[List[str]]:
+    """Generate a representative fee schedule: a contents page, then pages mixing fee tables and legal prose.
+
+    Every page has a running header, a "Page N of M" footer and a disclaimer.
+    Fee table rows are the lines containing "$".
+    """
+    rng = random.Random(seed)
+    header = ["Example Options Exchange", "Fee Schedule - Effective January 1, 2025"]
+    footer = lambda n: [DISCLAIMER, f"Page {n} of {page_count}"]
+    contents = ["Table of Contents"] + [
+        f"Section {i} {rng.choice(_WORDS).capitalize()} {rng.choice(_WORDS)} {'.' * 20} {i + 1}"
+        for i in range(1, min(page_count, 30))
+    ]
+    pages = [header + contents + footer(1)]
+    for n in range(2, page_count + 1):
+        body = [f"Section {n - 1} " + " ".join(rng.choice(_WORDS) for _ in range(3)).title()]
+        for _ in range(rng.randint(2, 4)):
+            if rng.random() < 0.4:
+                body.append("Participant Order Type Fee Rebate")
+                body.extend(
+                    f"{rng.choice(_PARTICIPANTS)} {rng.choice(_ORDER_TYPES)} ${rng.randint(0, 60) / 100:.2f} per contract "
+                    f"${rng.randint(0, 40) / 100:.2f} per contract"
+                    for _ in range(rng.randint(3, 8))
+                )
+            else:
+                body.extend(
+                    " ".join(rng.choice(_LEGAL_WORDS) for _ in range(rng.randint(10, 16))).capitalize() + "."
+                    for _ in range(rng.randint(4, 10))
+                )
+            body.append("")
+        pages.append(header + body + footer(n))
+    return pages
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """Build a PDF where each entry of ``pages`` is the list of text lines on that page."""
+    objects: List[bytes] = []
+    # 1: catalog, 2: pages tree, 3: font; page/content objects follow.
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for pid, lines in zip(page_ids, pages):
+        text_ops = " T* ".join(f"({_escape(line)}) Tj" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {text_ops} ET".encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pid + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(out)
+
+
+def build_synthetic_pdf(page_count: int, lines_per_page: int = 45, seed: int = 0) -> bytes:
+    """Build a synthetic multi-page fee schedule PDF."""
+    rng = random.Random(seed)
+    return build_pdf([make_page_lines(i + 1, lines_per_page, rng) for i in range(page_count)])
+
+
+def build_fee_schedule_pdf(page_count: int, seed: int = 0) -> bytes:
+    """Build a PDF of ``make_fee_schedule_pages``."""
+    return build_pdf(make_fee_schedule_pages(page_count, seed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic PDF to disk.")
+    parser.add_argument("output")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--lines", type=int, default=45)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with open(args.output, "wb") as f:
+        f.write(build_synthetic_pdf(args.pages, args.lines, args.seed))
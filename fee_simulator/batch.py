@@ -0,0 +1,236 @@
+"""Batch mode: run fee analysis on every PDF in a directory or glob and append results as JSONL.
+
+Text extraction runs in a process pool while LLM calls run on one event loop
+with bounded concurrency. Documents already recorded successfully in the
+output file are skipped, so an interrupted run can simply be restarted.
+
+With ``--batch-api`` the LLM calls of all documents are instead submitted as
+OpenAI Batch or Anthropic Message Batches jobs (see ``services.batch_api``),
+which are cheaper and have separate rate limits but can take hours to finish.
+
+Usage:
+    python -m fee_simulator.batch schedules/ --provider anthropic --output fees.jsonl
+    python -m fee_simulator.batch schedules/ --provider anthropic --output fees.jsonl --batch-api
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Set, Union
+from .services.analyzer import AsyncFeeAnalyzer
+from .services.batch_api import BatchRunner, run_batch_analysis
+from .services.pdf_service import extract_pages_incremental, extract_text_from_pdf
+from .services.version_store import document_id
+from .utils.metrics import stage, start_metrics_server, trace
+from .utils.stats import percentile
+from .config import load_env, settings, setup_logging
+
+logger = logging.getLogger(__name__)
+
+def find_documents(inputs: Iterable[str]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of PDF paths."""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True)
+        else:
+            matches = glob.glob(item, recursive=True)
+        paths.update(os.path.abspath(path) for path in matches if os.path.isfile(path))
+    return sorted(paths)
+
+def load_completed(output_path: str) -> Set[str]:
+    """Return the paths already recorded successfully in an existing output file."""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run.
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["path"])
+    return completed
+
+def _extract(path: str, incremental: bool = False) -> Union[str, List[str]]:
+    if incremental:
+        return extract_pages_incremental(path)
+    # Each batch worker is already one process of a pool; don't nest another.
+    return extract_text_from_pdf(path, workers=1)
+
+async def run_batch(
+    paths: List[str],
+    output_path: str,
+    workers: int,
+    concurrency: int,
+    provider: str = "openai",
+    analyzer: Optional[AsyncFeeAnalyzer] = None,
+    incremental: bool = False
+) -> dict:
+    """Process ``paths`` and append one JSON record per document to ``output_path``.
+
+    Args:
+        paths: PDF paths to process
+        output_path: JSONL file results are appended to
+        workers: Number of extraction processes
+        concurrency: Maximum number of documents in the LLM stage at once
+        provider: The LLM provider to use ("openai" or "anthropic")
+        analyzer: Analyzer to use (a new one is created if omitted)
+        incremental: Analyze page by page, reusing results from earlier versions of each document
+
+    Returns:
+        dict: Summary with document counts, docs/sec and p50/p95 latency
+    """
+    loop = asyncio.get_running_loop()
+    analyzer = analyzer or AsyncFeeAnalyzer()
+    llm_slots = asyncio.Semaphore(concurrency)
+    # Limit documents in flight so extracted text doesn't pile up ahead of the LLM stage.
+    document_slots = asyncio.Semaphore(concurrency + workers)
+    latencies: List[float] = []
+    failed = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async def process(path: str) -> dict:
+            async with document_slots:
+                start = time.perf_counter()
+                with trace(settings["SHOW_TIMINGS"]) as timings:
+                    try:
+                        with stage("pdf_extract"):
+                            text = await loop.run_in_executor(pool, _extract, path, incremental)
+                        async with llm_slots:
+                            if incremental:
+                                result = await analyzer.analyze_pages(text, provider, doc_id=document_id(path))
+                            else:
+                                result = await analyzer.analyze(text, provider=provider)
+                        record = {"path": path, "status": "ok", "result": result.model_dump()}
+                    except Exception as e:
+                        logger.error(f"Failed to process {path}: {str(e)}")
+                        record = {"path": path, "status": "error", "error": str(e)}
+                record["latency"] = time.perf_counter() - start
+                if timings is not None:
+                    record["timings"] = timings
+                return record
+
+        started = time.perf_counter()
+        with open(output_path, "a", encoding="utf-8") as out:
+            for next_record in asyncio.as_completed([process(path) for path in paths]):
+                record = await next_record
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                latencies.append(record["latency"])
+                failed += record["status"] != "ok"
+        elapsed = time.perf_counter() - started
+
+    return {
+        "documents": len(paths),
+        "succeeded": len(paths) - failed,
+        "failed": failed,
+        "elapsed": elapsed,
+        "docs_per_sec": len(paths) / elapsed if elapsed else 0.0,
+        "p50_latency": percentile(latencies, 50),
+        "p95_latency": percentile(latencies, 95),
+    }
+
+def run_batch_api(
+    paths: List[str],
+    output_path: str,
+    workers: int,
+    provider: str = "openai",
+    runner: Optional[BatchRunner] = None
+) -> dict:
+    """Extract ``paths`` in a process pool, analyze them all with batch jobs and append JSON records.
+
+    Latencies are measured from the start of the run, since every document
+    waits for the same jobs.
+
+    Returns:
+        dict: Summary with document counts, docs/sec and p50/p95 latency
+    """
+    started = time.perf_counter()
+    texts = {}
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as pool, stage("pdf_extract"):
+        futures = {path: pool.submit(_extract, path) for path in paths}
+        for path, future in futures.items():
+            try:
+                texts[path] = future.result()
+            except Exception as e:
+                logger.error(f"Failed to process {path}: {str(e)}")
+                records.append({"path": path, "status": "error", "error": str(e)})
+
+    results = run_batch_analysis(list(texts.values()), provider, runner)
+    for path, result in zip(texts, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to process {path}: {str(result)}")
+            records.append({"path": path, "status": "error", "error": str(result)})
+        else:
+            records.append({"path": path, "status": "ok", "result": result.model_dump()})
+    elapsed = time.perf_counter() - started
+
+    latencies: List[float] = []
+    with open(output_path, "a", encoding="utf-8") as out:
+        for record in records:
+            record["latency"] = elapsed
+            out.write(json.dumps(record) + "\n")
+            latencies.append(elapsed)
+    failed = sum(record["status"] != "ok" for record in records)
+    return {
+        "documents": len(paths),
+        "succeeded": len(paths) - failed,
+        "failed": failed,
+        "elapsed": elapsed,
+        "docs_per_sec": len(paths) / elapsed if elapsed else 0.0,
+        "p50_latency": percentile(latencies, 50),
+        "p95_latency": percentile(latencies, 95),
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description="Run fee analysis on a folder of PDFs and write JSONL results.")
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of PDF files")
+    parser.add_argument("--output", "-o", required=True, help="JSONL file to append results to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Extraction processes")
+    parser.add_argument("--provider", choices=["openai", "anthropic"], default="openai")
+    parser.add_argument(
+        "--concurrency", type=int, default=settings["DOCUMENT_CONCURRENCY"], help="Concurrent LLM pipelines"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true", default=settings["INCREMENTAL_ANALYSIS"],
+        help="Only re-analyze pages that changed since an earlier version of each document"
+    )
+    parser.add_argument(
+        "--batch-api", action="store_true",
+        help="Submit the LLM calls as provider batch jobs: cheaper, but results can take hours"
+    )
+    args = parser.parse_args(argv)
+    setup_logging()
+    if settings["METRICS_ENABLED"]:
+        start_metrics_server(settings["METRICS_PORT"])
+
+    paths = find_documents(args.inputs)
+    completed = load_completed(args.output)
+    pending = [path for path in paths if path not in completed]
+    logger.info(f"Found {len(paths)} documents, {len(paths) - len(pending)} already done")
+    if not pending:
+        return
+
+    if args.batch_api:
+        summary = run_batch_api(pending, args.output, args.workers, args.provider)
+    else:
+        summary = asyncio.run(run_batch(
+            pending, args.output, args.workers, args.concurrency, args.provider, incremental=args.incremental
+        ))
+    print(
+        f"Processed {summary['documents']} documents ({summary['failed']} failed) "
+        f"in {summary['elapsed']:.1f}s: {summary['docs_per_sec']:.2f} docs/sec, "
+        f"p50 {summary['p50_latency']:.2f}s, p95 {summary['p95_latency']:.2f}s"
+    )
+
+if __name__ == "__main__":
+    main()
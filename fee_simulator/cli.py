@@ -0,0 +1,82 @@
+"""Headless mode: simulate the fee scenarios of PDFs from the command line.
+
+Runs the same extraction and fee analysis as the web app, but never imports
+gradio, and only the chosen provider's SDK (plus pypdf) is loaded, once a
+document is actually analyzed, so the command starts quickly. Formatted
+scenarios go to stdout (one JSON object per document with ``--json``) and
+logs to stderr; the exit status is 1 if any document failed.
+
+Usage:
+    python -m fee_simulator.cli schedule.pdf --provider anthropic
+    python -m fee_simulator.cli a.pdf b.pdf --json > results.jsonl
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import Dict, List, Optional, Tuple
+from .main import format_fee_output
+from .models.schemas import FeeScenarioAnalysis
+from .services.analyzer import FeeAnalyzer
+from .services.pdf_service import close_document, extract_document, extract_pages_incremental
+from .services.version_store import document_id
+from .utils.metrics import trace
+from .config import load_env, settings, setup_logging
+
+logger = logging.getLogger(__name__)
+
+def analyze_file(path: str, provider: str = "openai") -> Tuple[FeeScenarioAnalysis, Optional[Dict[str, float]]]:
+    """Extract one fee schedule PDF and generate its fee scenarios.
+
+    Returns:
+        Tuple: The scenarios and, with SHOW_TIMINGS, the per-stage timings
+
+    Raises:
+        ValueError: If the PDF cannot be read or analyzed
+    """
+    analyzer = FeeAnalyzer()
+    with trace(settings["SHOW_TIMINGS"]) as timings:
+        if settings["INCREMENTAL_ANALYSIS"]:
+            pages = extract_pages_incremental(path)
+            result = analyzer.analyze_pages(pages, provider, doc_id=document_id(path))
+        else:
+            text = extract_document(path)
+            try:
+                result = analyzer.analyze(text, provider=provider)
+            finally:
+                close_document(text)
+    return result, timings
+
+def main(argv: Optional[List[str]] = None) -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description="Simulate the fee scenarios of PDFs, without the web UI.")
+    parser.add_argument("paths", nargs="+", help="Fee schedule PDFs to analyze")
+    parser.add_argument("--provider", choices=["openai", "anthropic"], default="openai")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per document")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    failed = 0
+    for path in args.paths:
+        try:
+            result, timings = analyze_file(path, args.provider)
+        except Exception as e:
+            logger.error(f"Failed to process {path}: {str(e)}")
+            failed += 1
+            if args.json:
+                print(json.dumps({"path": path, "status": "error", "error": str(e)}), flush=True)
+            continue
+        if args.json:
+            record = {"path": path, "status": "ok", "result": result.model_dump()}
+            if timings is not None:
+                record["timings"] = timings
+            print(json.dumps(record), flush=True)
+        else:
+            if len(args.paths) > 1:
+                print(f"# {path}")
+            print(format_fee_output(result, timings), flush=True)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
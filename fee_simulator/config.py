@@ -1,20 +1,150 @@
 """Configuration settings for the fee simulator."""
 import os
-from dotenv import load_dotenv
+import importlib.util
 from pathlib import Path
 import logging
 
-# Load environment variables
-load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env")
-
 # API Keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL")
+# Optional API keys for the other providers ROUTER_BACKENDS can use
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROK_API_KEY = os.getenv("GROK_API_KEY")
 
 # Model settings
 OPENAI_MODEL = "gpt-4o"
 ANTHROPIC_MODEL = "claude-3-haiku-20240307"
 
+# Extraction cache settings (set EXTRACTION_CACHE_PATH to an empty string to disable)
+EXTRACTION_CACHE_PATH = os.getenv(
+    "EXTRACTION_CACHE_PATH",
+    str(Path.home() / ".cache" / "doc_analyzer" / "extraction_cache.sqlite3")
+)
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "512"))
+
+# LLM response cache settings ("memory", "sqlite" or "none"; a TTL of 0 never expires)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH",
+    str(Path.home() / ".cache" / "doc_analyzer" / "response_cache.sqlite3")
+)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+
+# Documents longer than CHUNK_MAX_TOKENS are analyzed in chunks, CHUNK_CONCURRENCY at a time
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "24000"))
+CHUNK_CONCURRENCY = int(os.getenv("CHUNK_CONCURRENCY", "4"))
+
+# Incremental re-analysis: page text and per-chunk results of earlier document versions are
+# kept in the version store (set VERSION_STORE_PATH to an empty string to disable)
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "false").lower() in ("1", "true", "yes")
+INCREMENTAL_CHUNK_TOKENS = int(os.getenv("INCREMENTAL_CHUNK_TOKENS", "4000"))
+VERSION_STORE_PATH = os.getenv(
+    "VERSION_STORE_PATH",
+    str(Path.home() / ".cache" / "doc_analyzer" / "versions.sqlite3")
+)
+VERSION_STORE_MAX_ENTRIES = int(os.getenv("VERSION_STORE_MAX_ENTRIES", "100000"))
+
+# Maximum number of documents processed concurrently on one event loop
+DOCUMENT_CONCURRENCY = int(os.getenv("DOCUMENT_CONCURRENCY", "8"))
+
+# HTTP connection pool and timeout settings for the shared LLM clients
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+
+# Provider rate limits (requests and tokens per minute), adaptive concurrency ceiling,
+# retries for throttled or failed requests and the latency above which concurrency backs off
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "300000"))
+ANTHROPIC_RPM = float(os.getenv("ANTHROPIC_RPM", "50"))
+ANTHROPIC_TPM = float(os.getenv("ANTHROPIC_TPM", "50000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "90"))
+
+# Metrics: per-stage timers and LLM/cache counters served in Prometheus format on METRICS_PORT;
+# SHOW_TIMINGS appends a per-request timing breakdown to the output
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9465"))
+SHOW_TIMINGS = os.getenv("SHOW_TIMINGS", "false").lower() in ("1", "true", "yes")
+
+# Stream completions to the Gradio UI, rendering partial results as they arrive
+STREAM_OUTPUT = os.getenv("STREAM_OUTPUT", "true").lower() in ("1", "true", "yes")
+
+# Job queue: uploads are queued in a SQLite file and processed by JOB_WORKERS worker processes;
+# an attempt running longer than JOB_TIMEOUT seconds is abandoned, and jobs get JOB_MAX_ATTEMPTS attempts
+JOB_QUEUE = os.getenv("JOB_QUEUE", "false").lower() in ("1", "true", "yes")
+JOB_QUEUE_PATH = os.getenv(
+    "JOB_QUEUE_PATH",
+    str(Path.home() / ".cache" / "doc_analyzer" / "fee_jobs.sqlite3")
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+
+# Provider routing: ROUTER_BACKENDS adds fallback backends as provider:model[=relative cost];
+# the "preferred" strategy keeps that order, "fastest" picks the healthy backend with the lowest
+# rolling p50 (the cheapest within ROUTER_LATENCY_SLACK of it). Backends failing more than
+# ROUTER_MAX_ERROR_RATE of their last ROUTER_WINDOW requests are tried last. With ROUTER_HEDGE a
+# duplicate request is sent once the first runs past its p95 (after ROUTER_MIN_SAMPLES requests)
+ROUTER_BACKENDS = os.getenv("ROUTER_BACKENDS", "")
+ROUTER_STRATEGY = os.getenv("ROUTER_STRATEGY", "preferred")
+ROUTER_HEDGE = os.getenv("ROUTER_HEDGE", "false").lower() in ("1", "true", "yes")
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "200"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "10"))
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+ROUTER_LATENCY_SLACK = float(os.getenv("ROUTER_LATENCY_SLACK", "0.2"))
+
+# Near-duplicate reuse: analyzed documents are indexed by MinHash signature. A document at least
+# SIMILARITY_REUSE_THRESHOLD similar to an indexed one reuses its result; from SIMILARITY_ADAPT_THRESHOLD
+# the earlier result is updated from the text diff, if that diff is under SIMILARITY_MAX_DIFF_TOKENS
+SIMILARITY_REUSE = os.getenv("SIMILARITY_REUSE", "false").lower() in ("1", "true", "yes")
+SIMILARITY_INDEX_PATH = os.getenv(
+    "SIMILARITY_INDEX_PATH",
+    str(Path.home() / ".cache" / "doc_analyzer" / "fee_similarity.sqlite3")
+)
+SIMILARITY_REUSE_THRESHOLD = float(os.getenv("SIMILARITY_REUSE_THRESHOLD", "1.0"))
+SIMILARITY_ADAPT_THRESHOLD = float(os.getenv("SIMILARITY_ADAPT_THRESHOLD", "0.7"))
+SIMILARITY_MAX_DIFF_TOKENS = int(os.getenv("SIMILARITY_MAX_DIFF_TOKENS", "4000"))
+
+# Prompt compression: extracted text keeps running headers/footers (edge lines repeated on at least
+# BOILERPLATE_MIN_SHARE of the pages) and repeated disclaimers only where they first appear, and loses
+# page numbers and table of contents entries
+PROMPT_COMPRESSION = os.getenv("PROMPT_COMPRESSION", "true").lower() in ("1", "true", "yes")
+BOILERPLATE_MIN_SHARE = float(os.getenv("BOILERPLATE_MIN_SHARE", "0.5"))
+# With FEE_SECTION_FILTER only blocks with at least FEE_SECTION_MIN_SCORE fee terms per line
+# (amounts count double) are kept
+FEE_SECTION_FILTER = os.getenv("FEE_SECTION_FILTER", "true").lower() in ("1", "true", "yes")
+FEE_SECTION_MIN_SCORE = float(os.getenv("FEE_SECTION_MIN_SCORE", "0.5"))
+
+# Provider batch APIs (batch CLI --batch-api): prompts from many documents are submitted as batch jobs of
+# at most BATCH_MAX_REQUESTS requests, polled every BATCH_POLL_INTERVAL seconds for up to BATCH_TIMEOUT
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "10000"))
+BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "30"))
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", "86400"))
+
+# Provider prompt caching: prompts (system message, instructions and document) of at least
+# PROMPT_CACHE_MIN_TOKENS tokens are marked for Anthropic prompt caching, so a repeated run on the same
+# schedule reads them from the cache. OpenAI caches prompt prefixes of 1024+ tokens automatically.
+PROMPT_CACHING = os.getenv("PROMPT_CACHING", "true").lower() in ("1", "true", "yes")
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+
+# Memory-bounded mode for very large PDFs: documents with at least LARGE_PDF_PAGES pages (0 disables), and
+# documents extracted while the process's RSS is above MAX_RSS_MB (0 disables), have their page text spilled
+# to a temporary file in SPOOL_DIR, PAGE_WINDOW pages at a time, and are analyzed chunk by chunk
+LARGE_PDF_PAGES = int(os.getenv("LARGE_PDF_PAGES", "500"))
+MAX_RSS_MB = int(os.getenv("MAX_RSS_MB", "0"))
+PAGE_WINDOW = int(os.getenv("PAGE_WINDOW", "50"))
+SPOOL_DIR = os.getenv("SPOOL_DIR") or None
+
 def setup_logging():
     """Configure logging for the application."""
     logging.basicConfig(
@@ -26,6 +156,98 @@ def setup_logging():
 settings = {
     "OPENAI_API_KEY": OPENAI_API_KEY,
     "ANTHROPIC_API_KEY": ANTHROPIC_API_KEY,
+    "OPENAI_BASE_URL": OPENAI_BASE_URL,
+    "ANTHROPIC_BASE_URL": ANTHROPIC_BASE_URL,
+    "GOOGLE_API_KEY": GOOGLE_API_KEY,
+    "DEEPSEEK_API_KEY": DEEPSEEK_API_KEY,
+    "GROQ_API_KEY": GROQ_API_KEY,
+    "GROK_API_KEY": GROK_API_KEY,
     "OPENAI_MODEL": OPENAI_MODEL,
-    "ANTHROPIC_MODEL": ANTHROPIC_MODEL
-} 
\ No newline at end of file
+    "ANTHROPIC_MODEL": ANTHROPIC_MODEL,
+    "EXTRACTION_CACHE_PATH": EXTRACTION_CACHE_PATH,
+    "EXTRACTION_CACHE_MAX_MB": EXTRACTION_CACHE_MAX_MB,
+    "RESPONSE_CACHE_BACKEND": RESPONSE_CACHE_BACKEND,
+    "RESPONSE_CACHE_PATH": RESPONSE_CACHE_PATH,
+    "RESPONSE_CACHE_MAX_ENTRIES": RESPONSE_CACHE_MAX_ENTRIES,
+    "RESPONSE_CACHE_TTL": RESPONSE_CACHE_TTL,
+    "CHUNK_MAX_TOKENS": CHUNK_MAX_TOKENS,
+    "CHUNK_CONCURRENCY": CHUNK_CONCURRENCY,
+    "INCREMENTAL_ANALYSIS": INCREMENTAL_ANALYSIS,
+    "INCREMENTAL_CHUNK_TOKENS": INCREMENTAL_CHUNK_TOKENS,
+    "VERSION_STORE_PATH": VERSION_STORE_PATH,
+    "VERSION_STORE_MAX_ENTRIES": VERSION_STORE_MAX_ENTRIES,
+    "DOCUMENT_CONCURRENCY": DOCUMENT_CONCURRENCY,
+    "LLM_MAX_CONNECTIONS": LLM_MAX_CONNECTIONS,
+    "LLM_MAX_KEEPALIVE_CONNECTIONS": LLM_MAX_KEEPALIVE_CONNECTIONS,
+    "LLM_KEEPALIVE_EXPIRY": LLM_KEEPALIVE_EXPIRY,
+    "LLM_TIMEOUT": LLM_TIMEOUT,
+    "LLM_CONNECT_TIMEOUT": LLM_CONNECT_TIMEOUT,
+    "OPENAI_RPM": OPENAI_RPM,
+    "OPENAI_TPM": OPENAI_TPM,
+    "ANTHROPIC_RPM": ANTHROPIC_RPM,
+    "ANTHROPIC_TPM": ANTHROPIC_TPM,
+    "LLM_MAX_CONCURRENCY": LLM_MAX_CONCURRENCY,
+    "LLM_MAX_RETRIES": LLM_MAX_RETRIES,
+    "LLM_LATENCY_TARGET": LLM_LATENCY_TARGET,
+    "METRICS_ENABLED": METRICS_ENABLED,
+    "METRICS_PORT": METRICS_PORT,
+    "SHOW_TIMINGS": SHOW_TIMINGS,
+    "STREAM_OUTPUT": STREAM_OUTPUT,
+    "JOB_QUEUE": JOB_QUEUE,
+    "JOB_QUEUE_PATH": JOB_QUEUE_PATH,
+    "JOB_WORKERS": JOB_WORKERS,
+    "JOB_TIMEOUT": JOB_TIMEOUT,
+    "JOB_MAX_ATTEMPTS": JOB_MAX_ATTEMPTS,
+    "JOB_POLL_INTERVAL": JOB_POLL_INTERVAL,
+    "ROUTER_BACKENDS": ROUTER_BACKENDS,
+    "ROUTER_STRATEGY": ROUTER_STRATEGY,
+    "ROUTER_HEDGE": ROUTER_HEDGE,
+    "ROUTER_WINDOW": ROUTER_WINDOW,
+    "ROUTER_MIN_SAMPLES": ROUTER_MIN_SAMPLES,
+    "ROUTER_MAX_ERROR_RATE": ROUTER_MAX_ERROR_RATE,
+    "ROUTER_LATENCY_SLACK": ROUTER_LATENCY_SLACK,
+    "SIMILARITY_REUSE": SIMILARITY_REUSE,
+    "SIMILARITY_INDEX_PATH": SIMILARITY_INDEX_PATH,
+    "SIMILARITY_REUSE_THRESHOLD": SIMILARITY_REUSE_THRESHOLD,
+    "SIMILARITY_ADAPT_THRESHOLD": SIMILARITY_ADAPT_THRESHOLD,
+    "SIMILARITY_MAX_DIFF_TOKENS": SIMILARITY_MAX_DIFF_TOKENS,
+    "PROMPT_COMPRESSION": PROMPT_COMPRESSION,
+    "BOILERPLATE_MIN_SHARE": BOILERPLATE_MIN_SHARE,
+    "FEE_SECTION_FILTER": FEE_SECTION_FILTER,
+    "FEE_SECTION_MIN_SCORE": FEE_SECTION_MIN_SCORE,
+    "BATCH_MAX_REQUESTS": BATCH_MAX_REQUESTS,
+    "BATCH_POLL_INTERVAL": BATCH_POLL_INTERVAL,
+    "BATCH_TIMEOUT": BATCH_TIMEOUT,
+    "PROMPT_CACHING": PROMPT_CACHING,
+    "PROMPT_CACHE_MIN_TOKENS": PROMPT_CACHE_MIN_TOKENS,
+    "LARGE_PDF_PAGES": LARGE_PDF_PAGES,
+    "MAX_RSS_MB": MAX_RSS_MB,
+    "PAGE_WINDOW": PAGE_WINDOW,
+    "SPOOL_DIR": SPOOL_DIR
+} 
+
+# The settings as read from the environment at import, to tell which ones a .env file changes
+_environment_settings = dict(settings)
+_env_loaded = False
+
+def load_env():
+    """Load the .env file into the environment, once, and update ``settings`` from it.
+
+    The entry points call this before reading any settings, so importing
+    the package does not read .env or import python-dotenv. Only settings
+    the .env file changes are updated; values overridden at runtime are kept.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    from dotenv import load_dotenv
+    if not load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env"):
+        return
+    # Re-run this module to read the settings again from the updated environment
+    spec = importlib.util.find_spec(__name__)
+    fresh = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fresh)
+    settings.update({
+        key: value for key, value in fresh.settings.items() if value != _environment_settings[key]
+    })
@@ -0,0 +1,99 @@
+"""Job mode: queue fee schedules for analysis by a pool of worker processes.
+
+Jobs are kept in the SQLite queue at ``JOB_QUEUE_PATH``, so the web app (with
+``JOB_QUEUE=true``) and any number of worker pools on the same machine can
+share it. Results stay in the queue and can be looked up by job id.
+
+Usage:
+    python -m fee_simulator.jobs worker --workers 4
+    python -m fee_simulator.jobs submit schedule.pdf --provider anthropic
+    python -m fee_simulator.jobs status <job id>
+"""
+import argparse
+import io
+import json
+import logging
+from typing import List, Optional
+from .services.analyzer import FeeAnalyzer
+from .services.job_queue import Job, JobQueue, WorkerPool, get_job_queue
+from .services.pdf_service import (
+    PdfSource, _read_pdf_bytes, close_document, extract_document, extract_pages_incremental
+)
+from .services.version_store import document_id
+from .utils.metrics import start_metrics_server, trace
+from .config import load_env, settings, setup_logging
+
+logger = logging.getLogger(__name__)
+
+def simulate_fees_job(document: bytes, payload: dict) -> dict:
+    """Job handler: extract one fee schedule PDF and generate its fee scenarios.
+
+    Returns:
+        dict: The scenarios and, with SHOW_TIMINGS, the per-stage timings
+    """
+    file = io.BytesIO(document)
+    provider = payload.get("provider", "openai")
+    analyzer = FeeAnalyzer()
+    with trace(settings["SHOW_TIMINGS"]) as timings:
+        if payload.get("incremental"):
+            pages = extract_pages_incremental(file)
+            result = analyzer.analyze_pages(pages, provider, doc_id=payload.get("doc_id"))
+        else:
+            # Each job worker is already one process of a pool; don't nest another.
+            text = extract_document(file, workers=1)
+            try:
+                result = analyzer.analyze(text, provider=provider)
+            finally:
+                close_document(text)
+    return {"analysis": result.model_dump(), "timings": timings}
+
+def submit_document(file: PdfSource, provider: str = "openai", queue: Optional[JobQueue] = None) -> Job:
+    """Queue a fee schedule for analysis, returning the new job or an identical earlier one."""
+    queue = queue or get_job_queue()
+    payload = {
+        "doc_id": document_id(file),
+        "provider": provider,
+        "incremental": settings["INCREMENTAL_ANALYSIS"],
+    }
+    return queue.submit(_read_pdf_bytes(file), payload)
+
+def start_worker_pool(workers: Optional[int] = None) -> WorkerPool:
+    """Start a pool of fee analysis workers on the configured queue from a background thread."""
+    pool = WorkerPool(settings["JOB_QUEUE_PATH"], simulate_fees_job, workers)
+    pool.run_in_background()
+    return pool
+
+def main(argv: Optional[List[str]] = None) -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description="Queue fee schedules for analysis and run analysis workers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="Run a pool of worker processes until interrupted")
+    worker.add_argument("--workers", type=int, default=settings["JOB_WORKERS"], help="Worker processes")
+    submit = commands.add_parser("submit", help="Queue PDF files and print their job ids")
+    submit.add_argument("paths", nargs="+", help="PDF files to analyze")
+    submit.add_argument("--provider", choices=["openai", "anthropic"], default="openai")
+    status = commands.add_parser("status", help="Print the status and result of a job")
+    status.add_argument("job_id", help="Job id (or a unique prefix of one)")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if args.command == "worker":
+        if settings["METRICS_ENABLED"]:
+            start_metrics_server(settings["METRICS_PORT"])
+        pool = WorkerPool(settings["JOB_QUEUE_PATH"], simulate_fees_job, args.workers)
+        try:
+            pool.run()
+        except KeyboardInterrupt:
+            logger.info("Stopping job workers")
+    elif args.command == "submit":
+        for path in args.paths:
+            job = submit_document(path, args.provider)
+            print(f"{job.id} {job.status} {path}")
+    else:
+        job = get_job_queue().find(args.job_id)
+        if job is None:
+            parser.exit(1, f"No job matching {args.job_id}\n")
+        print(json.dumps(job._asdict(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,23 @@
-import gradio as gr
+import asyncio
 import logging
-from .services.analyzer import FeeAnalyzer
-from .services.pdf_service import extract_text_from_pdf
-from .config import setup_logging
+import re
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from .services.analyzer import AsyncFeeAnalyzer, FeeAnalyzer
+from .services.fee_engine import FeeEngine, format_usd
+from .services.job_queue import FAILED, QUEUED, RUNNING, Job, JobQueue, get_job_queue
+from .services.pdf_service import close_document, extract_document, extract_pages_incremental
+from .services.version_store import document_id
+from .models.schemas import FeeScenarioAnalysis, RateTable
+from .utils.json_stream import StreamUpdate
+from .utils.metrics import format_timings, start_metrics_server, trace, traced_stream
+from .jobs import start_worker_pool, submit_document
+from .config import load_env, settings, setup_logging
+
+if TYPE_CHECKING:
+    import gradio as gr
+    from single_doc_analyze.models.schemas import DocumentAnalysis
+    from .services.combined import CombinedReport
 
 logger = logging.getLogger(__name__)
 
@@ -17,27 +32,185 @@ def process_document(file, provider="openai"):
         str: Formatted fee analysis results or error message
     """
     try:
-        # Extract text
-        text = extract_text_from_pdf(file)
-        
         # Initialize analyzer
         analyzer = FeeAnalyzer()
         
-        # Analyze
-        result = analyzer.analyze(text, provider=provider)
+        with trace(settings["SHOW_TIMINGS"]) as timings:
+            # Extract and analyze (page by page when revisions are analyzed incrementally)
+            if settings["INCREMENTAL_ANALYSIS"]:
+                pages = extract_pages_incremental(file)
+                result = analyzer.analyze_pages(pages, provider, doc_id=document_id(file))
+            else:
+                text = extract_document(file)
+                try:
+                    result = analyzer.analyze(text, provider=provider)
+                finally:
+                    close_document(text)
         
         # Format output
-        output = "\U0001F4CA **Fee Scenario Variations**\n\n"
-        for scenario in result.scenarios:
-            output += f"""
-\U0001F9BE **{scenario.participant_type} - {scenario.order_type}**
-- Tier: {scenario.volume_tier}
-- Fee: {scenario.estimated_fee}
-- Rebate: {scenario.rebate}
-- Notes: {scenario.notes}
+        return format_fee_output(result, timings)
+        
+    except ValueError as e:
+        logger.error(f"Document processing error: {str(e)}")
+        return f"❌ Error processing document: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return f"❌ Unexpected error: {str(e)}"
 
-"""
-        return output
+def process_document_stream(file, provider="openai"):
+    """Generator variant of ``process_document`` that renders partial results.
+
+    Scenarios appear as the model writes them (or as chunks of a long
+    schedule finish) instead of after the whole analysis.
+    
+    Args:
+        file: A file-like object containing the PDF data
+        provider: The LLM provider to use ("openai" or "anthropic")
+        
+    Yields:
+        str: Progressively more complete output, ending with the final results or an error message
+    """
+    def updates():
+        analyzer = FeeAnalyzer()
+        # Revisions analyzed incrementally reuse stored chunk results and are not streamed
+        if settings["INCREMENTAL_ANALYSIS"]:
+            pages = extract_pages_incremental(file)
+            result = analyzer.analyze_pages(pages, provider, doc_id=document_id(file))
+            yield StreamUpdate(result.model_dump(), result)
+            return
+        text = extract_document(file)
+        try:
+            yield from analyzer.analyze_stream(text, provider=provider)
+        finally:
+            close_document(text)
+    
+    try:
+        for update, timings in traced_stream(updates, settings["SHOW_TIMINGS"]):
+            if update.result is None:
+                yield format_partial_fees(update.partial)
+            else:
+                yield format_fee_output(update.result, timings)
+        
+    except ValueError as e:
+        logger.error(f"Document processing error: {str(e)}")
+        yield f"❌ Error processing document: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        yield f"❌ Unexpected error: {str(e)}"
+
+def process_document_queued(file, provider="openai", queue: Optional[JobQueue] = None):
+    """Queue the document for the job workers and poll until its job finishes.
+
+    The handler only waits on the queue, so slow LLM calls don't hold it up,
+    and a document submitted again (e.g. after a restart) reuses its job.
+    
+    Args:
+        file: A file-like object containing the PDF data
+        provider: The LLM provider to use ("openai" or "anthropic")
+        queue: Job queue to use (defaults to the one at JOB_QUEUE_PATH)
+        
+    Yields:
+        str: Job status updates, ending with the formatted results or an error message
+    """
+    try:
+        queue = queue or get_job_queue()
+        job = submit_document(file, provider, queue)
+        while job.status in (QUEUED, RUNNING):
+            yield format_job_status(job, queue)
+            time.sleep(settings["JOB_POLL_INTERVAL"])
+            job = queue.get(job.id)
+        
+        if job.status == FAILED:
+            yield f"❌ Error processing document: {job.error}"
+        else:
+            yield format_fee_output(FeeScenarioAnalysis(**job.result["analysis"]), job.result["timings"])
+        
+    except ValueError as e:
+        logger.error(f"Document processing error: {str(e)}")
+        yield f"❌ Error processing document: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        yield f"❌ Unexpected error: {str(e)}"
+
+async def process_document_async(file, provider="openai", analyzer: Optional[AsyncFeeAnalyzer] = None):
+    """Async variant of ``process_document``.
+    
+    PDF extraction runs in a worker thread and the LLM calls are awaited on
+    the event loop, so many documents can be in flight at once.
+    
+    Args:
+        file: A file-like object containing the PDF data
+        provider: The LLM provider to use ("openai" or "anthropic")
+        analyzer: Analyzer to use (a new one is created if omitted)
+        
+    Returns:
+        str: Formatted fee analysis results or error message
+    """
+    try:
+        analyzer = analyzer or AsyncFeeAnalyzer()
+        with trace(settings["SHOW_TIMINGS"]) as timings:
+            if settings["INCREMENTAL_ANALYSIS"]:
+                pages = await asyncio.to_thread(extract_pages_incremental, file)
+                result = await analyzer.analyze_pages(pages, provider, doc_id=document_id(file))
+            else:
+                text = await asyncio.to_thread(extract_document, file)
+                try:
+                    result = await analyzer.analyze(text, provider=provider)
+                finally:
+                    close_document(text)
+        return format_fee_output(result, timings)
+        
+    except ValueError as e:
+        logger.error(f"Document processing error: {str(e)}")
+        return f"❌ Error processing document: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return f"❌ Unexpected error: {str(e)}"
+
+async def process_documents_async(
+    files,
+    provider="openai",
+    concurrency: Optional[int] = None,
+    analyzer: Optional[AsyncFeeAnalyzer] = None
+) -> List[str]:
+    """Process many documents on one event loop with bounded concurrency.
+    
+    Args:
+        files: File-like objects or paths containing PDF data
+        provider: The LLM provider to use ("openai" or "anthropic")
+        concurrency: Maximum documents in flight (defaults to DOCUMENT_CONCURRENCY)
+        analyzer: Analyzer shared by all documents (a new one is created if omitted)
+        
+    Returns:
+        List[str]: Formatted results in the same order as ``files``
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings["DOCUMENT_CONCURRENCY"])
+    analyzer = analyzer or AsyncFeeAnalyzer()
+    
+    async def run(file) -> str:
+        async with semaphore:
+            return await process_document_async(file, provider, analyzer)
+    
+    return list(await asyncio.gather(*(run(file) for file in files)))
+
+async def process_document_combined(file, provider="openai") -> str:
+    """Produce the document analysis and fee scenarios of one PDF in a single report.
+    
+    The PDF is extracted once, and both analyses run concurrently on its text.
+    
+    Args:
+        file: A file-like object containing the PDF data
+        provider: The LLM provider of the fee analysis ("openai" or "anthropic")
+        
+    Returns:
+        str: The formatted report, with an error message in place of a failed analysis
+    """
+    # Imported here so the fee simulator alone does not load the document analysis app.
+    from .services.combined import run_combined, trace_report
+    try:
+        with trace_report(settings["SHOW_TIMINGS"]) as (document_timings, fee_timings):
+            report = await run_combined(file, provider)
+        return format_combined_report(report, document_timings, fee_timings)
         
     except ValueError as e:
         logger.error(f"Document processing error: {str(e)}")
@@ -46,18 +219,242 @@ def process_document(file, provider="openai"):
         logger.error(f"Unexpected error: {str(e)}")
         return f"❌ Unexpected error: {str(e)}"
 
+def format_combined_report(
+    report: "CombinedReport",
+    document_timings: Optional[Dict[str, float]] = None,
+    fee_timings: Optional[Dict[str, float]] = None
+) -> str:
+    """Format both analyses of a combined report, each with its optional timing breakdown."""
+    if isinstance(report.analysis, Exception):
+        output = f"❌ Document analysis failed: {str(report.analysis)}\n"
+    else:
+        output = format_document_output(report.analysis, document_timings)
+    output += "\n"
+    if isinstance(report.fees, Exception):
+        output += f"❌ Fee analysis failed: {str(report.fees)}\n"
+    else:
+        output += format_fee_output(report.fees, fee_timings)
+    return output
+
+def extract_rates(file, provider="openai") -> Tuple[Optional[RateTable], str]:
+    """Extract the fee schedule's rate table, the only LLM step of interactive simulation.
+    
+    Args:
+        file: A file-like object containing the PDF data
+        provider: The LLM provider to use ("openai" or "anthropic")
+        
+    Returns:
+        Tuple[Optional[RateTable], str]: The rate table (None on error) and its formatted rates or an error message
+    """
+    try:
+        text = extract_document(file)
+        try:
+            table = FeeAnalyzer().extract_rate_table(text, provider=provider)
+        finally:
+            close_document(text)
+        if not table.rates:
+            return None, "❌ No fees or rebates found in the document"
+        return table, format_rate_table(table)
+        
+    except ValueError as e:
+        logger.error(f"Document processing error: {str(e)}")
+        return None, f"❌ Error processing document: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return None, f"❌ Unexpected error: {str(e)}"
+
+_VOLUME = re.compile(r"^(\d+(?:\.\d*)?(?:e\d+)?)([kmb]?)$", re.IGNORECASE)
+_MULTIPLIERS = {"": 1, "k": 1e3, "m": 1e6, "b": 1e9}
+
+def parse_volumes(text: str) -> List[float]:
+    """Parse monthly volumes like "500k, 2m, 10m" (one per month of a volume curve)."""
+    volumes = []
+    for token in re.split(r"[,;\s]+", text.strip()):
+        match = _VOLUME.match(token)
+        if not match:
+            raise ValueError(f"Invalid volume: {token!r}")
+        volumes.append(float(match.group(1)) * _MULTIPLIERS[match.group(2).lower()])
+    return volumes
+
+def pair_label(participant_type: str, order_type: str) -> str:
+    return f"{participant_type} - {order_type}"
+
+def simulate_fees(table: Optional[RateTable], pair: Optional[str], volumes: str) -> str:
+    """Simulate fees for monthly volumes from an extracted rate table, without calling the LLM.
+    
+    Args:
+        table: Rate table from ``extract_rates``
+        pair: Participant type and order type, as labelled by ``pair_label``
+        volumes: Monthly volumes, e.g. "2m" or a curve such as "500k, 2m, 10m"
+        
+    Returns:
+        str: Formatted scenarios per volume, with totals for a volume curve, or an error message
+    """
+    if table is None:
+        return "Extract a rate table first."
+    try:
+        engine = FeeEngine(table)
+        pairs = {pair_label(*candidate): candidate for candidate in engine.pairs}
+        if pair not in pairs:
+            return "Choose a participant type and order type."
+        participant_type, order_type = pairs[pair]
+        months = parse_volumes(volumes)
+        result = engine.simulate(participant_type, order_type, months)
+        output = format_fee_output(FeeScenarioAnalysis(
+            scenarios=[engine.scenario(participant_type, order_type, volume) for volume in months]
+        ))
+        if len(months) > 1:
+            output += (f"\U0001F4B5 **Total over {len(months)} months**: fees ${result.fee.sum():,.2f}, "
+                       f"rebates ${result.rebate.sum():,.2f}, net {format_usd(result.net.sum())}\n")
+        return output
+        
+    except ValueError as e:
+        return f"❌ {str(e)}"
+
+def format_rate_table(table: RateTable) -> str:
+    """Format the extracted rates by participant type and order type."""
+    engine = FeeEngine(table)
+    output = "\U0001F4CB **Rate Table**\n"
+    current = None
+    for rate in engine.rates:
+        if (rate.participant_type, rate.order_type) != current:
+            current = (rate.participant_type, rate.order_type)
+            output += f"\n\U0001F9BE **{pair_label(*current)}**\n"
+        output += (f"- {rate.volume_tier} (from {rate.min_volume:,.0f} {rate.unit}s/month): "
+                   f"fee ${rate.fee_per_unit:.4f}, rebate ${rate.rebate_per_unit:.4f} per {rate.unit}\n")
+    return output
+
+def build_simulation_app() -> "gr.Blocks":
+    """Interactive mode: extract the rate table once, then re-simulate locally as inputs change."""
+    import gradio as gr
+    with gr.Blocks() as app:
+        table = gr.State(None)
+        with gr.Row():
+            file = gr.File(label="Upload Exchange Fee Schedule (PDF)")
+            provider = gr.Radio(["openai", "anthropic"], label="Choose LLM Provider", value="openai")
+        extract = gr.Button("Extract rate table")
+        rates = gr.Markdown()
+        pair = gr.Dropdown(label="Participant type - order type", choices=[])
+        volumes = gr.Textbox(label="Monthly volumes (one per month)", value="1m", placeholder="e.g. 500k, 2m, 10m")
+        output = gr.Markdown()
+        
+        def on_extract(file, provider):
+            extracted, text = extract_rates(file, provider)
+            choices = [pair_label(*candidate) for candidate in FeeEngine(extracted).pairs] if extracted else []
+            return extracted, text, gr.update(choices=choices, value=choices[0] if choices else None)
+        
+        extract.click(on_extract, [file, provider], [table, rates, pair]).then(
+            simulate_fees, [table, pair, volumes], output
+        )
+        for control in (pair, volumes):
+            control.change(simulate_fees, [table, pair, volumes], output)
+    return app
+
+def format_fee_output(result: FeeScenarioAnalysis, timings: Optional[Dict[str, float]] = None) -> str:
+    """Format fee scenarios for display, with an optional per-stage timing breakdown."""
+    output = "\U0001F4CA **Fee Scenario Variations**\n\n"
+    for scenario in result.scenarios:
+        output += f"""
+\U0001F9BE **{scenario.participant_type} - {scenario.order_type}**
+- Tier: {scenario.volume_tier}
+- Fee: {scenario.estimated_fee}
+- Rebate: {scenario.rebate}
+- Notes: {scenario.notes}
+
+"""
+    if timings:
+        output += f"\n\u23F1\uFE0F **Timings**\n{format_timings(timings)}\n"
+    return output
+
+def format_document_output(result: "DocumentAnalysis", timings: Optional[Dict[str, float]] = None) -> str:
+    """Format the document analysis of a combined report, with an optional per-stage timing breakdown."""
+    output = f"""
+\U0001F4C4 **Summary**
+{result.summary}
+
+\U0001F511 **Key Topics**
+{', '.join(result.key_topics)}
+
+\u26A0\uFE0F **Risks or Issues**
+{', '.join(result.risks_or_issues)}
+
+\u2705 **Recommended Actions**
+{', '.join(result.recommended_actions)}
+"""
+    if timings:
+        output += f"\n\u23F1\uFE0F **Timings**\n{format_timings(timings)}\n"
+    return output
+
+def format_partial_fees(partial: dict) -> str:
+    """Format partially streamed scenarios, leaving out fields not written yet."""
+    output = "\U0001F4CA **Fee Scenario Variations**\n\n"
+    for scenario in partial.get("scenarios") or []:
+        if not isinstance(scenario, dict) or "participant_type" not in scenario:
+            continue
+        output += f"\n\U0001F9BE **{scenario['participant_type']} - {scenario.get('order_type', '...')}**\n"
+        for label, field in (("Tier", "volume_tier"), ("Fee", "estimated_fee"), ("Rebate", "rebate"), ("Notes", "notes")):
+            if field in scenario:
+                output += f"- {label}: {scenario[field]}\n"
+        output += "\n"
+    return output + "\n\u23F3 Analyzing...\n"
+
+def format_job_status(job: Job, queue: JobQueue) -> str:
+    """Describe where a queued or running job is."""
+    if job.status == QUEUED:
+        ahead = queue.position(job.id)
+        status = f"queued ({ahead} ahead)" if ahead else "queued (next)"
+    else:
+        status = f"running (attempt {job.attempts} of {job.max_attempts})"
+    retry = f"\nLast attempt failed: {job.error}" if job.error else ""
+    return f"\u23F3 Job {job.id[:12]} {status}...{retry}\n"
+
 if __name__ == "__main__":
+    # Imported here so the CLI, which reuses the handlers above, never loads gradio.
+    import gradio as gr
+    from single_doc_analyze.config import load_env as load_document_env
+
+    # The combined report also reads the document analysis settings
+    load_env()
+    load_document_env()
+
     # Setup logging
     setup_logging()
+    if settings["METRICS_ENABLED"]:
+        start_metrics_server(settings["METRICS_PORT"])
+    
+    # Queued handlers only poll the job queue, so they need no concurrency limit.
+    if settings["JOB_QUEUE"]:
+        process, concurrency_limit = process_document_queued, None
+        start_worker_pool()
+    else:
+        process = process_document_stream if settings["STREAM_OUTPUT"] else process_document_async
+        concurrency_limit = settings["DOCUMENT_CONCURRENCY"]
     
     logger.info("✅ Multi-LLM Fee Simulator launching...")
-    gr.Interface(
-        fn=lambda file, provider: process_document(file, provider),
+    scenarios = gr.Interface(
+        fn=process,
         inputs=[
             gr.File(label="Upload Exchange Fee Schedule (PDF)"),
             gr.Radio(["openai", "anthropic"], label="Choose LLM Provider", value="openai")
         ],
         outputs="text",
         title="Multi-LLM Fee Simulator",
-        description="Upload a fee schedule PDF and simulate 3–5 realistic fee/rebate scenarios using GPT-4o or Claude 3."
+        description="Upload a fee schedule PDF and simulate 3–5 realistic fee/rebate scenarios using GPT-4o or Claude 3.",
+        concurrency_limit=concurrency_limit
+    )
+    combined = gr.Interface(
+        fn=process_document_combined,
+        inputs=[
+            gr.File(label="Upload Exchange Fee Schedule (PDF)"),
+            gr.Radio(["openai", "anthropic"], label="Choose LLM Provider for fees", value="openai")
+        ],
+        outputs="text",
+        title="Comprehensive Report",
+        description="Analyze the document and simulate its fee scenarios from one upload.",
+        concurrency_limit=settings["DOCUMENT_CONCURRENCY"]
+    )
+    gr.TabbedInterface(
+        [scenarios, build_simulation_app(), combined],
+        ["Scenario analysis", "Interactive simulation", "Comprehensive report"],
+        title="Multi-LLM Fee Simulator"
     ).launch()
@@ -10,4 +10,18 @@ class FeeScenario(BaseModel):
     notes: str
 
 class FeeScenarioAnalysis(BaseModel):
-    scenarios: List[FeeScenario] 
\ No newline at end of file
+    scenarios: List[FeeScenario]
+
+class FeeRate(BaseModel):
+    participant_type: str
+    order_type: str
+    volume_tier: str
+    # Monthly volume (in ``unit``s) from which the tier applies to all of the month's volume
+    min_volume: float = 0.0
+    fee_per_unit: float = 0.0
+    rebate_per_unit: float = 0.0
+    unit: str = "share"
+    notes: str = ""
+
+class RateTable(BaseModel):
+    rates: List[FeeRate]
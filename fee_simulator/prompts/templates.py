@@ -1,3 +1,5 @@
+from ..models.schemas import FeeScenarioAnalysis
+
 def build_prompt(doc_text: str) -> str:
     """Build the prompt for fee analysis."""
     return f"""
@@ -25,4 +27,116 @@ Document:
 ---
 {doc_text}
 ---
-""" 
\ No newline at end of file
+"""
+
+def build_chunk_prompt(chunk_text: str, index: int, total: int) -> str:
+    """Build the fee analysis prompt for one part of a long fee schedule."""
+    return f"""
+You are a financial pricing analyst AI. You are reading part {index} of {total} of a longer exchange fee schedule:
+
+1. Identify participant types, volume tiers, and order types defined in this part
+2. Generate 1–5 realistic example scenarios showing estimated fees and rebates from this part
+3. Provide short notes explaining how each result was derived
+
+If this part contains no fees or rebates, return an empty "scenarios" list.
+
+Return ONLY your response in this exact JSON format (no explanation, no Markdown):
+{{
+  "scenarios": [
+    {{
+      "participant_type": "...",
+      "volume_tier": "...",
+      "order_type": "...",
+      "estimated_fee": "...",
+      "rebate": "...",
+      "notes": "..."
+    }}
+  ]
+}}
+
+Document (part {index} of {total}):
+---
+{chunk_text}
+---
+"""
+
+def build_adaptation_prompt(previous: FeeScenarioAnalysis, diff: str) -> str:
+    """Build the prompt updating an earlier fee analysis to a revised fee schedule."""
+    return f"""
+You are a financial pricing analyst AI. An exchange fee schedule was analyzed before. A revised version of it differs only in the lines shown in the diff below ("-" lines were removed, "+" lines were added):
+
+1. Keep the scenarios that the changes do not affect
+2. Recalculate the estimated fees, rebates and notes of scenarios that use changed fees, tiers or order types
+3. Add scenarios for participant types, volume tiers, or order types the changes introduce, and drop those they remove
+
+Return ONLY your response in this exact JSON format (no explanation, no Markdown):
+{{
+  "scenarios": [
+    {{
+      "participant_type": "...",
+      "volume_tier": "...",
+      "order_type": "...",
+      "estimated_fee": "...",
+      "rebate": "...",
+      "notes": "..."
+    }}
+  ]
+}}
+
+Previous analysis:
+---
+{previous.model_dump_json(indent=2)}
+---
+
+Changes to the fee schedule:
+---
+{diff}
+---
+"""
+
+_RATE_TABLE_INSTRUCTIONS = """
+1. List every fee or rebate rate as one row per participant type, order type, and volume tier
+2. Give each tier's minimum monthly volume in units traded (0 for the base tier); convert ADV or percentage-of-volume thresholds to monthly units if the schedule defines them, assuming 21 trading days
+3. Give fees and rebates as USD per unit (e.g. 0.0030 for 30 mils per share); use 0 when there is none
+4. Use the same participant type and order type names for every tier of a rate
+
+Return ONLY your response in this exact JSON format (no explanation, no Markdown):
+{
+  "rates": [
+    {
+      "participant_type": "...",
+      "order_type": "...",
+      "volume_tier": "...",
+      "min_volume": 0,
+      "fee_per_unit": 0.0,
+      "rebate_per_unit": 0.0,
+      "unit": "share",
+      "notes": "..."
+    }
+  ]
+}
+"""
+
+def build_rate_table_prompt(doc_text: str) -> str:
+    """Build the prompt extracting the fee schedule as a rate table."""
+    return f"""
+You are a financial pricing analyst AI. Extract the exchange fee schedule below as a structured rate table:
+{_RATE_TABLE_INSTRUCTIONS}
+Document:
+---
+{doc_text}
+---
+"""
+
+def build_rate_table_chunk_prompt(chunk_text: str, index: int, total: int) -> str:
+    """Build the rate table prompt for one part of a long fee schedule."""
+    return f"""
+You are a financial pricing analyst AI. You are reading part {index} of {total} of a longer exchange fee schedule. Extract the rates defined in this part as a structured rate table:
+{_RATE_TABLE_INSTRUCTIONS}
+If this part defines no fees or rebates, return an empty "rates" list.
+
+Document (part {index} of {total}):
+---
+{chunk_text}
+---
+"""
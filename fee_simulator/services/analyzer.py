@@ -1,52 +1,594 @@
+import asyncio
 import logging
-from typing import Optional
-import openai
-import anthropic
-from ..models.schemas import FeeScenarioAnalysis
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple, TypeVar, Union
+from pydantic import BaseModel
+from ..models.schemas import FeeScenarioAnalysis, RateTable
+from ..utils.json_stream import StreamUpdate
 from ..utils.json_utils import parse_json_response
-from ..prompts.templates import build_prompt
+from ..utils.metrics import bind_context, stage
+from ..utils.chunking import COMPLETION_TOKEN_ESTIMATE, chunk_text, estimate_tokens
+from ..prompts.templates import (
+    build_prompt, build_chunk_prompt, build_adaptation_prompt, build_rate_table_prompt, build_rate_table_chunk_prompt
+)
 from ..config import settings
+from .clients import (
+    get_anthropic_client, get_async_anthropic_client, get_async_openai_client, get_openai_client
+)
+from .rate_limiter import get_rate_limiter
+from .router import (
+    Backend, anthropic_user_content, aroute, arequest, default_backends, default_model, get_async_backend_client,
+    get_backend_client, request, route
+)
+from .fee_engine import merge_rate_tables
+from .similarity_index import Reuse, SimilarityIndex, find_reusable, get_similarity_index, remember_result
+from .streaming import anthropic_text_deltas, openai_text_deltas
+from .text_spool import TextSpool
+from .response_cache import (
+    ResponseCache, acached_call, cached_call, cached_stream, get_response_cache, make_cache_key
+)
+from .version_store import (
+    DocumentVersionStore, get_version_store, load_chunk_results, pending_parts, plan_page_chunks,
+    record_version, save_chunk_results
+)
+
+if TYPE_CHECKING:
+    import anthropic
+    import openai
 
 logger = logging.getLogger(__name__)
 
+M = TypeVar("M", bound=BaseModel)
+
+SYSTEM_MESSAGE = "You are a financial fee analyst AI."
+
+def _scenario_key(scenario) -> tuple:
+    return tuple(
+        re.sub(r"\s+", " ", value).strip().casefold()
+        for value in (scenario.participant_type, scenario.volume_tier, scenario.order_type)
+    )
+
+def _cache_key(prompt: str, provider: str, model: Optional[str] = None) -> str:
+    return make_cache_key(provider, model or default_model(provider), SYSTEM_MESSAGE, prompt)
+
+def _openai_messages(prompt: str) -> List[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt}
+    ]
+
+def _estimated_tokens(prompt: str) -> int:
+    return estimate_tokens(SYSTEM_MESSAGE) + estimate_tokens(prompt) + COMPLETION_TOKEN_ESTIMATE
+
+def _parse(content: str) -> FeeScenarioAnalysis:
+    return parse_json_response(content, FeeScenarioAnalysis)
+
+def _parse_rate_table(content: str) -> RateTable:
+    return parse_json_response(content, RateTable)
+
+def _build_prompts(doc_text: str, build=build_prompt, build_chunk=build_chunk_prompt) -> List[str]:
+    """Return the single analysis prompt, or one prompt per chunk for long documents."""
+    with stage("prompt_build"):
+        chunks = chunk_text(doc_text, settings["CHUNK_MAX_TOKENS"])
+        if len(chunks) <= 1:
+            return [build(chunks[0] if chunks else doc_text)]
+        return [build_chunk(chunk, index, len(chunks)) for index, chunk in enumerate(chunks, start=1)]
+
+def _build_rate_table_prompts(doc_text: str) -> List[str]:
+    return _build_prompts(doc_text, build_rate_table_prompt, build_rate_table_chunk_prompt)
+
+def _spool_prompts(
+    spool: TextSpool, build=build_prompt, build_chunk=build_chunk_prompt
+) -> Tuple[int, Iterator[str]]:
+    """Count the chunks of a spooled document and lazily build their prompts."""
+    max_tokens = settings["CHUNK_MAX_TOKENS"]
+    total = sum(1 for _ in spool.chunks(max_tokens))
+    if total <= 1:
+        return total, (build(chunk) for chunk in spool.chunks(max_tokens))
+    return total, (
+        build_chunk(chunk, index, total) for index, chunk in enumerate(spool.chunks(max_tokens), start=1)
+    )
+
+def _spool_rate_table_prompts(spool: TextSpool) -> Tuple[int, Iterator[str]]:
+    return _spool_prompts(spool, build_rate_table_prompt, build_rate_table_chunk_prompt)
+
+def _plan_chunks(pages: List[str], provider: str):
+    # The chunk prompt template is part of the namespace so editing it invalidates stored results.
+    namespace = _cache_key(build_chunk_prompt("", 0, 0), provider)
+    return plan_page_chunks(pages, settings["INCREMENTAL_CHUNK_TOKENS"], namespace)
+
+def _similarity_namespace(provider: str) -> str:
+    # Results are only reused under the same prompt template, provider and model.
+    return _cache_key(build_prompt(""), provider)
+
+def _find_similar(
+    index: Optional[SimilarityIndex], doc_text: str, provider: str, use_cache: bool
+) -> Optional[Reuse]:
+    if not use_cache:
+        return None
+    with stage("similarity_lookup"):
+        return find_reusable(index, doc_text, _similarity_namespace(provider), FeeScenarioAnalysis)
+
+def merge_scenario_analyses(partials: List[FeeScenarioAnalysis]) -> FeeScenarioAnalysis:
+    """Merge per-chunk analyses, keeping the first scenario for each
+    participant type, volume tier and order type."""
+    seen = set()
+    scenarios = []
+    for partial in partials:
+        for scenario in partial.scenarios:
+            key = _scenario_key(scenario)
+            if key not in seen:
+                seen.add(key)
+                scenarios.append(scenario)
+    return FeeScenarioAnalysis(scenarios=scenarios)
+
 class FeeAnalyzer:
-    def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=settings["OPENAI_API_KEY"])
-        self.anthropic_client = anthropic.Anthropic(api_key=settings["ANTHROPIC_API_KEY"])
+    def __init__(
+        self,
+        openai_client: Optional["openai.OpenAI"] = None,
+        anthropic_client: Optional["anthropic.Anthropic"] = None,
+        cache: Optional[ResponseCache] = None,
+        versions: Optional[DocumentVersionStore] = None,
+        similar: Optional[SimilarityIndex] = None
+    ):
+        self._openai_client = openai_client
+        self._anthropic_client = anthropic_client
+        self.cache = cache if cache is not None else get_response_cache()
+        self._versions = versions
+        self._similar = similar
+    
+    @property
+    def openai_client(self) -> "openai.OpenAI":
+        """The OpenAI client, taken from the shared registry on first use."""
+        if self._openai_client is None:
+            self._openai_client = get_openai_client()
+        return self._openai_client
+    
+    @property
+    def anthropic_client(self) -> "anthropic.Anthropic":
+        """The Anthropic client, taken from the shared registry on first use."""
+        if self._anthropic_client is None:
+            self._anthropic_client = get_anthropic_client()
+        return self._anthropic_client
+    
+    @property
+    def versions(self) -> Optional[DocumentVersionStore]:
+        """The document version store used by ``analyze_pages``."""
+        return self._versions or get_version_store()
+    
+    @property
+    def similar(self) -> Optional[SimilarityIndex]:
+        """The near-duplicate index whose results ``analyze`` reuses."""
+        return self._similar if self._similar is not None else get_similarity_index()
     
-    def analyze(self, doc_text: str, provider: str = "openai") -> FeeScenarioAnalysis:
-        """Analyze document text and return fee scenarios."""
-        prompt = build_prompt(doc_text)
+    def analyze(
+        self, doc_text: Union[str, TextSpool], provider: str = "openai", use_cache: bool = True
+    ) -> FeeScenarioAnalysis:
+        """Analyze document text and return fee scenarios.
+
+        Documents longer than ``CHUNK_MAX_TOKENS`` are split into chunks that
+        are analyzed concurrently; their scenarios are merged and deduplicated.
+        Identical requests are served from the response cache unless
+        ``use_cache`` is False. A ``TextSpool`` from ``extract_document`` is
+        handed to ``analyze_spool``.
+
+        With ``SIMILARITY_REUSE`` a near-duplicate of an analyzed fee schedule
+        reuses its scenarios, or has them updated from the text diff, instead
+        of being analyzed from scratch.
+        """
+        if isinstance(doc_text, TextSpool):
+            return self.analyze_spool(doc_text, provider, use_cache)
+        index = self.similar
+        reuse = _find_similar(index, doc_text, provider, use_cache)
+        if reuse is not None and reuse.diff is None:
+            return reuse.previous
+        if reuse is not None:
+            result = self._analyze_prompt(build_adaptation_prompt(reuse.previous, reuse.diff), provider, use_cache)
+        else:
+            result = self._analyze_text(doc_text, provider, use_cache)
+        if use_cache:
+            remember_result(index, doc_text, _similarity_namespace(provider), result)
+        return result
+    
+    def _analyze_text(self, doc_text: str, provider: str, use_cache: bool) -> FeeScenarioAnalysis:
+        prompts = _build_prompts(doc_text)
+        if len(prompts) == 1:
+            return self._analyze_prompt(prompts[0], provider, use_cache)
+        
+        with ThreadPoolExecutor(max_workers=settings["CHUNK_CONCURRENCY"]) as pool:
+            partials = list(pool.map(
+                bind_context(lambda prompt: self._analyze_prompt(prompt, provider, use_cache)), prompts
+            ))
+        return merge_scenario_analyses(partials)
+    
+    def analyze_spool(self, spool: TextSpool, provider: str = "openai", use_cache: bool = True) -> FeeScenarioAnalysis:
+        """Analyze a fee schedule spooled to disk by ``extract_document``.
+
+        Chunks are read back and analyzed ``CHUNK_CONCURRENCY`` at a time, so
+        only those chunks and the partial scenarios are held in memory, then
+        merged as in ``analyze``. Similarity reuse is skipped, since it needs
+        the whole text. An empty spool raises ValueError.
+        """
+        return self._analyze_spool(_spool_prompts(spool), provider, use_cache, _parse, merge_scenario_analyses)
+    
+    def _analyze_spool(
+        self,
+        spool_prompts: Tuple[int, Iterator[str]],
+        provider: str,
+        use_cache: bool,
+        parse: Callable[[str], M],
+        merge: Callable[[List[M]], M]
+    ) -> M:
+        total, prompts = spool_prompts
+        if not total:
+            raise ValueError("No text could be extracted")
+        if total == 1:
+            return self._analyze_prompt(next(prompts), provider, use_cache, parse)
+        
+        partials: List[M] = []
+        analyze_chunk = bind_context(lambda prompt: self._analyze_prompt(prompt, provider, use_cache, parse))
+        with ThreadPoolExecutor(max_workers=settings["CHUNK_CONCURRENCY"]) as pool:
+            while True:
+                batch = list(islice(prompts, settings["CHUNK_CONCURRENCY"]))
+                if not batch:
+                    break
+                partials.extend(pool.map(analyze_chunk, batch))
+        return merge(partials)
+    
+    def extract_rate_table(
+        self, doc_text: Union[str, TextSpool], provider: str = "openai", use_cache: bool = True
+    ) -> RateTable:
+        """Extract the fee schedule as a rate table for ``FeeEngine``.
+
+        Long documents are extracted chunk by chunk and the rates merged.
+        A ``TextSpool`` is read back ``CHUNK_CONCURRENCY`` chunks at a time,
+        as in ``analyze_spool``. Simulating scenarios from the table needs no
+        further LLM calls.
+        """
+        if isinstance(doc_text, TextSpool):
+            return self._analyze_spool(
+                _spool_rate_table_prompts(doc_text), provider, use_cache, _parse_rate_table, merge_rate_tables
+            )
+        prompts = _build_rate_table_prompts(doc_text)
+        if len(prompts) == 1:
+            return self._analyze_prompt(prompts[0], provider, use_cache, _parse_rate_table)
+        
+        with ThreadPoolExecutor(max_workers=settings["CHUNK_CONCURRENCY"]) as pool:
+            partials = list(pool.map(
+                bind_context(lambda prompt: self._analyze_prompt(prompt, provider, use_cache, _parse_rate_table)),
+                prompts
+            ))
+        return merge_rate_tables(partials)
+    
+    def analyze_stream(
+        self, doc_text: Union[str, TextSpool], provider: str = "openai", use_cache: bool = True
+    ) -> Iterator[StreamUpdate[FeeScenarioAnalysis]]:
+        """Like ``analyze``, but yield partial scenarios while the analysis runs.
+
+        A single prompt is streamed token by token. Long documents yield the
+        merged scenarios of the chunks finished so far; spooled documents
+        only yield the final result. The last update carries the validated
+        result.
+        """
+        if isinstance(doc_text, TextSpool):
+            result = self.analyze_spool(doc_text, provider, use_cache)
+            yield StreamUpdate(result.model_dump(), result)
+            return
+        index = self.similar
+        reuse = _find_similar(index, doc_text, provider, use_cache)
+        if reuse is not None and reuse.diff is None:
+            yield StreamUpdate(reuse.previous.model_dump(), reuse.previous)
+            return
+        if reuse is not None:
+            updates = self._stream_with_fallback(
+                build_adaptation_prompt(reuse.previous, reuse.diff), provider, use_cache
+            )
+        else:
+            updates = self._stream_text(doc_text, provider, use_cache)
+        for update in updates:
+            if update.result is not None and use_cache:
+                remember_result(index, doc_text, _similarity_namespace(provider), update.result)
+            yield update
+    
+    def _stream_text(
+        self, doc_text: str, provider: str, use_cache: bool
+    ) -> Iterator[StreamUpdate[FeeScenarioAnalysis]]:
+        prompts = _build_prompts(doc_text)
+        if len(prompts) == 1:
+            yield from self._stream_with_fallback(prompts[0], provider, use_cache)
+            return
+        
+        with ThreadPoolExecutor(max_workers=settings["CHUNK_CONCURRENCY"]) as pool:
+            analyze = bind_context(self._analyze_prompt)
+            futures = [pool.submit(analyze, prompt, provider, use_cache) for prompt in prompts]
+            for finished, _ in enumerate(as_completed(futures), start=1):
+                if finished < len(futures):
+                    done = [future.result() for future in futures if future.done() and not future.exception()]
+                    yield StreamUpdate(merge_scenario_analyses(done).model_dump())
+        result = merge_scenario_analyses([future.result() for future in futures])
+        yield StreamUpdate(result.model_dump(), result)
+    
+    def analyze_pages(
+        self,
+        pages: List[str],
+        provider: str = "openai",
+        doc_id: Optional[str] = None,
+        use_cache: bool = True
+    ) -> FeeScenarioAnalysis:
+        """Analyze a document page by page, re-analyzing only chunks that changed.
+
+        Pages are grouped into chunks of about ``INCREMENTAL_CHUNK_TOKENS``
+        with content-defined boundaries. Per-chunk scenarios are kept in the
+        version store and merged without an LLM call, so a revised schedule
+        only pays for the chunks around its edited pages. ``doc_id`` is used
+        to log which pages changed since the previous version.
+        """
+        chunks = _plan_chunks(pages, provider)
+        store = self.versions
+        record_version(store, doc_id, pages)
+        results = load_chunk_results(store, chunks, FeeScenarioAnalysis)
+        parts = pending_parts(chunks, results, settings["INCREMENTAL_CHUNK_TOKENS"])
+        positions = {chunk.key: index for index, chunk in enumerate(chunks, start=1)}
+        with ThreadPoolExecutor(max_workers=settings["CHUNK_CONCURRENCY"]) as pool:
+            analyses = list(pool.map(
+                bind_context(lambda part: self._analyze_prompt(
+                    build_chunk_prompt(part[1], positions[part[0].key], len(chunks)), provider, use_cache
+                )),
+                parts
+            ))
+        save_chunk_results(store, parts, analyses, results)
+        return merge_scenario_analyses([partial for chunk in chunks for partial in results[chunk.key]])
+    
+    def _stream_with_fallback(
+        self, prompt: str, provider: str, use_cache: bool
+    ) -> Iterator[StreamUpdate[FeeScenarioAnalysis]]:
+        """Stream a prompt, starting over with OpenAI if Claude fails."""
         try:
-            content = self._run_llm(prompt, provider)
-            return parse_json_response(content, FeeScenarioAnalysis)
+            yield from cached_stream(
+                self.cache, _cache_key(prompt, provider), lambda: self._stream_llm(prompt, provider), _parse, use_cache
+            )
         except Exception as e:
             if provider == "anthropic":
                 logger.warning("Claude failed. Retrying with OpenAI...")
-                content = self._run_llm(prompt, "openai")
-                return parse_json_response(content, FeeScenarioAnalysis)
+                yield from self._stream_with_fallback(prompt, "openai", use_cache)
             else:
                 raise e
     
-    def _run_llm(self, prompt: str, provider: str) -> str:
-        """Run the LLM with the specified provider."""
+    def _analyze_prompt(
+        self, prompt: str, provider: str, use_cache: bool, parse: Callable[[str], M] = _parse
+    ) -> M:
+        """Run the prompt on the provider, or its fallbacks, and parse the response (by default the scenarios).
+
+        Each backend's response is cached under its own provider and model.
+        """
+        return route(default_backends(provider), lambda backend: cached_call(
+            self.cache, _cache_key(prompt, backend.provider, backend.model),
+            lambda: self._run_llm(prompt, backend.provider, backend.model), parse, use_cache
+        ))
+    
+    def _run_llm(self, prompt: str, provider: str, model: Optional[str] = None) -> str:
+        """Run the LLM with the specified provider and model (by default the configured one)."""
         if provider == "openai":
-            response = self.openai_client.chat.completions.create(
-                model=settings["OPENAI_MODEL"],
-                messages=[
-                    {"role": "system", "content": "You are a financial fee analyst AI."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.choices[0].message.content.strip()
+            client = self.openai_client
+        elif provider == "anthropic":
+            client = self.anthropic_client
+        else:
+            client = get_backend_client(provider)
+        return request(client, Backend(provider, model or default_model(provider)), SYSTEM_MESSAGE, prompt)
+    
+    def _stream_llm(self, prompt: str, provider: str) -> Iterator[str]:
+        """Stream the completion text from the specified provider."""
+        if provider == "openai":
+            with stage("llm_wait"):
+                stream = get_rate_limiter(provider, settings["OPENAI_MODEL"]).call(
+                    lambda: self.openai_client.chat.completions.create(
+                        model=settings["OPENAI_MODEL"],
+                        messages=_openai_messages(prompt),
+                        stream=True,
+                        stream_options={"include_usage": True}
+                    ),
+                    _estimated_tokens(prompt)
+                )
+            yield from openai_text_deltas(stream, settings["OPENAI_MODEL"])
         
         elif provider == "anthropic":
-            response = self.anthropic_client.messages.create(
-                model=settings["ANTHROPIC_MODEL"],
-                max_tokens=1000,
-                messages=[{"role": "user", "content": prompt}]
+            with stage("llm_wait"):
+                stream = get_rate_limiter(provider, settings["ANTHROPIC_MODEL"]).call(
+                    lambda: self.anthropic_client.messages.create(
+                        model=settings["ANTHROPIC_MODEL"],
+                        max_tokens=COMPLETION_TOKEN_ESTIMATE,
+                        system=SYSTEM_MESSAGE,
+                        messages=[{"role": "user", "content": anthropic_user_content(SYSTEM_MESSAGE, prompt)}],
+                        stream=True
+                    ),
+                    _estimated_tokens(prompt)
+                )
+            yield from anthropic_text_deltas(stream, settings["ANTHROPIC_MODEL"])
+        
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+
+class AsyncFeeAnalyzer:
+    """Asyncio counterpart of ``FeeAnalyzer`` built on the SDKs' async clients."""
+
+    def __init__(
+        self,
+        openai_client: Optional["openai.AsyncOpenAI"] = None,
+        anthropic_client: Optional["anthropic.AsyncAnthropic"] = None,
+        cache: Optional[ResponseCache] = None,
+        versions: Optional[DocumentVersionStore] = None,
+        similar: Optional[SimilarityIndex] = None
+    ):
+        self._openai_client = openai_client
+        self._anthropic_client = anthropic_client
+        self.cache = cache if cache is not None else get_response_cache()
+        self._versions = versions
+        self._similar = similar
+    
+    @property
+    def openai_client(self) -> "openai.AsyncOpenAI":
+        """The AsyncOpenAI client, taken from the shared registry for the running loop."""
+        return self._openai_client or get_async_openai_client()
+    
+    @property
+    def anthropic_client(self) -> "anthropic.AsyncAnthropic":
+        """The AsyncAnthropic client, taken from the shared registry for the running loop."""
+        return self._anthropic_client or get_async_anthropic_client()
+    
+    @property
+    def versions(self) -> Optional[DocumentVersionStore]:
+        """The document version store used by ``analyze_pages``."""
+        return self._versions or get_version_store()
+    
+    @property
+    def similar(self) -> Optional[SimilarityIndex]:
+        """The near-duplicate index whose results ``analyze`` reuses."""
+        return self._similar if self._similar is not None else get_similarity_index()
+    
+    async def analyze(
+        self, doc_text: Union[str, TextSpool], provider: str = "openai", use_cache: bool = True
+    ) -> FeeScenarioAnalysis:
+        """Analyze document text and return fee scenarios.
+
+        Chunks of long documents are analyzed concurrently, at most
+        ``CHUNK_CONCURRENCY`` at a time, before their scenarios are merged.
+        Near-duplicates of analyzed fee schedules and spooled documents are
+        handled as in ``FeeAnalyzer.analyze``.
+        """
+        if isinstance(doc_text, TextSpool):
+            return await self.analyze_spool(doc_text, provider, use_cache)
+        index = self.similar
+        reuse = _find_similar(index, doc_text, provider, use_cache)
+        if reuse is not None and reuse.diff is None:
+            return reuse.previous
+        if reuse is not None:
+            result = await self._analyze_prompt(
+                build_adaptation_prompt(reuse.previous, reuse.diff), provider, use_cache
             )
-            return response.content[0].text.strip()
+        else:
+            result = await self._analyze_text(doc_text, provider, use_cache)
+        if use_cache:
+            remember_result(index, doc_text, _similarity_namespace(provider), result)
+        return result
+    
+    async def _analyze_text(self, doc_text: str, provider: str, use_cache: bool) -> FeeScenarioAnalysis:
+        prompts = _build_prompts(doc_text)
+        if len(prompts) == 1:
+            return await self._analyze_prompt(prompts[0], provider, use_cache)
         
+        semaphore = asyncio.Semaphore(settings["CHUNK_CONCURRENCY"])
+        
+        async def analyze_chunk(prompt: str) -> FeeScenarioAnalysis:
+            async with semaphore:
+                return await self._analyze_prompt(prompt, provider, use_cache)
+        
+        partials = await asyncio.gather(*(analyze_chunk(prompt) for prompt in prompts))
+        return merge_scenario_analyses(list(partials))
+    
+    async def analyze_spool(
+        self, spool: TextSpool, provider: str = "openai", use_cache: bool = True
+    ) -> FeeScenarioAnalysis:
+        """Analyze a fee schedule spooled to disk, ``CHUNK_CONCURRENCY`` chunks at a time.
+
+        See ``FeeAnalyzer.analyze_spool``.
+        """
+        return await self._analyze_spool(
+            _spool_prompts(spool), provider, use_cache, _parse, merge_scenario_analyses
+        )
+    
+    async def _analyze_spool(
+        self,
+        spool_prompts: Tuple[int, Iterator[str]],
+        provider: str,
+        use_cache: bool,
+        parse: Callable[[str], M],
+        merge: Callable[[List[M]], M]
+    ) -> M:
+        total, prompts = spool_prompts
+        if not total:
+            raise ValueError("No text could be extracted")
+        if total == 1:
+            return await self._analyze_prompt(next(prompts), provider, use_cache, parse)
+        
+        partials: List[M] = []
+        while True:
+            batch = list(islice(prompts, settings["CHUNK_CONCURRENCY"]))
+            if not batch:
+                break
+            partials.extend(await asyncio.gather(
+                *(self._analyze_prompt(prompt, provider, use_cache, parse) for prompt in batch)
+            ))
+        return merge(partials)
+    
+    async def extract_rate_table(
+        self, doc_text: Union[str, TextSpool], provider: str = "openai", use_cache: bool = True
+    ) -> RateTable:
+        """Extract the fee schedule as a rate table for ``FeeEngine``.
+
+        See ``FeeAnalyzer.extract_rate_table``.
+        """
+        if isinstance(doc_text, TextSpool):
+            return await self._analyze_spool(
+                _spool_rate_table_prompts(doc_text), provider, use_cache, _parse_rate_table, merge_rate_tables
+            )
+        prompts = _build_rate_table_prompts(doc_text)
+        if len(prompts) == 1:
+            return await self._analyze_prompt(prompts[0], provider, use_cache, _parse_rate_table)
+        
+        semaphore = asyncio.Semaphore(settings["CHUNK_CONCURRENCY"])
+        
+        async def extract_chunk(prompt: str) -> RateTable:
+            async with semaphore:
+                return await self._analyze_prompt(prompt, provider, use_cache, _parse_rate_table)
+        
+        partials = await asyncio.gather(*(extract_chunk(prompt) for prompt in prompts))
+        return merge_rate_tables(list(partials))
+    
+    async def analyze_pages(
+        self,
+        pages: List[str],
+        provider: str = "openai",
+        doc_id: Optional[str] = None,
+        use_cache: bool = True
+    ) -> FeeScenarioAnalysis:
+        """Analyze a document page by page, re-analyzing only chunks that changed.
+
+        See ``FeeAnalyzer.analyze_pages``.
+        """
+        chunks = _plan_chunks(pages, provider)
+        store = self.versions
+        record_version(store, doc_id, pages)
+        results = load_chunk_results(store, chunks, FeeScenarioAnalysis)
+        parts = pending_parts(chunks, results, settings["INCREMENTAL_CHUNK_TOKENS"])
+        positions = {chunk.key: index for index, chunk in enumerate(chunks, start=1)}
+        semaphore = asyncio.Semaphore(settings["CHUNK_CONCURRENCY"])
+        
+        async def analyze_part(chunk, text: str) -> FeeScenarioAnalysis:
+            async with semaphore:
+                return await self._analyze_prompt(
+                    build_chunk_prompt(text, positions[chunk.key], len(chunks)), provider, use_cache
+                )
+        
+        analyses = await asyncio.gather(*(analyze_part(chunk, text) for chunk, text in parts))
+        save_chunk_results(store, parts, list(analyses), results)
+        return merge_scenario_analyses([partial for chunk in chunks for partial in results[chunk.key]])
+    
+    async def _analyze_prompt(
+        self, prompt: str, provider: str, use_cache: bool, parse: Callable[[str], M] = _parse
+    ) -> M:
+        return await aroute(default_backends(provider), lambda backend: acached_call(
+            self.cache, _cache_key(prompt, backend.provider, backend.model),
+            lambda: self._run_llm(prompt, backend.provider, backend.model), parse, use_cache
+        ))
+    
+    async def _run_llm(self, prompt: str, provider: str, model: Optional[str] = None) -> str:
+        """Run the LLM with the specified provider and model (by default the configured one)."""
+        if provider == "openai":
+            client = self.openai_client
+        elif provider == "anthropic":
+            client = self.anthropic_client
         else:
-            raise ValueError(f"Unsupported provider: {provider}") 
\ No newline at end of file
+            client = get_async_backend_client(provider)
+        return await arequest(client, Backend(provider, model or default_model(provider)), SYSTEM_MESSAGE, prompt)
@@ -0,0 +1,245 @@
+"""Provider batch API execution for bulk, latency-insensitive fee analysis.
+
+OpenAI Batch and Anthropic Message Batches jobs cost less than synchronous
+requests and have their own rate limits, but finish within hours rather
+than seconds. ``BatchRunner`` submits prompts as jobs of at most
+``BATCH_MAX_REQUESTS`` requests and polls them every ``BATCH_POLL_INTERVAL``
+seconds until they end.
+
+``run_batch_analysis`` analyzes many fee schedules in one wave of batch
+jobs: the analysis prompts of short documents and the chunk prompts of long
+ones, whose scenarios are merged locally as in ``FeeAnalyzer.analyze``.
+Responses are cached under the same keys as synchronous calls, and cached
+prompts are not submitted.
+"""
+import json
+import logging
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple, TypeVar, Union
+from ..config import settings
+from ..models.schemas import FeeScenarioAnalysis
+from ..utils.chunking import COMPLETION_TOKEN_ESTIMATE
+from ..utils.metrics import record_llm_call, stage
+from .analyzer import SYSTEM_MESSAGE, _build_prompts, _parse, merge_scenario_analyses
+from .clients import get_anthropic_client, get_openai_client
+from .response_cache import ResponseCache, get_response_cache, make_cache_key
+from .router import default_model
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+class BatchRequest(NamedTuple):
+    """One prompt of a batch job, identified by ``custom_id`` in the results."""
+    custom_id: str
+    system: str
+    prompt: str
+
+# Response text, or the error, per custom id.
+BatchResults = Dict[str, Union[str, Exception]]
+
+class BatchRunner:
+    """Runs prompts through the OpenAI Batch or Anthropic Message Batches API."""
+
+    def __init__(
+        self,
+        provider: str = "openai",
+        client=None,
+        model: Optional[str] = None,
+        poll_interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_requests: Optional[int] = None
+    ):
+        if provider not in ("openai", "anthropic"):
+            raise ValueError(f"Unsupported batch provider: {provider}")
+        self.provider = provider
+        self._client = client
+        self.model = model or default_model(provider)
+        self.poll_interval = settings["BATCH_POLL_INTERVAL"] if poll_interval is None else poll_interval
+        self.timeout = settings["BATCH_TIMEOUT"] if timeout is None else timeout
+        self.max_requests = max(1, max_requests or settings["BATCH_MAX_REQUESTS"])
+
+    @property
+    def client(self):
+        """The provider's client, taken from the shared registry on first use."""
+        if self._client is None:
+            self._client = get_openai_client() if self.provider == "openai" else get_anthropic_client()
+        return self._client
+
+    def run(self, requests: List[BatchRequest]) -> BatchResults:
+        """Submit ``requests`` as batch jobs and wait for all of them to end.
+
+        Raises:
+            ValueError: If a job does not end within ``timeout`` seconds
+        """
+        if not requests:
+            return {}
+        with stage("batch_submit"):
+            jobs = [
+                self.submit(requests[start:start + self.max_requests])
+                for start in range(0, len(requests), self.max_requests)
+            ]
+        results: BatchResults = {}
+        with stage("batch_wait"):
+            for job in jobs:
+                results.update(self.collect(self.wait(job)))
+        for request in requests:
+            if request.custom_id not in results:
+                results[request.custom_id] = ValueError(f"Batch request {request.custom_id} returned no result")
+        return results
+
+    def submit(self, requests: List[BatchRequest]) -> str:
+        """Start a batch job for the requests and return its id."""
+        if self.provider == "anthropic":
+            batch = self.client.messages.batches.create(requests=[
+                {
+                    "custom_id": request.custom_id,
+                    "params": {
+                        "model": self.model,
+                        "max_tokens": COMPLETION_TOKEN_ESTIMATE,
+                        "system": request.system,
+                        "messages": [{"role": "user", "content": request.prompt}]
+                    }
+                }
+                for request in requests
+            ])
+        else:
+            lines = [
+                json.dumps({
+                    "custom_id": request.custom_id,
+                    "method": "POST",
+                    "url": ENDPOINT,
+                    "body": {
+                        "model": self.model,
+                        "messages": [
+                            {"role": "system", "content": request.system},
+                            {"role": "user", "content": request.prompt}
+                        ]
+                    }
+                })
+                for request in requests
+            ]
+            upload = self.client.files.create(file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+            batch = self.client.batches.create(input_file_id=upload.id, endpoint=ENDPOINT, completion_window="24h")
+        logger.info(f"Submitted {self.provider} batch {batch.id} with {len(requests)} requests")
+        return batch.id
+
+    def wait(self, batch_id: str):
+        """Poll the job until it ends and return it."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self.provider == "anthropic":
+                batch = self.client.messages.batches.retrieve(batch_id)
+                ended = batch.processing_status == "ended"
+            else:
+                batch = self.client.batches.retrieve(batch_id)
+                ended = batch.status in TERMINAL_STATUSES
+            if ended:
+                logger.info(f"Batch {batch_id} ended")
+                return batch
+            if time.monotonic() >= deadline:
+                raise ValueError(f"Batch {batch_id} did not finish within {self.timeout:.0f}s")
+            time.sleep(self.poll_interval)
+
+    def collect(self, batch) -> BatchResults:
+        """Read the response text or error of each request of an ended job."""
+        results: BatchResults = {}
+        if self.provider == "anthropic":
+            for entry in self.client.messages.batches.results(batch.id):
+                if entry.result.type == "succeeded":
+                    record_llm_call("anthropic", self.model, entry.result.message.usage)
+                    results[entry.custom_id] = entry.result.message.content[0].text.strip()
+                else:
+                    results[entry.custom_id] = ValueError(f"Batch request {entry.custom_id} {entry.result.type}")
+            return results
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    results[record["custom_id"]] = self._openai_result(record)
+        return results
+
+    def _openai_result(self, record: dict) -> Union[str, Exception]:
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        if response.get("status_code") != 200:
+            error = record.get("error") or body.get("error") or {}
+            return ValueError(f"Batch request {record['custom_id']} failed: {error.get('message', 'unknown error')}")
+        record_llm_call("openai", self.model, SimpleNamespace(**(body.get("usage") or {})))
+        return body["choices"][0]["message"]["content"].strip()
+
+# (system message, prompt, whether a cached response may be used) per request key.
+Prompts = Dict[Hashable, Tuple[str, str, bool]]
+
+def complete_all(
+    runner: BatchRunner, cache: Optional[ResponseCache], prompts: Prompts, parse: Callable[[str], T]
+) -> Dict[Hashable, Union[T, Exception]]:
+    """Answer each prompt from the cache or one wave of batch jobs and parse the responses."""
+    results: Dict[Hashable, Union[T, Exception]] = {}
+    pending: Dict[str, Tuple[Hashable, str]] = {}
+    for key, (system, prompt, use_cache) in prompts.items():
+        cache_key = make_cache_key(runner.provider, runner.model, system, prompt)
+        cached = cache.get(cache_key) if cache is not None and use_cache else None
+        if cached is not None:
+            try:
+                results[key] = parse(cached)
+                continue
+            except ValueError:
+                pass
+        pending[f"request-{len(pending)}"] = (key, cache_key)
+
+    requests = [
+        BatchRequest(custom_id, prompts[key][0], prompts[key][1]) for custom_id, (key, _) in pending.items()
+    ]
+    for custom_id, content in runner.run(requests).items():
+        key, cache_key = pending[custom_id]
+        if isinstance(content, Exception):
+            results[key] = content
+            continue
+        try:
+            results[key] = parse(content)
+        except ValueError as e:
+            results[key] = e
+            continue
+        if cache is not None:
+            cache.set(cache_key, content)
+    return results
+
+def run_batch_analysis(
+    texts: List[str],
+    provider: str = "openai",
+    runner: Optional[BatchRunner] = None,
+    cache: Optional[ResponseCache] = None,
+    use_cache: bool = True
+) -> List[Union[FeeScenarioAnalysis, Exception]]:
+    """Analyze many fee schedules in one wave of batch jobs.
+
+    Returns the scenarios of each document, or the error that stopped it,
+    in the order of ``texts``.
+    """
+    runner = runner or BatchRunner(provider)
+    cache = cache if cache is not None else get_response_cache()
+    plans = [_build_prompts(text) for text in texts]
+    prompts: Prompts = {
+        (index, part): (SYSTEM_MESSAGE, prompt, use_cache)
+        for index, doc_prompts in enumerate(plans)
+        for part, prompt in enumerate(doc_prompts)
+    }
+    with stage("analyze"):
+        answers = complete_all(runner, cache, prompts, _parse)
+
+    results: List[Union[FeeScenarioAnalysis, Exception]] = []
+    for index, doc_prompts in enumerate(plans):
+        partials = [answers[(index, part)] for part in range(len(doc_prompts))]
+        error = next((partial for partial in partials if isinstance(partial, Exception)), None)
+        if error is not None:
+            results.append(error)
+        else:
+            results.append(partials[0] if len(partials) == 1 else merge_scenario_analyses(partials))
+    return results
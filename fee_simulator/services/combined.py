@@ -0,0 +1,108 @@
+"""Comprehensive report: document analysis and fee scenarios from one upload.
+
+The combined pipeline is a small DAG (see ``utils.dag``)::
+
+    pages ─┬─ document_text ── document_analysis
+           └─ fee_text ─────── fee_analysis
+
+The PDF is read once. Its pages are then compressed separately for each
+analysis, since the fee simulator also drops paragraphs without fees. The
+document analysis pipeline (analyze, evaluate, retry) and the fee analysis
+run concurrently, so a report takes about as long as the slower of the two.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+from single_doc_analyze.config import settings as document_settings
+from single_doc_analyze.models.schemas import DocumentAnalysis
+from single_doc_analyze.services.analyzer import AsyncDocumentAnalyzer
+from single_doc_analyze.services.evaluator import AsyncDocumentEvaluator
+from single_doc_analyze.services.pipeline import run_pipeline_async
+from single_doc_analyze.utils import preprocess as document_preprocess
+from single_doc_analyze.utils.metrics import trace as document_trace
+from ..config import settings
+from ..models.schemas import FeeScenarioAnalysis
+from ..utils import preprocess
+from ..utils.chunking import PAGE_BREAK
+from ..utils.dag import Stage, run_dag
+from ..utils.metrics import stage, trace
+from .analyzer import AsyncFeeAnalyzer
+from .pdf_service import PdfSource, iter_pdf_pages
+
+class CombinedReport(NamedTuple):
+    """Both analyses of a document, or the error that stopped each of them."""
+    analysis: Union[DocumentAnalysis, Exception]
+    fees: Union[FeeScenarioAnalysis, Exception]
+
+def _join(pages: List[str]) -> str:
+    return PAGE_BREAK.join(text for text in pages if text).strip()
+
+def _document_text(pages: List[str]) -> str:
+    if document_settings["PROMPT_COMPRESSION"]:
+        return document_preprocess.compress_pages(pages).text
+    return _join(pages)
+
+def _fee_text(pages: List[str]) -> str:
+    if settings["PROMPT_COMPRESSION"]:
+        return preprocess.compress_pages(pages).text
+    return _join(pages)
+
+def combined_stages(
+    file: PdfSource,
+    provider: str = "openai",
+    analyzer: Optional[AsyncDocumentAnalyzer] = None,
+    evaluator: Optional[AsyncDocumentEvaluator] = None,
+    fee_analyzer: Optional[AsyncFeeAnalyzer] = None
+) -> List[Stage]:
+    """Return the stages of the combined pipeline for one PDF."""
+    def read_pages() -> List[str]:
+        with stage("pdf_extract"):
+            return list(iter_pdf_pages(file))
+
+    async def analyze_document(text: str) -> DocumentAnalysis:
+        return await run_pipeline_async(text, analyzer or AsyncDocumentAnalyzer(), evaluator or AsyncDocumentEvaluator())
+
+    async def analyze_fees(text: str) -> FeeScenarioAnalysis:
+        return await (fee_analyzer or AsyncFeeAnalyzer()).analyze(text, provider=provider)
+
+    return [
+        Stage("pages", read_pages),
+        Stage("document_text", _document_text, ("pages",)),
+        Stage("fee_text", _fee_text, ("pages",)),
+        Stage("document_analysis", analyze_document, ("document_text",)),
+        Stage("fee_analysis", analyze_fees, ("fee_text",)),
+    ]
+
+async def run_combined(
+    file: PdfSource,
+    provider: str = "openai",
+    analyzer: Optional[AsyncDocumentAnalyzer] = None,
+    evaluator: Optional[AsyncDocumentEvaluator] = None,
+    fee_analyzer: Optional[AsyncFeeAnalyzer] = None
+) -> CombinedReport:
+    """Analyze a PDF with both apps, extracting it once.
+
+    Args:
+        file: A path or file-like object containing the PDF data
+        provider: The LLM provider of the fee analysis ("openai" or "anthropic")
+        analyzer: Document analyzer to use (a new one is created if omitted)
+        evaluator: Document evaluator to use (a new one is created if omitted)
+        fee_analyzer: Fee analyzer to use (a new one is created if omitted)
+
+    Returns:
+        CombinedReport: Each analysis, or the error that stopped it
+    """
+    results = await run_dag(combined_stages(file, provider, analyzer, evaluator, fee_analyzer))
+    return CombinedReport(results["document_analysis"], results["fee_analysis"])
+
+@contextmanager
+def trace_report(
+    active: bool = True
+) -> Iterator[Tuple[Optional[Dict[str, float]], Optional[Dict[str, float]]]]:
+    """Collect the stage timings of a combined report within the block.
+
+    Each app records its stages in its own metrics module, so this yields
+    the document analysis timings and the fee analysis timings separately,
+    or (None, None) when ``active`` is False.
+    """
+    with document_trace(active) as document_timings, trace(active) as fee_timings:
+        yield document_timings, fee_timings
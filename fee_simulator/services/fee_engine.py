@@ -0,0 +1,116 @@
+"""Deterministic fee and rebate calculation from an extracted rate table.
+
+The LLM extracts a fee schedule once into a ``RateTable``; ``FeeEngine``
+then evaluates any number of participant type, order type and monthly
+volume combinations with NumPy, without further LLM calls. A month's volume
+falls in the highest tier whose ``min_volume`` it reaches and that tier's
+rates apply to all of it; volumes below every tier use the lowest one.
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from ..models.schemas import FeeRate, FeeScenario, FeeScenarioAnalysis, RateTable
+
+def _normalize(name: str) -> str:
+    return re.sub(r"\s+", " ", name).strip().casefold()
+
+def format_usd(amount: float) -> str:
+    return f"-${-amount:,.2f}" if amount < 0 else f"${amount:,.2f}"
+
+def rate_key(rate: FeeRate) -> tuple:
+    """Participant type, order type and tier threshold identifying a rate."""
+    return _normalize(rate.participant_type), _normalize(rate.order_type), rate.min_volume
+
+def merge_rate_tables(partials: List[RateTable]) -> RateTable:
+    """Merge rate tables extracted from parts of a schedule, keeping the first rate for each key."""
+    seen = set()
+    rates = []
+    for partial in partials:
+        for rate in partial.rates:
+            key = rate_key(rate)
+            if key not in seen:
+                seen.add(key)
+                rates.append(rate)
+    return RateTable(rates=rates)
+
+class Simulation(NamedTuple):
+    """Results per volume of ``FeeEngine.simulate``, as arrays shaped like ``volume``."""
+    volume: np.ndarray
+    tier: np.ndarray
+    fee: np.ndarray
+    rebate: np.ndarray
+
+    @property
+    def net(self) -> np.ndarray:
+        """Fees minus rebates (negative when the rebates are larger)."""
+        return self.fee - self.rebate
+
+class FeeEngine:
+    """Vectorized fee calculator over a ``RateTable``.
+
+    ``rates`` holds the table's rates grouped by participant type and order
+    type and sorted by tier threshold; ``Simulation.tier`` indexes into it.
+    Names are matched ignoring case and whitespace.
+    """
+
+    def __init__(self, table: RateTable):
+        if not table.rates:
+            raise ValueError("The rate table has no rates")
+        order = sorted(range(len(table.rates)), key=lambda i: (rate_key(table.rates[i])[:2], i))
+        self.rates: List[FeeRate] = [table.rates[i] for i in order]
+        self._groups: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        start = 0
+        for end in range(1, len(self.rates) + 1):
+            if end == len(self.rates) or rate_key(self.rates[end])[:2] != rate_key(self.rates[start])[:2]:
+                self.rates[start:end] = sorted(self.rates[start:end], key=lambda rate: rate.min_volume)
+                self._groups[rate_key(self.rates[start])[:2]] = (start, end)
+                start = end
+        self._min_volume = np.array([rate.min_volume for rate in self.rates], dtype=np.float64)
+        self._fee = np.array([rate.fee_per_unit for rate in self.rates], dtype=np.float64)
+        self._rebate = np.array([rate.rebate_per_unit for rate in self.rates], dtype=np.float64)
+
+    @property
+    def pairs(self) -> List[Tuple[str, str]]:
+        """The participant type and order type combinations the table has rates for."""
+        return [(self.rates[start].participant_type, self.rates[start].order_type)
+                for start, _ in self._groups.values()]
+
+    def simulate(self, participant_type: str, order_type: str, volume) -> Simulation:
+        """Fees and rebates for monthly volumes (a number or an array, e.g. a volume curve)."""
+        group = self._groups.get((_normalize(participant_type), _normalize(order_type)))
+        if group is None:
+            raise ValueError(f"No rates for {participant_type} {order_type} orders")
+        volume = np.asarray(volume, dtype=np.float64)
+        if (volume < 0).any():
+            raise ValueError("Volumes must not be negative")
+        start, end = group
+        position = np.searchsorted(self._min_volume[start:end], volume, "right") - 1
+        tier = start + np.maximum(position, 0)
+        return Simulation(volume, tier, volume * self._fee[tier], volume * self._rebate[tier])
+
+    def simulate_all(self, volume) -> Dict[Tuple[str, str], Simulation]:
+        """``simulate`` for every participant type and order type in the table."""
+        return {pair: self.simulate(*pair, volume) for pair in self.pairs}
+
+    def scenario(self, participant_type: str, order_type: str, volume: float) -> FeeScenario:
+        """The fee scenario for one month's volume."""
+        result = self.simulate(participant_type, order_type, volume)
+        rate = self.rates[int(result.tier)]
+        return FeeScenario(
+            participant_type=rate.participant_type,
+            volume_tier=rate.volume_tier,
+            order_type=rate.order_type,
+            estimated_fee=f"${float(result.fee):,.2f} (${rate.fee_per_unit:.4f} per {rate.unit})",
+            rebate=f"${float(result.rebate):,.2f} (${rate.rebate_per_unit:.4f} per {rate.unit})",
+            notes=f"{float(volume):,.0f} {rate.unit}s per month, net {format_usd(float(result.net))}. "
+                  f"{rate.notes}".strip()
+        )
+
+    def scenarios(self, volumes: Optional[Sequence[float]] = None) -> FeeScenarioAnalysis:
+        """Scenarios for each combination at ``volumes``, by default at each tier's threshold."""
+        scenarios = []
+        for participant_type, order_type in self.pairs:
+            start, end = self._groups[(_normalize(participant_type), _normalize(order_type))]
+            points = volumes if volumes is not None else [rate.min_volume for rate in self.rates[start:end]]
+            scenarios.extend(self.scenario(participant_type, order_type, volume) for volume in points)
+        return FeeScenarioAnalysis(scenarios=scenarios)
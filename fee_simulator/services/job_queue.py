@@ -0,0 +1,355 @@
+"""SQLite-backed job queue and worker process pool.
+
+Uploads are submitted as jobs (the PDF bytes plus a JSON payload) instead of
+being processed inside the request handler. Worker processes claim queued
+jobs, run them and store the result, so a burst of uploads waits in the
+queue rather than in the UI, and results survive a restart of the app.
+
+* Identical submissions (same bytes and payload) share one job, whose id is
+  the SHA-256 of both.
+* A claimed job holds a lease of its timeout. The pool terminates a worker
+  whose job overruns the lease, and any worker can reclaim a job whose lease
+  expired (e.g. after the whole pool crashed).
+* A failed, timed out or crashed attempt is retried until ``max_attempts``
+  attempts have been made.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from ..config import settings, setup_logging
+from ..utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, document BLOB, "
+    "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, timeout REAL NOT NULL, "
+    "worker TEXT, lease_expires REAL, result TEXT, error TEXT, "
+    "created REAL NOT NULL, updated REAL NOT NULL)"
+)
+_INDEX = "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)"
+
+_COLUMNS = "id, status, payload, attempts, max_attempts, result, error, created, updated"
+
+Handler = Callable[[bytes, dict], dict]
+
+class Job(NamedTuple):
+    """Status of a job; ``result`` is set once it is done, ``error`` after a failed attempt."""
+    id: str
+    status: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+    result: Optional[dict]
+    error: Optional[str]
+    created: float
+    updated: float
+
+def job_key(document: bytes, payload: dict) -> str:
+    """Identify a submission by its document bytes and payload."""
+    digest = hashlib.sha256(document)
+    digest.update(json.dumps(payload, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+def _job(row: tuple) -> Job:
+    job_id, status, payload, attempts, max_attempts, result, error, created, updated = row
+    return Job(
+        job_id, status, json.loads(payload), attempts, max_attempts,
+        json.loads(result) if result is not None else None, error, created, updated
+    )
+
+class JobQueue:
+    """Persistent job queue shared by the app and worker processes through one SQLite file."""
+
+    def __init__(self, path: str, timeout: Optional[float] = None, max_attempts: Optional[int] = None):
+        self.path = path
+        self.timeout = timeout or settings["JOB_TIMEOUT"]
+        self.max_attempts = max_attempts or settings["JOB_MAX_ATTEMPTS"]
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit mode: claims use explicit BEGIN IMMEDIATE transactions across processes.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(_INDEX)
+
+    def submit(self, document: bytes, payload: dict, timeout: Optional[float] = None) -> Job:
+        """Queue a job, or return the existing job for an identical submission.
+
+        A failed job is queued again with a fresh set of attempts.
+        """
+        job_id = job_key(document, payload)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, status, payload, document, max_attempts, timeout, created, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (job_id, QUEUED, json.dumps(payload), document, self.max_attempts,
+                         timeout or self.timeout, now, now)
+                    )
+                elif row[0] == FAILED:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, document = ?, attempts = 0, error = NULL, updated = ? "
+                        "WHERE id = ?",
+                        (QUEUED, document, now, job_id)
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is not None and row[0] != FAILED:
+            logger.info(f"Deduplicated submission of job {job_id[:12]}")
+        return self.get(job_id)
+
+    def claim(self, worker: str) -> Optional[Tuple[Job, bytes]]:
+        """Claim the oldest runnable job for ``worker``: queued, or running with an expired lease."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._conn.execute(
+                        f"SELECT {_COLUMNS}, document, timeout FROM jobs "
+                        "WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY created LIMIT 1",
+                        (QUEUED, RUNNING, now)
+                    ).fetchone()
+                    if row is None:
+                        claimed = None
+                        break
+                    job, document, timeout = _job(row[:-2]), row[-2], row[-1]
+                    if job.attempts >= job.max_attempts:
+                        # An expired lease on the last attempt: the worker died or hung.
+                        self._finish_failed(job.id, f"Timed out or crashed after {job.attempts} attempts", now)
+                        continue
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_expires = ?, "
+                        "updated = ? WHERE id = ?",
+                        (RUNNING, worker, now + timeout, now, job.id)
+                    )
+                    claimed = (job._replace(status=RUNNING, attempts=job.attempts + 1, updated=now), document)
+                    break
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def complete(self, job_id: str, worker: str, result: dict) -> bool:
+        """Store the result of a job; False if ``worker`` no longer holds it."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, document = NULL, worker = NULL, "
+                "lease_expires = NULL, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+                (DONE, json.dumps(result), time.time(), job_id, worker, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        """Record a failed attempt, queueing the job again if it has attempts left."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker = ? AND status = ?",
+                (job_id, worker, RUNNING)
+            ).fetchone()
+            if row is None:
+                return False
+            if row[0] >= row[1]:
+                self._finish_failed(job_id, error, now)
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_expires = NULL, updated = ? "
+                    "WHERE id = ?",
+                    (QUEUED, error, now, job_id)
+                )
+        logger.warning(f"Job {job_id[:12]} attempt {row[0]}/{row[1]} failed: {error}")
+        return True
+
+    def _finish_failed(self, job_id: str, error: str, now: float) -> None:
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, document = NULL, worker = NULL, lease_expires = NULL, "
+            "updated = ? WHERE id = ?",
+            (FAILED, error, now, job_id)
+        )
+
+    def running_on(self, worker: str) -> List[Tuple[str, float]]:
+        """Return ``(job_id, lease_expires)`` for the jobs ``worker`` is running."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, lease_expires FROM jobs WHERE worker = ? AND status = ?", (worker, RUNNING)
+            ).fetchall()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    def find(self, prefix: str) -> Optional[Job]:
+        """Look up a job by its id or a unique prefix of it."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE id LIKE ? LIMIT 2", (prefix + "%",)
+            ).fetchall()
+        return _job(rows[0]) if len(rows) == 1 else None
+
+    def position(self, job_id: str) -> int:
+        """Number of queued jobs ahead of ``job_id``."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created < (SELECT created FROM jobs WHERE id = ?)",
+                (QUEUED, job_id)
+            ).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs by status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)} | dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def process_next(queue: JobQueue, worker: str, handler: Handler) -> bool:
+    """Claim and run one job; False if the queue had nothing to run."""
+    claimed = queue.claim(worker)
+    if claimed is None:
+        return False
+    job, document = claimed
+    logger.info(f"Worker {worker} running job {job.id[:12]} (attempt {job.attempts}/{job.max_attempts})")
+    try:
+        result = handler(document, job.payload)
+    except Exception as e:
+        queue.fail(job.id, worker, str(e))
+    else:
+        if not queue.complete(job.id, worker, result):
+            logger.warning(f"Job {job.id[:12]} was reassigned before worker {worker} finished it")
+    return True
+
+def _worker_main(path: str, worker: str, handler: Handler, poll_interval: float) -> None:
+    setup_logging()
+    queue = JobQueue(path)
+    while True:
+        if not process_next(queue, worker, handler):
+            time.sleep(poll_interval)
+
+class WorkerPool:
+    """Supervise worker processes running ``handler`` on jobs from a queue.
+
+    Workers that exit are replaced, and a worker still running a job past its
+    lease is terminated and replaced; either way the job is retried or, on its
+    last attempt, marked failed. ``handler`` must be importable by name, since
+    workers are started with the spawn method.
+    """
+
+    def __init__(self, path: str, handler: Handler, workers: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.path = path
+        self.handler = handler
+        self.workers = workers or settings["JOB_WORKERS"]
+        self.poll_interval = poll_interval or settings["JOB_POLL_INTERVAL"]
+        self.queue = JobQueue(path)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[str, multiprocessing.Process] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        for _ in range(self.workers - len(self._processes)):
+            self._spawn()
+
+    def _spawn(self) -> None:
+        worker = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        process = self._context.Process(
+            target=_worker_main, args=(self.path, worker, self.handler, self.poll_interval),
+            name=f"job-worker-{worker}", daemon=True
+        )
+        process.start()
+        self._processes[worker] = process
+
+    def supervise(self) -> None:
+        """Replace exited workers and terminate workers whose job overran its timeout."""
+        now = time.time()
+        for worker, process in list(self._processes.items()):
+            running = self.queue.running_on(worker)
+            if process.is_alive():
+                overdue = [job_id for job_id, lease_expires in running if lease_expires < now]
+                if not overdue:
+                    continue
+                process.terminate()
+                process.join()
+                error = "Timed out"
+            else:
+                error = f"Worker exited with code {process.exitcode}"
+            for job_id, _ in running:
+                self.queue.fail(job_id, worker, error)
+            logger.warning(f"Replacing job worker {worker}: {error}")
+            del self._processes[worker]
+            self._spawn()
+
+    def run(self) -> None:
+        """Start the workers and supervise them until ``stop`` is called."""
+        self.start()
+        try:
+            while not self._stop.wait(self.poll_interval):
+                self.supervise()
+        finally:
+            self._shutdown()
+
+    def run_in_background(self) -> None:
+        """Run the pool from a daemon thread of the current process."""
+        self._thread = threading.Thread(target=self.run, name="job-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop supervising and terminate the workers."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            self._shutdown()
+
+    def _shutdown(self) -> None:
+        for worker, process in self._processes.items():
+            process.terminate()
+            process.join()
+            # Jobs interrupted by shutdown are queued again (this counts as an attempt).
+            for job_id, _ in self.queue.running_on(worker):
+                self.queue.fail(job_id, worker, "Worker stopped")
+        self._processes.clear()
+
+_default_queue: Optional[JobQueue] = None
+_default_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue at ``JOB_QUEUE_PATH``."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(settings["JOB_QUEUE_PATH"])
+        return _default_queue
+
+def _collect_metrics():
+    queue = _default_queue
+    if queue is None:
+        return []
+    return [("jobs", {"status": status}, count) for status, count in queue.counts().items()]
+
+REGISTRY.register_collector(_collect_metrics)
@@ -0,0 +1,255 @@
+"""Caches for LLM responses keyed on provider, model, system message and prompt."""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, Iterator, Optional, TypeVar
+from ..config import settings
+from ..utils.json_stream import PartialJSONParser, StreamUpdate, T
+from ..utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar('R')
+
+def make_cache_key(provider: str, model: str, system: str, prompt: str) -> str:
+    """Build a response cache key from the request parameters."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return hashlib.sha256(
+        json.dumps([provider, model, system, prompt_hash]).encode("utf-8")
+    ).hexdigest()
+
+class ResponseCache(ABC):
+    """Base class for response caches.
+
+    Subclasses implement ``_get``/``_set``/``_size``; this class keeps the hit/miss
+    counters and the TTL and size settings shared by every backend.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for ``key``, or None on a miss."""
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store ``value`` under ``key``, evicting old entries if needed."""
+        with self._lock:
+            self._set(key, value)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of stored entries."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": self._size(),
+            }
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        """Return the stored value for ``key``, or None if it is missing or expired."""
+
+    @abstractmethod
+    def _set(self, key: str, value: str) -> None:
+        """Store ``value`` under ``key``, evicting entries beyond ``max_entries``."""
+
+    @abstractmethod
+    def _size(self) -> int:
+        """Return the number of stored entries."""
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU response cache."""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        super().__init__(max_entries, ttl)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, created = entry
+        if self._expired(created):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: str) -> None:
+        self._entries[key] = (value, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _size(self) -> int:
+        return len(self._entries)
+
+class SQLiteResponseCache(ResponseCache):
+    """On-disk response cache shared across processes and restarts."""
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl: Optional[float] = None):
+        super().__init__(max_entries, ttl)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT value, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        with self._conn:
+            if self._expired(created):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+        return value
+
+    def _set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def _size(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+def cached_call(
+    cache: Optional[ResponseCache],
+    key: str,
+    call: Callable[[], str],
+    parse: Callable[[str], R],
+    use_cache: bool = True,
+) -> R:
+    """Return ``parse(content)`` for ``key``, calling the LLM only on a cache miss.
+
+    Responses are stored only after they parse, so a malformed completion is
+    never replayed from the cache.
+    """
+    if cache is None or not use_cache:
+        return parse(call())
+    content = cache.get(key)
+    if content is not None:
+        return parse(content)
+    content = call()
+    result = parse(content)
+    cache.set(key, content)
+    return result
+
+async def acached_call(
+    cache: Optional[ResponseCache],
+    key: str,
+    call: Callable[[], Awaitable[str]],
+    parse: Callable[[str], R],
+    use_cache: bool = True,
+) -> R:
+    """Async counterpart of ``cached_call`` for coroutine-based LLM clients."""
+    if cache is None or not use_cache:
+        return parse(await call())
+    content = cache.get(key)
+    if content is not None:
+        return parse(content)
+    content = await call()
+    result = parse(content)
+    cache.set(key, content)
+    return result
+
+def cached_stream(
+    cache: Optional[ResponseCache],
+    key: str,
+    stream: Callable[[], Iterable[str]],
+    parse: Callable[[str], T],
+    use_cache: bool = True,
+) -> Iterator[StreamUpdate[T]]:
+    """Streaming counterpart of ``cached_call``.
+
+    Yields a ``StreamUpdate`` each time the partially streamed JSON gains
+    content, then a final update carrying ``parse(content)``. A cache hit
+    yields only the final update.
+    """
+    use_cache = cache is not None and use_cache
+    content = cache.get(key) if use_cache else None
+    if content is not None:
+        result = parse(content)
+        yield StreamUpdate(result.model_dump(), result)
+        return
+    parser = PartialJSONParser()
+    for delta in stream():
+        partial = parser.feed(delta)
+        if partial is not None:
+            yield StreamUpdate(partial)
+    result = parse(parser.text)
+    if use_cache:
+        cache.set(key, parser.text)
+    yield StreamUpdate(result.model_dump(), result)
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache configured in settings, if any."""
+    global _default_cache
+    backend = settings["RESPONSE_CACHE_BACKEND"]
+    if backend == "none":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            max_entries = settings["RESPONSE_CACHE_MAX_ENTRIES"]
+            ttl = settings["RESPONSE_CACHE_TTL"] or None
+            if backend == "sqlite":
+                _default_cache = SQLiteResponseCache(settings["RESPONSE_CACHE_PATH"], max_entries, ttl)
+            elif backend == "memory":
+                _default_cache = MemoryResponseCache(max_entries, ttl)
+            else:
+                raise ValueError(f"Unsupported response cache backend: {backend}")
+        return _default_cache
+
+def _collect_metrics():
+    cache = _default_cache
+    if cache is None:
+        return []
+    return [
+        ("cache_hits_total", {"cache": "response"}, cache.hits),
+        ("cache_misses_total", {"cache": "response"}, cache.misses),
+    ]
+
+REGISTRY.register_collector(_collect_metrics)
@@ -0,0 +1,268 @@
+"""Near-duplicate index for reusing analyses across similar documents.
+
+Documents are compared by the Jaccard similarity of their word 5-shingles,
+estimated from 128-value MinHash signatures. Locality-sensitive hashing
+splits each signature into 16 bands of 8 values; documents sharing a band
+are candidates, and only the candidates' signatures are compared, so a
+lookup costs a few binary searches however many documents are indexed.
+Documents more than about 70% similar share a band with high probability.
+
+Band hashes are kept in one sorted array plus an unsorted buffer of recent
+additions, which is merged in once it outgrows a sixteenth of the index.
+Signatures stay in memory; the text and result of each document are kept in
+SQLite (or in memory without a path) and only read for a match.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from difflib import unified_diff
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type, TypeVar
+import numpy as np
+from pydantic import BaseModel
+from ..config import settings
+from ..utils.chunking import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents ("
+    "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, signature BLOB NOT NULL, "
+    "text BLOB NOT NULL, result TEXT NOT NULL, updated REAL NOT NULL)"
+)
+
+_WORD = re.compile(r"\w+")
+# Fixed seed: signatures are stored, so the hash functions must not change between runs.
+_random = np.random.default_rng(20240601)
+_PERM_A = _random.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _random.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+_SHINGLE_MULT = _random.integers(1, 2**63, SHINGLE_WORDS, dtype=np.uint64) | np.uint64(1)
+_BAND_MULT = _random.integers(1, 2**63, ROWS, dtype=np.uint64) | np.uint64(1)
+_BAND_TAGS = np.arange(BANDS, dtype=np.uint64) << np.uint64(60)
+_BLOCK = 2048
+_MIN_BUFFER = 1024
+
+class SimilarMatch(NamedTuple):
+    """An indexed document similar to the one looked up, with its stored result JSON."""
+    key: str
+    similarity: float
+    text: str
+    result: str
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """Return the MinHash signature of the text's word shingles, or None if it has no words."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return None
+    hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words))
+    width = min(SHINGLE_WORDS, len(hashes))
+    count = len(hashes) - width + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        shingles += hashes[offset:offset + count] * _SHINGLE_MULT[offset]
+    shingles = np.unique(shingles)
+    signature = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    for start in range(0, len(shingles), _BLOCK):
+        values = (shingles[start:start + _BLOCK, None] * _PERM_A + _PERM_B) >> np.uint64(32)
+        np.minimum(signature, values.min(axis=0).astype(np.uint32), out=signature)
+    return signature
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    """Hash each band of ``(n, NUM_PERM)`` signatures into ``(n, BANDS)`` keys tagged with the band."""
+    bands = signatures.reshape(len(signatures), BANDS, ROWS).astype(np.uint64)
+    return ((bands * _BAND_MULT).sum(axis=2) >> np.uint64(4)) | _BAND_TAGS
+
+def document_key(text: str, namespace: str) -> str:
+    """Key of a document's text (ignoring whitespace) within a namespace."""
+    return hashlib.sha256(f"{namespace}\n{' '.join(text.split())}".encode("utf-8")).hexdigest()
+
+class SimilarityIndex:
+    """MinHash LSH index of analyzed documents and their results.
+
+    ``namespace`` (model, prompt, ...) separates results that must not be
+    mixed; a lookup only matches documents of the same namespace.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or None
+        self._lock = threading.Lock()
+        self._signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+        self._bands = np.empty((0, BANDS), dtype=np.uint64)
+        self._count = 0
+        self._keys: List[str] = []
+        self._namespaces: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._sorted_keys = np.empty(0, dtype=np.uint64)
+        self._sorted_rows = np.empty(0, dtype=np.int64)
+        self._merged = 0
+        self._documents: Dict[str, Tuple[str, str]] = {}
+        self._conn = None
+        if self.path:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(_SCHEMA)
+            rows = self._conn.execute("SELECT key, namespace, signature FROM documents").fetchall()
+            for key, namespace, signature in rows:
+                self._append(key, namespace, np.frombuffer(signature, dtype=np.uint32))
+            self._merge()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, text: str, namespace: str, result: str, signature: Optional[np.ndarray] = None) -> Optional[str]:
+        """Index a document with its result JSON, returning its key (None for text without words).
+
+        ``signature`` may be passed if already computed with ``minhash_signature``.
+        """
+        if signature is None:
+            signature = minhash_signature(text)
+        if signature is None:
+            return None
+        key = document_key(text, namespace)
+        with self._lock:
+            if key not in self._rows:
+                self._append(key, namespace, signature)
+                if self._count - self._merged > max(_MIN_BUFFER, self._merged // 16):
+                    self._merge()
+            if self._conn is None:
+                self._documents[key] = (text, result)
+            else:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO documents (key, namespace, signature, text, result, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, namespace, signature.tobytes(), zlib.compress(text.encode("utf-8")), result, time.time()),
+                    )
+        return key
+
+    def query(self, text: str, namespace: str, threshold: float) -> Optional[SimilarMatch]:
+        """Return the most similar indexed document at least ``threshold`` similar, if any."""
+        signature = minhash_signature(text)
+        if signature is None:
+            return None
+        return self.query_signature(signature, namespace, threshold)
+
+    def query_signature(self, signature: np.ndarray, namespace: str, threshold: float) -> Optional[SimilarMatch]:
+        """Like ``query``, for a signature from ``minhash_signature``."""
+        bands = _band_keys(signature[None, :])[0]
+        with self._lock:
+            starts = np.searchsorted(self._sorted_keys, bands, "left")
+            stops = np.searchsorted(self._sorted_keys, bands, "right")
+            parts = [self._sorted_rows[start:stop] for start, stop in zip(starts, stops) if stop > start]
+            recent = self._bands[self._merged:self._count]
+            if len(recent):
+                parts.append(self._merged + np.flatnonzero((recent == bands).any(axis=1)))
+            if not parts:
+                return None
+            rows = [row for row in np.unique(np.concatenate(parts)) if self._namespaces[row] == namespace]
+            if not rows:
+                return None
+            similarities = (self._signatures[rows] == signature).mean(axis=1)
+            best = int(np.argmax(similarities))
+            if similarities[best] < threshold:
+                return None
+            key = self._keys[rows[best]]
+            text, result = self._load(key)
+        return SimilarMatch(key, float(similarities[best]), text, result)
+
+    def _load(self, key: str) -> Tuple[str, str]:
+        if self._conn is None:
+            return self._documents[key]
+        text, result = self._conn.execute(
+            "SELECT text, result FROM documents WHERE key = ?", (key,)
+        ).fetchone()
+        return zlib.decompress(text).decode("utf-8"), result
+
+    def _append(self, key: str, namespace: str, signature: np.ndarray) -> None:
+        if self._count == len(self._signatures):
+            capacity = max(1024, 2 * self._count)
+            self._signatures = np.resize(self._signatures, (capacity, NUM_PERM))
+            self._bands = np.resize(self._bands, (capacity, BANDS))
+        self._signatures[self._count] = signature
+        self._bands[self._count] = _band_keys(signature[None, :])[0]
+        self._rows[key] = self._count
+        self._keys.append(key)
+        self._namespaces.append(namespace)
+        self._count += 1
+
+    def _merge(self) -> None:
+        """Fold the recent additions into the sorted band keys."""
+        keys = self._bands[:self._count].ravel()
+        order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[order]
+        self._sorted_rows = order // BANDS
+        self._merged = self._count
+
+class Reuse(NamedTuple):
+    """A stored result to return as is or, when ``diff`` is set, to update from the diff."""
+    previous: BaseModel
+    similarity: float
+    diff: Optional[str]
+
+def _lines(text: str) -> List[str]:
+    return [" ".join(line.split()) for line in text.splitlines() if line.strip()]
+
+def find_reusable(
+    index: Optional[SimilarityIndex], text: str, namespace: str, model: Type[M]
+) -> Optional[Reuse]:
+    """Look up a near-duplicate of ``text`` whose result can be reused.
+
+    Results of documents at least ``SIMILARITY_REUSE_THRESHOLD`` similar, or
+    differing only in whitespace, are reused as is; a threshold of 1 reuses
+    only the latter, since equal signatures do not guarantee equal text. From
+    ``SIMILARITY_ADAPT_THRESHOLD`` the line diff between the two texts is
+    returned for an update, unless it exceeds ``SIMILARITY_MAX_DIFF_TOKENS``.
+    """
+    if index is None:
+        return None
+    match = index.query(text, namespace, settings["SIMILARITY_ADAPT_THRESHOLD"])
+    if match is None:
+        return None
+    previous = model.model_validate_json(match.result)
+    threshold = settings["SIMILARITY_REUSE_THRESHOLD"]
+    if threshold < 1 and match.similarity >= threshold:
+        logger.info(f"Reusing the result of a {match.similarity:.0%} similar document")
+        return Reuse(previous, match.similarity, None)
+    diff = "\n".join(unified_diff(_lines(match.text), _lines(text), "previous", "current", lineterm="", n=1))
+    if not diff:
+        logger.info("Reusing the result of a document differing only in whitespace")
+        return Reuse(previous, match.similarity, None)
+    if estimate_tokens(diff) > settings["SIMILARITY_MAX_DIFF_TOKENS"]:
+        return None
+    logger.info(f"Updating the result of a {match.similarity:.0%} similar document from its diff")
+    return Reuse(previous, match.similarity, diff)
+
+def remember_result(index: Optional[SimilarityIndex], text: str, namespace: str, result: BaseModel) -> None:
+    """Add an analyzed document to the index."""
+    if index is not None:
+        index.add(text, namespace, result.model_dump_json())
+
+_default_index: Optional[SimilarityIndex] = None
+_default_lock = threading.Lock()
+
+def get_similarity_index() -> Optional[SimilarityIndex]:
+    """Return the process-wide similarity index, or None if reuse is disabled."""
+    global _default_index
+    if not settings["SIMILARITY_REUSE"]:
+        return None
+    with _default_lock:
+        if _default_index is None:
+            try:
+                _default_index = SimilarityIndex(settings["SIMILARITY_INDEX_PATH"])
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Similarity index disabled: {str(e)}")
+                return None
+        return _default_index
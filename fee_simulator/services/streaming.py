@@ -0,0 +1,36 @@
+"""Text deltas from streamed chat completions and messages."""
+from types import SimpleNamespace
+from typing import Iterable, Iterator
+from ..utils.metrics import record_llm_call
+
+def openai_text_deltas(stream: Iterable, model: str) -> Iterator[str]:
+    """Yield the text of each streamed OpenAI chunk and record the final usage.
+
+    Requests should set ``stream_options={"include_usage": True}`` so the
+    last chunk reports token usage.
+    """
+    usage = None
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+    record_llm_call("openai", model, usage)
+
+def anthropic_text_deltas(stream: Iterable, model: str) -> Iterator[str]:
+    """Yield the text of each streamed Anthropic content delta and record the usage.
+
+    Input and prompt cache tokens arrive with ``message_start`` and output
+    tokens with the closing ``message_delta`` event.
+    """
+    usage = SimpleNamespace(
+        input_tokens=None, output_tokens=None, cache_read_input_tokens=None, cache_creation_input_tokens=None
+    )
+    for event in stream:
+        if event.type == "message_start":
+            for attribute in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens"):
+                setattr(usage, attribute, getattr(event.message.usage, attribute, None))
+        elif event.type == "message_delta":
+            usage.output_tokens = getattr(event.usage, "output_tokens", None)
+        elif event.type == "content_block_delta" and getattr(event.delta, "text", None):
+            yield event.delta.text
+    record_llm_call("anthropic", model, usage)
@@ -0,0 +1,89 @@
+"""Disk-backed store for the text of documents too large to hold in memory."""
+import os
+import tempfile
+import threading
+from typing import Iterator, List, Optional, Tuple
+from ..utils.chunking import CHARS_PER_TOKEN, PAGE_BREAK, chunk_text
+
+def current_rss_mb() -> float:
+    """Return the resident set size of this process in megabytes.
+
+    Read from /proc where available; elsewhere the peak RSS is the best
+    cheap approximation.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class TextSpool:
+    """Document text spilled to an anonymous temporary file, one part at a time.
+
+    Parts (a page, or the compressed text of a window of pages) are appended
+    in document order and read back lazily, so only the part being read is
+    held in memory. The file is deleted when the spool is closed or garbage
+    collected.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._spans: List[Tuple[int, int]] = []
+        self._size = 0
+        self._lock = threading.Lock()
+        self.chars = 0
+
+    def append(self, text: str) -> None:
+        """Write one part to the end of the spool."""
+        data = text.encode("utf-8")
+        with self._lock:
+            self._file.seek(self._size)
+            self._file.write(data)
+            self._spans.append((self._size, len(data)))
+            self._size += len(data)
+            self.chars += len(text)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __getitem__(self, index: int) -> str:
+        offset, length = self._spans[index]
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self._spans)):
+            yield self[index]
+
+    def chunks(self, max_tokens: int) -> Iterator[str]:
+        """Yield the spooled text in chunks of roughly ``max_tokens`` tokens or fewer.
+
+        The parts are split like ``chunk_text`` would split them joined into
+        one string, but only about one chunk's worth of text is held at
+        a time: once the parts read exceed the budget, all but the last of
+        their chunks are final, and the last is packed with the next parts.
+        """
+        max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+        window: List[str] = []
+        chars = 0
+        for part in self:
+            window.append(part)
+            chars += len(part)
+            if chars > max_chars:
+                chunks = chunk_text(PAGE_BREAK.join(window), max_tokens)
+                yield from chunks[:-1]
+                window = chunks[-1:]
+                chars = sum(len(chunk) for chunk in window)
+        if window:
+            yield from chunk_text(PAGE_BREAK.join(window), max_tokens)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "TextSpool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from ..config import settings
+from ..services import extraction_cache, job_queue, response_cache, similarity_index, version_store
+
+SCENARIOS_JSON = json.dumps({"scenarios": [{
+    "participant_type": "Customer",
+    "volume_tier": "Tier 1",
+    "order_type": "Simple",
+    "estimated_fee": "$0.00",
+    "rebate": "$0.15 per contract",
+    "notes": "Customer rebate program"
+}]})
+
+def _pieces(content: str, size: int = 7):
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+def _openai_chunks(content: str):
+    """Stream ``content`` as OpenAI chat completion chunks, ending with a usage-only chunk."""
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None)
+        for piece in _pieces(content)
+    ]
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=len(chunks))
+    return iter(chunks + [SimpleNamespace(choices=[], usage=usage)])
+
+def _anthropic_events(content: str):
+    """Stream ``content`` as Anthropic message events."""
+    return iter(
+        [SimpleNamespace(type="message_start", message=SimpleNamespace(usage=SimpleNamespace(input_tokens=10)))]
+        + [
+            SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=piece))
+            for piece in _pieces(content)
+        ]
+        + [SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=5))]
+    )
+
+class FakeOpenAI:
+    """Stand-in for openai.OpenAI that returns canned completions without network access.
+
+    Each response is either a string or a callable that receives the request kwargs.
+    """
+
+    def __init__(self, *responses: str):
+        self.responses = list(responses) or [SCENARIOS_JSON]
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.responses[min(len(self.calls), len(self.responses)) - 1]
+        if callable(content):
+            content = content(kwargs)
+        if kwargs.get("stream"):
+            return _openai_chunks(content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class FakeAnthropic:
+    """Stand-in for anthropic.Anthropic that returns canned messages without network access.
+
+    Each response is either a string or a callable that receives the request kwargs.
+    """
+
+    def __init__(self, *responses: str):
+        self.responses = list(responses) or [SCENARIOS_JSON]
+        self.calls = []
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.responses[min(len(self.calls), len(self.responses)) - 1]
+        if callable(content):
+            content = content(kwargs)
+        if kwargs.get("stream"):
+            return _anthropic_events(content)
+        return SimpleNamespace(content=[SimpleNamespace(text=content)])
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    """Stand-in for openai.AsyncOpenAI; ``delay`` simulates network latency."""
+
+    def __init__(self, *responses: str, delay: float = 0.0):
+        super().__init__(*responses)
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._acreate))
+
+    async def _acreate(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return self._create(**kwargs)
+        finally:
+            self.in_flight -= 1
+
+class FakeAsyncAnthropic(FakeAnthropic):
+    """Stand-in for anthropic.AsyncAnthropic."""
+
+    def __init__(self, *responses: str):
+        super().__init__(*responses)
+        self.messages = SimpleNamespace(create=self._acreate)
+
+    async def _acreate(self, **kwargs):
+        return self._create(**kwargs)
+
+# Process-wide stores created on first use, and the settings that point them at disk.
+_STORE_PATHS = {
+    "EXTRACTION_CACHE_PATH": "extraction_cache.sqlite3",
+    "RESPONSE_CACHE_PATH": "response_cache.sqlite3",
+    "VERSION_STORE_PATH": "versions.sqlite3",
+    "JOB_QUEUE_PATH": "jobs.sqlite3",
+    "SIMILARITY_INDEX_PATH": "similarity.sqlite3",
+}
+_SINGLETONS = [
+    (extraction_cache, "_default_cache"),
+    (response_cache, "_default_cache"),
+    (version_store, "_default_store"),
+    (job_queue, "_default_queue"),
+    (similarity_index, "_default_index"),
+]
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    """Keep caches, version store and job queue out of the home directory and fresh for every test."""
+    for key, name in _STORE_PATHS.items():
+        monkeypatch.setitem(settings, key, str(tmp_path / name))
+    for module, attribute in _SINGLETONS:
+        monkeypatch.setattr(module, attribute, None)
+
+@pytest.fixture
+def fake_openai():
+    return FakeOpenAI
+
+@pytest.fixture
+def fake_anthropic():
+    return FakeAnthropic
+
+@pytest.fixture
+def fake_async_openai():
+    return FakeAsyncOpenAI
+
+@pytest.fixture
+def fake_async_anthropic():
+    return FakeAsyncAnthropic
@@ -29,7 +29,7 @@ def test_analyze_with_anthropic_fallback():
     test_text = "Sample fee schedule document."
     
     # Mock the _run_llm method to simulate Anthropic failure
-    def mock_run_llm(prompt, provider):
+    def mock_run_llm(prompt, provider, model=None):
         if provider == "anthropic":
             raise Exception("Anthropic API error")
         return '{"scenarios": [{"participant_type": "Test", "volume_tier": "Tier 1", "order_type": "Market", "estimated_fee": "$1.00", "rebate": "$0.10", "notes": "Test scenario"}]}'
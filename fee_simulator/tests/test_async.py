@@ -0,0 +1,28 @@
+import asyncio
+import pytest
+from pathlib import Path
+from ..main import process_documents_async
+from ..services.analyzer import AsyncFeeAnalyzer
+from ..services.response_cache import MemoryResponseCache
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+
+def test_async_fee_analyzer_falls_back_to_openai(fake_async_openai, fake_async_anthropic):
+    openai_client = fake_async_openai()
+    analyzer = AsyncFeeAnalyzer(openai_client, fake_async_anthropic("not json"), cache=MemoryResponseCache())
+
+    result = asyncio.run(analyzer.analyze("Fee schedule", provider="anthropic"))
+
+    assert result.scenarios[0].participant_type == "Customer"
+    assert len(openai_client.calls) == 1
+
+def test_process_documents_async_bounds_concurrency(fake_async_openai, fake_async_anthropic):
+    openai_client = fake_async_openai(delay=0.01)
+    analyzer = AsyncFeeAnalyzer(openai_client, fake_async_anthropic(), cache=MemoryResponseCache())
+
+    outputs = asyncio.run(process_documents_async(
+        [str(SAMPLE_PDF)] * 5, concurrency=2, analyzer=analyzer
+    ))
+
+    assert all("Fee Scenario Variations" in output for output in outputs)
+    assert openai_client.max_in_flight == 2
@@ -0,0 +1,27 @@
+import asyncio
+import json
+import shutil
+import pytest
+from pathlib import Path
+from ..batch import find_documents, load_completed, run_batch
+from ..services.analyzer import AsyncFeeAnalyzer
+from ..services.response_cache import MemoryResponseCache
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+
+def test_run_batch_records_scenarios_and_resumes(tmp_path, fake_async_openai, fake_async_anthropic):
+    for name in ("a.pdf", "b.pdf"):
+        shutil.copy(SAMPLE_PDF, tmp_path / name)
+    output = tmp_path / "fees.jsonl"
+    anthropic_client = fake_async_anthropic()
+    analyzer = AsyncFeeAnalyzer(fake_async_openai(), anthropic_client, cache=MemoryResponseCache())
+
+    summary = asyncio.run(run_batch(
+        find_documents([str(tmp_path)]), str(output), 1, 2, "anthropic", analyzer
+    ))
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert summary["succeeded"] == 2
+    assert records[0]["result"]["scenarios"][0]["participant_type"] == "Customer"
+    assert len(anthropic_client.calls) == 1
+    assert load_completed(str(output)) == set(find_documents([str(tmp_path)]))
@@ -0,0 +1,34 @@
+import pytest
+from benchmarks.stub_server import FEES_JSON, StubServer
+from ..models.schemas import FeeScenarioAnalysis
+from ..services.batch_api import BatchRunner, run_batch_analysis
+from ..services.clients import get_anthropic_client, get_openai_client
+from ..services.response_cache import MemoryResponseCache
+
+SHORT = "Customer orders adding liquidity pay $0.10 per contract. " * 5
+LONG = "Market maker rebate of $0.20 per contract for removing liquidity. " * 3000
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic"])
+def test_batch_analysis_merges_chunk_scenarios_per_document(provider):
+    with StubServer() as server:
+        client = (
+            get_openai_client("test", server.base_url) if provider == "openai"
+            else get_anthropic_client("test", server.root_url)
+        )
+        runner = BatchRunner(provider, client, poll_interval=0.01)
+        cache = MemoryResponseCache()
+
+        results = run_batch_analysis([SHORT, LONG], runner=runner, cache=cache)
+        assert len(server.batches) == 1 and server.batch_requests > 2
+        assert results[0] == FeeScenarioAnalysis.model_validate_json(FEES_JSON)
+        # Identical chunk scenarios are merged into one.
+        assert results[1] == results[0]
+
+        assert run_batch_analysis([SHORT, LONG], runner=runner, cache=cache) == results
+        assert len(server.batches) == 1
+
+def test_failed_batch_requests_become_per_document_errors():
+    with StubServer(error_rate=1.0) as server:
+        runner = BatchRunner("openai", get_openai_client("test", server.base_url), poll_interval=0.01)
+        results = run_batch_analysis([SHORT], runner=runner, cache=MemoryResponseCache())
+    assert isinstance(results[0], ValueError)
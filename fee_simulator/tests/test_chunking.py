@@ -0,0 +1,67 @@
+import json
+import pytest
+import re
+from pathlib import Path
+from ..config import settings
+from ..models.schemas import FeeScenario, FeeScenarioAnalysis
+from ..services.analyzer import FeeAnalyzer, merge_scenario_analyses
+from ..services.pdf_service import extract_text_from_pdf
+from ..services.response_cache import MemoryResponseCache
+from ..utils.chunking import chunk_text
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+
+def _scenario(participant_type: str, volume_tier: str = "Tier 1", order_type: str = "Simple") -> FeeScenario:
+    return FeeScenario(
+        participant_type=participant_type,
+        volume_tier=volume_tier,
+        order_type=order_type,
+        estimated_fee="$0.10",
+        rebate="$0.00",
+        notes="Test"
+    )
+
+def test_merge_deduplicates_scenarios_across_chunks():
+    merged = merge_scenario_analyses([
+        FeeScenarioAnalysis(scenarios=[_scenario("Customer"), _scenario("Market Maker")]),
+        FeeScenarioAnalysis(scenarios=[_scenario(" customer "), _scenario("Customer", "Tier 2")]),
+    ])
+
+    assert [(s.participant_type, s.volume_tier) for s in merged.scenarios] == [
+        ("Customer", "Tier 1"), ("Market Maker", "Tier 1"), ("Customer", "Tier 2")
+    ]
+
+def test_long_fee_schedule_is_analyzed_per_chunk(fake_openai, fake_anthropic, monkeypatch):
+    monkeypatch.setitem(settings, "CHUNK_MAX_TOKENS", 100)
+    text = "\n\n".join(f"Section {i}. " + "fee " * 60 for i in range(5))
+
+    def respond(kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        section = prompt.split("---\n")[1].split(".")[0]
+        return json.dumps({"scenarios": [_scenario(section).model_dump(), _scenario("Shared").model_dump()]})
+
+    client = fake_openai(respond)
+    analyzer = FeeAnalyzer(client, fake_anthropic(), cache=MemoryResponseCache())
+    result = analyzer.analyze(text)
+
+    chunk_count = len(chunk_text(text, 100))
+    types = [s.participant_type for s in result.scenarios]
+    assert len(client.calls) == chunk_count
+    assert types.count("Shared") == 1
+    assert len(types) == chunk_count + 1
+
+def test_extracted_fee_schedule_is_split_on_page_boundaries(fake_openai, fake_anthropic, monkeypatch):
+    # Uncompressed pages have no blank lines, so only the page breaks keep chunks from splitting mid-page.
+    monkeypatch.setitem(settings, "PROMPT_COMPRESSION", False)
+    monkeypatch.setitem(settings, "CHUNK_MAX_TOKENS", 600)
+    client = fake_openai()
+    analyzer = FeeAnalyzer(client, fake_anthropic(), cache=MemoryResponseCache())
+
+    analyzer.analyze(extract_text_from_pdf(str(SAMPLE_PDF)))
+
+    parts = [call["messages"][-1]["content"] for call in client.calls]
+    assert len(parts) > 1
+    for page in range(1, 21):
+        holding = [part for part in parts if re.search(rf"^(Section|Page) {page}$", part, re.M)]
+        assert len(holding) == 1
+        assert re.search(rf"^Section {page}$.*^Page {page}$", holding[0], re.M | re.S)
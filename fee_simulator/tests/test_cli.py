@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from .. import cli, config
+from ..services.analyzer import FeeAnalyzer
+from ..services.response_cache import MemoryResponseCache
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+ROOT = Path(__file__).parents[2]
+
+def _loaded_after(code: str, modules):
+    """Run ``code`` in a fresh interpreter and return which of ``modules`` it imported."""
+    check = f"{code}\nimport sys\nprint(' '.join(m for m in {list(modules)!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True, check=True)
+    return output.stdout.split()
+
+def test_only_the_chosen_provider_sdk_is_loaded():
+    heavy = ["gradio", "openai", "anthropic", "pypdf", "dotenv"]
+
+    assert _loaded_after("import fee_simulator.cli", heavy) == []
+    assert _loaded_after("import fee_simulator.main", heavy) == []
+    assert _loaded_after(
+        "from fee_simulator.services.analyzer import FeeAnalyzer\n"
+        "from fee_simulator.services.response_cache import MemoryResponseCache\n"
+        "FeeAnalyzer(cache=MemoryResponseCache()).anthropic_client",
+        heavy
+    ) == ["anthropic"]
+
+def test_fee_app_loads_the_document_app_only_for_combined_reports():
+    document_app = ["single_doc_analyze.main", "single_doc_analyze.services.analyzer"]
+
+    assert _loaded_after("import fee_simulator.main", document_app) == []
+    assert _loaded_after("import fee_simulator.services.combined", document_app) == [
+        "single_doc_analyze.services.analyzer"
+    ]
+
+def test_entry_points_load_the_env_file_once(monkeypatch):
+    import dotenv
+    loads = []
+
+    def load_dotenv(**kwargs):
+        loads.append(kwargs)
+        monkeypatch.setenv("JOB_WORKERS", "9")
+        return True
+
+    monkeypatch.setattr(dotenv, "load_dotenv", load_dotenv)
+    monkeypatch.setattr(config, "_env_loaded", False)
+    monkeypatch.setitem(config.settings, "JOB_WORKERS", config.settings["JOB_WORKERS"])
+    monkeypatch.setitem(config.settings, "LLM_MAX_RETRIES", 7)
+
+    config.load_env()
+    config.load_env()
+
+    assert [kwargs["dotenv_path"].name for kwargs in loads] == [".env"]
+    assert config.settings["JOB_WORKERS"] == 9
+    # Settings the .env file leaves alone keep their runtime values.
+    assert config.settings["LLM_MAX_RETRIES"] == 7
+
+def test_cli_prints_scenarios_as_json(monkeypatch, fake_anthropic, capsys):
+    monkeypatch.setattr(cli, "FeeAnalyzer", lambda: FeeAnalyzer(
+        anthropic_client=fake_anthropic(), cache=MemoryResponseCache()
+    ))
+
+    cli.main([str(SAMPLE_PDF), "--provider", "anthropic", "--json"])
+
+    record = json.loads(capsys.readouterr().out)
+    assert record["status"] == "ok"
+    assert record["result"]["scenarios"][0]["participant_type"] == "Customer"
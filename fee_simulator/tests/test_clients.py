@@ -0,0 +1,25 @@
+import pytest
+from ..services import clients
+from ..services.analyzer import FeeAnalyzer
+from ..services.clients import clear_clients, get_anthropic_client, get_openai_client
+
+@pytest.fixture(autouse=True)
+def isolated_registry():
+    clear_clients()
+    yield
+    clear_clients()
+
+def test_registry_reuses_client_per_provider_and_key():
+    openai_client = get_openai_client(api_key="key")
+    anthropic_client = get_anthropic_client(api_key="key")
+
+    assert get_openai_client(api_key="key") is openai_client
+    assert get_anthropic_client(api_key="key") is anthropic_client
+    assert get_anthropic_client(api_key="other") is not anthropic_client
+
+def test_fee_analyzer_only_creates_the_client_it_uses(monkeypatch):
+    monkeypatch.setitem(clients.settings, "OPENAI_API_KEY", "key")
+    analyzer = FeeAnalyzer()
+
+    assert analyzer.openai_client is get_openai_client()
+    assert list(clients._clients) == [("openai", "key", None)]
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from single_doc_analyze.config import settings as document_settings
+from single_doc_analyze.models.schemas import DocumentAnalysis
+from single_doc_analyze.services.analyzer import AsyncDocumentAnalyzer
+from single_doc_analyze.services.evaluator import AsyncDocumentEvaluator
+from single_doc_analyze.services.response_cache import MemoryResponseCache as DocumentResponseCache
+from ..main import format_combined_report
+from ..models.schemas import FeeScenarioAnalysis
+from ..services import combined
+from ..services.analyzer import AsyncFeeAnalyzer
+from ..services.combined import run_combined
+from ..services.response_cache import MemoryResponseCache
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+ANALYSIS_JSON = json.dumps({
+    "summary": "A fee schedule.",
+    "key_topics": ["Fees"],
+    "risks_or_issues": ["Tier thresholds change monthly"],
+    "recommended_actions": ["Review the tiers"],
+})
+
+def _analyzers(fake_async_openai, delay: float, fee_responses=()):
+    return dict(
+        analyzer=AsyncDocumentAnalyzer(fake_async_openai(ANALYSIS_JSON, delay=delay), cache=DocumentResponseCache()),
+        evaluator=AsyncDocumentEvaluator(fake_async_openai(delay=delay), cache=DocumentResponseCache()),
+        fee_analyzer=AsyncFeeAnalyzer(fake_async_openai(*fee_responses, delay=delay), cache=MemoryResponseCache()),
+    )
+
+def test_extracts_once_and_runs_both_analyses_concurrently(monkeypatch, fake_async_openai):
+    monkeypatch.setitem(document_settings, "MAX_RETRIES", 0)
+    extractions = []
+    iter_pdf_pages = combined.iter_pdf_pages
+    monkeypatch.setattr(combined, "iter_pdf_pages", lambda file: extractions.append(file) or iter_pdf_pages(file))
+    analyzers = _analyzers(fake_async_openai, delay=0.3)
+
+    start = time.perf_counter()
+    report = asyncio.run(run_combined(str(SAMPLE_PDF), **analyzers))
+
+    assert time.perf_counter() - start < 0.55
+    assert extractions == [str(SAMPLE_PDF)]
+    assert report.analysis == DocumentAnalysis.model_validate_json(ANALYSIS_JSON)
+    assert isinstance(report.fees, FeeScenarioAnalysis)
+    assert "Fee Scenario Variations" in format_combined_report(report)
+
+def test_a_failed_analysis_does_not_lose_the_other(monkeypatch, fake_async_openai):
+    monkeypatch.setitem(document_settings, "MAX_RETRIES", 0)
+    report = asyncio.run(run_combined(str(SAMPLE_PDF), **_analyzers(fake_async_openai, 0.0, ["not json"])))
+
+    assert isinstance(report.analysis, DocumentAnalysis)
+    assert isinstance(report.fees, ValueError)
+    output = format_combined_report(report)
+    assert "Summary" in output and "❌ Fee analysis failed" in output
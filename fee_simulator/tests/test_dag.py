@@ -0,0 +1,34 @@
+import asyncio
+import time
+import pytest
+from ..utils.dag import Stage, run_dag
+
+def test_independent_stages_overlap_and_failures_skip_dependents():
+    async def slow(value):
+        await asyncio.sleep(0.2)
+        return value + 1
+
+    def fail(value):
+        raise ValueError("no fees")
+
+    stages = [
+        Stage("source", lambda: 1),
+        Stage("left", slow, ("source",)),
+        Stage("right", slow, ("source",)),
+        Stage("sum", lambda left, right: left + right, ("left", "right")),
+        Stage("broken", fail, ("source",)),
+        Stage("after_broken", lambda value: value, ("broken",)),
+    ]
+    start = time.perf_counter()
+    results = asyncio.run(run_dag(stages))
+
+    assert time.perf_counter() - start < 0.35
+    assert results["sum"] == 4
+    assert isinstance(results["broken"], ValueError)
+    assert results["after_broken"] is results["broken"]
+
+def test_unknown_dependencies_and_cycles_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        asyncio.run(run_dag([Stage("a", lambda x: x, ("missing",))]))
+    with pytest.raises(ValueError, match="cycle"):
+        asyncio.run(run_dag([Stage("a", lambda x: x, ("b",)), Stage("b", lambda x: x, ("a",))]))
@@ -0,0 +1,84 @@
+import json
+import numpy as np
+import pytest
+from ..config import settings
+from ..main import parse_volumes, simulate_fees
+from ..models.schemas import FeeRate, RateTable
+from ..services.analyzer import FeeAnalyzer
+from ..services.fee_engine import FeeEngine, merge_rate_tables
+from ..services.response_cache import MemoryResponseCache
+from ..services.text_spool import TextSpool
+
+def _rate(tier: str, min_volume: float, fee: float, rebate: float, participant: str = "Member") -> FeeRate:
+    return FeeRate(participant_type=participant, order_type="Adding liquidity", volume_tier=tier,
+                   min_volume=min_volume, fee_per_unit=fee, rebate_per_unit=rebate)
+
+TABLE = RateTable(rates=[
+    _rate("Tier 3", 50_000_000, 0.0, 0.0032),
+    _rate("Tier 1", 0, 0.0030, 0.0020),
+    _rate("Tier 2", 10_000_000, 0.0010, 0.0029),
+    _rate("Base", 0, 0.0030, 0.0, participant="Non-member"),
+])
+
+def test_volumes_use_the_highest_tier_reached():
+    engine = FeeEngine(TABLE)
+    result = engine.simulate("member", "adding  LIQUIDITY", [0, 5_000_000, 10_000_000, 80_000_000])
+
+    assert [engine.rates[tier].volume_tier for tier in result.tier] == ["Tier 1", "Tier 1", "Tier 2", "Tier 3"]
+    np.testing.assert_allclose(result.fee, [0, 15_000, 10_000, 0])
+    np.testing.assert_allclose(result.net, [0, 5_000, -19_000, -256_000])
+    assert engine.pairs == [("Member", "Adding liquidity"), ("Non-member", "Adding liquidity")]
+
+def test_invalid_simulations_raise_value_error():
+    engine = FeeEngine(TABLE)
+    with pytest.raises(ValueError):
+        engine.simulate("Member", "Removing liquidity", 1000)
+    with pytest.raises(ValueError):
+        engine.simulate("Member", "Adding liquidity", [-1])
+    with pytest.raises(ValueError):
+        FeeEngine(RateTable(rates=[]))
+
+def test_scenarios_at_each_tier_threshold():
+    scenarios = FeeEngine(TABLE).scenarios().scenarios
+
+    assert [scenario.volume_tier for scenario in scenarios] == ["Tier 1", "Tier 2", "Tier 3", "Base"]
+    assert scenarios[1].estimated_fee == "$10,000.00 ($0.0010 per share)"
+    assert scenarios[1].rebate == "$29,000.00 ($0.0029 per share)"
+
+def test_merge_rate_tables_keeps_the_first_rate_per_tier():
+    merged = merge_rate_tables([TABLE, RateTable(rates=[_rate("tier 2 (again)", 10_000_000, 0.5, 0.0)])])
+    assert merged.rates == TABLE.rates
+
+def test_rate_table_is_extracted_once_and_simulated_locally(monkeypatch, fake_openai):
+    monkeypatch.setitem(settings, "CHUNK_MAX_TOKENS", 50)
+    client = fake_openai(TABLE.model_dump_json(), json.dumps({"rates": []}))
+    document = "\n\n".join(f"Section {i}: rebates for adding liquidity by monthly volume tier." for i in range(20))
+
+    table = FeeAnalyzer(client, cache=MemoryResponseCache()).extract_rate_table(document)
+
+    assert len(client.calls) > 1
+    assert table.rates == TABLE.rates
+    assert "rate table" in client.calls[0]["messages"][-1]["content"]
+    calls = len(client.calls)
+    output = simulate_fees(table, "Member - Adding liquidity", "5m, 20m")
+    assert "Tier 2" in output
+    assert "net -$38,000.00" in output
+    assert "Total over 2 months**: fees $35,000.00, rebates $68,000.00, net -$33,000.00" in output
+    assert len(client.calls) == calls
+
+def test_simulate_fees_reports_invalid_input():
+    assert simulate_fees(None, None, "1m") == "Extract a rate table first."
+    assert simulate_fees(TABLE, "Member - Adding liquidity", "lots").startswith("❌")
+    assert parse_volumes("500k; 2.5M 1e6") == [500_000, 2_500_000, 1_000_000]
+
+def test_rate_table_is_extracted_from_a_spool_chunk_by_chunk(monkeypatch, fake_openai):
+    monkeypatch.setitem(settings, "CHUNK_MAX_TOKENS", 50)
+    client = fake_openai(TABLE.model_dump_json(), json.dumps({"rates": []}))
+    with TextSpool() as spool:
+        for i in range(20):
+            spool.append(f"Section {i}: rebates for adding liquidity by monthly volume tier.")
+        table = FeeAnalyzer(client, cache=MemoryResponseCache()).extract_rate_table(spool)
+
+    assert len(client.calls) > 1
+    assert table.rates == TABLE.rates
+    assert "rate table" in client.calls[0]["messages"][-1]["content"]
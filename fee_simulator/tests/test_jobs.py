@@ -0,0 +1,33 @@
+from pathlib import Path
+from ..jobs import simulate_fees_job, submit_document
+from ..main import process_document_queued
+from ..services.analyzer import FeeAnalyzer
+from ..services.job_queue import DONE, JobQueue, process_next
+from ..services.response_cache import MemoryResponseCache
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+
+def test_submissions_are_deduplicated_per_provider(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+    openai_job = submit_document(str(SAMPLE_PDF), "openai", queue)
+    anthropic_job = submit_document(str(SAMPLE_PDF), "anthropic", queue)
+
+    assert submit_document(str(SAMPLE_PDF), "openai", queue).id == openai_job.id
+    assert anthropic_job.id != openai_job.id
+    assert anthropic_job.payload["provider"] == "anthropic"
+
+def test_queued_schedule_is_analyzed_by_a_worker(tmp_path, fake_anthropic, monkeypatch):
+    monkeypatch.setattr(
+        "fee_simulator.jobs.FeeAnalyzer",
+        lambda: FeeAnalyzer(anthropic_client=fake_anthropic(), cache=MemoryResponseCache())
+    )
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job = submit_document(str(SAMPLE_PDF), "anthropic", queue)
+
+    assert process_next(queue, "worker", simulate_fees_job)
+
+    assert queue.get(job.id).status == DONE
+    outputs = list(process_document_queued(str(SAMPLE_PDF), "anthropic", queue))
+    assert len(outputs) == 1
+    assert "- Notes: Customer rebate program" in outputs[0]
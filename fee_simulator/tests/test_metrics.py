@@ -0,0 +1,19 @@
+from ..config import settings
+from ..main import format_fee_output
+from ..services.analyzer import FeeAnalyzer
+from ..services.response_cache import MemoryResponseCache
+from ..utils.metrics import REGISTRY, trace
+
+def test_trace_and_registry_cover_the_analyzer(fake_anthropic, monkeypatch):
+    monkeypatch.setitem(settings, "METRICS_ENABLED", True)
+    REGISTRY.reset()
+    analyzer = FeeAnalyzer(anthropic_client=fake_anthropic(), cache=MemoryResponseCache())
+
+    with trace() as timings:
+        result = analyzer.analyze("Customer rebate $0.15 per contract.", provider="anthropic")
+
+    assert {"prompt_build", "llm_wait", "json_parse"} <= set(timings)
+    assert "Timings" in format_fee_output(result, timings)
+    model = settings["ANTHROPIC_MODEL"]
+    assert f'doc_analyzer_llm_requests_total{{model="{model}",provider="anthropic"}} 1' in REGISTRY.render()
+    REGISTRY.reset()
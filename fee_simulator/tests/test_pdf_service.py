@@ -1,6 +1,8 @@
 import pytest
 from io import BytesIO
-from ..services.pdf_service import extract_text_from_pdf
+from pathlib import Path
+from ..config import settings
+from ..services.pdf_service import extract_text_from_pdf, iter_pdf_pages
 
 def test_extract_text_from_pdf_with_valid_pdf():
     # Create a simple PDF file in memory
@@ -23,4 +25,33 @@ def test_extract_text_from_pdf_with_empty_file():
     empty_file = BytesIO(b"")
     
     with pytest.raises(ValueError):
-        extract_text_from_pdf(empty_file) 
\ No newline at end of file
+        extract_text_from_pdf(empty_file)
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+
+def test_extract_text_from_pdf_with_path(monkeypatch):
+    monkeypatch.setitem(settings, "PROMPT_COMPRESSION", False)
+    text = extract_text_from_pdf(str(SAMPLE_PDF))
+
+    assert text.startswith("Section 1")
+    assert "Page 20" in text
+
+def test_extract_text_from_pdf_drops_page_numbers():
+    text = extract_text_from_pdf(str(SAMPLE_PDF))
+
+    assert text.startswith("Section 1")
+    assert "Section 20" in text
+    assert "Page 20" not in text
+
+def test_iter_pdf_pages_yields_each_page_in_order():
+    with SAMPLE_PDF.open("rb") as pdf_file:
+        pages = list(iter_pdf_pages(pdf_file))
+
+    assert len(pages) == 20
+    assert all(page.startswith(f"Section {i + 1}") for i, page in enumerate(pages))
+
+def test_iter_pdf_pages_parallel_matches_sequential():
+    sequential = list(iter_pdf_pages(SAMPLE_PDF, workers=1))
+    parallel = list(iter_pdf_pages(SAMPLE_PDF, workers=2, parallel_threshold=1))
+
+    assert parallel == sequential
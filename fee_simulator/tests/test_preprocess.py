@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+from ..config import settings
+from ..utils.chunking import PAGE_BREAK
+from ..utils.preprocess import compress_pages, select_fee_sections
+
+REFERENCE = Path(__file__).parent / "test_data" / "reference_fee_analysis.json"
+
+def test_compressed_schedule_keeps_the_reference_analysis_facts():
+    reference = json.loads(REFERENCE.read_text())
+
+    result = compress_pages(reference["pages"])
+
+    assert result.tokens_after < 0.5 * result.tokens_before
+    for scenario in reference["analysis"]["scenarios"]:
+        assert scenario["participant_type"] in result.text
+        assert scenario["estimated_fee"] in result.text
+        assert scenario["rebate"] in result.text
+    assert "150,000 contracts or more" in result.text
+    assert "Table of Contents" not in result.text
+
+def test_text_without_fee_sections_is_unchanged():
+    text = "Introduction\n\nThis document describes our history.\n\nContact us for details."
+    assert select_fee_sections(text) == text
+
+def test_fee_section_filter_keeps_page_breaks():
+    text = PAGE_BREAK.join([
+        "Transaction fee $0.10 per contract, rebate $0.05\n\nOur history\nFounded long ago\nMany offices",
+        "Contact us\nBy phone\nOr by email",
+        "Maker fee $0.20 per contract, taker fee 0.3%",
+    ])
+
+    assert select_fee_sections(text) == PAGE_BREAK.join([
+        "Transaction fee $0.10 per contract, rebate $0.05", "Maker fee $0.20 per contract, taker fee 0.3%"
+    ])
+
+def test_fee_section_filter_can_be_disabled(monkeypatch):
+    reference = json.loads(REFERENCE.read_text())
+    filtered = compress_pages(reference["pages"])
+
+    monkeypatch.setitem(settings, "FEE_SECTION_FILTER", False)
+    unfiltered = compress_pages(reference["pages"])
+
+    assert unfiltered.tokens_after > filtered.tokens_after
+    assert "Section 2 Transaction Fees" in unfiltered.text
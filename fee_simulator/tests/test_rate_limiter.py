@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+import pytest
+from .conftest import SCENARIOS_JSON
+from ..services import rate_limiter
+from ..services.analyzer import FeeAnalyzer
+from ..services.rate_limiter import RateLimiter, clear_rate_limiters, get_rate_limiter
+from ..services.response_cache import MemoryResponseCache
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers={"retry-after": "0"})
+
+def throttled(kwargs):
+    raise FakeAPIError(429)
+
+@pytest.fixture(autouse=True)
+def isolated_limiters(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: None)
+    clear_rate_limiters()
+    yield
+    clear_rate_limiters()
+
+def test_throttled_claude_is_retried_before_falling_back(fake_openai, fake_anthropic):
+    openai_client = fake_openai()
+    anthropic_client = fake_anthropic(throttled, throttled, SCENARIOS_JSON)
+    analyzer = FeeAnalyzer(openai_client, anthropic_client, cache=MemoryResponseCache())
+
+    result = analyzer.analyze("Customer rebate $0.15 per contract.", provider="anthropic")
+
+    assert result.scenarios[0].participant_type == "Customer"
+    assert len(anthropic_client.calls) == 3
+    assert openai_client.calls == []
+    assert get_rate_limiter("anthropic", rate_limiter.settings["ANTHROPIC_MODEL"]).throttled == 2
+
+def test_non_retryable_errors_fail_fast():
+    limiter = RateLimiter("test", requests_per_minute=1000, tokens_per_minute=100000)
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise FakeAPIError(400)
+
+    with pytest.raises(FakeAPIError):
+        limiter.call(bad_request)
+    assert len(calls) == 1
@@ -0,0 +1,37 @@
+import pytest
+from ..services.analyzer import FeeAnalyzer
+from ..services.response_cache import MemoryResponseCache
+
+def test_fee_analyzer_caches_per_provider(fake_openai, fake_anthropic):
+    openai_client = fake_openai()
+    anthropic_client = fake_anthropic()
+    analyzer = FeeAnalyzer(openai_client, anthropic_client, cache=MemoryResponseCache())
+
+    for _ in range(2):
+        analyzer.analyze("Fee schedule", provider="openai")
+        analyzer.analyze("Fee schedule", provider="anthropic")
+
+    assert len(openai_client.calls) == 1
+    assert len(anthropic_client.calls) == 1
+
+def test_fee_analyzer_cache_opt_out(fake_openai, fake_anthropic):
+    openai_client = fake_openai()
+    analyzer = FeeAnalyzer(openai_client, fake_anthropic(), cache=MemoryResponseCache())
+
+    analyzer.analyze("Fee schedule")
+    result = analyzer.analyze("Fee schedule", use_cache=False)
+
+    assert result.scenarios[0].participant_type == "Customer"
+    assert len(openai_client.calls) == 2
+
+def test_fallback_result_is_cached_under_openai(fake_openai, fake_anthropic):
+    openai_client = fake_openai()
+    anthropic_client = fake_anthropic("not json")
+    cache = MemoryResponseCache()
+    analyzer = FeeAnalyzer(openai_client, anthropic_client, cache=cache)
+
+    analyzer.analyze("Fee schedule", provider="anthropic")
+    analyzer.analyze("Fee schedule", provider="openai")
+
+    assert len(openai_client.calls) == 1
+    assert cache.stats()["entries"] == 1
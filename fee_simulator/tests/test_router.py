@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from benchmarks.stub_server import StubServer
+from ..config import settings
+from ..services.analyzer import AsyncFeeAnalyzer, FeeAnalyzer
+from ..services.clients import get_anthropic_client
+from ..services.response_cache import MemoryResponseCache
+from ..services.router import Backend, clear_backend_stats, default_backends, get_backend_stats
+from ..utils.metrics import REGISTRY
+
+@pytest.fixture(autouse=True)
+def isolated_stats():
+    clear_backend_stats()
+    yield
+    clear_backend_stats()
+
+def test_anthropic_falls_back_to_openai_then_router_backends(monkeypatch):
+    monkeypatch.setitem(settings, "ROUTER_BACKENDS", "groq:llama-3.1-8b-instant=0.2")
+    assert default_backends("anthropic") == [
+        Backend("anthropic", settings["ANTHROPIC_MODEL"]),
+        Backend("openai", settings["OPENAI_MODEL"]),
+        Backend("groq", "llama-3.1-8b-instant", 0.2),
+    ]
+    assert default_backends("openai") == [
+        Backend("openai", settings["OPENAI_MODEL"]),
+        Backend("groq", "llama-3.1-8b-instant", 0.2),
+    ]
+
+def test_failing_provider_is_skipped_once_unhealthy(monkeypatch, fake_openai, fake_anthropic):
+    monkeypatch.setitem(settings, "ROUTER_MIN_SAMPLES", 2)
+
+    def unavailable(kwargs):
+        raise RuntimeError("overloaded")
+
+    openai_client = fake_openai()
+    anthropic_client = fake_anthropic(unavailable)
+    analyzer = FeeAnalyzer(openai_client, anthropic_client, cache=MemoryResponseCache())
+
+    for text in ("Schedule 1", "Schedule 2", "Schedule 3"):
+        result = analyzer.analyze(text, provider="anthropic")
+        assert result.scenarios[0].notes == "Customer rebate program"
+
+    # After two failures Anthropic is ranked behind OpenAI and no longer tried first.
+    assert len(anthropic_client.calls) == 2
+    assert len(openai_client.calls) == 3
+    assert get_backend_stats(Backend("anthropic", settings["ANTHROPIC_MODEL"])).error_rate == 1.0
+
+def test_slow_async_request_is_hedged(monkeypatch, fake_async_openai, fake_async_anthropic):
+    monkeypatch.setitem(settings, "ROUTER_HEDGE", True)
+    monkeypatch.setitem(settings, "ROUTER_MIN_SAMPLES", 1)
+    get_backend_stats(Backend("openai", settings["OPENAI_MODEL"])).record(0.05, True)
+    openai_client = fake_async_openai(delay=1.0)
+    anthropic_client = fake_async_anthropic()
+    monkeypatch.setitem(settings, "ROUTER_BACKENDS", f"anthropic:{settings['ANTHROPIC_MODEL']}")
+    analyzer = AsyncFeeAnalyzer(openai_client, anthropic_client, cache=MemoryResponseCache())
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await analyzer.analyze("Fee schedule", provider="openai")
+        return result, loop.time() - start
+
+    result, elapsed = asyncio.run(main())
+
+    assert result.scenarios[0].participant_type == "Customer"
+    assert elapsed < 0.5
+    assert len(anthropic_client.calls) == 1
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_repeated_anthropic_runs_read_the_schedule_from_the_prompt_cache(monkeypatch, stream):
+    monkeypatch.setitem(settings, "METRICS_ENABLED", True)
+    REGISTRY.reset()
+    schedule = "Customer orders adding liquidity receive a rebate of $0.20 per contract. " * 80
+    with StubServer() as stub:
+        analyzer = FeeAnalyzer(anthropic_client=get_anthropic_client("key", stub.root_url), cache=MemoryResponseCache())
+        for _ in range(2):
+            if stream:
+                list(analyzer.analyze_stream(schedule, provider="anthropic", use_cache=False))
+            else:
+                analyzer.analyze(schedule, provider="anthropic", use_cache=False)
+
+    model = settings["ANTHROPIC_MODEL"]
+    metrics = REGISTRY.render()
+    assert stub.cache_read_tokens > 1024
+    for kind in ("cache_read", "cache_write"):
+        assert f'llm_cached_tokens_total{{model="{model}",provider="anthropic",type="{kind}"}}' in metrics
+    REGISTRY.reset()
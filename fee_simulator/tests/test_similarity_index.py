@@ -0,0 +1,38 @@
+from ..services.analyzer import FeeAnalyzer
+from ..services.response_cache import MemoryResponseCache
+from ..services.similarity_index import SimilarityIndex
+
+SCHEDULE = "\n".join(
+    f"Tier {tier} members adding liquidity in {symbol} pay a fee of $0.00{tier} per share"
+    for tier in range(1, 10) for symbol in ("Tape A", "Tape B", "Tape C", "options", "ETFs")
+)
+
+def test_only_unchanged_schedules_are_reused_as_is(fake_openai):
+    client = fake_openai()
+    analyzer = FeeAnalyzer(client, cache=MemoryResponseCache(), similar=SimilarityIndex())
+
+    analyzer.analyze(SCHEDULE)
+    result = analyzer.analyze(SCHEDULE.replace("\n", "\n\n"))
+    assert result.scenarios[0].notes == "Customer rebate program"
+    assert len(client.calls) == 1
+
+    # A changed fee is never served from the earlier analysis, however similar the schedule.
+    revised = SCHEDULE.replace("Tier 3 members adding liquidity in ETFs pay a fee of $0.003",
+                               "Tier 3 members adding liquidity in ETFs pay a fee of $0.004")
+    analyzer.analyze(revised)
+
+    prompt = client.calls[-1]["messages"][-1]["content"]
+    assert len(client.calls) == 2
+    assert "+Tier 3 members adding liquidity in ETFs pay a fee of $0.004 per share" in prompt
+    assert "Customer rebate program" in prompt
+
+def test_providers_do_not_share_results(fake_openai, fake_anthropic):
+    openai_client = fake_openai()
+    anthropic_client = fake_anthropic()
+    analyzer = FeeAnalyzer(openai_client, anthropic_client, cache=MemoryResponseCache(), similar=SimilarityIndex())
+
+    analyzer.analyze(SCHEDULE, provider="openai")
+    analyzer.analyze(SCHEDULE, provider="anthropic")
+
+    assert len(openai_client.calls) == 1
+    assert len(anthropic_client.calls) == 1
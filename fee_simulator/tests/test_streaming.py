@@ -0,0 +1,33 @@
+from pathlib import Path
+from ..config import settings
+from ..main import process_document_stream
+from ..services.analyzer import FeeAnalyzer
+from ..services.response_cache import MemoryResponseCache
+from ..models.schemas import FeeScenarioAnalysis
+
+def test_anthropic_stream_falls_back_to_openai(fake_openai, fake_anthropic):
+    def fail(kwargs):
+        raise RuntimeError("overloaded")
+    anthropic_client = fake_anthropic(fail)
+    openai_client = fake_openai()
+    analyzer = FeeAnalyzer(openai_client=openai_client, anthropic_client=anthropic_client, cache=MemoryResponseCache())
+
+    updates = list(analyzer.analyze_stream("Fee schedule text.", provider="anthropic"))
+
+    assert anthropic_client.calls[0]["stream"] is True
+    assert openai_client.calls[0]["stream"] is True
+    assert isinstance(updates[-1].result, FeeScenarioAnalysis)
+    assert updates[-1].result.scenarios[0].participant_type == "Customer"
+
+def test_process_document_stream_renders_partial_scenarios(fake_anthropic, monkeypatch):
+    sample_pdf = next((Path(__file__).parent / "test_data").glob("*.pdf"))
+    monkeypatch.setitem(settings, "INCREMENTAL_ANALYSIS", False)
+    monkeypatch.setattr(
+        "fee_simulator.main.FeeAnalyzer",
+        lambda: FeeAnalyzer(anthropic_client=fake_anthropic(), cache=MemoryResponseCache())
+    )
+
+    outputs = list(process_document_stream(str(sample_pdf), provider="anthropic"))
+
+    assert any("Customer" in output and "Analyzing..." in output for output in outputs[:-1])
+    assert "- Notes: Customer rebate program" in outputs[-1]
@@ -0,0 +1,112 @@
+import json
+import pytest
+from pathlib import Path
+from .. import main
+from ..config import settings
+from ..services import pdf_service
+from ..services.analyzer import FeeAnalyzer
+from ..services.pdf_service import extract_document
+from ..services.response_cache import MemoryResponseCache
+from ..services.text_spool import TextSpool
+from ..utils.chunking import PAGE_BREAK, chunk_text, estimate_tokens
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+
+def _pages(count: int) -> list:
+    return [f"Section {i}. " + "fee " * 60 for i in range(count)]
+
+def test_spool_reads_back_parts_and_packs_chunks():
+    pages = _pages(8)
+    with TextSpool() as spool:
+        for page in pages:
+            spool.append(page)
+
+        assert len(spool) == 8
+        assert spool[5] == pages[5]
+        chunks = list(spool.chunks(100))
+        assert [chunk.split() for chunk in chunks] == [chunk.split() for chunk in chunk_text(PAGE_BREAK.join(pages), 100)]
+        assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+
+@pytest.fixture
+def spooled(monkeypatch):
+    monkeypatch.setitem(settings, "PROMPT_COMPRESSION", False)
+    monkeypatch.setitem(settings, "PAGE_WINDOW", 8)
+
+@pytest.fixture
+def parses(monkeypatch):
+    parsed = []
+    reader = pdf_service._reader
+    monkeypatch.setattr(pdf_service, "_reader", lambda data: parsed.append(data) or reader(data))
+    return parsed
+
+def test_documents_are_parsed_once_and_then_served_from_the_cache(spooled, parses):
+    first = extract_document(str(SAMPLE_PDF))
+    second = extract_document(str(SAMPLE_PDF))
+
+    assert first == second
+    assert len(parses) == 1
+
+def test_large_documents_are_spooled_a_window_at_a_time(spooled, parses, monkeypatch):
+    monkeypatch.setitem(settings, "LARGE_PDF_PAGES", 10)
+
+    spool = extract_document(str(SAMPLE_PDF))
+
+    assert len(parses) == 1
+    assert isinstance(spool, TextSpool)
+    assert len(spool) == 3
+    assert spool[0].startswith("Section 1") and "Section 20" in spool[2]
+
+def test_extraction_degrades_to_a_spool_above_the_rss_ceiling(spooled, parses, monkeypatch):
+    monkeypatch.setitem(settings, "LARGE_PDF_PAGES", 0)
+    monkeypatch.setitem(settings, "MAX_RSS_MB", 100)
+    monkeypatch.setattr(pdf_service, "current_rss_mb", lambda: 200.0)
+
+    with SAMPLE_PDF.open("rb") as pdf_file:
+        spool = extract_document(pdf_file)
+
+    text = "\n".join(spool)
+    assert len(parses) == 1
+    assert isinstance(spool, TextSpool)
+    assert all(f"Section {i}" in text for i in range(1, 21))
+
+def test_spooled_fee_schedule_is_analyzed_per_chunk(fake_openai, fake_anthropic, monkeypatch):
+    monkeypatch.setitem(settings, "CHUNK_MAX_TOKENS", 100)
+    monkeypatch.setitem(settings, "CHUNK_CONCURRENCY", 2)
+
+    def respond(kwargs):
+        section = kwargs["messages"][-1]["content"].split("---\n")[1].split(".")[0]
+        return json.dumps({"scenarios": [{
+            "participant_type": section, "volume_tier": "Tier 1", "order_type": "Simple",
+            "estimated_fee": "$0.10", "rebate": "$0.00", "notes": "Test"
+        }]})
+
+    client = fake_openai(respond)
+    with TextSpool() as spool:
+        for page in _pages(5):
+            spool.append(page)
+        result = FeeAnalyzer(client, fake_anthropic(), cache=MemoryResponseCache()).analyze(spool)
+
+    chunk_count = len(chunk_text(PAGE_BREAK.join(_pages(5)), 100))
+    assert len(client.calls) == chunk_count
+    assert len(result.scenarios) == chunk_count
+
+def test_handlers_close_the_spool(spooled, fake_anthropic, monkeypatch):
+    monkeypatch.setitem(settings, "LARGE_PDF_PAGES", 10)
+    monkeypatch.setitem(settings, "INCREMENTAL_ANALYSIS", False)
+    monkeypatch.setattr(main, "FeeAnalyzer", lambda: FeeAnalyzer(
+        anthropic_client=fake_anthropic(), cache=MemoryResponseCache()
+    ))
+    closed = []
+    close = TextSpool.close
+    monkeypatch.setattr(TextSpool, "close", lambda spool: closed.append(spool) or close(spool))
+
+    assert "Fee Scenario Variations" in main.process_document(str(SAMPLE_PDF), provider="anthropic")
+    assert "Fee Scenario Variations" in list(main.process_document_stream(str(SAMPLE_PDF), provider="anthropic"))[-1]
+    assert len(closed) == 2
+
+def test_empty_spool_is_an_error(fake_openai, fake_anthropic):
+    client = fake_openai()
+    with TextSpool() as spool, pytest.raises(ValueError, match="No text could be extracted"):
+        FeeAnalyzer(client, fake_anthropic(), cache=MemoryResponseCache()).analyze(spool)
+
+    assert client.calls == []
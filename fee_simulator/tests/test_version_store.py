@@ -0,0 +1,30 @@
+import pytest
+from ..config import settings
+from ..services.analyzer import FeeAnalyzer
+from ..services.response_cache import MemoryResponseCache
+from ..services.version_store import DocumentVersionStore
+
+def _pages(count: int, edited: int = -1):
+    return [
+        f"Section {i}. Customer fee $0.{i:02d} per contract. " + "tier " * 400 + ("Revised." if i == edited else "")
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentVersionStore(str(tmp_path / "versions.sqlite3"))
+
+def test_revision_only_reanalyzes_changed_chunks(store, fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "INCREMENTAL_CHUNK_TOKENS", 2000)
+    client = fake_openai()
+    analyzer = FeeAnalyzer(openai_client=client, cache=MemoryResponseCache(), versions=store)
+
+    first = analyzer.analyze_pages(_pages(60), doc_id="fees.pdf")
+    first_calls = len(client.calls)
+    revised = analyzer.analyze_pages(_pages(60, edited=30), doc_id="fees.pdf")
+    revision_calls = len(client.calls) - first_calls
+
+    # Scenarios are merged locally, so a revision costs only the changed chunks.
+    assert 1 <= revision_calls <= 2
+    assert first_calls >= 5 * revision_calls
+    assert revised.scenarios == first.scenarios
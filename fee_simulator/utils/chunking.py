@@ -0,0 +1,74 @@
+"""Token-aware splitting of document text into chunks for map-reduce analysis."""
+from typing import Iterable, List
+
+# Rough average for English prose with OpenAI/Anthropic tokenizers.
+CHARS_PER_TOKEN = 4
+
+# Tokens reserved for the completion when budgeting a request against tokens/min limits.
+COMPLETION_TOKEN_ESTIMATE = 1000
+
+# Pages of extracted text are joined with a form feed so chunks can be cut at page boundaries.
+PAGE_BREAK = "\f"
+
+# Boundaries tried in order: page break, paragraph, line, word.
+SEPARATORS = [PAGE_BREAK, "\n\n", "\n", " "]
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in ``text`` without loading a tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _split(text: str, max_chars: int, separators: List[str]) -> List[str]:
+    """Split ``text`` into pieces of at most ``max_chars``, preferring coarse boundaries.
+
+    Consecutive parts are packed greedily; a part that is too large on its
+    own is split again on the next, finer separator.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    if not separators:
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+    separator, rest = separators[0], separators[1:]
+    if separator not in text:
+        return _split(text, max_chars, rest)
+
+    chunks: List[str] = []
+    current = ""
+    for part in text.split(separator):
+        if not part.strip():
+            continue
+        if len(part) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(_split(part, max_chars, rest))
+            continue
+        candidate = f"{current}{separator}{part}" if current else part
+        if len(candidate) <= max_chars:
+            current = candidate
+        else:
+            chunks.append(current)
+            current = part
+    if current:
+        chunks.append(current)
+    return chunks
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Split text into chunks of roughly ``max_tokens`` tokens or fewer.
+
+    Splits happen on page breaks (form feeds) first, then paragraphs, lines
+    and finally words, so chunks keep as much structure as possible. Page
+    breaks left inside a chunk become paragraph breaks.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    chunks = _split(text, max_chars, SEPARATORS)
+    return [chunk.strip().replace(PAGE_BREAK, "\n\n") for chunk in chunks if chunk.strip()]
+
+def chunk_pages(pages: Iterable[str], max_tokens: int) -> List[str]:
+    """Pack whole pages into chunks of roughly ``max_tokens`` tokens or fewer.
+
+    Pages larger than the budget are split further with ``chunk_text``.
+    """
+    return chunk_text(PAGE_BREAK.join(page.strip() for page in pages), max_tokens)
@@ -0,0 +1,64 @@
+"""Run a pipeline expressed as a small DAG of stages on one event loop.
+
+Each stage names the stages whose results it takes, and starts as soon as
+they have finished, so independent stages overlap. Coroutine functions run
+on the event loop and plain functions in a worker thread. A stage that
+raises does not stop the others: its exception becomes its result, and the
+stages depending on it are skipped and get that exception as well.
+"""
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+class Stage(NamedTuple):
+    """A named step called with the results of the stages in ``after``, in that order."""
+    name: str
+    run: Callable[..., Any]
+    after: Tuple[str, ...] = ()
+
+def _check(stages: Dict[str, Stage]) -> None:
+    """Reject unknown dependencies and cycles, which would never finish."""
+    for stage in stages.values():
+        for dependency in stage.after:
+            if dependency not in stages:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage {dependency}")
+    done = set()
+    while len(done) < len(stages):
+        ready = [name for name, stage in stages.items() if name not in done and set(stage.after) <= done]
+        if not ready:
+            raise ValueError(f"Stages form a cycle: {', '.join(sorted(set(stages) - done))}")
+        done.update(ready)
+
+async def run_dag(stages: Iterable[Stage]) -> Dict[str, Any]:
+    """Run ``stages`` and return each stage's result, or the exception it raised or was skipped for.
+
+    Raises:
+        ValueError: If stage names repeat, a dependency is unknown or the stages form a cycle
+    """
+    stages = list(stages)
+    by_name = {stage.name: stage for stage in stages}
+    if len(by_name) < len(stages):
+        raise ValueError("Stage names must be unique")
+    _check(by_name)
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(stage: Stage) -> Any:
+        inputs = [await tasks[dependency] for dependency in stage.after]
+        failed = next((value for value in inputs if isinstance(value, Exception)), None)
+        if failed is not None:
+            return failed
+        try:
+            if inspect.iscoroutinefunction(stage.run):
+                return await stage.run(*inputs)
+            return await asyncio.to_thread(stage.run, *inputs)
+        except Exception as e:
+            logger.error(f"Stage {stage.name} failed: {str(e)}")
+            return e
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(run(stage))
+    await asyncio.gather(*tasks.values())
+    return {name: task.result() for name, task in tasks.items()}
@@ -1,9 +1,31 @@
-from typing import Any, TypeVar, Type
+from typing import Any, List, Optional, TypeVar, Type
 import json
-from pydantic import BaseModel
+import logging
+import re
+from pydantic import BaseModel, ValidationError
+from .metrics import stage
 
 T = TypeVar('T', bound=BaseModel)
 
+logger = logging.getLogger(__name__)
+
+# Braces and quotes that matter when looking for the end of an object; escapes are
+# consumed whole so an escaped quote never toggles the string state.
+_STRUCTURE = re.compile(r'\\.|["{}]', re.DOTALL)
+
+_SMART_QUOTES = "“”„‟"
+_TOKEN = re.compile(
+    r'"(?P<body>(?:[^"\\]|\\.)*)(?P<closed>")?'
+    rf'|[{_SMART_QUOTES}](?P<smart_body>(?:[^"{_SMART_QUOTES}\\]|\\.)*)(?P<smart_closed>["{_SMART_QUOTES}])?'
+    r'|(?P<punct>[{}\[\],:])'
+    r'|(?P<space>\s+)'
+    rf'|(?P<other>[^"{{}}\[\],:\s{_SMART_QUOTES}\\]+)',
+    re.DOTALL
+)
+_UNFINISHED_ESCAPE = re.compile(r'\\u[0-9a-fA-F]{0,3}$')
+# An opening brace followed by a key, or by the brace closing an empty object.
+_OBJECT_START = re.compile(rf'\{{\s*["}}{_SMART_QUOTES}]')
+
 def clean_json_response(content: str) -> str:
     """Clean JSON response from markdown formatting."""
     content = content.strip()
@@ -15,13 +37,188 @@ def clean_json_response(content: str) -> str:
         content = content[:-3]
     return content.strip()
 
-def parse_json_response(content: str, model_class: Type[T]) -> T:
-    """Parse JSON response into a Pydantic model."""
+def _object_end(content: str, start: int) -> Optional[int]:
+    """Return the end of the object opened at ``start``, or None if it is never closed."""
+    depth = 0
+    in_string = False
+    for match in _STRUCTURE.finditer(content, start):
+        token = match.group()
+        if token == '"':
+            in_string = not in_string
+        elif in_string or token[0] == "\\":
+            continue
+        elif token == "{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+def extract_json_object(content: str) -> str:
+    """Return the outermost balanced JSON object in a response.
+
+    Braces inside strings are ignored, so preambles, code fences and trailing
+    commentary are dropped. Only braces followed by a key (or closing the
+    object right away) are tried, in order; the first balanced object that
+    parses wins, and otherwise the first one tried, for ``repair_json`` to
+    fix. If that object is never closed (a truncated response) the rest of
+    the text is returned for ``repair_json`` to complete.
+    """
+    start = content.find("{")
+    if start < 0:
+        raise ValueError("No JSON object found in response")
+    fallback: Optional[str] = None
+    match = _OBJECT_START.search(content)
+    while match:
+        end = _object_end(content, match.start())
+        if end is None:
+            return fallback or content[match.start():].rstrip()
+        candidate = content[match.start():end]
+        try:
+            json.loads(candidate)
+            return candidate
+        except ValueError:
+            fallback = fallback or candidate
+        match = _OBJECT_START.search(content, end)
+    if fallback is not None:
+        return fallback
+    end = _object_end(content, start)
+    return content[start:end] if end is not None else content[start:].rstrip()
+
+class _Container:
+    __slots__ = ("bracket", "start", "in_array", "expect", "complete")
+
+    def __init__(self, bracket: str, start: int, in_array: bool):
+        self.bracket = bracket
+        self.start = start
+        self.in_array = in_array
+        self.expect = "key" if bracket == "{" else "value"
+        # Output length at the last point the container could be closed.
+        self.complete = start + 1
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+def repair_json(text: str) -> str:
+    """Repair common defects in JSON written by an LLM.
+
+    * curly double quotes used as string delimiters become straight quotes,
+    * trailing commas before a closing bracket are removed,
+    * a truncated document is closed: an unterminated final string value of
+      an object is kept, a dangling key or partial literal is dropped, and an
+      unfinished string, object or array inside a list is dropped as a whole.
+
+    The text is only re-tokenized, not re-serialized, so valid JSON comes back
+    unchanged (apart from curly quotes).
+    """
+    out: List[str] = []
+    stack: List[_Container] = []
+
+    def value_done() -> None:
+        if stack:
+            stack[-1].expect = "comma"
+            stack[-1].complete = len(out)
+
+    for match in _TOKEN.finditer(text):
+        top = stack[-1] if stack else None
+        if match.group("punct"):
+            char = match.group("punct")
+            if char in "{[":
+                stack.append(_Container(char, len(out), top is not None and top.bracket == "["))
+                out.append(char)
+            elif char in "}]":
+                _drop_trailing_comma(out)
+                out.append(char)
+                if stack:
+                    stack.pop()
+                value_done()
+                if not stack:
+                    break
+            elif top is not None:
+                out.append(char)
+                if char == ",":
+                    top.expect = "key" if top.bracket == "{" else "value"
+                else:
+                    top.expect = "value"
+            continue
+        if match.group("space"):
+            out.append(match.group())
+            continue
+        if match.group("other"):
+            out.append(match.group())
+            # A literal or number running to the end of the text may be cut short.
+            if match.end() < len(text):
+                value_done()
+            continue
+        smart = match.group("smart_body") is not None
+        body = match.group("smart_body") if smart else match.group("body")
+        closed = match.group("smart_closed" if smart else "closed") is not None
+        is_key = top is not None and top.bracket == "{" and top.expect == "key"
+        if not closed:
+            if not is_key and (top is None or top.bracket == "{"):
+                out.append('"' + _UNFINISHED_ESCAPE.sub("", body) + '"')
+                value_done()
+            break
+        out.append('"' + body + '"')
+        if is_key:
+            top.expect = "colon"
+        else:
+            value_done()
+
+    if stack:
+        # Truncated: drop any unfinished element of a list, then close what is still open.
+        cut = next((i for i, container in enumerate(stack) if container.in_array), None)
+        if cut is not None:
+            del out[stack[cut].start:]
+            del stack[cut:]
+        else:
+            del out[stack[-1].complete:]
+        _drop_trailing_comma(out)
+        out.extend("}" if container.bracket == "{" else "]" for container in reversed(stack))
+    return "".join(out)
+
+def _is_json_error(error: ValidationError) -> bool:
+    return any(detail["type"] == "json_invalid" for detail in error.errors())
+
+def _validate(json_text: str, model_class: Type[T]) -> Optional[T]:
+    """Validate JSON text, returning None if it is not valid JSON."""
     try:
-        cleaned_content = clean_json_response(content)
-        parsed = json.loads(cleaned_content)
-        return model_class(**parsed)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {e}")
-    except Exception as e:
-        raise ValueError(f"Failed to create model instance: {e}") 
\ No newline at end of file
+        return model_class.model_validate_json(json_text)
+    except ValidationError as e:
+        if _is_json_error(e):
+            return None
+        raise ValueError(f"Failed to create model instance: {e}")
+
+def parse_json_response(content: str, model_class: Type[T]) -> T:
+    """Parse JSON response into a Pydantic model.
+
+    Validation uses ``model_validate_json`` directly on the text from the
+    first opening to the last closing brace, which covers code fences and
+    plain preambles at C speed. Only if that is not valid JSON is the
+    outermost balanced object extracted and, failing that, repaired (see
+    ``extract_json_object`` and ``repair_json``).
+    """
+    with stage("json_parse"):
+        start = content.find("{")
+        if start < 0:
+            raise ValueError("Failed to parse JSON response: no JSON object found")
+        end = content.rfind("}")
+        candidate = content[start:end + 1] if end > start else None
+        if candidate is not None:
+            result = _validate(candidate, model_class)
+            if result is not None:
+                return result
+        json_text = extract_json_object(content)
+        if json_text != candidate:
+            result = _validate(json_text, model_class)
+            if result is not None:
+                return result
+        result = _validate(repair_json(json_text), model_class)
+        if result is None:
+            raise ValueError(f"Failed to parse JSON response: invalid JSON in {json_text[:80]!r}")
+        logger.info(f"Repaired malformed JSON response for {model_class.__name__}")
+        return result
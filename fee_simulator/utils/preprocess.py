@@ -0,0 +1,149 @@
+"""Strip boilerplate from extracted page text before it is sent to the LLM.
+
+* Running headers and footers, i.e. lines within the first or last
+  ``EDGE_LINES`` lines of a page that repeat on at least
+  ``BOILERPLATE_MIN_SHARE`` of the pages, are kept only where they first
+  appear. They must repeat exactly, except for the numbers of lines
+  mentioning the page. So are long lines repeated that often anywhere
+  (disclaimers).
+* Page numbers at the top or bottom of a page and table of contents
+  entries are dropped.
+* Runs of spaces and blank lines are collapsed.
+* With ``FEE_SECTION_FILTER``, only blocks of lines that score as
+  fee-relevant (fee terms and amounts per line) are kept.
+"""
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Set, Tuple
+from ..config import settings
+from .chunking import PAGE_BREAK, estimate_tokens
+from .metrics import REGISTRY, enabled, stage
+
+logger = logging.getLogger(__name__)
+
+EDGE_LINES = 3
+# Shorter repeated lines (table headings, labels) are kept wherever they appear.
+MIN_REPEATED_CHARS = 40
+# Boilerplate is only detected in documents with at least this many pages.
+MIN_PAGES = 3
+# Paragraphs longer than this are scored for fee relevance in blocks of this many lines.
+FEE_BLOCK_LINES = 12
+
+_PAGE = re.compile(r"\bpage\b", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+_PAGE_NUMBER = re.compile(
+    r"^(page\s*)?[-–—]?\s*\d{1,4}\s*[-–—]?(\s*(of|/)\s*\d{1,4})?$|^page\s+[ivxlc]+$", re.IGNORECASE
+)
+_TOC_ENTRY = re.compile(r"(\.\s?){4,}\s*\d{1,4}$|…+\s*\d{1,4}$")
+_TOC_HEADINGS = {"contents", "table of contents"}
+_FEE_TERMS = re.compile(
+    r"\b(fees?|rebates?|credits?|charges?|tiers?|rates?|pricing|discounts?|caps?|surcharges?|bps|basis points?"
+    r"|mils?|adv|volume|liquidity|maker|taker|per (share|contract|side|order|trade|message|transaction))\b",
+    re.IGNORECASE
+)
+_AMOUNT = re.compile(r"\$\s?\d|\d\s?%|\d*\.\d{2,}")
+
+class Compression(NamedTuple):
+    """Compressed text with the estimated tokens before and after."""
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+def _normalize(line: str) -> str:
+    return " ".join(line.split())
+
+def _edge_key(line: str) -> str:
+    return _DIGITS.sub("#", line) if _PAGE.search(line) else line
+
+def _is_toc(line: str) -> bool:
+    return bool(_TOC_ENTRY.search(line)) or line.casefold() in _TOC_HEADINGS
+
+def find_boilerplate(pages: List[List[str]]) -> Set[str]:
+    """Return the edge keys and repeated long lines of pages given as lists of normalized lines."""
+    if len(pages) < MIN_PAGES:
+        return set()
+    counts: Counter = Counter()
+    for lines in pages:
+        edges = {_edge_key(line) for line in lines[:EDGE_LINES] + lines[-EDGE_LINES:]}
+        counts.update(edges | {line for line in lines if len(line) >= MIN_REPEATED_CHARS})
+    needed = max(MIN_PAGES, math.ceil(settings["BOILERPLATE_MIN_SHARE"] * len(pages)))
+    return {key for key, count in counts.items() if count >= needed}
+
+def strip_pages(pages: List[str]) -> List[str]:
+    """Return each page's text without boilerplate and with whitespace collapsed."""
+    split = [[line for line in map(_normalize, page.splitlines()) if not _is_toc(line)] for page in pages]
+    boilerplate = find_boilerplate([[line for line in lines if line] for lines in split])
+    kept = set()
+    stripped = []
+    for lines in split:
+        content = [i for i, line in enumerate(lines) if line]
+        edges = set(content[:EDGE_LINES] + content[-EDGE_LINES:])
+        out = []
+        for i, line in enumerate(lines):
+            if not line:
+                if out and out[-1]:
+                    out.append(line)
+                continue
+            if i in edges and _PAGE_NUMBER.match(line):
+                continue
+            key = _edge_key(line) if i in edges else line
+            if key in boilerplate:
+                if key in kept:
+                    continue
+                kept.add(key)
+            out.append(line)
+        stripped.append("\n".join(out).strip())
+    return stripped
+
+def fee_score(lines: List[str]) -> float:
+    """Fee terms per line, with amounts ($, %, decimals) counting double."""
+    text = "\n".join(lines)
+    return (len(_FEE_TERMS.findall(text)) + 2 * len(_AMOUNT.findall(text))) / max(1, len(lines))
+
+def _blocks(text: str) -> List[Tuple[int, List[str]]]:
+    """Split text into blocks of at most ``FEE_BLOCK_LINES`` lines, each with the index of its page."""
+    blocks = []
+    for page, page_text in enumerate(text.split(PAGE_BREAK)):
+        for paragraph in re.split(r"\n\s*\n", page_text):
+            lines = paragraph.splitlines()
+            blocks.extend((page, lines[i:i + FEE_BLOCK_LINES]) for i in range(0, len(lines), FEE_BLOCK_LINES))
+    return [(page, block) for page, block in blocks if block]
+
+def select_fee_sections(text: str) -> str:
+    """Keep the blocks scoring at least ``FEE_SECTION_MIN_SCORE``, plus short headings right before them.
+
+    Kept blocks of the same page are joined as paragraphs and pages keep
+    their page breaks. Returns the text unchanged if no block scores high
+    enough.
+    """
+    blocks = _blocks(text)
+    relevant = [fee_score(block) >= settings["FEE_SECTION_MIN_SCORE"] for _, block in blocks]
+    if not any(relevant):
+        return text
+    pages: Dict[int, List[str]] = {}
+    for i, (page, block) in enumerate(blocks):
+        if relevant[i] or (len(block) <= 2 and i + 1 < len(blocks) and relevant[i + 1]):
+            pages.setdefault(page, []).append("\n".join(block))
+    return PAGE_BREAK.join("\n\n".join(kept) for kept in pages.values())
+
+def record_compression(before: int, after: int) -> None:
+    """Log and count the estimated tokens saved by compression."""
+    saved = 1 - after / before if before else 0.0
+    logger.info(f"Compressed document from {before} to {after} tokens ({saved:.0%} saved)")
+    if enabled():
+        REGISTRY.inc("document_tokens_total", before, stage="extracted")
+        REGISTRY.inc("document_tokens_total", after, stage="compressed")
+
+def compress_pages(pages: List[str]) -> Compression:
+    """Join page texts into the document text sent to the LLM, stripped of boilerplate and non-fee sections."""
+    with stage("compress"):
+        before = estimate_tokens("\n".join(text for text in pages if text).strip())
+        # Page breaks are kept, so chunking can split on them first.
+        text = PAGE_BREAK.join(text for text in strip_pages(pages) if text)
+        if settings["FEE_SECTION_FILTER"]:
+            text = select_fee_sections(text)
+        after = estimate_tokens(text)
+    record_compression(before, after)
+    return Compression(text, before, after)
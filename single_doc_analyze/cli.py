@@ -0,0 +1,81 @@
+"""Headless mode: analyze PDFs from the command line and print the results.
+
+Runs the same extract, analyze and evaluate pipeline as the web app, but
+never imports gradio, and the provider SDKs and pypdf are only loaded once a
+document is actually analyzed, so the command starts quickly. Formatted
+results go to stdout (one JSON object per document with ``--json``) and
+logs to stderr; the exit status is 1 if any document failed.
+
+Usage:
+    python -m single_doc_analyze.cli contract.pdf
+    python -m single_doc_analyze.cli a.pdf b.pdf --json > results.jsonl
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import logging
+import sys
+from single_doc_analyze.main import format_analysis_output
+from single_doc_analyze.models.schemas import DocumentAnalysis
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.evaluator import DocumentEvaluator
+from single_doc_analyze.services.pdf_service import close_document, extract_document, extract_pages_incremental
+from single_doc_analyze.services.pipeline import run_pipeline
+from single_doc_analyze.services.version_store import document_id
+from single_doc_analyze.utils.metrics import trace
+from single_doc_analyze.config import load_env, settings, setup_logging
+
+logger = logging.getLogger(__name__)
+
+def analyze_file(path: str) -> Tuple[DocumentAnalysis, Optional[Dict[str, float]]]:
+    """Extract, analyze and evaluate one PDF.
+
+    Returns:
+        Tuple: The analysis and, with SHOW_TIMINGS, the per-stage timings
+
+    Raises:
+        ValueError: If the PDF cannot be read or analyzed
+    """
+    with trace(settings["SHOW_TIMINGS"]) as timings:
+        if settings["INCREMENTAL_ANALYSIS"]:
+            text = extract_pages_incremental(path)
+        else:
+            text = extract_document(path)
+        try:
+            result = run_pipeline(text, DocumentAnalyzer(), DocumentEvaluator(), doc_id=document_id(path))
+        finally:
+            close_document(text)
+    return result, timings
+
+def main(argv: Optional[List[str]] = None) -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description="Analyze PDFs and print the results, without the web UI.")
+    parser.add_argument("paths", nargs="+", help="PDF files to analyze")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per document")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    failed = 0
+    for path in args.paths:
+        try:
+            result, timings = analyze_file(path)
+        except Exception as e:
+            logger.error(f"Failed to process {path}: {str(e)}")
+            failed += 1
+            if args.json:
+                print(json.dumps({"path": path, "status": "error", "error": str(e)}), flush=True)
+            continue
+        if args.json:
+            record = {"path": path, "status": "ok", "result": result.model_dump()}
+            if timings is not None:
+                record["timings"] = timings
+            print(json.dumps(record), flush=True)
+        else:
+            if len(args.paths) > 1:
+                print(f"# {path}")
+            print(format_analysis_output(result, timings), flush=True)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
-from typing import BinaryIO
-import gradio as gr
+from typing import BinaryIO, Dict, Iterator, List, Optional
+import asyncio
 import logging
-from single_doc_analyze.services.analyzer import DocumentAnalyzer
-from single_doc_analyze.services.evaluator import DocumentEvaluator
-from single_doc_analyze.services.pdf_service import extract_text_from_pdf
+import time
+from single_doc_analyze.services.analyzer import AsyncDocumentAnalyzer, DocumentAnalyzer
+from single_doc_analyze.services.evaluator import AsyncDocumentEvaluator, DocumentEvaluator
+from single_doc_analyze.services.job_queue import FAILED, QUEUED, RUNNING, Job, JobQueue, get_job_queue
+from single_doc_analyze.services.pdf_service import close_document, extract_document, extract_pages_incremental
+from single_doc_analyze.services.version_store import document_id
+from single_doc_analyze.services.pipeline import run_pipeline, run_pipeline_async, stream_pipeline
 from single_doc_analyze.models.schemas import DocumentAnalysis
-from single_doc_analyze.config import settings
+from single_doc_analyze.utils.metrics import format_timings, start_metrics_server, trace, traced_stream
+from single_doc_analyze.jobs import start_worker_pool, submit_document
+from single_doc_analyze.config import load_env, settings
 
 logger = logging.getLogger(__name__)
 
@@ -19,26 +25,130 @@ def process_document(file: BinaryIO) -> str:
         str: Formatted analysis results or error message
     """
     try:
-        # Extract text
-        text = extract_text_from_pdf(file)
+        with trace(settings["SHOW_TIMINGS"]) as timings:
+            # Extract text (page by page when revisions are analyzed incrementally)
+            if settings["INCREMENTAL_ANALYSIS"]:
+                text = extract_pages_incremental(file)
+            else:
+                text = extract_document(file)
+            
+            # Analyze, evaluate and retry if needed
+            try:
+                result = run_pipeline(text, DocumentAnalyzer(), DocumentEvaluator(), doc_id=document_id(file))
+            finally:
+                close_document(text)
         
-        # Initialize services
-        analyzer = DocumentAnalyzer()
-        evaluator = DocumentEvaluator()
+        # Format output
+        return format_analysis_output(result, timings)
+        
+    except ValueError as e:
+        logger.error(f"Document processing error: {str(e)}")
+        return f"❌ Error processing document: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return f"❌ Unexpected error: {str(e)}"
+
+def process_document_stream(file: BinaryIO) -> Iterator[str]:
+    """Generator variant of ``process_document`` that renders partial results.
+
+    The analysis is streamed, so the summary and lists appear as the model
+    writes them instead of after the whole completion.
+    
+    Args:
+        file: A file-like object containing the PDF data
         
-        # First pass
-        result = analyzer.analyze(text)
+    Yields:
+        str: Progressively more complete output, ending with the final results or an error message
+    """
+    def updates():
+        # Extract text (page by page when revisions are analyzed incrementally)
+        if settings["INCREMENTAL_ANALYSIS"]:
+            text = extract_pages_incremental(file)
+        else:
+            text = extract_document(file)
+        try:
+            yield from stream_pipeline(text, DocumentAnalyzer(), DocumentEvaluator(), doc_id=document_id(file))
+        finally:
+            close_document(text)
+    
+    try:
+        for update, timings in traced_stream(updates, settings["SHOW_TIMINGS"]):
+            if update.result is None:
+                yield format_partial_analysis(update.partial)
+            else:
+                yield format_analysis_output(update.result, timings)
         
-        # Evaluate
-        evaluation = evaluator.evaluate(result)
+    except ValueError as e:
+        logger.error(f"Document processing error: {str(e)}")
+        yield f"❌ Error processing document: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        yield f"❌ Unexpected error: {str(e)}"
+
+def process_document_queued(file: BinaryIO, queue: Optional[JobQueue] = None) -> Iterator[str]:
+    """Queue the document for the job workers and poll until its job finishes.
+
+    The handler only waits on the queue, so slow LLM calls don't hold it up,
+    and a document submitted again (e.g. after a restart) reuses its job.
+    
+    Args:
+        file: A file-like object containing the PDF data
+        queue: Job queue to use (defaults to the one at JOB_QUEUE_PATH)
         
-        # Retry if needed
-        if not evaluation.is_acceptable:
-            logger.info("First analysis attempt failed, retrying with feedback")
-            result = analyzer.analyze(text, evaluation.feedback)
+    Yields:
+        str: Job status updates, ending with the formatted results or an error message
+    """
+    try:
+        queue = queue or get_job_queue()
+        job = submit_document(file, queue)
+        while job.status in (QUEUED, RUNNING):
+            yield format_job_status(job, queue)
+            time.sleep(settings["JOB_POLL_INTERVAL"])
+            job = queue.get(job.id)
         
-        # Format output
-        return format_analysis_output(result)
+        if job.status == FAILED:
+            yield f"❌ Error processing document: {job.error}"
+        else:
+            yield format_analysis_output(DocumentAnalysis(**job.result["analysis"]), job.result["timings"])
+        
+    except ValueError as e:
+        logger.error(f"Document processing error: {str(e)}")
+        yield f"❌ Error processing document: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        yield f"❌ Unexpected error: {str(e)}"
+
+async def process_document_async(
+    file: BinaryIO,
+    analyzer: Optional[AsyncDocumentAnalyzer] = None,
+    evaluator: Optional[AsyncDocumentEvaluator] = None
+) -> str:
+    """Async variant of ``process_document``.
+
+    PDF extraction runs in a worker thread and the LLM calls are awaited on
+    the event loop, so many documents can be in flight at once.
+    
+    Args:
+        file: A file-like object containing the PDF data
+        analyzer: Analyzer to use (a new one is created if omitted)
+        evaluator: Evaluator to use (a new one is created if omitted)
+        
+    Returns:
+        str: Formatted analysis results or error message
+    """
+    try:
+        with trace(settings["SHOW_TIMINGS"]) as timings:
+            extract = extract_pages_incremental if settings["INCREMENTAL_ANALYSIS"] else extract_document
+            text = await asyncio.to_thread(extract, file)
+            
+            try:
+                result = await run_pipeline_async(
+                    text, analyzer or AsyncDocumentAnalyzer(), evaluator or AsyncDocumentEvaluator(),
+                    doc_id=document_id(file)
+                )
+            finally:
+                close_document(text)
+        return format_analysis_output(result, timings)
         
     except ValueError as e:
         logger.error(f"Document processing error: {str(e)}")
@@ -47,9 +157,36 @@ def process_document(file: BinaryIO) -> str:
         logger.error(f"Unexpected error: {str(e)}")
         return f"❌ Unexpected error: {str(e)}"
 
-def format_analysis_output(result: DocumentAnalysis) -> str:
-    """Format analysis results for display."""
-    return f"""
+async def process_documents_async(
+    files: List[BinaryIO],
+    concurrency: Optional[int] = None,
+    analyzer: Optional[AsyncDocumentAnalyzer] = None,
+    evaluator: Optional[AsyncDocumentEvaluator] = None
+) -> List[str]:
+    """Process many documents on one event loop with bounded concurrency.
+    
+    Args:
+        files: File-like objects or paths containing PDF data
+        concurrency: Maximum documents in flight (defaults to DOCUMENT_CONCURRENCY)
+        analyzer: Analyzer shared by all documents (a new one is created if omitted)
+        evaluator: Evaluator shared by all documents (a new one is created if omitted)
+        
+    Returns:
+        List[str]: Formatted results in the same order as ``files``
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings["DOCUMENT_CONCURRENCY"])
+    analyzer = analyzer or AsyncDocumentAnalyzer()
+    evaluator = evaluator or AsyncDocumentEvaluator()
+    
+    async def run(file: BinaryIO) -> str:
+        async with semaphore:
+            return await process_document_async(file, analyzer, evaluator)
+    
+    return list(await asyncio.gather(*(run(file) for file in files)))
+
+def format_analysis_output(result: DocumentAnalysis, timings: Optional[Dict[str, float]] = None) -> str:
+    """Format analysis results for display, with an optional per-stage timing breakdown."""
+    output = f"""
 📄 **Summary**
 {result.summary}
 
@@ -62,12 +199,58 @@ def format_analysis_output(result: DocumentAnalysis) -> str:
 ✅ **Recommended Actions**
 {', '.join(result.recommended_actions)}
 """
+    if timings:
+        output += f"""
+⏱️ **Timings**
+{format_timings(timings)}
+"""
+    return output
+
+def format_partial_analysis(partial: dict) -> str:
+    """Format a partially streamed analysis, showing only the sections started so far."""
+    sections = [
+        ("📄 **Summary**", partial.get("summary")),
+        ("🔑 **Key Topics**", partial.get("key_topics")),
+        ("⚠️ **Risks or Issues**", partial.get("risks_or_issues")),
+        ("✅ **Recommended Actions**", partial.get("recommended_actions")),
+    ]
+    output = ""
+    for title, value in sections:
+        if value is None:
+            continue
+        text = ', '.join(str(item) for item in value) if isinstance(value, list) else str(value)
+        output += f"\n{title}\n{text}\n"
+    return output + "\n⏳ Analyzing...\n"
+
+def format_job_status(job: Job, queue: JobQueue) -> str:
+    """Describe where a queued or running job is."""
+    if job.status == QUEUED:
+        ahead = queue.position(job.id)
+        status = f"queued ({ahead} ahead)" if ahead else "queued (next)"
+    else:
+        status = f"running (attempt {job.attempts} of {job.max_attempts})"
+    retry = f"\nLast attempt failed: {job.error}" if job.error else ""
+    return f"⏳ Job {job.id[:12]} {status}...{retry}\n"
 
 if __name__ == "__main__":
+    # Imported here so the CLI, which reuses the handlers above, never loads gradio.
+    import gradio as gr
+
+    load_env()
+    if settings["METRICS_ENABLED"]:
+        start_metrics_server(settings["METRICS_PORT"])
+    # Queued handlers only poll the job queue, so they need no concurrency limit.
+    if settings["JOB_QUEUE"]:
+        process, concurrency_limit = process_document_queued, None
+        start_worker_pool()
+    else:
+        process = process_document_stream if settings["STREAM_OUTPUT"] else process_document_async
+        concurrency_limit = settings["DOCUMENT_CONCURRENCY"]
     gr.Interface(
-        fn=process_document,
+        fn=process,
         inputs=gr.File(label="Upload PDF"),
         outputs="text",
         title="One-Shot Document Analyzer",
-        description="Upload a document and receive a structured summary with risks and action items."
-    ).launch()
\ No newline at end of file
+        description="Upload a document and receive a structured summary with risks and action items.",
+        concurrency_limit=concurrency_limit
+    ).launch()
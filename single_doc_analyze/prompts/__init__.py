@@ -1,4 +1,4 @@
 """Prompt templates for document analysis."""
-from .templates import build_prompt, build_evaluation_prompt
+from .templates import build_prompt, build_chunk_prompt, build_merge_prompt, build_evaluation_prompt
 
-__all__ = ['build_prompt', 'build_evaluation_prompt'] 
\ No newline at end of file
+__all__ = ['build_prompt', 'build_chunk_prompt', 'build_merge_prompt', 'build_evaluation_prompt'] 
\ No newline at end of file
@@ -1,3 +1,4 @@
+from typing import List, Optional
 from single_doc_analyze.models.schemas import DocumentAnalysis
 
 def build_prompt(doc_text: str) -> str:
@@ -24,6 +25,72 @@ Document text:
 ---
 """
 
+def build_feedback(feedback: Optional[str]) -> str:
+    """Evaluator feedback for a retry, appended after the unchanged analysis or merge prompt.
+
+    Keeping the feedback last leaves the prompt a prefix of the retry, which
+    providers can serve from their prompt cache.
+    """
+    if not feedback:
+        return ""
+    return f"\n\n# Feedback from evaluator:\n{feedback}"
+
+def build_chunk_prompt(chunk_text: str, index: int, total: int) -> str:
+    return f"""
+You are a document analysis expert.
+
+You are reading part {index} of {total} of a longer document. Analyze only this part:
+1. Summarize this part in 2-3 sentences.
+2. Identify key topics or themes.
+3. Highlight risks, unclear language, or potential issues.
+4. Recommend next actions for the user.
+
+Return your response in this exact JSON format:
+{{
+  "summary": "...",
+  "key_topics": ["..."],
+  "risks_or_issues": ["..."],
+  "recommended_actions": ["..."]
+}}
+
+Document text (part {index} of {total}):
+---
+{chunk_text}
+---
+"""
+
+def build_merge_prompt(partials: List[DocumentAnalysis]) -> str:
+    sections = "\n\n".join(
+        f"""Part {i}:
+Summary: {partial.summary}
+Key Topics: {"; ".join(partial.key_topics)}
+Risks or Issues: {"; ".join(partial.risks_or_issues)}
+Recommended Actions: {"; ".join(partial.recommended_actions)}"""
+        for i, partial in enumerate(partials, start=1)
+    )
+    return f"""
+You are a document analysis expert.
+
+A long document was analyzed in {len(partials)} consecutive parts. Combine the partial analyses below into one analysis of the whole document:
+1. Summarize the whole document in 3-4 sentences.
+2. Merge the key topics, removing duplicates.
+3. Merge the risks, unclear language, or potential issues, removing duplicates.
+4. Merge the recommended next actions, removing duplicates.
+
+Return your response in this exact JSON format:
+{{
+  "summary": "...",
+  "key_topics": ["..."],
+  "risks_or_issues": ["..."],
+  "recommended_actions": ["..."]
+}}
+
+Partial analyses:
+---
+{sections}
+---
+"""
+
 def build_evaluation_prompt(result: DocumentAnalysis) -> str:
     return f"""
 You are a document analysis evaluator. You will be given a structured output and must check if it meets the requirements.
@@ -53,4 +120,31 @@ Return your judgment as JSON:
   "is_acceptable": true or false,
   "feedback": "Short explanation of what is missing or how to improve"
 }}
-""" 
\ No newline at end of file
+""" 
+
+def build_adaptation_prompt(previous: DocumentAnalysis, diff: str) -> str:
+    return f"""
+You are a document analysis expert.
+
+A document was analyzed before. A revised version of it differs only in the lines shown in the diff below ("-" lines were removed, "+" lines were added). Update the analysis to describe the revised document:
+1. Keep everything in the analysis that the changes do not affect.
+2. Revise the summary, key topics, risks or issues and recommended actions where the changes affect them.
+
+Return your response in this exact JSON format:
+{{
+  "summary": "...",
+  "key_topics": ["..."],
+  "risks_or_issues": ["..."],
+  "recommended_actions": ["..."]
+}}
+
+Previous analysis:
+---
+{previous.model_dump_json(indent=2)}
+---
+
+Changes to the document:
+---
+{diff}
+---
+"""
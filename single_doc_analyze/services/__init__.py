@@ -1,6 +1,6 @@
 """Services package for document analysis."""
 from .analyzer import DocumentAnalyzer
 from .evaluator import DocumentEvaluator
-from .pdf_service import extract_text_from_pdf
+from .pdf_service import extract_text_from_pdf, iter_pdf_pages
 
-__all__ = ['DocumentAnalyzer', 'DocumentEvaluator', 'extract_text_from_pdf'] 
\ No newline at end of file
+__all__ = ['DocumentAnalyzer', 'DocumentEvaluator', 'extract_text_from_pdf', 'iter_pdf_pages'] 
\ No newline at end of file
@@ -1,29 +1,408 @@
-from typing import Optional
-import openai
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import asyncio
 from ..models.schemas import DocumentAnalysis
+from ..utils.json_stream import StreamUpdate
 from ..utils.json_utils import parse_json_response
-from ..prompts.templates import build_prompt
+from ..utils.metrics import bind_context, stage
+from ..utils.chunking import COMPLETION_TOKEN_ESTIMATE, chunk_text, estimate_tokens
+from ..prompts.templates import (
+    build_prompt, build_chunk_prompt, build_merge_prompt, build_adaptation_prompt, build_feedback
+)
 from ..config import settings
+from .clients import get_async_openai_client, get_openai_client
+from .rate_limiter import get_rate_limiter
+from .router import (
+    Backend, aroute, arequest, default_backends, get_async_backend_client, get_backend_client, request, route
+)
+from .similarity_index import Reuse, SimilarityIndex, find_reusable, get_similarity_index, remember_result
+from .streaming import openai_text_deltas
+from .text_spool import TextSpool
+from .response_cache import (
+    ResponseCache, acached_call, cached_call, cached_stream, get_response_cache, make_cache_key
+)
+from .version_store import (
+    DocumentVersionStore, get_version_store, load_chunk_results, pending_parts, plan_page_chunks,
+    record_version, save_chunk_results
+)
+
+if TYPE_CHECKING:
+    import openai
+
+SYSTEM_MESSAGE = "You are a document analysis expert."
+
+def _with_feedback(prompt: str, feedback: Optional[str]) -> str:
+    return prompt + build_feedback(feedback)
+
+def _cache_key(prompt: str, backend: Optional[Backend] = None) -> str:
+    provider, model = backend[:2] if backend else ("openai", settings["MODEL_NAME"])
+    return make_cache_key(provider, model, SYSTEM_MESSAGE, prompt)
+
+def _messages(prompt: str) -> List[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt}
+    ]
+
+def _estimated_tokens(prompt: str) -> int:
+    return estimate_tokens(SYSTEM_MESSAGE) + estimate_tokens(prompt) + COMPLETION_TOKEN_ESTIMATE
+
+def _parse(content: str) -> DocumentAnalysis:
+    return parse_json_response(content, DocumentAnalysis)
+
+def _build_prompts(doc_text: str) -> List[str]:
+    """Return the single analysis prompt, or one prompt per chunk for long documents."""
+    with stage("prompt_build"):
+        chunks = chunk_text(doc_text, settings["CHUNK_MAX_TOKENS"])
+        if len(chunks) <= 1:
+            return [build_prompt(chunks[0] if chunks else doc_text)]
+        return [build_chunk_prompt(chunk, index, len(chunks)) for index, chunk in enumerate(chunks, start=1)]
+
+def _spool_prompts(spool: TextSpool) -> Tuple[int, Iterator[str]]:
+    """Count the chunks of a spooled document and lazily build their prompts."""
+    max_tokens = settings["CHUNK_MAX_TOKENS"]
+    total = sum(1 for _ in spool.chunks(max_tokens))
+    if total <= 1:
+        return total, (build_prompt(chunk) for chunk in spool.chunks(max_tokens))
+    return total, (
+        build_chunk_prompt(chunk, index, total) for index, chunk in enumerate(spool.chunks(max_tokens), start=1)
+    )
+
+def _similarity_namespace() -> str:
+    # Results are only reused under the same prompt template and model.
+    return _cache_key(build_prompt(""))
+
+def _find_similar(
+    index: Optional[SimilarityIndex], doc_text: str, feedback: Optional[str], use_cache: bool
+) -> Optional[Reuse]:
+    if feedback is not None or not use_cache:
+        return None
+    with stage("similarity_lookup"):
+        return find_reusable(index, doc_text, _similarity_namespace(), DocumentAnalysis)
+
+def _remember(
+    index: Optional[SimilarityIndex], doc_text: str, feedback: Optional[str], use_cache: bool, result: DocumentAnalysis
+) -> None:
+    if feedback is None and use_cache:
+        remember_result(index, doc_text, _similarity_namespace(), result)
+
+def _plan_chunks(pages: List[str]):
+    # The chunk prompt template is part of the namespace so editing it invalidates stored results.
+    namespace = _cache_key(build_chunk_prompt("", 0, 0))
+    return plan_page_chunks(pages, settings["INCREMENTAL_CHUNK_TOKENS"], namespace)
 
 class DocumentAnalyzer:
-    def __init__(self):
-        self.client = openai.OpenAI()
-    
-    def analyze(self, doc_text: str, feedback: Optional[str] = None) -> DocumentAnalysis:
-        """Analyze document text and return structured analysis."""
-        prompt = build_prompt(doc_text)
-        if feedback:
-            prompt += f"\n\n# Feedback from evaluator:\n{feedback}"
-            
-        response = self.client.chat.completions.create(
-            model=settings["MODEL_NAME"],
-            messages=[
-                {"role": "system", "content": "You are a document analysis expert."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        return parse_json_response(
-            response.choices[0].message.content,
-            DocumentAnalysis
-        ) 
\ No newline at end of file
+    def __init__(
+        self,
+        client: Optional["openai.OpenAI"] = None,
+        cache: Optional[ResponseCache] = None,
+        versions: Optional[DocumentVersionStore] = None,
+        similar: Optional[SimilarityIndex] = None
+    ):
+        self._client = client
+        self.cache = cache if cache is not None else get_response_cache()
+        self._versions = versions
+        self._similar = similar
+    
+    @property
+    def client(self) -> "openai.OpenAI":
+        """The OpenAI client, taken from the shared registry on first use."""
+        if self._client is None:
+            self._client = get_openai_client()
+        return self._client
+    
+    @property
+    def versions(self) -> Optional[DocumentVersionStore]:
+        """The document version store used by ``analyze_pages``."""
+        return self._versions or get_version_store()
+    
+    @property
+    def similar(self) -> Optional[SimilarityIndex]:
+        """The near-duplicate index whose results ``analyze`` reuses."""
+        return self._similar if self._similar is not None else get_similarity_index()
+    
+    def analyze(self, doc_text: str, feedback: Optional[str] = None, use_cache: bool = True) -> DocumentAnalysis:
+        """Analyze document text and return structured analysis.
+
+        Documents longer than ``CHUNK_MAX_TOKENS`` are split into chunks that
+        are analyzed concurrently and then merged into one analysis; evaluator
+        feedback is applied to the merge step. Identical requests are served
+        from the response cache unless ``use_cache`` is False.
+
+        With ``SIMILARITY_REUSE`` a near-duplicate of an analyzed document
+        reuses that analysis, or has it updated from the text diff, instead
+        of being analyzed from scratch.
+        """
+        index = self.similar
+        reuse = _find_similar(index, doc_text, feedback, use_cache)
+        if reuse is not None and reuse.diff is None:
+            return reuse.previous
+        if reuse is not None:
+            prompt = build_adaptation_prompt(reuse.previous, reuse.diff)
+        else:
+            prompt = self._final_prompt(doc_text, use_cache)
+        result = self._analyze_prompt(prompt, feedback, use_cache)
+        _remember(index, doc_text, feedback, use_cache, result)
+        return result
+    
+    def analyze_stream(
+        self, doc_text: str, feedback: Optional[str] = None, use_cache: bool = True
+    ) -> Iterator[StreamUpdate[DocumentAnalysis]]:
+        """Like ``analyze``, but stream the final completion.
+
+        Yields a ``StreamUpdate`` with the partially parsed analysis as
+        tokens arrive; the last update carries the validated result. For long
+        documents the chunks are analyzed first and the merge is streamed.
+        """
+        index = self.similar
+        reuse = _find_similar(index, doc_text, feedback, use_cache)
+        if reuse is not None and reuse.diff is None:
+            yield StreamUpdate(reuse.previous.model_dump(), reuse.previous)
+            return
+        if reuse is not None:
+            prompt = build_adaptation_prompt(reuse.previous, reuse.diff)
+        else:
+            prompt = _with_feedback(self._final_prompt(doc_text, use_cache), feedback)
+        for update in cached_stream(
+            self.cache, _cache_key(prompt), lambda: self._stream_complete(prompt), _parse, use_cache
+        ):
+            if update.result is not None:
+                _remember(index, doc_text, feedback, use_cache, update.result)
+            yield update
+    
+    def _final_prompt(self, doc_text: str, use_cache: bool) -> str:
+        """Return the analysis prompt, or analyze the chunks of a long document and return the merge prompt."""
+        prompts = _build_prompts(doc_text)
+        if len(prompts) == 1:
+            return prompts[0]
+        
+        with ThreadPoolExecutor(max_workers=settings["CHUNK_CONCURRENCY"]) as pool:
+            partials = list(pool.map(
+                bind_context(lambda prompt: self._analyze_prompt(prompt, None, use_cache)), prompts
+            ))
+        with stage("prompt_build"):
+            return build_merge_prompt(partials)
+    
+    def analyze_spool(
+        self, spool: TextSpool, feedback: Optional[str] = None, use_cache: bool = True
+    ) -> DocumentAnalysis:
+        """Analyze a document spooled to disk by ``extract_document``.
+
+        Chunks are read back and analyzed ``CHUNK_CONCURRENCY`` at a time, so
+        only those chunks and the partial analyses are held in memory, then
+        merged as in ``analyze``. Similarity reuse is skipped, since it needs
+        the whole text. An empty spool raises ValueError.
+        """
+        total, prompts = _spool_prompts(spool)
+        if not total:
+            raise ValueError("No text could be extracted")
+        if total == 1:
+            return self._analyze_prompt(next(prompts), feedback, use_cache)
+        
+        partials: List[DocumentAnalysis] = []
+        analyze_chunk = bind_context(lambda prompt: self._analyze_prompt(prompt, None, use_cache))
+        with ThreadPoolExecutor(max_workers=settings["CHUNK_CONCURRENCY"]) as pool:
+            while True:
+                batch = list(islice(prompts, settings["CHUNK_CONCURRENCY"]))
+                if not batch:
+                    break
+                partials.extend(pool.map(analyze_chunk, batch))
+        with stage("prompt_build"):
+            prompt = build_merge_prompt(partials)
+        return self._analyze_prompt(prompt, feedback, use_cache)
+    
+    def analyze_pages(
+        self,
+        pages: List[str],
+        doc_id: Optional[str] = None,
+        feedback: Optional[str] = None,
+        use_cache: bool = True
+    ) -> DocumentAnalysis:
+        """Analyze a document page by page, re-analyzing only chunks that changed.
+
+        Pages are grouped into chunks of about ``INCREMENTAL_CHUNK_TOKENS``
+        with content-defined boundaries. Per-chunk results are kept in the
+        version store, so a revised document only pays for the chunks around
+        its edited pages plus the merge. ``doc_id`` is used to log which
+        pages changed since the previous version.
+        """
+        chunks = _plan_chunks(pages)
+        if len(chunks) <= 1:
+            return self.analyze("\n".join(chunk.text for chunk in chunks), feedback, use_cache)
+        
+        store = self.versions
+        record_version(store, doc_id, pages)
+        results = load_chunk_results(store, chunks, DocumentAnalysis)
+        parts = pending_parts(chunks, results, settings["INCREMENTAL_CHUNK_TOKENS"])
+        positions = {chunk.key: index for index, chunk in enumerate(chunks, start=1)}
+        with ThreadPoolExecutor(max_workers=settings["CHUNK_CONCURRENCY"]) as pool:
+            analyses = list(pool.map(
+                bind_context(lambda part: self._analyze_prompt(
+                    build_chunk_prompt(part[1], positions[part[0].key], len(chunks)), None, use_cache
+                )),
+                parts
+            ))
+        save_chunk_results(store, parts, analyses, results)
+        
+        partials = [partial for chunk in chunks for partial in results[chunk.key]]
+        return self._analyze_prompt(build_merge_prompt(partials), feedback, use_cache)
+    
+    def _analyze_prompt(self, prompt: str, feedback: Optional[str], use_cache: bool) -> DocumentAnalysis:
+        suffix = build_feedback(feedback)
+        return route(default_backends(), lambda backend: cached_call(
+            self.cache, _cache_key(prompt + suffix, backend), lambda: self._complete(prompt, suffix, backend), _parse,
+            use_cache
+        ))
+    
+    def _complete(self, prompt: str, suffix: str, backend: Backend) -> str:
+        client = self.client if backend.provider == "openai" else get_backend_client(backend.provider)
+        return request(client, backend, SYSTEM_MESSAGE, prompt, suffix)
+    
+    def _stream_complete(self, prompt: str) -> Iterator[str]:
+        with stage("llm_wait"):
+            stream = get_rate_limiter("openai", settings["MODEL_NAME"]).call(
+                lambda: self.client.chat.completions.create(
+                    model=settings["MODEL_NAME"],
+                    messages=_messages(prompt),
+                    stream=True,
+                    stream_options={"include_usage": True}
+                ),
+                _estimated_tokens(prompt)
+            )
+        yield from openai_text_deltas(stream, settings["MODEL_NAME"])
+
+class AsyncDocumentAnalyzer:
+    """Asyncio counterpart of ``DocumentAnalyzer`` built on ``"openai.AsyncOpenAI"``."""
+
+    def __init__(
+        self,
+        client: Optional["openai.AsyncOpenAI"] = None,
+        cache: Optional[ResponseCache] = None,
+        versions: Optional[DocumentVersionStore] = None,
+        similar: Optional[SimilarityIndex] = None
+    ):
+        self._client = client
+        self.cache = cache if cache is not None else get_response_cache()
+        self._versions = versions
+        self._similar = similar
+    
+    @property
+    def client(self) -> "openai.AsyncOpenAI":
+        """The AsyncOpenAI client, taken from the shared registry for the running loop."""
+        return self._client or get_async_openai_client()
+    
+    @property
+    def versions(self) -> Optional[DocumentVersionStore]:
+        """The document version store used by ``analyze_pages``."""
+        return self._versions or get_version_store()
+    
+    @property
+    def similar(self) -> Optional[SimilarityIndex]:
+        """The near-duplicate index whose results ``analyze`` reuses."""
+        return self._similar if self._similar is not None else get_similarity_index()
+    
+    async def analyze(self, doc_text: str, feedback: Optional[str] = None, use_cache: bool = True) -> DocumentAnalysis:
+        """Analyze document text and return structured analysis.
+
+        Chunks of long documents are analyzed concurrently, at most
+        ``CHUNK_CONCURRENCY`` at a time, before being merged. Near-duplicates
+        of analyzed documents are handled as in ``DocumentAnalyzer.analyze``.
+        """
+        index = self.similar
+        reuse = _find_similar(index, doc_text, feedback, use_cache)
+        if reuse is not None and reuse.diff is None:
+            return reuse.previous
+        if reuse is not None:
+            prompt = build_adaptation_prompt(reuse.previous, reuse.diff)
+        else:
+            prompt = await self._final_prompt(doc_text, use_cache)
+        result = await self._analyze_prompt(prompt, feedback, use_cache)
+        _remember(index, doc_text, feedback, use_cache, result)
+        return result
+    
+    async def _final_prompt(self, doc_text: str, use_cache: bool) -> str:
+        """Return the analysis prompt, or analyze the chunks of a long document and return the merge prompt."""
+        prompts = _build_prompts(doc_text)
+        if len(prompts) == 1:
+            return prompts[0]
+        
+        semaphore = asyncio.Semaphore(settings["CHUNK_CONCURRENCY"])
+        
+        async def analyze_chunk(prompt: str) -> DocumentAnalysis:
+            async with semaphore:
+                return await self._analyze_prompt(prompt, None, use_cache)
+        
+        partials = await asyncio.gather(*(analyze_chunk(prompt) for prompt in prompts))
+        with stage("prompt_build"):
+            return build_merge_prompt(list(partials))
+    
+    async def analyze_spool(
+        self, spool: TextSpool, feedback: Optional[str] = None, use_cache: bool = True
+    ) -> DocumentAnalysis:
+        """Analyze a document spooled to disk, ``CHUNK_CONCURRENCY`` chunks at a time.
+
+        See ``DocumentAnalyzer.analyze_spool``.
+        """
+        total, prompts = _spool_prompts(spool)
+        if not total:
+            raise ValueError("No text could be extracted")
+        if total == 1:
+            return await self._analyze_prompt(next(prompts), feedback, use_cache)
+        
+        partials: List[DocumentAnalysis] = []
+        while True:
+            batch = list(islice(prompts, settings["CHUNK_CONCURRENCY"]))
+            if not batch:
+                break
+            partials.extend(await asyncio.gather(
+                *(self._analyze_prompt(prompt, None, use_cache) for prompt in batch)
+            ))
+        with stage("prompt_build"):
+            prompt = build_merge_prompt(partials)
+        return await self._analyze_prompt(prompt, feedback, use_cache)
+    
+    async def analyze_pages(
+        self,
+        pages: List[str],
+        doc_id: Optional[str] = None,
+        feedback: Optional[str] = None,
+        use_cache: bool = True
+    ) -> DocumentAnalysis:
+        """Analyze a document page by page, re-analyzing only chunks that changed.
+
+        See ``DocumentAnalyzer.analyze_pages``.
+        """
+        chunks = _plan_chunks(pages)
+        if len(chunks) <= 1:
+            return await self.analyze("\n".join(chunk.text for chunk in chunks), feedback, use_cache)
+        
+        store = self.versions
+        record_version(store, doc_id, pages)
+        results = load_chunk_results(store, chunks, DocumentAnalysis)
+        parts = pending_parts(chunks, results, settings["INCREMENTAL_CHUNK_TOKENS"])
+        positions = {chunk.key: index for index, chunk in enumerate(chunks, start=1)}
+        semaphore = asyncio.Semaphore(settings["CHUNK_CONCURRENCY"])
+        
+        async def analyze_part(chunk, text: str) -> DocumentAnalysis:
+            async with semaphore:
+                return await self._analyze_prompt(
+                    build_chunk_prompt(text, positions[chunk.key], len(chunks)), None, use_cache
+                )
+        
+        analyses = await asyncio.gather(*(analyze_part(chunk, text) for chunk, text in parts))
+        save_chunk_results(store, parts, list(analyses), results)
+        
+        partials = [partial for chunk in chunks for partial in results[chunk.key]]
+        return await self._analyze_prompt(build_merge_prompt(partials), feedback, use_cache)
+    
+    async def _analyze_prompt(self, prompt: str, feedback: Optional[str], use_cache: bool) -> DocumentAnalysis:
+        suffix = build_feedback(feedback)
+        return await aroute(default_backends(), lambda backend: acached_call(
+            self.cache, _cache_key(prompt + suffix, backend), lambda: self._complete(prompt, suffix, backend), _parse,
+            use_cache
+        ))
+    
+    async def _complete(self, prompt: str, suffix: str, backend: Backend) -> str:
+        client = self.client if backend.provider == "openai" else get_async_backend_client(backend.provider)
+        return await arequest(client, backend, SYSTEM_MESSAGE, prompt, suffix)
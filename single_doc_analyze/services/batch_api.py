@@ -0,0 +1,289 @@
+"""Provider batch API execution for bulk, latency-insensitive analysis.
+
+OpenAI Batch jobs cost less than synchronous requests and have their own
+rate limits, but finish within hours rather than seconds. ``BatchRunner``
+submits prompts as jobs of at most ``BATCH_MAX_REQUESTS`` requests and polls
+them every ``BATCH_POLL_INTERVAL`` seconds until they end.
+
+``run_batch_pipeline`` runs the analyze, evaluate and retry pipeline for
+many documents as waves of batch jobs:
+
+1. the analysis prompts of short documents and the chunk prompts of long ones,
+2. the merge prompts of long documents,
+3. evaluations of the analyses that ``check_analysis`` and the rule-based
+   scorer cannot settle locally,
+4. rejected documents go back to 1 with the evaluator's feedback, up to
+   ``MAX_RETRIES`` times; the last round is not evaluated.
+
+Responses are cached under the same keys as synchronous calls, and cached
+prompts are not submitted, except for the final prompts of retries.
+"""
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple, TypeVar, Union
+import json
+import logging
+import time
+from ..config import settings
+from ..models.schemas import DocumentAnalysis, EvaluationResult
+from ..prompts.templates import build_evaluation_prompt, build_merge_prompt
+from ..utils.metrics import record_llm_call, stage
+from .analyzer import SYSTEM_MESSAGE, _build_prompts, _parse, _with_feedback
+from .clients import get_openai_client
+from .evaluator import SYSTEM_MESSAGE as EVALUATION_SYSTEM_MESSAGE, _local_verdict, _parse as _parse_evaluation
+from .response_cache import ResponseCache, get_response_cache, make_cache_key
+
+if TYPE_CHECKING:
+    import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+class BatchRequest(NamedTuple):
+    """One prompt of a batch job, identified by ``custom_id`` in the results."""
+    custom_id: str
+    system: str
+    prompt: str
+
+# Response text, or the error, per custom id.
+BatchResults = Dict[str, Union[str, Exception]]
+
+class BatchRunner:
+    """Runs prompts through the OpenAI Batch API."""
+
+    def __init__(
+        self,
+        client: Optional["openai.OpenAI"] = None,
+        model: Optional[str] = None,
+        poll_interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_requests: Optional[int] = None
+    ):
+        self._client = client
+        self.model = model or settings["MODEL_NAME"]
+        self.poll_interval = settings["BATCH_POLL_INTERVAL"] if poll_interval is None else poll_interval
+        self.timeout = settings["BATCH_TIMEOUT"] if timeout is None else timeout
+        self.max_requests = max(1, max_requests or settings["BATCH_MAX_REQUESTS"])
+
+    @property
+    def client(self) -> "openai.OpenAI":
+        """The OpenAI client, taken from the shared registry on first use."""
+        if self._client is None:
+            self._client = get_openai_client()
+        return self._client
+
+    def run(self, requests: List[BatchRequest]) -> BatchResults:
+        """Submit ``requests`` as batch jobs and wait for all of them to end.
+
+        Raises:
+            ValueError: If a job does not end within ``timeout`` seconds
+        """
+        if not requests:
+            return {}
+        with stage("batch_submit"):
+            jobs = [
+                self.submit(requests[start:start + self.max_requests])
+                for start in range(0, len(requests), self.max_requests)
+            ]
+        results: BatchResults = {}
+        with stage("batch_wait"):
+            for job in jobs:
+                results.update(self.collect(self.wait(job)))
+        for request in requests:
+            if request.custom_id not in results:
+                results[request.custom_id] = ValueError(f"Batch request {request.custom_id} returned no result")
+        return results
+
+    def submit(self, requests: List[BatchRequest]) -> str:
+        """Upload the requests as a JSONL file, start a batch job on it and return the job id."""
+        lines = [
+            json.dumps({
+                "custom_id": request.custom_id,
+                "method": "POST",
+                "url": ENDPOINT,
+                "body": {
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": request.system},
+                        {"role": "user", "content": request.prompt}
+                    ]
+                }
+            })
+            for request in requests
+        ]
+        upload = self.client.files.create(file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+        batch = self.client.batches.create(input_file_id=upload.id, endpoint=ENDPOINT, completion_window="24h")
+        logger.info(f"Submitted batch {batch.id} with {len(requests)} requests")
+        return batch.id
+
+    def wait(self, batch_id: str):
+        """Poll the job until it ends and return it."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                logger.info(f"Batch {batch_id} {batch.status}")
+                return batch
+            if time.monotonic() >= deadline:
+                raise ValueError(f"Batch {batch_id} did not finish within {self.timeout:.0f}s")
+            time.sleep(self.poll_interval)
+
+    def collect(self, batch) -> BatchResults:
+        """Read the response text or error of each request of an ended job."""
+        results: BatchResults = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    results[record["custom_id"]] = self._result(record)
+        return results
+
+    def _result(self, record: dict) -> Union[str, Exception]:
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        if response.get("status_code") != 200:
+            error = record.get("error") or body.get("error") or {}
+            return ValueError(f"Batch request {record['custom_id']} failed: {error.get('message', 'unknown error')}")
+        record_llm_call("openai", self.model, SimpleNamespace(**(body.get("usage") or {})))
+        return body["choices"][0]["message"]["content"].strip()
+
+# (system message, prompt, whether a cached response may be used) per request key.
+Prompts = Dict[Hashable, Tuple[str, str, bool]]
+
+def complete_all(
+    runner: BatchRunner, cache: Optional[ResponseCache], prompts: Prompts, parse: Callable[[str], T]
+) -> Dict[Hashable, Union[T, Exception]]:
+    """Answer each prompt from the cache or one wave of batch jobs and parse the responses."""
+    results: Dict[Hashable, Union[T, Exception]] = {}
+    pending: Dict[str, Tuple[Hashable, str]] = {}
+    for key, (system, prompt, use_cache) in prompts.items():
+        cache_key = make_cache_key("openai", runner.model, system, prompt)
+        cached = cache.get(cache_key) if cache is not None and use_cache else None
+        if cached is not None:
+            try:
+                results[key] = parse(cached)
+                continue
+            except ValueError:
+                pass
+        pending[f"request-{len(pending)}"] = (key, cache_key)
+
+    requests = [
+        BatchRequest(custom_id, prompts[key][0], prompts[key][1]) for custom_id, (key, _) in pending.items()
+    ]
+    for custom_id, content in runner.run(requests).items():
+        key, cache_key = pending[custom_id]
+        if isinstance(content, Exception):
+            results[key] = content
+            continue
+        try:
+            results[key] = parse(content)
+        except ValueError as e:
+            results[key] = e
+            continue
+        if cache is not None:
+            cache.set(cache_key, content)
+    return results
+
+def _analyze_wave(
+    runner: BatchRunner,
+    cache: Optional[ResponseCache],
+    texts: Dict[int, str],
+    feedback: Dict[int, Optional[str]],
+    use_cache: bool,
+    retry: bool
+) -> Dict[int, Union[DocumentAnalysis, Exception]]:
+    plans = {index: _build_prompts(text) for index, text in texts.items()}
+    # Chunk results carry no feedback, so retries may reuse them.
+    final_cache = use_cache and not retry
+    prompts: Prompts = {}
+    for index, doc_prompts in plans.items():
+        if len(doc_prompts) == 1:
+            prompts[index] = (SYSTEM_MESSAGE, _with_feedback(doc_prompts[0], feedback[index]), final_cache)
+        else:
+            for part, prompt in enumerate(doc_prompts):
+                prompts[(index, part)] = (SYSTEM_MESSAGE, prompt, use_cache)
+    answers = complete_all(runner, cache, prompts, _parse)
+
+    analyses: Dict[int, Union[DocumentAnalysis, Exception]] = {}
+    merges: Prompts = {}
+    for index, doc_prompts in plans.items():
+        if len(doc_prompts) == 1:
+            analyses[index] = answers[index]
+            continue
+        partials = [answers[(index, part)] for part in range(len(doc_prompts))]
+        error = next((partial for partial in partials if isinstance(partial, Exception)), None)
+        if error is not None:
+            analyses[index] = error
+            continue
+        with stage("prompt_build"):
+            merges[index] = (SYSTEM_MESSAGE, _with_feedback(build_merge_prompt(partials), feedback[index]), final_cache)
+    analyses.update(complete_all(runner, cache, merges, _parse))
+    return analyses
+
+def _evaluate_wave(
+    runner: BatchRunner,
+    cache: Optional[ResponseCache],
+    analyses: Dict[int, DocumentAnalysis],
+    texts: Dict[int, str]
+) -> Dict[int, Union[EvaluationResult, Exception]]:
+    with stage("evaluate"):
+        verdicts: Dict[int, Union[EvaluationResult, Exception]] = {}
+        prompts: Prompts = {}
+        for index, analysis in analyses.items():
+            verdict = _local_verdict(analysis, texts[index])
+            if verdict is not None:
+                verdicts[index] = verdict
+            else:
+                prompts[index] = (EVALUATION_SYSTEM_MESSAGE, build_evaluation_prompt(analysis), True)
+        verdicts.update(complete_all(runner, cache, prompts, _parse_evaluation))
+        return verdicts
+
+def run_batch_pipeline(
+    texts: List[str],
+    runner: Optional[BatchRunner] = None,
+    cache: Optional[ResponseCache] = None,
+    max_retries: Optional[int] = None,
+    use_cache: bool = True
+) -> List[Union[DocumentAnalysis, Exception]]:
+    """Analyze, evaluate and retry many documents as waves of batch jobs.
+
+    Returns the accepted (or last) analysis of each document, or the error
+    that stopped it, in the order of ``texts``.
+    """
+    runner = runner or BatchRunner()
+    cache = cache if cache is not None else get_response_cache()
+    rounds = 1 + max(0, settings["MAX_RETRIES"] if max_retries is None else max_retries)
+    results: Dict[int, Union[DocumentAnalysis, Exception]] = {}
+    feedback: Dict[int, Optional[str]] = {index: None for index in range(len(texts))}
+    for attempt in range(rounds):
+        with stage("retry" if attempt else "analyze"):
+            analyses = _analyze_wave(
+                runner, cache, {index: texts[index] for index in feedback}, feedback, use_cache, attempt > 0
+            )
+        if attempt == rounds - 1:
+            results.update(analyses)
+            break
+
+        verdicts = _evaluate_wave(
+            runner, cache,
+            {index: analysis for index, analysis in analyses.items() if not isinstance(analysis, Exception)},
+            {index: texts[index] for index in analyses}
+        )
+        feedback = {}
+        for index, analysis in analyses.items():
+            verdict = verdicts.get(index, analysis)
+            if isinstance(verdict, Exception):
+                results[index] = verdict
+            elif verdict.is_acceptable:
+                results[index] = analysis
+            else:
+                feedback[index] = verdict.feedback
+        if not feedback:
+            break
+        logger.info(f"{len(feedback)} of {len(analyses)} analyses were rejected, retrying")
+    return [results[index] for index in range(len(texts))]
@@ -0,0 +1,142 @@
+"""Process-wide registry of pooled LLM clients.
+
+Constructing an SDK client creates a new HTTP connection pool, so every
+request that builds its own client pays for fresh TCP and TLS handshakes.
+The registry creates one client per (provider, API key, base URL) on first
+use and hands the same instance to every caller so keep-alive connections
+are reused across requests.
+
+SDK-level retries are disabled; ``rate_limiter`` retries throttled and failed
+requests itself so backoff and concurrency stay under one controller.
+
+Each SDK is imported when its first client is created, so a process
+that only talks to one provider never loads the other SDK.
+"""
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import threading
+import weakref
+from ..config import settings
+
+if TYPE_CHECKING:
+    import anthropic
+    import openai
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients: Dict[Tuple, Any] = {}
+# Async clients hold connections bound to the event loop that opened them,
+# so they are registered per loop and dropped when the loop goes away.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def _limits(sdk: Any) -> Any:
+    # Built from the SDK's own limits type so it matches the HTTP library the SDK ships with.
+    return type(sdk.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=settings["LLM_MAX_CONNECTIONS"],
+        max_keepalive_connections=settings["LLM_MAX_KEEPALIVE_CONNECTIONS"],
+        keepalive_expiry=settings["LLM_KEEPALIVE_EXPIRY"],
+    )
+
+def _timeout(sdk: Any) -> Any:
+    return sdk.Timeout(settings["LLM_TIMEOUT"], connect=settings["LLM_CONNECT_TIMEOUT"])
+
+def _get_or_create(key: Tuple, factory: Callable[[], Any]) -> Any:
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            logger.info(f"Creating pooled {key[0]} client")
+            client = _clients[key] = factory()
+        return client
+
+def _get_or_create_async(key: Tuple, factory: Callable[[], Any]) -> Any:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            logger.info(f"Creating pooled {key[0]} client")
+            client = clients[key] = factory()
+        return client
+
+def get_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> "openai.OpenAI":
+    """Return the shared OpenAI client for this API key and base URL."""
+    import openai
+    api_key = api_key or settings["OPENAI_API_KEY"]
+    base_url = base_url or settings["OPENAI_BASE_URL"]
+    return _get_or_create(
+        ("openai", api_key, base_url),
+        lambda: openai.OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=_timeout(openai),
+            max_retries=0,
+            http_client=openai.DefaultHttpxClient(limits=_limits(openai), timeout=_timeout(openai)),
+        ),
+    )
+
+def get_async_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> "openai.AsyncOpenAI":
+    """Return the shared AsyncOpenAI client for the running event loop.
+
+    Must be called from inside a running event loop.
+    """
+    import openai
+    api_key = api_key or settings["OPENAI_API_KEY"]
+    base_url = base_url or settings["OPENAI_BASE_URL"]
+    return _get_or_create_async(
+        ("openai-async", api_key, base_url),
+        lambda: openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=_timeout(openai),
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(limits=_limits(openai), timeout=_timeout(openai)),
+        ),
+    )
+
+def get_anthropic_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> "anthropic.Anthropic":
+    """Return the shared Anthropic client for this API key and base URL."""
+    import anthropic
+    api_key = api_key or settings["anthropic_api_key"]
+    return _get_or_create(
+        ("anthropic", api_key, base_url),
+        lambda: anthropic.Anthropic(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=_timeout(anthropic),
+            max_retries=0,
+            http_client=anthropic.DefaultHttpxClient(limits=_limits(anthropic), timeout=_timeout(anthropic)),
+        ),
+    )
+
+def get_async_anthropic_client(
+    api_key: Optional[str] = None, base_url: Optional[str] = None
+) -> "anthropic.AsyncAnthropic":
+    """Return the shared AsyncAnthropic client for the running event loop.
+
+    Must be called from inside a running event loop.
+    """
+    import anthropic
+    api_key = api_key or settings["anthropic_api_key"]
+    return _get_or_create_async(
+        ("anthropic-async", api_key, base_url),
+        lambda: anthropic.AsyncAnthropic(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=_timeout(anthropic),
+            max_retries=0,
+            http_client=anthropic.DefaultAsyncHttpxClient(limits=_limits(anthropic), timeout=_timeout(anthropic)),
+        ),
+    )
+
+def clear_clients() -> None:
+    """Close and forget every registered synchronous client."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _async_clients.clear()
+    for client in clients:
+        client.close()
@@ -1,27 +1,114 @@
-from typing import Optional
-import openai
+from typing import TYPE_CHECKING, Optional
 from ..models.schemas import DocumentAnalysis, EvaluationResult
 from ..utils.json_utils import parse_json_response
 from ..prompts.templates import build_evaluation_prompt
 from ..config import settings
+from ..utils.metrics import stage
+from .clients import get_async_openai_client, get_openai_client
+from .router import (
+    Backend, aroute, arequest, default_backends, get_async_backend_client, get_backend_client, request, route
+)
+from .rule_evaluator import rule_verdict
+from .response_cache import ResponseCache, acached_call, cached_call, get_response_cache, make_cache_key
+
+if TYPE_CHECKING:
+    import openai
+
+SYSTEM_MESSAGE = "You are a quality evaluator for document analysis outputs."
+
+def _cache_key(prompt: str, backend: Backend) -> str:
+    return make_cache_key(backend.provider, backend.model, SYSTEM_MESSAGE, prompt)
+
+def _parse(content: str) -> EvaluationResult:
+    return parse_json_response(content, EvaluationResult)
+
+def check_analysis(result: DocumentAnalysis) -> Optional[EvaluationResult]:
+    """Reject analyses with obviously missing content without asking the LLM.
+
+    Returns a rejection with feedback, or None if the analysis needs a full evaluation.
+    """
+    problems = []
+    if not result.summary.strip():
+        problems.append("The summary is empty.")
+    if not any(topic.strip() for topic in result.key_topics):
+        problems.append("No key topics were identified.")
+    if not any(risk.strip() for risk in result.risks_or_issues):
+        problems.append("No risks or issues were identified.")
+    if not problems:
+        return None
+    return EvaluationResult(is_acceptable=False, feedback=" ".join(problems))
+
+def _local_verdict(result: DocumentAnalysis, source_text: Optional[str]) -> Optional[EvaluationResult]:
+    verdict = check_analysis(result)
+    if verdict is None and settings["RULE_EVALUATION"]:
+        with stage("rule_evaluate"):
+            verdict = rule_verdict(result, source_text)
+    return verdict
 
 class DocumentEvaluator:
-    def __init__(self):
-        self.client = openai.OpenAI()
+    def __init__(self, client: Optional["openai.OpenAI"] = None, cache: Optional[ResponseCache] = None):
+        self._client = client
+        self.cache = cache if cache is not None else get_response_cache()
+    
+    @property
+    def client(self) -> "openai.OpenAI":
+        """The OpenAI client, taken from the shared registry on first use."""
+        if self._client is None:
+            self._client = get_openai_client()
+        return self._client
+    
+    def evaluate(
+        self, result: DocumentAnalysis, use_cache: bool = True, source_text: Optional[str] = None
+    ) -> EvaluationResult:
+        """Evaluate the document analysis output.
+
+        Analyses that fail ``check_analysis``, or that the rule-based scorer
+        judges clearly good or clearly poor, are settled without an LLM call.
+        ``source_text`` lets the scorer check overlap with the document.
+        """
+        with stage("evaluate"):
+            verdict = _local_verdict(result, source_text)
+            if verdict is not None:
+                return verdict
+            prompt = build_evaluation_prompt(result)
+            return route(default_backends(), lambda backend: cached_call(
+                self.cache, _cache_key(prompt, backend), lambda: self._complete(prompt, backend), _parse, use_cache
+            ))
+    
+    def _complete(self, prompt: str, backend: Backend) -> str:
+        client = self.client if backend.provider == "openai" else get_backend_client(backend.provider)
+        return request(client, backend, SYSTEM_MESSAGE, prompt)
+
+class AsyncDocumentEvaluator:
+    """Asyncio counterpart of ``DocumentEvaluator`` built on ``"openai.AsyncOpenAI"``."""
+
+    def __init__(self, client: Optional["openai.AsyncOpenAI"] = None, cache: Optional[ResponseCache] = None):
+        self._client = client
+        self.cache = cache if cache is not None else get_response_cache()
+    
+    @property
+    def client(self) -> "openai.AsyncOpenAI":
+        """The AsyncOpenAI client, taken from the shared registry for the running loop."""
+        return self._client or get_async_openai_client()
+    
+    async def evaluate(
+        self, result: DocumentAnalysis, use_cache: bool = True, source_text: Optional[str] = None
+    ) -> EvaluationResult:
+        """Evaluate the document analysis output.
+
+        Analyses that fail ``check_analysis``, or that the rule-based scorer
+        judges clearly good or clearly poor, are settled without an LLM call.
+        ``source_text`` lets the scorer check overlap with the document.
+        """
+        with stage("evaluate"):
+            verdict = _local_verdict(result, source_text)
+            if verdict is not None:
+                return verdict
+            prompt = build_evaluation_prompt(result)
+            return await aroute(default_backends(), lambda backend: acached_call(
+                self.cache, _cache_key(prompt, backend), lambda: self._complete(prompt, backend), _parse, use_cache
+            ))
     
-    def evaluate(self, result: DocumentAnalysis) -> EvaluationResult:
-        """Evaluate the document analysis output."""
-        prompt = build_evaluation_prompt(result)
-        
-        response = self.client.chat.completions.create(
-            model=settings["MODEL_NAME"],
-            messages=[
-                {"role": "system", "content": "You are a quality evaluator for document analysis outputs."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        return parse_json_response(
-            response.choices[0].message.content,
-            EvaluationResult
-        ) 
\ No newline at end of file
+    async def _complete(self, prompt: str, backend: Backend) -> str:
+        client = self.client if backend.provider == "openai" else get_async_backend_client(backend.provider)
+        return await arequest(client, backend, SYSTEM_MESSAGE, prompt)
@@ -0,0 +1,130 @@
+"""Content-addressed on-disk cache of extracted PDF page text."""
+from typing import List, Optional
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from ..config import settings
+from ..utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    key TEXT PRIMARY KEY,
+    pages BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+def cache_key(data: bytes, extractor_version: str) -> str:
+    """Build the cache key for a PDF from its bytes and the extractor version."""
+    return f"{hashlib.sha256(data).hexdigest()}:{extractor_version}"
+
+class ExtractionCache:
+    """SQLite-backed cache mapping a PDF content hash to its per-page text.
+
+    Page text is stored zlib-compressed. When the stored size exceeds
+    ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached pages for ``key``, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE extractions SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key: str, pages: List[str]) -> None:
+        """Store the pages for ``key`` and evict old entries if over budget."""
+        blob = zlib.compress(json.dumps(pages).encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, pages, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM extractions ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+            total -= size
+            logger.debug(f"Evicted extraction cache entry {key}")
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM extractions")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size_bytes": size}
+
+_default_cache: Optional[ExtractionCache] = None
+_default_lock = threading.Lock()
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Return the process-wide extraction cache, or None if it is disabled."""
+    global _default_cache
+    path = settings["EXTRACTION_CACHE_PATH"]
+    if not path:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = ExtractionCache(
+                    path, max_bytes=settings["EXTRACTION_CACHE_MAX_MB"] * 1024 * 1024
+                )
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Extraction cache disabled: {str(e)}")
+                return None
+        return _default_cache
+
+def _collect_metrics():
+    cache = _default_cache
+    if cache is None:
+        return []
+    return [
+        ("cache_hits_total", {"cache": "extraction"}, cache.hits),
+        ("cache_misses_total", {"cache": "extraction"}, cache.misses),
+    ]
+
+REGISTRY.register_collector(_collect_metrics)
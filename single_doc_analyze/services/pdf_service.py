@@ -1,28 +1,379 @@
-from typing import BinaryIO
-from pypdf import PdfReader
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterator, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from io import BytesIO
+import hashlib
 import logging
+import mmap
+import os
+from ..config import settings
+from ..utils.chunking import PAGE_BREAK
+from ..utils.metrics import stage
+from ..utils.preprocess import compress_pages
+from .text_spool import TextSpool, current_rss_mb
+from .extraction_cache import ExtractionCache, cache_key, get_extraction_cache
+from .version_store import DocumentVersionStore, get_version_store
+
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+    from pypdf.generic import DictionaryObject
 
 logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(pdf_file: BinaryIO) -> str:
+# Bump whenever extraction output changes so cached results are invalidated.
+EXTRACTOR_VERSION = "2"
+# Documents with at least this many pages are extracted across a process pool.
+PARALLEL_PAGE_THRESHOLD = 64
+# Number of consecutive pages handed to a worker per task.
+PAGES_PER_TASK = 16
+
+PdfSource = Union[str, os.PathLike, BinaryIO]
+
+# Resource streams that cannot change the extracted text and are expensive to decode.
+_SKIPPED_STREAMS = {"/FontFile", "/FontFile2", "/FontFile3"}
+
+_worker_reader: Optional["PdfReader"] = None
+
+def _read_pdf_bytes(pdf_file: PdfSource) -> bytes:
+    """Read the raw bytes of a PDF given as a path or a file-like object."""
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if hasattr(pdf_file, "seek"):
+        pdf_file.seek(0)
+    return pdf_file.read()
+
+@contextmanager
+def _open_source(pdf_file: PdfSource) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Yield the PDF's data, memory-mapped when it is backed by a file on disk.
+
+    A mapping is paged in by the OS as pypdf reads it instead of being copied
+    onto the heap. In-memory uploads (and empty files, which cannot be
+    mapped) fall back to reading the bytes.
+    """
+    with ExitStack() as stack:
+        if isinstance(pdf_file, (str, os.PathLike)):
+            pdf_file = stack.enter_context(open(pdf_file, "rb"))
+        try:
+            data = mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            yield _read_pdf_bytes(pdf_file)
+            return
+        with data:
+            yield data
+
+def _source_path(pdf_file: PdfSource) -> Optional[str]:
+    """The file a PDF lives in, if any, so worker processes can map it themselves."""
+    if isinstance(pdf_file, (str, os.PathLike)):
+        return os.fspath(pdf_file)
+    name = getattr(pdf_file, "name", None)
+    return name if isinstance(name, str) and os.path.isfile(name) else None
+
+def _reader(data: Union[bytes, mmap.mmap]) -> "PdfReader":
+    from pypdf import PdfReader
+    return PdfReader(data if isinstance(data, mmap.mmap) else BytesIO(data))
+
+def _over_rss_ceiling() -> bool:
+    return 0 < settings["MAX_RSS_MB"] < current_rss_mb()
+
+def _init_worker(source: Union[str, bytes]) -> None:
+    """Parse the PDF once per worker process, mapping it when given its path."""
+    global _worker_reader
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_reader = _reader(source)
+
+def _extract_page_range(start: int, stop: int) -> List[str]:
+    """Extract the text of pages ``[start, stop)`` inside a worker process."""
+    return [_worker_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _extract_pages(
+    data: Union[bytes, mmap.mmap],
+    workers: Optional[int],
+    parallel_threshold: int,
+    path: Optional[str] = None,
+    reader: Optional["PdfReader"] = None,
+) -> Iterator[str]:
+    """Extract page text from PDF data, in-process or across a process pool.
+
+    ``reader`` is an already parsed reader of ``data``, if the caller has
+    one. Worker processes map ``path`` when it is given instead of receiving
+    a copy of the data.
+    """
+    reader = reader or _reader(data)
+    page_count = len(reader.pages)
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1 or page_count < parallel_threshold:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    ranges = [
+        (first, min(first + PAGES_PER_TASK, page_count))
+        for first in range(0, page_count, PAGES_PER_TASK)
+    ]
+    workers = min(workers, len(ranges))
+    logger.info(f"Extracting {page_count} pages across {workers} processes")
+    initargs = (path or bytes(data),)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        for texts in pool.map(_extract_page_range, *zip(*ranges)):
+            yield from texts
+
+def iter_pdf_pages(
+    pdf_file: PdfSource,
+    workers: Optional[int] = None,
+    parallel_threshold: int = PARALLEL_PAGE_THRESHOLD,
+    cache: Optional[ExtractionCache] = None,
+    use_cache: bool = True,
+) -> Iterator[str]:
+    """Yield the text of each page of a PDF, in page order.
+
+    Files on disk are memory-mapped rather than read into memory. Results
+    are looked up in the extraction cache by content hash first.
+    Small documents are extracted lazily in-process. Documents with at least
+    ``parallel_threshold`` pages are split into page ranges and extracted
+    across a process pool; pages are still yielded in order.
+
+    Args:
+        pdf_file: A path or file-like object containing the PDF data
+        workers: Number of worker processes (defaults to the CPU count)
+        parallel_threshold: Minimum page count for parallel extraction
+        cache: Extraction cache to use (defaults to the process-wide cache)
+        use_cache: Set to False to bypass the extraction cache
+
+    Yields:
+        str: The extracted text of each page ("" for pages without text)
+
+    Raises:
+        ValueError: If the PDF cannot be read or text cannot be extracted
+    """
+    try:
+        with _open_source(pdf_file) as data:
+            cache = (cache or get_extraction_cache()) if use_cache else None
+            key = cache_key(data, EXTRACTOR_VERSION) if cache else None
+            cached = _cache_get(cache, key)
+            if cached is not None:
+                yield from cached
+                return
+
+            pages = []
+            for text in _extract_pages(data, workers, parallel_threshold, _source_path(pdf_file)):
+                pages.append(text)
+                yield text
+            _cache_put(cache, key, pages)
+    except Exception as e:
+        logger.error(f"Failed to extract text from PDF: {str(e)}")
+        raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+def _cache_get(cache: Optional[ExtractionCache], key: Optional[str]) -> Optional[List[str]]:
+    if cache is None:
+        return None
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"Extraction cache lookup failed: {str(e)}")
+        return None
+
+def _cache_put(cache: Optional[ExtractionCache], key: Optional[str], pages: List[str]) -> None:
+    if cache is None:
+        return
+    try:
+        cache.put(key, pages)
+    except Exception as e:
+        logger.warning(f"Extraction cache write failed: {str(e)}")
+
+def _hash_pdf_object(digest: Any, obj: Any, memo: dict, depth: int = 0) -> None:
+    """Feed a PDF object and everything it references into ``digest``.
+
+    Indirect objects (fonts, forms) are usually shared by many pages, so
+    their digests are memoized by object number.
+    """
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref not in memo:
+            memo[ref] = b""  # Guards against reference cycles.
+            sub_digest = hashlib.sha256()
+            _hash_pdf_object(sub_digest, obj.get_object(), memo, depth + 1)
+            memo[ref] = sub_digest.digest()
+        digest.update(memo[ref])
+    elif depth > 16:
+        digest.update(b"...")
+    elif isinstance(obj, StreamObject):
+        if obj.get("/Subtype") != "/Image":
+            digest.update(obj.get_data())
+        _hash_pdf_dict(digest, obj, memo, depth)
+    elif isinstance(obj, DictionaryObject):
+        _hash_pdf_dict(digest, obj, memo, depth)
+    elif isinstance(obj, ArrayObject):
+        for item in obj:
+            _hash_pdf_object(digest, item, memo, depth + 1)
+    else:
+        digest.update(repr(obj).encode())
+
+def _hash_pdf_dict(digest: Any, obj: "DictionaryObject", memo: dict, depth: int) -> None:
+    for key in sorted(obj):
+        if key not in _SKIPPED_STREAMS and key != "/Parent":
+            digest.update(key.encode())
+            _hash_pdf_object(digest, obj.raw_get(key), memo, depth + 1)
+
+def page_signature(page: Any, memo: Optional[dict] = None) -> str:
+    """Hash a page's content stream and resources (fonts, forms) without extracting its text.
+
+    Pages with the same signature extract to the same text, so the text of
+    unchanged pages can be reused across document revisions. Pass the same
+    ``memo`` for every page of a document to hash shared resources once.
+    """
+    digest = hashlib.sha256(EXTRACTOR_VERSION.encode())
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    _hash_pdf_object(digest, page.get("/Resources"), {} if memo is None else memo)
+    return digest.hexdigest()
+
+def extract_pages_incremental(pdf_file: PdfSource, store: Optional[DocumentVersionStore] = None) -> List[str]:
+    """Extract the text of each page, reusing text of pages seen in earlier versions.
+
+    Pages are matched by ``page_signature``, which is far cheaper to compute
+    than text extraction, so a revised document only pays for its edited pages.
+
+    Args:
+        pdf_file: A path or file-like object containing the PDF data
+        store: Version store to use (defaults to the process-wide store)
+
+    Returns:
+        List[str]: The extracted text of each page ("" for pages without text)
+
+    Raises:
+        ValueError: If the PDF cannot be read or text cannot be extracted
+    """
+    store = store or get_version_store()
+    if store is None:
+        with stage("pdf_extract"):
+            return list(iter_pdf_pages(pdf_file))
+    try:
+        with stage("pdf_extract"), _open_source(pdf_file) as data:
+            reader = _reader(data)
+            memo: dict = {}
+            signatures = [page_signature(page, memo) for page in reader.pages]
+            known = store.get_page_texts(signatures)
+            extracted = {}
+            pages = []
+            for page, signature in zip(reader.pages, signatures):
+                if signature not in known and signature not in extracted:
+                    extracted[signature] = page.extract_text() or ""
+                pages.append(known.get(signature, extracted.get(signature)))
+            store.put_page_texts(extracted)
+        logger.info(f"Extracted {len(extracted)} of {len(pages)} pages, reused the rest")
+        return pages
+    except Exception as e:
+        logger.error(f"Failed to extract text from PDF: {str(e)}")
+        raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+def extract_text_from_pdf(pdf_file: BinaryIO, workers: Optional[int] = None) -> str:
     """Extract text content from a PDF file.
-    
+
     Args:
         pdf_file: A file-like object containing the PDF data
-        
+        workers: Number of extraction processes (defaults to the CPU count)
+
     Returns:
         str: The extracted text content
-        
+
+    Raises:
+        ValueError: If the PDF cannot be read or text cannot be extracted
+    """
+    with stage("pdf_extract"):
+        pages = list(iter_pdf_pages(pdf_file, workers))
+    return _join_pages(pages)
+
+def _join_pages(pages: List[str]) -> str:
+    if settings["PROMPT_COMPRESSION"]:
+        return compress_pages(pages).text
+    return PAGE_BREAK.join(text for text in pages if text).strip()
+
+def extract_document(pdf_file: PdfSource, workers: Optional[int] = None) -> Union[str, TextSpool]:
+    """Extract a PDF's text, spilling it to disk when it is too large to hold in memory.
+
+    Documents with fewer than LARGE_PDF_PAGES pages are extracted like
+    ``extract_text_from_pdf``. The text of larger ones is written to a
+    ``TextSpool`` PAGE_WINDOW pages at a time, and so is the rest of a
+    document whose extraction pushes the process above MAX_RSS_MB. Each
+    window is compressed (with PROMPT_COMPRESSION) before it is spooled.
+
+    The page count comes from the extraction cache entry or from the parse
+    that extracts the pages, so the PDF is parsed at most once. Spooled
+    documents are not added to the extraction cache, since it would hold
+    every page in memory.
+
+    Args:
+        pdf_file: A path or file-like object containing the PDF data
+        workers: Number of extraction processes (defaults to the CPU count)
+
+    Returns:
+        Union[str, TextSpool]: The extracted text, or a spool holding it
+
     Raises:
         ValueError: If the PDF cannot be read or text cannot be extracted
     """
+    threshold = settings["LARGE_PDF_PAGES"]
+    window = max(1, settings["PAGE_WINDOW"])
+    spool: Optional[TextSpool] = None
+    pages: List[str] = []
     try:
-        reader = PdfReader(pdf_file)
-        full_text = ""
-        for page in reader.pages:
-            if page.extract_text():
-                full_text += page.extract_text() + "\n"
-        return full_text.strip()
+        with stage("pdf_extract"), _open_source(pdf_file) as data:
+            cache = get_extraction_cache()
+            key = cache_key(data, EXTRACTOR_VERSION) if cache else None
+            cached = _cache_get(cache, key)
+            if cached is not None:
+                page_count, extraction = len(cached), iter(cached)
+            else:
+                reader = _reader(data)
+                page_count = len(reader.pages)
+                extraction = _extract_pages(
+                    data, workers, PARALLEL_PAGE_THRESHOLD, _source_path(pdf_file), reader=reader
+                )
+            if threshold and page_count >= threshold:
+                logger.info(f"Spooling the text of {page_count} pages to disk")
+                spool = TextSpool(settings["SPOOL_DIR"])
+
+            for text in extraction:
+                pages.append(text)
+                if len(pages) % window:
+                    continue
+                if spool is None and len(pages) < page_count and _over_rss_ceiling():
+                    logger.warning(
+                        f"RSS above {settings['MAX_RSS_MB']} MB after {len(pages)} pages, spooling the rest to disk"
+                    )
+                    spool = TextSpool(settings["SPOOL_DIR"])
+                if spool is not None:
+                    for first in range(0, len(pages), window):
+                        _spool_window(spool, pages[first:first + window])
+                    pages = []
+
+            if spool is not None and pages:
+                _spool_window(spool, pages)
+            elif spool is None and cached is None:
+                _cache_put(cache, key, pages)
     except Exception as e:
+        if spool is not None:
+            spool.close()
         logger.error(f"Failed to extract text from PDF: {str(e)}")
-        raise ValueError(f"Failed to extract text from PDF: {str(e)}") 
\ No newline at end of file
+        raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+    if spool is None:
+        return _join_pages(pages)
+    logger.info(f"Spooled {spool.chars} characters in {len(spool)} windows")
+    return spool
+
+def close_document(document: Union[str, List[str], TextSpool]) -> None:
+    """Release an extracted document, deleting the temporary file of a spooled one."""
+    if isinstance(document, TextSpool):
+        document.close()
+
+def _spool_window(spool: TextSpool, pages: List[str]) -> None:
+    text = _join_pages(pages)
+    if text:
+        spool.append(text)
@@ -0,0 +1,307 @@
+"""Analyze, evaluate and retry pipeline shared by the UI and batch entry points.
+
+The pipeline runs in rounds. Round 0 analyzes the document; each later round
+retries with the evaluator's feedback after every candidate of the previous
+one was rejected, up to ``MAX_RETRIES`` retries. The last round's result is returned without
+evaluation. Two settings trade extra LLM calls for lower latency:
+
+* ``PIPELINE_CANDIDATES`` races that many analyses per round and keeps the
+  first one the evaluator accepts.
+* ``SPECULATIVE_RETRY`` starts a spare analysis with the round's prompt as
+  soon as its first result goes to the evaluator. If that result is
+  rejected, the spare is evaluated while the retry runs and is kept if
+  accepted, which saves the retry's evaluation round-trip.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+import asyncio
+import logging
+from ..config import settings
+from ..models.schemas import DocumentAnalysis
+from ..utils.json_stream import StreamUpdate
+from ..utils.metrics import bind_context, stage
+from .analyzer import AsyncDocumentAnalyzer, DocumentAnalyzer
+from .evaluator import AsyncDocumentEvaluator, DocumentEvaluator
+from .text_spool import TextSpool
+
+logger = logging.getLogger(__name__)
+
+Document = Union[str, List[str], TextSpool]
+
+class PipelinePlan(NamedTuple):
+    """How many rounds to run, how many candidates per round and whether to speculate."""
+    rounds: int
+    candidates: int
+    speculative: bool
+
+def make_plan(
+    max_retries: Optional[int] = None, candidates: Optional[int] = None, speculative: Optional[bool] = None
+) -> PipelinePlan:
+    """Fill unset pipeline options from settings."""
+    return PipelinePlan(
+        rounds=1 + max(0, settings["MAX_RETRIES"] if max_retries is None else max_retries),
+        candidates=max(1, settings["PIPELINE_CANDIDATES"] if candidates is None else candidates),
+        speculative=settings["SPECULATIVE_RETRY"] if speculative is None else speculative,
+    )
+
+def _source_text(document: Document) -> Optional[str]:
+    # A spooled document is too large to load for the evaluator's overlap check.
+    if isinstance(document, TextSpool):
+        return None
+    return document if isinstance(document, str) else "\n".join(document)
+
+def _analyze(analyzer, document: Document, feedback: Optional[str], doc_id: Optional[str], use_cache: bool = True):
+    # A list of pages is analyzed incrementally against earlier versions of the document.
+    if isinstance(document, str):
+        return analyzer.analyze(document, feedback, use_cache)
+    if isinstance(document, TextSpool):
+        return analyzer.analyze_spool(document, feedback, use_cache)
+    return analyzer.analyze_pages(document, doc_id, feedback, use_cache)
+
+class _PromptTracker:
+    """Allows the response cache only the first time a run sends a prompt.
+
+    Extra candidates, speculative retries and retries with repeated feedback
+    resend an earlier prompt; a cached response would replay the same analysis.
+    """
+
+    def __init__(self):
+        self._seen: Set[Optional[str]] = set()
+
+    def first_use(self, feedback: Optional[str]) -> bool:
+        if feedback in self._seen:
+            return False
+        self._seen.add(feedback)
+        return True
+
+class _Rounds:
+    """Which round each analysis belongs to, and when the next round is due.
+
+    The next round starts once every candidate of the latest round was
+    rejected or failed, with the first feedback given in that round.
+    Speculative spares are not waited for, but their feedback counts.
+    """
+
+    def __init__(self, max_rounds: int):
+        self.max_rounds = max_rounds
+        # Analysis -> (round, its feedback, whether it is a candidate rather than a spare).
+        self.analyses: Dict[Any, Tuple[int, Optional[str], bool]] = {}
+        # Evaluation -> (round, the analysis evaluated, whether it is a candidate).
+        self.evaluations: Dict[Any, Tuple[int, DocumentAnalysis, bool]] = {}
+        self._outstanding: List[int] = []
+        self._feedback: List[Optional[str]] = []
+        self._spared: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._outstanding)
+
+    def add(self, attempt: int, feedback: Optional[str], analyses: list, spare: bool = False) -> None:
+        if spare:
+            self._spared.add(attempt)
+        else:
+            self._outstanding.append(len(analyses))
+            self._feedback.append(None)
+        self.analyses.update(dict.fromkeys(analyses, (attempt, feedback, not spare)))
+
+    def spared(self, attempt: int) -> bool:
+        return attempt in self._spared
+
+    def settle(self, attempt: int, candidate: bool, feedback: Optional[str] = None) -> Optional[str]:
+        """Record a rejected or failed analysis; return the feedback if the next round is due."""
+        if candidate:
+            self._outstanding[attempt] -= 1
+        if self._feedback[attempt] is None:
+            self._feedback[attempt] = feedback
+        # Rejections in a round that was already retried are ignored.
+        if attempt + 1 == len(self) < self.max_rounds and self._outstanding[attempt] == 0:
+            return self._feedback[attempt]
+        return None
+
+def run_pipeline(
+    text: Document,
+    analyzer: DocumentAnalyzer,
+    evaluator: DocumentEvaluator,
+    doc_id: Optional[str] = None,
+    max_retries: Optional[int] = None,
+    candidates: Optional[int] = None,
+    speculative: Optional[bool] = None
+) -> DocumentAnalysis:
+    """Analyze the text, evaluate the result and retry with feedback until it is accepted.
+
+    ``text`` is the document text, its list of page texts, which are
+    analyzed incrementally with ``analyze_pages``, or a ``TextSpool`` from
+    ``extract_document``, analyzed with ``analyze_spool``. Unset options default
+    to ``MAX_RETRIES``, ``PIPELINE_CANDIDATES`` and ``SPECULATIVE_RETRY``.
+    """
+    plan = make_plan(max_retries, candidates, speculative)
+    source_text = _source_text(text)
+    # Two overlapping rounds of candidates and their evaluations, plus a spare.
+    executor = ThreadPoolExecutor(max_workers=3 * plan.candidates + 2)
+
+    prompts = _PromptTracker()
+    rounds = _Rounds(plan.rounds)
+
+    def analyze(attempt: int, feedback: Optional[str], use_cache: bool) -> DocumentAnalysis:
+        with stage("retry" if attempt else "analyze"):
+            return _analyze(analyzer, text, feedback, doc_id, use_cache)
+
+    evaluate = bind_context(partial(evaluator.evaluate, source_text=source_text))
+
+    def start(attempt: int, feedback: Optional[str], spare: bool = False) -> List[Future]:
+        futures = [
+            executor.submit(bind_context(analyze), attempt, feedback, prompts.first_use(feedback))
+            for _ in range(1 if spare else plan.candidates)
+        ]
+        rounds.add(attempt, feedback, futures, spare)
+        return futures
+
+    try:
+        pending = set(start(0, None))
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in rounds.evaluations:
+                    attempt, result, candidate = rounds.evaluations.pop(future)
+                    evaluation = future.result()
+                    if evaluation.is_acceptable:
+                        return result
+                    feedback = rounds.settle(attempt, candidate, evaluation.feedback)
+                else:
+                    attempt, prompt_feedback, candidate = rounds.analyses.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        error = error or e
+                        feedback = rounds.settle(attempt, candidate)
+                    else:
+                        if attempt == plan.rounds - 1:
+                            return result
+                        if plan.speculative and not rounds.spared(attempt):
+                            pending.update(start(attempt, prompt_feedback, spare=True))
+                        evaluation_future = executor.submit(evaluate, result)
+                        rounds.evaluations[evaluation_future] = (attempt, result, candidate)
+                        pending.add(evaluation_future)
+                        continue
+                if feedback is not None:
+                    logger.info(f"Analysis attempt {len(rounds)} was rejected, retrying")
+                    pending.update(start(len(rounds), feedback))
+        raise error
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def run_pipeline_async(
+    text: Document,
+    analyzer: AsyncDocumentAnalyzer,
+    evaluator: AsyncDocumentEvaluator,
+    doc_id: Optional[str] = None,
+    max_retries: Optional[int] = None,
+    candidates: Optional[int] = None,
+    speculative: Optional[bool] = None
+) -> DocumentAnalysis:
+    """Async variant of ``run_pipeline``; losing candidates are cancelled."""
+    plan = make_plan(max_retries, candidates, speculative)
+    source_text = _source_text(text)
+    tasks: List[asyncio.Task] = []
+
+    prompts = _PromptTracker()
+    rounds = _Rounds(plan.rounds)
+
+    async def analyze(attempt: int, feedback: Optional[str], use_cache: bool) -> DocumentAnalysis:
+        with stage("retry" if attempt else "analyze"):
+            return await _analyze(analyzer, text, feedback, doc_id, use_cache)
+
+    def schedule(coroutine) -> asyncio.Task:
+        task = asyncio.ensure_future(coroutine)
+        tasks.append(task)
+        return task
+
+    def start(attempt: int, feedback: Optional[str], spare: bool = False) -> List[asyncio.Task]:
+        started = [
+            schedule(analyze(attempt, feedback, prompts.first_use(feedback)))
+            for _ in range(1 if spare else plan.candidates)
+        ]
+        rounds.add(attempt, feedback, started, spare)
+        return started
+
+    try:
+        pending = set(start(0, None))
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task in rounds.evaluations:
+                    attempt, result, candidate = rounds.evaluations.pop(task)
+                    evaluation = task.result()
+                    if evaluation.is_acceptable:
+                        return result
+                    feedback = rounds.settle(attempt, candidate, evaluation.feedback)
+                else:
+                    attempt, prompt_feedback, candidate = rounds.analyses.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        error = error or e
+                        feedback = rounds.settle(attempt, candidate)
+                    else:
+                        if attempt == plan.rounds - 1:
+                            return result
+                        if plan.speculative and not rounds.spared(attempt):
+                            pending.update(start(attempt, prompt_feedback, spare=True))
+                        evaluation_task = schedule(evaluator.evaluate(result, source_text=source_text))
+                        rounds.evaluations[evaluation_task] = (attempt, result, candidate)
+                        pending.add(evaluation_task)
+                        continue
+                if feedback is not None:
+                    logger.info(f"Analysis attempt {len(rounds)} was rejected, retrying")
+                    pending.update(start(len(rounds), feedback))
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Mark failures of discarded candidates as retrieved.
+                task.exception()
+
+def stream_pipeline(
+    text: Document,
+    analyzer: DocumentAnalyzer,
+    evaluator: DocumentEvaluator,
+    doc_id: Optional[str] = None,
+    max_retries: Optional[int] = None
+) -> Iterator[StreamUpdate[DocumentAnalysis]]:
+    """Streaming variant of ``run_pipeline`` for interactive use.
+
+    Each attempt is streamed with ``analyze_stream`` and evaluated when it
+    completes; rejected attempts are retried with feedback, one at a time.
+    Only the last update carries a ``result``. Page lists and spooled
+    documents are analyzed chunk by chunk and are not streamed.
+    """
+    plan = make_plan(max_retries, candidates=1, speculative=False)
+    source_text = _source_text(text)
+    prompts = _PromptTracker()
+    feedback: Optional[str] = None
+    for attempt in range(plan.rounds):
+        with stage("retry" if attempt else "analyze"):
+            use_cache = prompts.first_use(feedback)
+            if isinstance(text, str):
+                updates = analyzer.analyze_stream(text, feedback, use_cache)
+            else:
+                result = _analyze(analyzer, text, feedback, doc_id, use_cache)
+                updates = iter([StreamUpdate(result.model_dump(), result)])
+            for update in updates:
+                if update.result is None:
+                    yield update
+                result = update.result
+        if attempt == plan.rounds - 1:
+            break
+        evaluation = evaluator.evaluate(result, source_text=source_text)
+        if evaluation.is_acceptable:
+            break
+        logger.info(f"Analysis attempt {attempt + 1} was rejected, retrying")
+        feedback = evaluation.feedback
+        # Show the rejected attempt while the retry starts.
+        yield StreamUpdate(result.model_dump())
+    yield StreamUpdate(result.model_dump(), result)
@@ -0,0 +1,260 @@
+"""Provider-level rate limiting, adaptive concurrency and retry with backoff.
+
+Every LLM request goes through a ``RateLimiter`` for its provider and model:
+
+* two token buckets keep requests/min and tokens/min under the account limits,
+* an AIMD controller grows the number of in-flight requests by one after each
+  fast success and halves it on a 429 or a slow response,
+* retryable failures (429, 5xx, connection errors) are retried with jittered
+  exponential backoff that honors the server's Retry-After header.
+
+The SDK clients are created with ``max_retries=0`` so that retries happen
+here, where they are visible to the limiter.
+"""
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import asyncio
+import logging
+import random
+import threading
+import time
+from ..config import settings
+from ..utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+_RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError"}
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate_per_minute``.
+
+    ``reserve`` takes tokens immediately and returns how long the caller must
+    wait before using them, so it works for both threads and coroutines.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens and return the number of seconds to wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Requests larger than the bucket can never fit; charge a full bucket instead.
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class AdaptiveConcurrency:
+    """Additive-increase/multiplicative-decrease limit on in-flight requests."""
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64,
+                 latency_target: Optional[float] = None):
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        delay = 0.005
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        """Grow the limit by one per window of successes, or shrink it on slow responses."""
+        with self._condition:
+            if self.latency_target and latency > self.latency_target:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / max(self.limit, 1.0))
+            self._condition.notify_all()
+
+    def on_throttle(self) -> None:
+        """Halve the limit after the provider throttled a request."""
+        with self._condition:
+            self.limit = max(self.minimum, self.limit / 2)
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def is_rate_limited(error: Exception) -> bool:
+    return _status_code(error) == 429
+
+def is_retryable(error: Exception) -> bool:
+    """Return True for throttling, server errors and connection failures."""
+    status = _status_code(error)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return any(cls.__name__ in _RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Return the server-requested delay in seconds from a failed response, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def backoff_delay(attempt: int, server_delay: Optional[float] = None,
+                  base: float = 0.5, cap: float = 30.0) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    jittered = random.uniform(0, min(cap, base * 2 ** attempt))
+    if server_delay is not None:
+        return server_delay + jittered * 0.1
+    return jittered
+
+class RateLimiter:
+    """Rate limits, adaptive concurrency and retries for one provider and model."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int = 32,
+        max_retries: int = 5,
+        latency_target: Optional[float] = None,
+        backoff_base: float = 0.5,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(
+            initial=max(1, max_concurrency // 4), maximum=max_concurrency, latency_target=latency_target
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.throttled = 0
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Return how long to wait before retrying, or None if the error is final."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        if is_rate_limited(error):
+            self.throttled += 1
+            self.concurrency.on_throttle()
+        delay = backoff_delay(attempt, retry_after(error), base=self.backoff_base)
+        logger.warning(
+            f"{self.name} request failed ({str(error)}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+        )
+        return delay
+
+    def call(self, fn: Callable[[], T], estimated_tokens: int = 0) -> T:
+        """Run ``fn`` under the rate limits, retrying retryable failures."""
+        attempt = 0
+        while True:
+            time.sleep(self._reserve(estimated_tokens))
+            self.concurrency.acquire()
+            start = time.monotonic()
+            # Released in ``finally`` so that a cancelled call gives back its slot too;
+            # only completed calls feed the AIMD controller.
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            else:
+                self.concurrency.on_success(time.monotonic() - start)
+                return result
+            finally:
+                self.concurrency.release()
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], estimated_tokens: int = 0) -> T:
+        """Async variant of ``call`` for coroutine-based clients."""
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._reserve(estimated_tokens))
+            await self.concurrency.acquire_async()
+            start = time.monotonic()
+            # Released in ``finally`` so that a cancelled call gives back its slot too;
+            # only completed calls feed the AIMD controller.
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            else:
+                self.concurrency.on_success(time.monotonic() - start)
+                return result
+            finally:
+                self.concurrency.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, model: str) -> RateLimiter:
+    """Return the process-wide limiter for a provider and model."""
+    with _limiters_lock:
+        limiter = _limiters.get((provider, model))
+        if limiter is None:
+            # Providers without limits of their own get the OpenAI defaults.
+            prefix = provider.upper() if f"{provider.upper()}_RPM" in settings else "OPENAI"
+            limiter = _limiters[(provider, model)] = RateLimiter(
+                f"{provider}/{model}",
+                requests_per_minute=settings[f"{prefix}_RPM"],
+                tokens_per_minute=settings[f"{prefix}_TPM"],
+                max_concurrency=settings["LLM_MAX_CONCURRENCY"],
+                max_retries=settings["LLM_MAX_RETRIES"],
+                latency_target=settings["LLM_LATENCY_TARGET"] or None,
+            )
+        return limiter
+
+def clear_rate_limiters() -> None:
+    """Forget every limiter so the next call picks up fresh settings."""
+    with _limiters_lock:
+        _limiters.clear()
+
+def _collect_metrics():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [("rate_limit_throttled_total", {"limiter": limiter.name}, limiter.throttled) for limiter in limiters]
+
+REGISTRY.register_collector(_collect_metrics)
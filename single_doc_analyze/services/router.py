@@ -0,0 +1,387 @@
+"""Route LLM requests across providers by observed latency and health.
+
+A backend is a provider and model. Every request made through ``request``
+records its latency and outcome in a rolling window per backend, from which
+``rank_backends`` orders the candidates for the next request:
+
+* ``ROUTER_STRATEGY=preferred`` keeps the configured order (the default
+  backend first, then ``ROUTER_BACKENDS``) and only demotes unhealthy ones,
+* ``ROUTER_STRATEGY=fastest`` puts the healthy backend with the lowest p50
+  first, preferring the cheapest among those within ``ROUTER_LATENCY_SLACK``.
+
+A backend is unhealthy once more than ``ROUTER_MAX_ERROR_RATE`` of its recent
+requests failed. ``route`` tries the ranked backends in turn until one
+returns a valid result. With ``ROUTER_HEDGE`` a duplicate request goes to the
+next backend (or the same one, if it is the only one) when the first has
+been running longer than its p95, and the first valid result wins.
+
+Anthropic is called through its own SDK; the other providers all expose
+OpenAI-compatible endpoints and share the OpenAI client.
+
+A request's ``suffix`` (evaluator feedback) is sent after the prompt, so
+the system message and prompt form a prefix that retries repeat unchanged.
+With ``PROMPT_CACHING`` that prefix is marked for Anthropic prompt caching;
+OpenAI-compatible providers cache such prefixes on their own.
+"""
+from typing import Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, TypeVar
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+import asyncio
+import logging
+import threading
+import time
+from ..config import settings
+from ..utils.chunking import COMPLETION_TOKEN_ESTIMATE, estimate_tokens
+from ..utils.metrics import REGISTRY, bind_context, enabled, record_llm_call, stage
+from ..utils.stats import percentile
+from .clients import get_anthropic_client, get_async_anthropic_client, get_async_openai_client, get_openai_client
+from .rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# OpenAI-compatible endpoints and the settings holding their API keys
+PROVIDER_BASE_URLS = {
+    "google": "https://generativelanguage.googleapis.com/v1beta/openai/",
+    "deepseek": "https://api.deepseek.com/v1",
+    "groq": "https://api.groq.com/openai/v1",
+    "grok": "https://api.x.ai/v1",
+}
+_API_KEY_SETTINGS = {
+    "google": "google_api_key",
+    "deepseek": "deepseek_api_key",
+    "groq": "groq_api_key",
+    "grok": "grok_api_key",
+}
+PROVIDERS = ("openai", "anthropic", *PROVIDER_BASE_URLS)
+
+class Backend(NamedTuple):
+    """A provider and model; ``cost`` is its price relative to the other backends."""
+    provider: str
+    model: str
+    cost: float = 1.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+def parse_backends(spec: str) -> List[Backend]:
+    """Parse a comma-separated list of ``provider:model[=cost]`` backends."""
+    backends = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, cost = item.partition("=")
+        provider, _, model = name.strip().partition(":")
+        if provider not in PROVIDERS or not model:
+            raise ValueError(f"Invalid router backend {item!r}; expected provider:model[=cost]")
+        try:
+            backends.append(Backend(provider, model.strip(), float(cost) if cost else 1.0))
+        except ValueError as e:
+            raise ValueError(f"Invalid cost in router backend {item!r}: {str(e)}")
+    return backends
+
+def default_backends() -> List[Backend]:
+    """The configured model followed by the ``ROUTER_BACKENDS`` fallbacks."""
+    backends = [Backend("openai", settings["MODEL_NAME"])]
+    for backend in parse_backends(settings["ROUTER_BACKENDS"]):
+        if all(backend[:2] != known[:2] for known in backends):
+            backends.append(backend)
+    return backends
+
+class BackendStats:
+    """Latency and outcome of the last ``window`` requests to one backend."""
+
+    def __init__(self, window: int):
+        self._latencies = deque(maxlen=window)
+        self._failures = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            # Only successful requests count towards latency; failures often return early.
+            if ok:
+                self._latencies.append(seconds)
+            self._failures.append(not ok)
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Time the enclosed request and record whether it raised.
+
+        A cancelled request (a hedge that lost the race) is not recorded:
+        it neither succeeded nor failed, and its latency is only a lower bound.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(time.perf_counter() - start, False)
+            raise
+        self.record(time.perf_counter() - start, True)
+
+    @property
+    def samples(self) -> int:
+        return len(self._failures)
+
+    @property
+    def p50(self) -> float:
+        with self._lock:
+            return percentile(list(self._latencies), 50)
+
+    @property
+    def p95(self) -> float:
+        with self._lock:
+            return percentile(list(self._latencies), 95)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return sum(self._failures) / len(self._failures) if self._failures else 0.0
+
+    def healthy(self) -> bool:
+        """False once enough recent requests have failed."""
+        return self.samples < settings["ROUTER_MIN_SAMPLES"] or self.error_rate <= settings["ROUTER_MAX_ERROR_RATE"]
+
+_stats: Dict[tuple, BackendStats] = {}
+_stats_lock = threading.Lock()
+
+def get_backend_stats(backend: Backend) -> BackendStats:
+    """Return the process-wide rolling statistics of a backend."""
+    with _stats_lock:
+        stats = _stats.get(backend[:2])
+        if stats is None:
+            stats = _stats[backend[:2]] = BackendStats(settings["ROUTER_WINDOW"])
+        return stats
+
+def clear_backend_stats() -> None:
+    """Forget the latency and error history of every backend."""
+    with _stats_lock:
+        _stats.clear()
+
+def rank_backends(backends: List[Backend], strategy: Optional[str] = None) -> List[Backend]:
+    """Order backends for the next request, healthy ones first."""
+    strategy = strategy or settings["ROUTER_STRATEGY"]
+    stats = {backend: get_backend_stats(backend) for backend in backends}
+    healthy = [backend for backend in backends if stats[backend].healthy()]
+    unhealthy = [backend for backend in backends if backend not in healthy]
+    if strategy == "fastest":
+        # Backends without enough samples go first so that every backend gets measured.
+        untried = [backend for backend in healthy if stats[backend].samples < settings["ROUTER_MIN_SAMPLES"]]
+        tried = sorted((backend for backend in healthy if backend not in untried), key=lambda b: stats[b].p50)
+        if tried:
+            limit = stats[tried[0]].p50 * (1 + settings["ROUTER_LATENCY_SLACK"])
+            close = sorted((backend for backend in tried if stats[backend].p50 <= limit), key=lambda b: b.cost)
+            tried = close + [backend for backend in tried if backend not in close]
+        healthy = untried + tried
+    elif strategy != "preferred":
+        raise ValueError(f"Unknown router strategy: {strategy}")
+    return healthy + unhealthy
+
+def hedge_delay(backend: Backend) -> Optional[float]:
+    """Seconds after which a request to ``backend`` is hedged, or None if not hedging."""
+    stats = get_backend_stats(backend)
+    if not settings["ROUTER_HEDGE"] or stats.samples < settings["ROUTER_MIN_SAMPLES"]:
+        return None
+    return stats.p95
+
+def _hedge_target(ranked: List[Backend], launched: int) -> Backend:
+    return ranked[launched] if launched < len(ranked) else ranked[0]
+
+def _note_hedge(primary: Backend, target: Backend, delay: float) -> None:
+    logger.info(f"{primary.name} slower than its p95 ({delay:.2f}s); hedging with {target.name}")
+    if enabled():
+        REGISTRY.inc("router_hedges_total", backend=target.name)
+
+def route(backends: List[Backend], call: Callable[[Backend], T]) -> T:
+    """Return ``call(backend)`` for the first ranked backend that succeeds.
+
+    ``call`` should raise for an invalid response so that the next backend is
+    tried. Raises the last error if every backend fails.
+    """
+    ranked = rank_backends(backends)
+    delay = hedge_delay(ranked[0])
+    if delay is None:
+        for index, backend in enumerate(ranked):
+            try:
+                return call(backend)
+            except Exception as e:
+                if index == len(ranked) - 1:
+                    raise
+                logger.warning(f"{backend.name} failed ({str(e)}); trying {ranked[index + 1].name}")
+
+    executor = ThreadPoolExecutor(max_workers=len(ranked) + 1)
+    pending = {}
+    launched = 0
+
+    def launch(backend: Backend) -> None:
+        pending[executor.submit(bind_context(call), backend)] = backend
+
+    try:
+        launch(ranked[0])
+        launched = 1
+        hedged = False
+        error: Optional[Exception] = None
+        while pending:
+            done, _ = wait(pending, timeout=None if hedged else delay, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                target = _hedge_target(ranked, launched)
+                _note_hedge(ranked[0], target, delay)
+                launch(target)
+                launched += 1
+                continue
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+                    logger.warning(f"{backend.name} failed ({str(e)})")
+            if not pending and launched < len(ranked):
+                launch(ranked[launched])
+                launched += 1
+        raise error
+    finally:
+        # The losing request is left to finish in the background.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def aroute(backends: List[Backend], call: Callable[[Backend], Awaitable[T]]) -> T:
+    """Async counterpart of ``route``; a losing hedged request is cancelled."""
+    ranked = rank_backends(backends)
+    delay = hedge_delay(ranked[0])
+    if delay is None:
+        for index, backend in enumerate(ranked):
+            try:
+                return await call(backend)
+            except Exception as e:
+                if index == len(ranked) - 1:
+                    raise
+                logger.warning(f"{backend.name} failed ({str(e)}); trying {ranked[index + 1].name}")
+
+    pending = {}
+    launched = 0
+
+    def launch(backend: Backend) -> None:
+        pending[asyncio.ensure_future(call(backend))] = backend
+
+    try:
+        launch(ranked[0])
+        launched = 1
+        hedged = False
+        error: Optional[Exception] = None
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=None if hedged else delay, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                target = _hedge_target(ranked, launched)
+                _note_hedge(ranked[0], target, delay)
+                launch(target)
+                launched += 1
+                continue
+            for task in done:
+                backend = pending.pop(task)
+                try:
+                    return task.result()
+                except Exception as e:
+                    error = e
+                    logger.warning(f"{backend.name} failed ({str(e)})")
+            if not pending and launched < len(ranked):
+                launch(ranked[launched])
+                launched += 1
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+def get_backend_client(provider: str):
+    """Return the shared SDK client for a provider."""
+    if provider == "openai":
+        return get_openai_client()
+    if provider == "anthropic":
+        return get_anthropic_client()
+    if provider not in PROVIDER_BASE_URLS:
+        raise ValueError(f"Unsupported provider: {provider}")
+    return get_openai_client(settings[_API_KEY_SETTINGS[provider]], PROVIDER_BASE_URLS[provider])
+
+def get_async_backend_client(provider: str):
+    """Return the shared async SDK client for a provider on the running event loop."""
+    if provider == "openai":
+        return get_async_openai_client()
+    if provider == "anthropic":
+        return get_async_anthropic_client()
+    if provider not in PROVIDER_BASE_URLS:
+        raise ValueError(f"Unsupported provider: {provider}")
+    return get_async_openai_client(settings[_API_KEY_SETTINGS[provider]], PROVIDER_BASE_URLS[provider])
+
+def anthropic_user_content(system: str, prompt: str, suffix: str = ""):
+    """Return the Anthropic user message content for ``prompt`` followed by ``suffix``.
+
+    With ``PROMPT_CACHING`` a prompt of at least ``PROMPT_CACHE_MIN_TOKENS``
+    (with the system message) gets a cache breakpoint, so later requests
+    starting with the same system message and prompt read it from the cache.
+    """
+    cacheable = settings["PROMPT_CACHING"] and (
+        estimate_tokens(system) + estimate_tokens(prompt) >= settings["PROMPT_CACHE_MIN_TOKENS"]
+    )
+    if not cacheable and not suffix:
+        return prompt
+    blocks = [{"type": "text", "text": prompt}]
+    if cacheable:
+        blocks[0]["cache_control"] = {"type": "ephemeral"}
+    if suffix:
+        blocks.append({"type": "text", "text": suffix})
+    return blocks
+
+def _create(client, backend: Backend, system: str, prompt: str, suffix: str = ""):
+    if backend.provider == "anthropic":
+        return client.messages.create(
+            model=backend.model,
+            max_tokens=COMPLETION_TOKEN_ESTIMATE,
+            system=system,
+            messages=[{"role": "user", "content": anthropic_user_content(system, prompt, suffix)}]
+        )
+    # Sent as one string, the prompt is a byte-identical prefix of every retry's message.
+    return client.chat.completions.create(
+        model=backend.model,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt + suffix}
+        ]
+    )
+
+def _content(backend: Backend, response) -> str:
+    record_llm_call(backend.provider, backend.model, getattr(response, "usage", None))
+    if backend.provider == "anthropic":
+        return response.content[0].text.strip()
+    return response.choices[0].message.content.strip()
+
+def _estimated_tokens(system: str, prompt: str) -> int:
+    return estimate_tokens(system) + estimate_tokens(prompt) + COMPLETION_TOKEN_ESTIMATE
+
+def request(client, backend: Backend, system: str, prompt: str, suffix: str = "") -> str:
+    """Send one completion request to ``backend`` and return the response text."""
+    with stage("llm_wait"), get_backend_stats(backend).track():
+        response = get_rate_limiter(backend.provider, backend.model).call(
+            lambda: _create(client, backend, system, prompt, suffix), _estimated_tokens(system, prompt + suffix)
+        )
+    return _content(backend, response)
+
+async def arequest(client, backend: Backend, system: str, prompt: str, suffix: str = "") -> str:
+    """Async counterpart of ``request``."""
+    with stage("llm_wait"), get_backend_stats(backend).track():
+        response = await get_rate_limiter(backend.provider, backend.model).acall(
+            lambda: _create(client, backend, system, prompt, suffix), _estimated_tokens(system, prompt + suffix)
+        )
+    return _content(backend, response)
+
+def _collect_metrics():
+    with _stats_lock:
+        items = [(Backend(*key), stats) for key, stats in _stats.items()]
+    samples = []
+    for backend, stats in items:
+        samples.append(("router_latency_seconds", {"backend": backend.name, "quantile": "0.5"}, stats.p50))
+        samples.append(("router_latency_seconds", {"backend": backend.name, "quantile": "0.95"}, stats.p95))
+        samples.append(("router_error_rate", {"backend": backend.name}, stats.error_rate))
+    return samples
+
+REGISTRY.register_collector(_collect_metrics)
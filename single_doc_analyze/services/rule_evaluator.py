@@ -0,0 +1,188 @@
+"""Deterministic, CPU-only pre-evaluation of document analyses.
+
+``score_analysis`` rates an analysis on the criteria of the LLM evaluation
+prompt that can be checked locally:
+
+* all four sections are present,
+* each list has a useful number of items,
+* items are specific (not duplicated, not generic filler),
+* the summary has a sensible number of sentences,
+* key topics and risks use words that appear in the source document.
+
+``rule_verdict`` accepts clearly good analyses and rejects clearly poor ones,
+including any with a section that has no specific entries or topics that do
+not appear in the document; borderline scores return None so the caller can
+escalate to the LLM evaluator.
+"""
+from typing import Dict, List, NamedTuple, Optional
+import re
+from ..config import settings
+from ..models.schemas import DocumentAnalysis, EvaluationResult
+
+WEIGHTS = {
+    "sections": 0.3,
+    "list_lengths": 0.15,
+    "specificity": 0.25,
+    "summary": 0.1,
+    "overlap": 0.2,
+}
+
+# Items matching these (after normalization) say nothing about the document.
+GENERIC_PHRASES = {
+    "n/a", "na", "none", "nothing", "unknown", "various", "misc", "miscellaneous", "other", "tbd",
+    "general", "document", "the document", "risks", "issues", "actions", "topics", "no risks",
+    "no issues", "review the document", "read the document", "read carefully", "consult an expert",
+    "consult a lawyer", "seek advice", "be careful", "take action", "follow up", "monitor", "...",
+}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "may", "not", "of", "on", "or", "that", "the", "their", "this", "to", "was", "were", "will",
+    "with", "without", "lack", "clear", "unclear", "potential", "possible", "risk", "risks", "issue",
+    "issues", "missing", "no",
+}
+
+MIN_ITEMS = 2
+MAX_ITEMS = 10
+# Topics may be single words; risks and actions need enough words to be specific.
+MIN_ITEM_WORDS = {"key topics": 1, "risks or issues": 2, "recommended actions": 2}
+STEM_LENGTH = 5
+# Share of key topic and risk terms found in the source below which they look off-topic,
+# and below which the analysis is rejected outright.
+MIN_OVERLAP = 0.4
+OFF_TOPIC_OVERLAP = 0.15
+MIN_SUMMARY_SENTENCES = 2
+MAX_SUMMARY_SENTENCES = 6
+
+_WORD = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+_SENTENCE_END = re.compile(r"[.!?](?:\s|$)")
+
+class RuleScore(NamedTuple):
+    """Overall score in [0, 1], the per-criterion scores and the problems found."""
+    score: float
+    criteria: Dict[str, float]
+    problems: List[str]
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+def _stem(word: str) -> str:
+    # A fixed-length prefix is a crude but dependency-free stand-in for stemming
+    # ("renewal"/"renews", "terminate"/"termination").
+    return word[:STEM_LENGTH]
+
+def _normalize(item: str) -> str:
+    return " ".join(_words(item)) or item.strip().lower()
+
+def _is_generic(item: str, min_words: int = 1) -> bool:
+    return _normalize(item) in GENERIC_PHRASES or len(_words(item)) < min_words
+
+def count_sentences(text: str) -> int:
+    """Count sentences by terminal punctuation; unterminated text counts as one."""
+    stripped = text.strip()
+    if not stripped:
+        return 0
+    return len(_SENTENCE_END.findall(stripped)) + (0 if stripped[-1] in ".!?" else 1)
+
+def score_analysis(result: DocumentAnalysis, source_text: Optional[str] = None) -> RuleScore:
+    """Score an analysis against the evaluation criteria that need no LLM.
+
+    Lexical overlap with ``source_text`` is only scored when it is given;
+    otherwise the remaining weights are rescaled.
+    """
+    problems: List[str] = []
+    lists = {
+        "key topics": [item for item in result.key_topics if item.strip()],
+        "risks or issues": [item for item in result.risks_or_issues if item.strip()],
+        "recommended actions": [item for item in result.recommended_actions if item.strip()],
+    }
+    criteria: Dict[str, float] = {}
+
+    # A section only counts as present if it has at least one specific item.
+    present = [bool(result.summary.strip())] + [
+        any(not _is_generic(item, MIN_ITEM_WORDS[name]) for item in items) for name, items in lists.items()
+    ]
+    criteria["sections"] = sum(present) / len(present)
+    if not present[0]:
+        problems.append("The summary is missing.")
+    problems.extend(
+        f"The {name} section has no specific entries." for (name, items), ok in zip(lists.items(), present[1:])
+        if not ok
+    )
+
+    length_scores = []
+    for name, items in lists.items():
+        if len(items) > MAX_ITEMS:
+            length_scores.append(0.5)
+            problems.append(f"Too many {name} ({len(items)}); keep the most important.")
+        else:
+            length_scores.append(min(len(items), MIN_ITEMS) / MIN_ITEMS)
+            if 0 < len(items) < MIN_ITEMS:
+                problems.append(f"List at least {MIN_ITEMS} {name}.")
+    criteria["list_lengths"] = sum(length_scores) / len(length_scores)
+
+    specific = 0
+    total = 0
+    for name, items in lists.items():
+        seen = set()
+        for item in items:
+            total += 1
+            normalized = _normalize(item)
+            if normalized in seen:
+                problems.append(f"Duplicate {name} entry: {item.strip()!r}.")
+            elif _is_generic(item, MIN_ITEM_WORDS[name]):
+                problems.append(f"Generic {name} entry: {item.strip()!r}; be specific.")
+            else:
+                specific += 1
+            seen.add(normalized)
+    criteria["specificity"] = specific / total if total else 0.0
+
+    sentences = count_sentences(result.summary)
+    if MIN_SUMMARY_SENTENCES <= sentences <= MAX_SUMMARY_SENTENCES:
+        criteria["summary"] = 1.0
+    else:
+        criteria["summary"] = 0.0 if sentences == 0 else 0.5
+        if sentences:
+            problems.append(
+                f"The summary has {sentences} sentence{'s' if sentences != 1 else ''}; "
+                f"use {MIN_SUMMARY_SENTENCES}-{MAX_SUMMARY_SENTENCES}."
+            )
+
+    if source_text:
+        source_stems = {_stem(word) for word in _words(source_text)}
+        terms = {
+            _stem(word)
+            for item in lists["key topics"] + lists["risks or issues"]
+            for word in _words(item)
+            if word not in STOPWORDS and len(word) > 2
+        }
+        criteria["overlap"] = len(terms & source_stems) / len(terms) if terms else 0.0
+        if terms and criteria["overlap"] < MIN_OVERLAP:
+            problems.append("Key topics and risks use few terms from the document.")
+
+    weight = sum(WEIGHTS[name] for name in criteria)
+    score = sum(WEIGHTS[name] * value for name, value in criteria.items()) / weight
+    return RuleScore(score, criteria, problems)
+
+def rule_verdict(
+    result: DocumentAnalysis,
+    source_text: Optional[str] = None,
+    accept_score: Optional[float] = None,
+    reject_score: Optional[float] = None
+) -> Optional[EvaluationResult]:
+    """Accept or reject an analysis locally, or return None if it is borderline.
+
+    Thresholds default to ``RULE_ACCEPT_SCORE`` and ``RULE_REJECT_SCORE``.
+    """
+    accept_score = settings["RULE_ACCEPT_SCORE"] if accept_score is None else accept_score
+    reject_score = settings["RULE_REJECT_SCORE"] if reject_score is None else reject_score
+    rating = score_analysis(result, source_text)
+    if rating.score >= accept_score and not rating.problems:
+        return EvaluationResult(is_acceptable=True, feedback="Passed local quality checks.")
+    if (
+        rating.score < reject_score
+        or rating.criteria["sections"] < 1.0
+        or rating.criteria.get("overlap", 1.0) < OFF_TOPIC_OVERLAP
+    ):
+        return EvaluationResult(is_acceptable=False, feedback=" ".join(rating.problems))
+    return None
@@ -0,0 +1,16 @@
+"""Text deltas from streamed chat completions."""
+from typing import Iterable, Iterator
+from ..utils.metrics import record_llm_call
+
+def openai_text_deltas(stream: Iterable, model: str) -> Iterator[str]:
+    """Yield the text of each streamed OpenAI chunk and record the final usage.
+
+    Requests should set ``stream_options={"include_usage": True}`` so the
+    last chunk reports token usage.
+    """
+    usage = None
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+    record_llm_call("openai", model, usage)
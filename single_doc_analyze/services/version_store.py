@@ -0,0 +1,273 @@
+"""Document version store for incremental re-analysis of revised documents.
+
+One SQLite file keeps:
+
+* page text keyed by a signature of the page's content stream and resources,
+  so a revised PDF only re-extracts the pages that changed,
+* per-chunk analysis results keyed by the fingerprints of the pages in the
+  chunk, so a revised document only re-analyzes the chunks that changed,
+* the page fingerprints of the latest version of each document, so the
+  changed pages can be reported.
+"""
+from difflib import SequenceMatcher
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Type, TypeVar
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pydantic import BaseModel
+from ..config import settings
+from ..utils.chunking import chunk_text, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar('M', bound=BaseModel)
+
+# On average one page in PAGES_PER_CHUNK ends a chunk, independent of its position.
+PAGES_PER_CHUNK = 8
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS page_texts ("
+    "signature TEXT PRIMARY KEY, text BLOB NOT NULL, last_access REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS chunk_results ("
+    "key TEXT PRIMARY KEY, result TEXT NOT NULL, last_access REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS documents ("
+    "doc_id TEXT PRIMARY KEY, fingerprints TEXT NOT NULL, updated REAL NOT NULL)",
+]
+
+class PageChunk(NamedTuple):
+    """A run of consecutive pages analyzed together."""
+    key: str
+    start: int
+    stop: int
+    text: str
+
+def page_fingerprint(text: str) -> str:
+    """Fingerprint page text, ignoring differences in whitespace."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+def plan_page_chunks(pages: Sequence[str], max_tokens: int, namespace: str) -> List[PageChunk]:
+    """Group consecutive pages into chunks with content-defined boundaries.
+
+    A chunk ends after a page whose fingerprint falls on a boundary, or when
+    the next page would exceed ``max_tokens``. Boundaries depend on page
+    content rather than position, so editing, inserting or deleting a page
+    only changes the chunk around it. ``namespace`` (model, prompt, ...) is
+    folded into every chunk key.
+    """
+    fingerprints = [page_fingerprint(page) for page in pages]
+    chunks: List[PageChunk] = []
+    start = 0
+    tokens = 0
+    for i, (page, fingerprint) in enumerate(zip(pages, fingerprints)):
+        page_tokens = estimate_tokens(page)
+        if i > start and tokens + page_tokens > max_tokens:
+            chunks.append(_make_chunk(pages, fingerprints, start, i, namespace))
+            start, tokens = i, 0
+        tokens += page_tokens
+        if int(fingerprint[:8], 16) % PAGES_PER_CHUNK == 0:
+            chunks.append(_make_chunk(pages, fingerprints, start, i + 1, namespace))
+            start, tokens = i + 1, 0
+    if start < len(pages):
+        chunks.append(_make_chunk(pages, fingerprints, start, len(pages), namespace))
+    return [chunk for chunk in chunks if chunk.text]
+
+def _make_chunk(pages: Sequence[str], fingerprints: List[str], start: int, stop: int, namespace: str) -> PageChunk:
+    key = hashlib.sha256(json.dumps([namespace] + fingerprints[start:stop]).encode("utf-8")).hexdigest()
+    text = "\n".join(page.strip() for page in pages[start:stop] if page.strip())
+    return PageChunk(key, start, stop, text)
+
+def changed_pages(previous: Sequence[str], current: Sequence[str]) -> List[int]:
+    """Return the indices of pages in ``current`` that are new or modified."""
+    matcher = SequenceMatcher(None, previous, current, autojunk=False)
+    return [
+        index
+        for tag, _, _, start, stop in matcher.get_opcodes()
+        if tag in ("replace", "insert")
+        for index in range(start, stop)
+    ]
+
+def document_id(pdf_file) -> Optional[str]:
+    """Best-effort stable identifier for an uploaded file or path."""
+    name = pdf_file if isinstance(pdf_file, (str, os.PathLike)) else getattr(pdf_file, "name", None)
+    return os.path.basename(os.fspath(name)) if name else None
+
+class DocumentVersionStore:
+    """SQLite-backed store of page text, chunk results and document versions.
+
+    Page text and chunk results are evicted least recently used first once
+    either table holds more than ``max_entries`` rows.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+
+    def get_page_texts(self, signatures: Sequence[str]) -> Dict[str, str]:
+        """Return the stored text for whichever of ``signatures`` are known."""
+        unique = list(dict.fromkeys(signatures))
+        found: Dict[str, str] = {}
+        with self._lock:
+            # Stay well under SQLite's limit on bound parameters.
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT signature, text FROM page_texts WHERE signature IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                found.update((signature, zlib.decompress(text).decode("utf-8")) for signature, text in rows)
+            if found:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE page_texts SET last_access = ? WHERE signature = ?",
+                        [(time.time(), signature) for signature in found],
+                    )
+        return found
+
+    def put_page_texts(self, texts: Dict[str, str]) -> None:
+        """Store extracted page text by page signature."""
+        if not texts:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO page_texts (signature, text, last_access) VALUES (?, ?, ?)",
+                [(signature, zlib.compress(text.encode("utf-8")), now) for signature, text in texts.items()],
+            )
+            self._evict("page_texts", "signature")
+
+    def get_chunk(self, key: str) -> Optional[list]:
+        """Return the stored results for a chunk, or None if it was never analyzed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM chunk_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE chunk_results SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+        return json.loads(row[0])
+
+    def put_chunk(self, key: str, results: list) -> None:
+        """Store the JSON-serializable results for a chunk."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunk_results (key, result, last_access) VALUES (?, ?, ?)",
+                (key, json.dumps(results), time.time()),
+            )
+            self._evict("chunk_results", "key")
+
+    def get_version(self, doc_id: str) -> Optional[List[str]]:
+        """Return the page fingerprints of the last recorded version of a document."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprints FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_version(self, doc_id: str, fingerprints: List[str]) -> None:
+        """Record the page fingerprints of the latest version of a document."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_id, fingerprints, updated) VALUES (?, ?, ?)",
+                (doc_id, json.dumps(fingerprints), time.time()),
+            )
+
+    def _evict(self, table: str, column: str) -> None:
+        self._conn.execute(
+            f"DELETE FROM {table} WHERE {column} IN ("
+            f"SELECT {column} FROM {table} ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        """Return the number of stored pages, chunk results and documents."""
+        with self._lock:
+            return {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("page_texts", "chunk_results", "documents")
+            }
+
+def record_version(store: Optional[DocumentVersionStore], doc_id: Optional[str], pages: Sequence[str]) -> None:
+    """Log which pages changed since the previous version of ``doc_id`` and record this one."""
+    if store is None or doc_id is None:
+        return
+    fingerprints = [page_fingerprint(page) for page in pages]
+    previous = store.get_version(doc_id)
+    if previous is not None:
+        changed = changed_pages(previous, fingerprints)
+        logger.info(f"{doc_id}: {len(changed)} of {len(pages)} pages changed since the last version")
+    store.put_version(doc_id, fingerprints)
+
+def load_chunk_results(
+    store: Optional[DocumentVersionStore], chunks: List[PageChunk], model: Type[M]
+) -> Dict[str, List[M]]:
+    """Return stored results for the chunks that were analyzed before."""
+    results: Dict[str, List[M]] = {}
+    if store is None:
+        return results
+    for chunk in chunks:
+        stored = store.get_chunk(chunk.key)
+        if stored is not None:
+            results[chunk.key] = [model.model_validate(item) for item in stored]
+    logger.info(f"Reusing {len(results)} of {len(chunks)} chunk results")
+    return results
+
+def pending_parts(chunks: List[PageChunk], results: Dict[str, list], max_tokens: int) -> List[Tuple[PageChunk, str]]:
+    """Return ``(chunk, text)`` for every part of the chunks without stored results.
+
+    A chunk is normally one part; a single page over the token budget is split further.
+    """
+    return [
+        (chunk, part)
+        for chunk in chunks
+        if chunk.key not in results
+        for part in chunk_text(chunk.text, max_tokens)
+    ]
+
+def save_chunk_results(
+    store: Optional[DocumentVersionStore],
+    parts: List[Tuple[PageChunk, str]],
+    analyses: List[M],
+    results: Dict[str, List[M]],
+) -> None:
+    """Group freshly analyzed parts by chunk, add them to ``results`` and store them."""
+    fresh: Dict[str, List[M]] = {}
+    for (chunk, _), analysis in zip(parts, analyses):
+        fresh.setdefault(chunk.key, []).append(analysis)
+    results.update(fresh)
+    if store is None:
+        return
+    for key, analyses_for_chunk in fresh.items():
+        store.put_chunk(key, [analysis.model_dump() for analysis in analyses_for_chunk])
+
+_default_store: Optional[DocumentVersionStore] = None
+_default_lock = threading.Lock()
+
+def get_version_store() -> Optional[DocumentVersionStore]:
+    """Return the process-wide version store, or None if it is disabled."""
+    global _default_store
+    path = settings["VERSION_STORE_PATH"]
+    if not path:
+        return None
+    with _default_lock:
+        if _default_store is None:
+            try:
+                _default_store = DocumentVersionStore(path, settings["VERSION_STORE_MAX_ENTRIES"])
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Document version store disabled: {str(e)}")
+                return None
+        return _default_store
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from pathlib import Path
+from single_doc_analyze.config import settings
+from single_doc_analyze.main import process_document_async, process_documents_async
+from single_doc_analyze.services.analyzer import AsyncDocumentAnalyzer
+from single_doc_analyze.services.evaluator import AsyncDocumentEvaluator
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.models.schemas import DocumentAnalysis
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+ACCEPTED = '{"is_acceptable": true, "feedback": "Good"}'
+REJECTED = '{"is_acceptable": false, "feedback": "Add more risks"}'
+
+def test_async_analyzer_returns_analysis(fake_async_openai):
+    client = fake_async_openai()
+    analyzer = AsyncDocumentAnalyzer(client=client, cache=MemoryResponseCache())
+
+    result = asyncio.run(analyzer.analyze("Some document text."))
+
+    assert isinstance(result, DocumentAnalysis)
+    assert len(client.calls) == 1
+
+def test_async_analyzer_bounds_chunk_concurrency(fake_async_openai, monkeypatch):
+    monkeypatch.setitem(settings, "CHUNK_MAX_TOKENS", 50)
+    monkeypatch.setitem(settings, "CHUNK_CONCURRENCY", 2)
+    client = fake_async_openai(delay=0.01)
+    analyzer = AsyncDocumentAnalyzer(client=client, cache=MemoryResponseCache())
+
+    asyncio.run(analyzer.analyze("\n\n".join("word " * 30 for _ in range(8))))
+
+    assert client.max_in_flight == 2
+
+def test_process_document_async_retries_rejected_analysis(fake_async_openai, monkeypatch):
+    monkeypatch.setitem(settings, "MAX_RETRIES", 1)
+    monkeypatch.setitem(settings, "RULE_EVALUATION", False)
+    analyzer = AsyncDocumentAnalyzer(client=fake_async_openai(), cache=MemoryResponseCache())
+    evaluator_client = fake_async_openai(REJECTED)
+    evaluator = AsyncDocumentEvaluator(client=evaluator_client, cache=MemoryResponseCache())
+
+    output = asyncio.run(process_document_async(str(SAMPLE_PDF), analyzer, evaluator))
+
+    assert "**Summary**" in output
+    assert len(analyzer.client.calls) == 2
+    assert "Add more risks" in analyzer.client.calls[1]["messages"][1]["content"]
+
+def test_process_documents_async_bounds_document_concurrency(fake_async_openai):
+    client = fake_async_openai(delay=0.01)
+    analyzer = AsyncDocumentAnalyzer(client=client, cache=MemoryResponseCache())
+    evaluator = AsyncDocumentEvaluator(client=fake_async_openai(ACCEPTED), cache=MemoryResponseCache())
+
+    outputs = asyncio.run(process_documents_async(
+        [str(SAMPLE_PDF)] * 6, concurrency=3, analyzer=analyzer, evaluator=evaluator
+    ))
+
+    assert len(outputs) == 6
+    assert all("**Summary**" in output for output in outputs)
+    assert client.max_in_flight == 3
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import shutil
+import pytest
+from pathlib import Path
+from single_doc_analyze.batch import find_documents, load_completed, run_batch
+from single_doc_analyze.services.analyzer import AsyncDocumentAnalyzer
+from single_doc_analyze.services.evaluator import AsyncDocumentEvaluator
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.utils.stats import percentile
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+ACCEPTED = '{"is_acceptable": true, "feedback": "Good"}'
+
+@pytest.fixture
+def corpus(tmp_path):
+    (tmp_path / "nested").mkdir()
+    for name in ("a.pdf", "b.pdf", "nested/c.pdf"):
+        shutil.copy(SAMPLE_PDF, tmp_path / name)
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+    (tmp_path / "notes.txt").write_text("ignored")
+    return tmp_path
+
+def _run(paths, output, fake_async_openai):
+    analyzer = AsyncDocumentAnalyzer(client=fake_async_openai(), cache=MemoryResponseCache())
+    evaluator = AsyncDocumentEvaluator(client=fake_async_openai(ACCEPTED), cache=MemoryResponseCache())
+    return asyncio.run(run_batch(paths, str(output), 1, 2, analyzer, evaluator))
+
+def test_find_documents_expands_directories_and_globs(corpus):
+    assert len(find_documents([str(corpus)])) == 4
+    assert find_documents([str(corpus / "*.pdf")]) == sorted(
+        str(corpus / name) for name in ("a.pdf", "b.pdf", "broken.pdf")
+    )
+
+def test_run_batch_writes_one_record_per_document(corpus, fake_async_openai):
+    output = corpus / "results.jsonl"
+    summary = _run(find_documents([str(corpus)]), output, fake_async_openai)
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(records) == 4
+    assert summary["succeeded"] == 3
+    assert summary["failed"] == 1
+    assert summary["p95_latency"] >= summary["p50_latency"] > 0
+    assert {r["status"] for r in records if r["path"].endswith("broken.pdf")} == {"error"}
+    assert all(r["result"]["summary"] for r in records if r["status"] == "ok")
+
+def test_completed_documents_are_skipped_on_resume(corpus, fake_async_openai):
+    output = corpus / "results.jsonl"
+    paths = find_documents([str(corpus)])
+    _run(paths[:2], output, fake_async_openai)
+    with output.open("a") as f:
+        f.write('{"path": "truncated')
+
+    completed = load_completed(str(output))
+
+    assert completed == {path for path in paths[:2] if not path.endswith("broken.pdf")}
+
+def test_percentile_interpolates():
+    assert percentile([], 95) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0], 100) == 4.0
@@ -0,0 +1,59 @@
+import json
+import pytest
+from benchmarks.stub_server import ANALYSIS_JSON, StubServer
+from single_doc_analyze.batch import run_batch_api
+from single_doc_analyze.models.schemas import DocumentAnalysis
+from single_doc_analyze.services.batch_api import BatchRequest, BatchRunner, run_batch_pipeline
+from single_doc_analyze.services.clients import get_openai_client
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+
+SHORT = "The company reported revenue growth. " * 5
+LONG = "Quarterly results and risks. " * 6000
+
+@pytest.fixture
+def server():
+    with StubServer() as server:
+        yield server
+
+def _runner(server, **kwargs):
+    return BatchRunner(get_openai_client("test", server.base_url), poll_interval=0.01, **kwargs)
+
+def _prompts(batch):
+    return [body["messages"][1]["content"] for _, body in batch["requests"]]
+
+def test_runner_splits_requests_into_jobs_and_maps_results_by_custom_id(server):
+    requests = [BatchRequest(f"r{i}", "You are a quality evaluator.", f"prompt {i}") for i in range(5)]
+    results = _runner(server, max_requests=2).run(requests)
+
+    assert len(server.batches) == 3
+    assert sorted(results) == [f"r{i}" for i in range(5)]
+    assert all(json.loads(content)["is_acceptable"] for content in results.values())
+
+def test_pipeline_batches_chunks_merges_and_retries_with_feedback(server):
+    results = run_batch_pipeline([SHORT, LONG], _runner(server), MemoryResponseCache(), max_retries=1)
+
+    assert results == [DocumentAnalysis.model_validate_json(ANALYSIS_JSON)] * 2
+    first, merge, retry, retry_merge = (_prompts(batch) for batch in server.batches.values())
+    assert len(first) == 3 and "A long document" in merge[0]
+    # The rule-based pre-evaluation rejected both analyses; only the final
+    # prompts are resubmitted, with its feedback, and the chunks come from the cache.
+    assert len(retry) == len(retry_merge) == 1
+    assert "# Feedback from evaluator:" in retry[0] and "# Feedback from evaluator:" in retry_merge[0]
+
+def test_cached_rerun_submits_no_batches(server):
+    cache = MemoryResponseCache()
+    run_batch_pipeline([SHORT, LONG], _runner(server), cache, max_retries=0)
+    submitted = len(server.batches)
+
+    assert run_batch_pipeline([SHORT, LONG], _runner(server), cache, max_retries=0)[1] is not None
+    assert len(server.batches) == submitted
+
+def test_failed_requests_become_per_document_errors(server, tmp_path):
+    server.error_rate = 1.0
+    results = run_batch_pipeline([SHORT], _runner(server), MemoryResponseCache(), max_retries=0)
+    assert isinstance(results[0], ValueError)
+
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+    summary = run_batch_api([str(tmp_path / "broken.pdf")], str(tmp_path / "out.jsonl"), 1, _runner(server))
+    assert summary["failed"] == 1
+    assert json.loads((tmp_path / "out.jsonl").read_text())["status"] == "error"
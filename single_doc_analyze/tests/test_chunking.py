@@ -0,0 +1,75 @@
+import pytest
+import re
+from pathlib import Path
+from single_doc_analyze.config import settings
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.pdf_service import extract_text_from_pdf
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.utils.chunking import chunk_pages, chunk_text, estimate_tokens
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+
+def _paragraphs(count: int, words: int = 40) -> str:
+    return "\n\n".join(f"Paragraph {i}. " + "word " * words for i in range(count))
+
+def test_short_text_is_a_single_chunk():
+    assert chunk_text("A short document.", 100) == ["A short document."]
+    assert chunk_text("   ", 100) == []
+
+def test_chunks_respect_token_budget_and_keep_all_text():
+    text = _paragraphs(30)
+    chunks = chunk_text(text, 200)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+    assert sum(chunk.count("Paragraph") for chunk in chunks) == 30
+
+def test_chunks_split_on_paragraph_boundaries():
+    chunks = chunk_text(_paragraphs(30), 200)
+
+    assert all(chunk.startswith("Paragraph") for chunk in chunks)
+
+def test_oversized_paragraph_is_split_on_words():
+    chunks = chunk_text("word " * 1000, 50)
+
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert all(not chunk.startswith(" ") for chunk in chunks)
+
+def test_chunk_pages_keeps_pages_together():
+    pages = [f"Page {i}\n" + "text " * 30 for i in range(6)]
+    chunks = chunk_pages(pages, 100)
+
+    assert all(chunk.startswith("Page") for chunk in chunks)
+    assert "\f" not in "".join(chunks)
+
+def test_long_document_is_mapped_then_reduced(fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "CHUNK_MAX_TOKENS", 200)
+    client = fake_openai()
+    analyzer = DocumentAnalyzer(client=client, cache=MemoryResponseCache())
+    text = _paragraphs(30)
+
+    result = analyzer.analyze(text, feedback="Be more specific.")
+
+    prompts = [call["messages"][1]["content"] for call in client.calls]
+    chunk_count = len(chunk_text(text, 200))
+    assert result.key_topics == ["Testing"]
+    assert len(prompts) == chunk_count + 1
+    assert sum("part" in p and "of a longer document" in p for p in prompts) == chunk_count
+    assert "Partial analyses" in prompts[-1]
+    assert "Be more specific." in prompts[-1]
+
+def test_extracted_pdf_is_split_on_page_boundaries(fake_openai, monkeypatch):
+    # Uncompressed pages have no blank lines, so only the page breaks keep chunks from splitting mid-page.
+    monkeypatch.setitem(settings, "PROMPT_COMPRESSION", False)
+    monkeypatch.setitem(settings, "CHUNK_MAX_TOKENS", 600)
+    client = fake_openai()
+
+    DocumentAnalyzer(client=client, cache=MemoryResponseCache()).analyze(extract_text_from_pdf(str(SAMPLE_PDF)))
+
+    parts = [call["messages"][1]["content"] for call in client.calls][:-1]
+    assert len(parts) > 1
+    for page in range(1, 21):
+        # Each page's heading and footer land in the same part, and in no other.
+        holding = [part for part in parts if re.search(rf"^(Section|Page) {page}$", part, re.M)]
+        assert len(holding) == 1
+        assert re.search(rf"^Section {page}$.*^Page {page}$", holding[0], re.M | re.S)
@@ -0,0 +1,73 @@
+import json
+import subprocess
+import sys
+import pytest
+from pathlib import Path
+from single_doc_analyze import cli, config
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.evaluator import DocumentEvaluator
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+ROOT = Path(__file__).parents[2]
+ACCEPTED = '{"is_acceptable": true, "feedback": "Good"}'
+
+def _loaded_after(code: str, modules):
+    """Run ``code`` in a fresh interpreter and return which of ``modules`` it imported."""
+    check = f"{code}\nimport sys\nprint(' '.join(m for m in {list(modules)!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True, check=True)
+    return output.stdout.split()
+
+def test_cli_and_web_app_modules_load_heavy_dependencies_lazily():
+    heavy = ["gradio", "openai", "anthropic", "pypdf", "dotenv"]
+
+    assert _loaded_after("import single_doc_analyze.cli", heavy) == []
+    assert _loaded_after("import single_doc_analyze.main", heavy) == []
+
+def test_entry_points_load_the_env_file_once(monkeypatch):
+    import dotenv
+    loads = []
+
+    def load_dotenv(**kwargs):
+        loads.append(kwargs)
+        monkeypatch.setenv("MODEL_NAME", "model-from-env")
+        return True
+
+    monkeypatch.setattr(dotenv, "load_dotenv", load_dotenv)
+    monkeypatch.setattr(config, "_env_loaded", False)
+    monkeypatch.setitem(config.settings, "MODEL_NAME", config.settings["MODEL_NAME"])
+    monkeypatch.setitem(config.settings, "MAX_RETRIES", 7)
+
+    config.load_env()
+    config.load_env()
+
+    assert len(loads) == 1
+    assert config.settings["MODEL_NAME"] == "model-from-env"
+    # Settings the .env file leaves alone keep their runtime values.
+    assert config.settings["MAX_RETRIES"] == 7
+
+@pytest.fixture
+def fake_pipeline(monkeypatch, fake_openai):
+    monkeypatch.setattr(cli, "DocumentAnalyzer", lambda: DocumentAnalyzer(
+        client=fake_openai(), cache=MemoryResponseCache()
+    ))
+    monkeypatch.setattr(cli, "DocumentEvaluator", lambda: DocumentEvaluator(
+        client=fake_openai(ACCEPTED), cache=MemoryResponseCache()
+    ))
+
+def test_cli_prints_formatted_analysis(fake_pipeline, capsys):
+    cli.main([str(SAMPLE_PDF)])
+
+    assert "The document describes a test." in capsys.readouterr().out
+
+def test_cli_prints_one_json_record_per_document_and_fails_on_errors(fake_pipeline, tmp_path, capsys):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main([str(SAMPLE_PDF), str(broken), "--json"])
+
+    assert exit_info.value.code == 1
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["status"] for record in records] == ["ok", "error"]
+    assert records[0]["result"]["summary"] == "The document describes a test."
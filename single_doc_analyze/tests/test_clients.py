@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from single_doc_analyze.services import clients
+from single_doc_analyze.services.analyzer import DocumentAnalyzer, AsyncDocumentAnalyzer
+from single_doc_analyze.services.clients import (
+    clear_clients, get_async_openai_client, get_openai_client
+)
+
+@pytest.fixture(autouse=True)
+def isolated_registry():
+    clear_clients()
+    yield
+    clear_clients()
+
+def test_registry_reuses_client_per_key():
+    first = get_openai_client(api_key="key-1", base_url="http://localhost:1/v1")
+
+    assert get_openai_client(api_key="key-1", base_url="http://localhost:1/v1") is first
+    assert get_openai_client(api_key="key-2", base_url="http://localhost:1/v1") is not first
+    assert get_openai_client(api_key="key-1", base_url="http://localhost:2/v1") is not first
+
+def test_analyzers_share_the_registry_client(monkeypatch):
+    monkeypatch.setitem(clients.settings, "OPENAI_API_KEY", "key")
+
+    assert DocumentAnalyzer().client is DocumentAnalyzer().client
+    assert DocumentAnalyzer().client is get_openai_client()
+
+def test_async_clients_are_registered_per_event_loop():
+    async def lookup():
+        return get_async_openai_client(api_key="key"), get_async_openai_client(api_key="key")
+
+    first_a, first_b = asyncio.run(lookup())
+    second, _ = asyncio.run(lookup())
+
+    assert first_a is first_b
+    assert second is not first_a
+
+def test_async_analyzer_uses_registry_inside_loop(monkeypatch):
+    monkeypatch.setitem(clients.settings, "OPENAI_API_KEY", "key")
+    analyzer = AsyncDocumentAnalyzer()
+
+    async def lookup():
+        return analyzer.client, get_async_openai_client()
+
+    client, registered = asyncio.run(lookup())
+    assert client is registered
@@ -0,0 +1,54 @@
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from single_doc_analyze.services import extraction_cache
+from single_doc_analyze.services.extraction_cache import ExtractionCache, cache_key
+from single_doc_analyze.services.pdf_service import iter_pdf_pages, EXTRACTOR_VERSION
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(str(tmp_path / "cache.sqlite3"))
+
+def test_cache_round_trip_and_counters(cache):
+    assert cache.get("missing") is None
+
+    cache.put("doc", ["page one", "", "page three"])
+
+    assert cache.get("doc") == ["page one", "", "page three"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 1
+
+def test_cache_key_depends_on_extractor_version():
+    assert cache_key(b"pdf", "1") != cache_key(b"pdf", "2")
+    assert cache_key(b"pdf", "1") == cache_key(b"pdf", "1")
+
+def test_cache_evicts_least_recently_used(cache, monkeypatch):
+    # A clock that ticks on every call, so access times never tie.
+    clock = iter(range(1000))
+    monkeypatch.setattr(extraction_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+    cache.put("a", ["x" * 100])
+    cache.max_bytes = 2 * cache.stats()["size_bytes"]
+    cache.put("b", ["y" * 100])
+    cache.get("a")
+
+    cache.put("c", ["z" * 100])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ["x" * 100]
+    assert cache.get("c") == ["z" * 100]
+    assert cache.stats()["entries"] == 2
+
+def test_iter_pdf_pages_serves_repeat_extraction_from_cache(cache, monkeypatch):
+    first = list(iter_pdf_pages(SAMPLE_PDF, cache=cache))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("PDF should not be parsed on a cache hit")
+
+    monkeypatch.setattr("pypdf.PdfReader", fail)
+    second = list(iter_pdf_pages(SAMPLE_PDF, cache=cache))
+
+    assert second == first
+    assert cache.get(cache_key(SAMPLE_PDF.read_bytes(), EXTRACTOR_VERSION)) == first
@@ -0,0 +1,90 @@
+import time
+from pathlib import Path
+from single_doc_analyze.config import settings
+from single_doc_analyze.jobs import analyze_document_job, submit_document
+from single_doc_analyze.main import process_document_queued
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.evaluator import DocumentEvaluator
+from single_doc_analyze.services.job_queue import DONE, FAILED, QUEUED, JobQueue, WorkerPool, process_next
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+ACCEPTED = '{"is_acceptable": true, "feedback": "Good"}'
+
+def test_identical_submissions_share_a_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+    first = queue.submit(b"%PDF-1.4", {"doc_id": "a.pdf"})
+    again = queue.submit(b"%PDF-1.4", {"doc_id": "a.pdf"})
+    other = queue.submit(b"%PDF-1.4", {"doc_id": "b.pdf"})
+
+    assert first.id == again.id != other.id
+    assert queue.counts()[QUEUED] == 2
+    assert queue.position(other.id) == 1
+    assert queue.find(first.id[:8]) == first
+
+def test_failed_attempts_are_retried_until_exhausted(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+    job = queue.submit(b"data", {})
+
+    for attempt in (1, 2):
+        claimed, document = queue.claim("worker")
+        assert (claimed.id, claimed.attempts, document) == (job.id, attempt, b"data")
+        queue.fail(job.id, "worker", f"error {attempt}")
+
+    assert queue.claim("worker") is None
+    assert queue.get(job.id)[1:5] == (FAILED, {}, 2, 2)
+    assert queue.get(job.id).error == "error 2"
+    # Submitting a failed job again gives it a fresh set of attempts.
+    assert queue.submit(b"data", {}).status == QUEUED
+
+def test_expired_lease_is_reclaimed_by_another_worker(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), timeout=0.01)
+    job = queue.submit(b"data", {})
+    queue.claim("stalled")
+    time.sleep(0.05)
+
+    claimed, _ = queue.claim("healthy")
+
+    assert (claimed.id, claimed.attempts) == (job.id, 2)
+    assert not queue.complete(job.id, "stalled", {"late": True})
+    assert queue.complete(job.id, "healthy", {"ok": True})
+    assert queue.get(job.id).result == {"ok": True}
+
+def test_queued_document_is_analyzed_by_a_worker(tmp_path, fake_openai, monkeypatch):
+    monkeypatch.setattr("single_doc_analyze.jobs.DocumentAnalyzer", lambda: DocumentAnalyzer(
+        client=fake_openai(), cache=MemoryResponseCache()
+    ))
+    monkeypatch.setattr("single_doc_analyze.jobs.DocumentEvaluator", lambda: DocumentEvaluator(
+        client=fake_openai(ACCEPTED), cache=MemoryResponseCache()
+    ))
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job = submit_document(str(SAMPLE_PDF), queue)
+
+    assert process_next(queue, "worker", analyze_document_job)
+    assert not process_next(queue, "worker", analyze_document_job)
+
+    done = queue.get(job.id)
+    assert done.status == DONE
+    assert done.result["analysis"]["summary"] == "The document describes a test."
+    # Submitting the same document again returns the stored result without re-running it.
+    outputs = list(process_document_queued(str(SAMPLE_PDF), queue))
+    assert len(outputs) == 1
+    assert "The document describes a test." in outputs[0]
+
+def test_worker_pool_retries_and_fails_broken_documents(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(path, max_attempts=2)
+    job = queue.submit(b"not a pdf", {})
+    pool = WorkerPool(path, analyze_document_job, workers=1, poll_interval=0.05)
+    pool.run_in_background()
+    try:
+        deadline = time.time() + 60
+        while queue.get(job.id).status != FAILED and time.time() < deadline:
+            time.sleep(0.1)
+    finally:
+        pool.stop()
+
+    failed = queue.get(job.id)
+    assert (failed.status, failed.attempts) == (FAILED, 2)
+    assert "Failed to extract text from PDF" in failed.error
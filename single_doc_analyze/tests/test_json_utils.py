@@ -1,7 +1,18 @@
+import json
+import random
 import pytest
-from single_doc_analyze.utils.json_utils import clean_json_response, parse_json_response
+from single_doc_analyze.utils.json_utils import (
+    clean_json_response, extract_json_object, parse_json_response, repair_json
+)
 from single_doc_analyze.models.schemas import DocumentAnalysis
 
+ANALYSIS = {
+    "summary": "Test summary",
+    "key_topics": ["Topic 1", "Topic 2"],
+    "risks_or_issues": ["Risk 1"],
+    "recommended_actions": ["Action 1", "Action 2"]
+}
+
 def test_clean_json_response():
     # Test with markdown code block
     input_text = "```json\n{\"key\": \"value\"}\n```"
@@ -47,4 +58,46 @@ def test_parse_json_response_with_missing_fields():
     }
     """
     with pytest.raises(ValueError):
-        parse_json_response(incomplete_json, DocumentAnalysis) 
\ No newline at end of file
+        parse_json_response(incomplete_json, DocumentAnalysis)
+
+def test_parse_json_response_ignores_preamble_and_commentary():
+    content = "Here is the analysis:\n```json\n" + json.dumps(ANALYSIS) + "\n```\nLet me know {if} you need more."
+    result = parse_json_response(content, DocumentAnalysis)
+    assert result.model_dump() == ANALYSIS
+
+def test_extract_json_object_skips_braces_in_the_preamble():
+    assert extract_json_object('Here is {the} JSON: {"a": 1}') == '{"a": 1}'
+    assert extract_json_object('Fill in {"name"} as {"a": {"b": 1}} says.') == '{"a": {"b": 1}}'
+    assert extract_json_object('Using {the} template: {"a": 1,}') == '{"a": 1,}'
+    assert extract_json_object('Here is {the} JSON: {"a": [1, ') == '{"a": [1,'
+
+    content = "Here is {the} analysis:\n" + json.dumps(ANALYSIS)
+    assert parse_json_response(content, DocumentAnalysis).model_dump() == ANALYSIS
+
+def test_parse_json_response_repairs_common_defects():
+    trailing_commas = json.dumps(ANALYSIS).replace('"]', '",]').replace("]}", "],}")
+    smart_quotes = '{“summary”: “Test summary”, “key_topics”: [“Topic 1”, “Topic 2”], ' \
+        '“risks_or_issues”: [“Risk 1”], “recommended_actions”: [“Action 1”, “Action 2”]}'
+    assert parse_json_response(trailing_commas, DocumentAnalysis).model_dump() == ANALYSIS
+    assert parse_json_response(smart_quotes, DocumentAnalysis).model_dump() == ANALYSIS
+
+    truncated = parse_json_response(json.dumps(ANALYSIS)[:-6], DocumentAnalysis)
+    assert truncated.recommended_actions == ["Action 1"]
+
+def test_repair_json_drops_unfinished_list_elements():
+    assert repair_json('{"items": [{"a": 1}, {"a": 2, "b"') == '{"items": [{"a": 1}]}'
+    assert repair_json('{"flag": tru') == '{}'
+    assert repair_json('{"a": 1, "b":') == '{"a": 1}'
+    assert repair_json('{"items": ["done", "half') == '{"items": ["done"]}'
+    assert repair_json('{"a": "half') == '{"a": "half"}'
+    assert repair_json('{"a": "unchanged"}') == '{"a": "unchanged"}'
+
+def test_parse_json_response_fuzzed_truncations_raise_value_error():
+    content = json.dumps(ANALYSIS, indent=2)
+    rng = random.Random(0)
+    for _ in range(300):
+        truncated = content[:rng.randrange(len(content))]
+        try:
+            parse_json_response(truncated, DocumentAnalysis)
+        except ValueError:
+            pass
@@ -0,0 +1,33 @@
+import anthropic
+import openai
+import pytest
+from benchmarks.load_test import find_regressions
+from benchmarks.stub_server import EVALUATION_JSON, RATE_TABLE_JSON, StubServer
+
+def test_stub_server_answers_openai_and_anthropic_requests_by_prompt():
+    with StubServer() as server:
+        openai_client = openai.OpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+        response = openai_client.chat.completions.create(
+            model="stub", messages=[{"role": "system", "content": "You are a quality evaluator."}]
+        )
+        assert response.choices[0].message.content == EVALUATION_JSON
+
+        anthropic_client = anthropic.Anthropic(api_key="test", base_url=server.root_url, max_retries=0)
+        message = anthropic_client.messages.create(
+            model="stub", max_tokens=100, messages=[{"role": "user", "content": "Extract the rate table below."}]
+        )
+        assert message.content[0].text == RATE_TABLE_JSON
+        assert message.usage.output_tokens > 0
+
+        server.error_rate = 1.0
+        with pytest.raises(anthropic.InternalServerError):
+            anthropic_client.messages.create(model="stub", max_tokens=100, messages=[{"role": "user", "content": "x"}])
+        assert server.errors == 1
+
+def test_find_regressions_uses_the_threshold_and_min_delta():
+    baseline = {"app x1": {"throughput": 10.0, "p95": 1.0, "stage:compress": 0.001, "failed": 0}}
+    results = {"app x1": {"throughput": 7.0, "p95": 1.2, "stage:compress": 0.004, "failed": 3}}
+
+    assert find_regressions(results, baseline, threshold=0.25, min_delta=0.01) == ["app x1 throughput: 10.0000 -> 7.0000"]
+    assert len(find_regressions(results, baseline, threshold=0.1, min_delta=0.001)) == 3
+    assert find_regressions({"other x1": results["app x1"]}, baseline, threshold=0.0, min_delta=0.0) == []
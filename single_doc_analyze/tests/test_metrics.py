@@ -0,0 +1,63 @@
+import urllib.request
+import pytest
+from benchmarks.stub_server import StubServer
+from single_doc_analyze.config import settings
+from single_doc_analyze.main import format_analysis_output
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.clients import clear_clients, get_openai_client
+from single_doc_analyze.services.evaluator import DocumentEvaluator
+from single_doc_analyze.services.pipeline import run_pipeline
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.utils import metrics
+from single_doc_analyze.utils.metrics import REGISTRY, stage, start_metrics_server, trace
+
+EVALUATION_JSON = '{"is_acceptable": true, "feedback": "Looks good."}'
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    REGISTRY.reset()
+    yield
+    REGISTRY.reset()
+    clear_clients()
+
+def test_stage_is_a_shared_noop_when_disabled(monkeypatch):
+    monkeypatch.setitem(settings, "METRICS_ENABLED", False)
+
+    assert stage("llm_wait") is metrics._NOOP
+    with trace() as timings:
+        with stage("llm_wait"):
+            pass
+    assert "llm_wait" in timings
+
+def test_trace_breaks_down_pipeline_stages(fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "METRICS_ENABLED", False)
+    analyzer = DocumentAnalyzer(client=fake_openai(), cache=MemoryResponseCache())
+    evaluator = DocumentEvaluator(client=fake_openai(EVALUATION_JSON), cache=MemoryResponseCache())
+
+    with trace() as timings:
+        result = run_pipeline("A short document.", analyzer, evaluator)
+
+    assert {"analyze", "prompt_build", "llm_wait", "json_parse", "evaluate"} <= set(timings)
+    assert "retry" not in timings
+    assert "Timings" in format_analysis_output(result, timings)
+    assert "Timings" not in format_analysis_output(result)
+
+def test_metrics_endpoint_reports_stages_tokens_and_caches(monkeypatch):
+    monkeypatch.setitem(settings, "METRICS_ENABLED", True)
+    with StubServer() as stub:
+        analyzer = DocumentAnalyzer(client=get_openai_client(api_key="key", base_url=stub.base_url))
+        analyzer.analyze("A short document.", use_cache=False)
+
+    server = start_metrics_server(0, host="127.0.0.1")
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            body = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert "# TYPE doc_analyzer_stage_seconds histogram" in body
+    assert 'doc_analyzer_stage_seconds_count{stage="llm_wait"} 1' in body
+    model = settings["MODEL_NAME"]
+    assert f'doc_analyzer_llm_tokens_total{{model="{model}",provider="openai",type="prompt"}} 10' in body
+    assert 'doc_analyzer_stage_seconds_bucket{le="+Inf",stage="json_parse"} 1' in body
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from single_doc_analyze.config import settings
+from single_doc_analyze.services.analyzer import AsyncDocumentAnalyzer, DocumentAnalyzer
+from single_doc_analyze.services.evaluator import AsyncDocumentEvaluator, DocumentEvaluator
+from single_doc_analyze.services.pipeline import run_pipeline, run_pipeline_async
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.models.schemas import DocumentAnalysis
+
+ACCEPTED = '{"is_acceptable": true, "feedback": "Good"}'
+REJECTED = '{"is_acceptable": false, "feedback": "Add more risks"}'
+FULL_ANALYSIS = '{"summary": "A test.", "key_topics": ["Testing"], "risks_or_issues": ["None"], "recommended_actions": []}'
+EMPTY_ANALYSIS = '{"summary": "A test.", "key_topics": [], "risks_or_issues": [], "recommended_actions": []}'
+
+def test_local_check_skips_the_llm_evaluator(fake_openai):
+    client = fake_openai(ACCEPTED)
+    evaluator = DocumentEvaluator(client=client, cache=MemoryResponseCache())
+
+    evaluation = evaluator.evaluate(DocumentAnalysis(
+        summary="A test.", key_topics=["Testing"], risks_or_issues=[" "], recommended_actions=[]
+    ))
+
+    assert not evaluation.is_acceptable
+    assert "risks" in evaluation.feedback
+    assert client.calls == []
+
+def test_pipeline_retries_with_feedback_up_to_max_retries(fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "RULE_EVALUATION", False)
+    analyzer_client = fake_openai(*(FULL_ANALYSIS.replace("A test.", f"Attempt {i}.") for i in range(3)))
+    evaluator_client = fake_openai(REJECTED)
+    analyzer = DocumentAnalyzer(client=analyzer_client, cache=MemoryResponseCache())
+    evaluator = DocumentEvaluator(client=evaluator_client, cache=MemoryResponseCache())
+
+    result = run_pipeline("Some document text.", analyzer, evaluator, max_retries=2)
+
+    assert isinstance(result, DocumentAnalysis)
+    assert len(analyzer_client.calls) == 3
+    assert len(evaluator_client.calls) == 2
+    assert "Add more risks" in analyzer_client.calls[-1]["messages"][-1]["content"]
+
+def test_pipeline_keeps_first_accepted_candidate(fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "RULE_EVALUATION", False)
+    # One candidate fails the local check, the other is accepted; no retry round is needed.
+    analyzer_client = fake_openai(EMPTY_ANALYSIS, FULL_ANALYSIS)
+    evaluator_client = fake_openai(ACCEPTED)
+    analyzer = DocumentAnalyzer(client=analyzer_client, cache=MemoryResponseCache())
+    evaluator = DocumentEvaluator(client=evaluator_client, cache=MemoryResponseCache())
+
+    result = run_pipeline("Some document text.", analyzer, evaluator, max_retries=1, candidates=2)
+
+    assert result.key_topics == ["Testing"]
+    assert len(analyzer_client.calls) == 2
+    assert len(evaluator_client.calls) == 1
+
+def _retried(kwargs):
+    retried = "Add more risks" in kwargs["messages"][-1]["content"]
+    return FULL_ANALYSIS.replace("A test.", "Retried." if retried else "First try.")
+
+def test_speculative_spare_saves_the_retry_evaluation(fake_async_openai, monkeypatch):
+    monkeypatch.setitem(settings, "RULE_EVALUATION", False)
+
+    async def run(speculative: bool):
+        tries = iter(range(10))
+
+        def respond(kwargs):
+            # Distinct first tries, so the spare is not judged from the evaluator's cache.
+            return _retried(kwargs).replace("First try.", f"Try {next(tries)}.")
+
+        analyzer = AsyncDocumentAnalyzer(client=fake_async_openai(respond, delay=0.1), cache=MemoryResponseCache())
+        evaluator = AsyncDocumentEvaluator(
+            client=fake_async_openai(REJECTED, ACCEPTED, delay=0.1), cache=MemoryResponseCache()
+        )
+        start = time.perf_counter()
+        result = await run_pipeline_async(
+            "Some document text.", analyzer, evaluator, max_retries=2, speculative=speculative
+        )
+        return result, time.perf_counter() - start
+
+    result, sequential = asyncio.run(run(False))
+    assert result.summary == "Retried."
+    # The spare is evaluated while the retry runs, and accepted.
+    result, speculative = asyncio.run(run(True))
+    assert result.summary == "Try 1."
+    assert sequential >= 0.4
+    assert speculative < sequential - 0.07
+
+def test_retry_after_a_rejection_gets_the_feedback_when_speculating(fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "RULE_EVALUATION", False)
+    analyzer_client = fake_openai(_retried)
+    analyzer = DocumentAnalyzer(client=analyzer_client, cache=MemoryResponseCache())
+    evaluator = DocumentEvaluator(client=fake_openai(REJECTED), cache=MemoryResponseCache())
+
+    result = run_pipeline("Some document text.", analyzer, evaluator, max_retries=1, speculative=True)
+
+    assert result.summary == "Retried."
+    assert len(analyzer_client.calls) == 3
@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+from single_doc_analyze.config import settings
+from single_doc_analyze.utils.metrics import REGISTRY
+from single_doc_analyze.utils.preprocess import compress_pages, strip_pages
+
+RECORDED = Path(__file__).parent / "test_data" / "recorded_compression.json"
+
+def _pages(count: int, body) -> list:
+    return [
+        "\n".join(["Annual Report 2024", *body(n), f"Page {n} of {count}"])
+        for n in range(1, count + 1)
+    ]
+
+def test_running_headers_are_kept_once_and_page_numbers_dropped():
+    body = lambda n: [f"Finding {n}.", f"Detail {n}a.", f"Detail {n}b.", "12", f"Detail {n}c.", f"Detail {n}d."]
+    pages = strip_pages(_pages(4, body))
+
+    assert pages[0] == "Annual Report 2024\nFinding 1.\nDetail 1a.\nDetail 1b.\n12\nDetail 1c.\nDetail 1d."
+    assert pages[1] == "Finding 2.\nDetail 2a.\nDetail 2b.\n12\nDetail 2c.\nDetail 2d."
+    assert all("Page" not in page for page in pages)
+
+def test_repeated_disclaimers_are_kept_once_and_short_lines_everywhere():
+    disclaimer = "Past performance is not a reliable indicator of future results."
+    body = lambda n: [f"Summary {n}", f"North {n}00", disclaimer, "Region Revenue", f"South {n}00", "x" * n, "y" * n]
+    pages = strip_pages(_pages(4, body))
+
+    assert [page.count(disclaimer) for page in pages] == [1, 0, 0, 0]
+    assert all("\nRegion Revenue\n" in page for page in pages)
+
+def test_short_documents_keep_their_headers(monkeypatch):
+    pages = strip_pages(_pages(2, lambda n: [f"Finding {n}."]))
+    assert pages[0] == "Annual Report 2024\nFinding 1."
+
+    monkeypatch.setitem(settings, "BOILERPLATE_MIN_SHARE", 1.0)
+    pages = strip_pages(_pages(4, lambda n: ["Draft" if n < 4 else "Final", f"Finding {n}."]))
+    assert pages[1] == "Draft\nFinding 2."
+
+def test_compression_matches_the_recorded_output(monkeypatch):
+    monkeypatch.setitem(settings, "METRICS_ENABLED", True)
+    REGISTRY.reset()
+    recorded = json.loads(RECORDED.read_text())
+
+    result = compress_pages(recorded["pages"])
+
+    assert result.text == recorded["compressed"]
+    assert result.tokens_after < 0.7 * result.tokens_before
+    metrics = REGISTRY.render()
+    assert f'doc_analyzer_document_tokens_total{{stage="compressed"}} {result.tokens_after}' in metrics
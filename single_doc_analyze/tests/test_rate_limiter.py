@@ -0,0 +1,122 @@
+import asyncio
+from types import SimpleNamespace
+import openai
+import pytest
+from benchmarks.stub_server import StubServer
+from single_doc_analyze.services import rate_limiter
+from single_doc_analyze.services.analyzer import AsyncDocumentAnalyzer, DocumentAnalyzer
+from single_doc_analyze.services.clients import clear_clients, get_openai_client
+from single_doc_analyze.services.rate_limiter import (
+    AdaptiveConcurrency, RateLimiter, TokenBucket, backoff_delay, clear_rate_limiters,
+    get_rate_limiter, retry_after
+)
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+@pytest.fixture(autouse=True)
+def isolated_limiters():
+    clear_rate_limiters()
+    clear_clients()
+    yield
+    clear_rate_limiters()
+    clear_clients()
+
+def test_token_bucket_waits_once_exhausted():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    now[0] += 2.0
+    assert bucket.reserve(1) == 0.0
+
+def test_adaptive_concurrency_is_aimd():
+    concurrency = AdaptiveConcurrency(initial=8, maximum=16, latency_target=1.0)
+
+    concurrency.on_throttle()
+    assert concurrency.limit == 4
+    for _ in range(4):
+        concurrency.on_success(0.1)
+    assert concurrency.limit == pytest.approx(5, abs=0.1)
+    concurrency.on_success(5.0)
+    assert concurrency.limit < 3
+
+def test_backoff_honors_retry_after():
+    error = FakeAPIError(429, {"retry-after": "2"})
+
+    assert retry_after(error) == 2.0
+    assert retry_after(FakeAPIError(429, {"retry-after-ms": "250"})) == 0.25
+    assert all(backoff_delay(attempt, retry_after(error)) >= 2.0 for attempt in range(5))
+
+def test_call_retries_throttled_requests_only(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: None)
+    limiter = RateLimiter("test", requests_per_minute=1000, tokens_per_minute=100000, max_retries=3)
+    attempts = []
+
+    def throttled_twice():
+        attempts.append(1)
+        if len(attempts) <= 2:
+            raise FakeAPIError(429)
+        return "ok"
+
+    assert limiter.call(throttled_twice) == "ok"
+    assert limiter.throttled == 2
+
+    with pytest.raises(FakeAPIError):
+        limiter.call(lambda: (_ for _ in ()).throw(FakeAPIError(400)))
+
+def test_analyzer_recovers_from_injected_429s():
+    with StubServer() as server:
+        server.throttle_next(2)
+        analyzer = DocumentAnalyzer(
+            client=get_openai_client(api_key="key", base_url=server.base_url), cache=MemoryResponseCache()
+        )
+
+        result = analyzer.analyze("A short document.")
+
+    assert result.summary == "Stub summary."
+    assert server.requests == 3
+    assert get_rate_limiter("openai", rate_limiter.settings["MODEL_NAME"]).throttled == 2
+
+def test_async_analyzer_adapts_to_server_concurrency_limit(monkeypatch):
+    monkeypatch.setitem(rate_limiter.settings, "LLM_MAX_RETRIES", 20)
+
+    async def run(base_url):
+        analyzer = AsyncDocumentAnalyzer(
+            client=openai.AsyncOpenAI(api_key="key", base_url=base_url, max_retries=0),
+            cache=MemoryResponseCache()
+        )
+        return await asyncio.gather(*(analyzer.analyze(f"Document {i}.") for i in range(20)))
+
+    with StubServer(latency=0.02, max_in_flight=2) as server:
+        results = asyncio.run(run(server.base_url))
+
+    limiter = get_rate_limiter("openai", rate_limiter.settings["MODEL_NAME"])
+    assert len(results) == 20
+    assert server.throttled > 0
+    assert limiter.concurrency.limit < limiter.concurrency.maximum // 4
+
+def test_cancelled_calls_give_back_their_slot():
+    limiter = RateLimiter("test", requests_per_minute=1000, tokens_per_minute=100000, max_concurrency=4)
+    limit = limiter.concurrency.limit
+
+    async def fast():
+        return "ok"
+
+    async def run():
+        for _ in range(2):
+            call = asyncio.ensure_future(limiter.acall(lambda: asyncio.sleep(10)))
+            await asyncio.sleep(0.01)
+            call.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await call
+        return await asyncio.wait_for(limiter.acall(fast), timeout=1)
+
+    assert asyncio.run(run()) == "ok"
+    assert limiter.concurrency.in_flight == 0
+    assert limiter.concurrency.limit > limit
@@ -0,0 +1,115 @@
+import pytest
+from single_doc_analyze.services import response_cache
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.evaluator import DocumentEvaluator
+from single_doc_analyze.services.response_cache import (
+    MemoryResponseCache, ResponseCache, SQLiteResponseCache, make_cache_key
+)
+from single_doc_analyze.models.schemas import DocumentAnalysis
+
+EVALUATION_JSON = '{"is_acceptable": true, "feedback": "Looks good"}'
+
+def test_cache_key_covers_every_request_field():
+    base = make_cache_key("openai", "gpt-4o", "system", "prompt")
+
+    assert base == make_cache_key("openai", "gpt-4o", "system", "prompt")
+    assert base != make_cache_key("anthropic", "gpt-4o", "system", "prompt")
+    assert base != make_cache_key("openai", "gpt-4o-mini", "system", "prompt")
+    assert base != make_cache_key("openai", "gpt-4o", "other", "prompt")
+    assert base != make_cache_key("openai", "gpt-4o", "system", "prompt 2")
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+def test_incomplete_backend_fails_when_constructed():
+    class NoSize(ResponseCache):
+        def _get(self, key):
+            return None
+
+        def _set(self, key, value):
+            pass
+
+    with pytest.raises(TypeError):
+        NoSize()
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_cache_entries_expire_after_ttl(backend, tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    if backend == "memory":
+        cache = MemoryResponseCache(ttl=10)
+    else:
+        cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"), ttl=10)
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    now[0] += 11
+    assert cache.get("key") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_sqlite_cache_persists_and_limits_entries(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    cache = SQLiteResponseCache(path, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+
+    reopened = SQLiteResponseCache(path, max_entries=2)
+    assert reopened.get("a") is None
+    assert reopened.get("c") == "C"
+    assert reopened.stats()["entries"] == 2
+
+def test_analyzer_serves_identical_requests_from_cache(fake_openai):
+    client = fake_openai()
+    cache = MemoryResponseCache()
+    analyzer = DocumentAnalyzer(client=client, cache=cache)
+
+    first = analyzer.analyze("Some document text.")
+    second = analyzer.analyze("Some document text.")
+
+    assert isinstance(second, DocumentAnalysis)
+    assert second == first
+    assert len(client.calls) == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+def test_analyzer_cache_opt_out(fake_openai):
+    client = fake_openai()
+    analyzer = DocumentAnalyzer(client=client, cache=MemoryResponseCache())
+
+    analyzer.analyze("Some document text.")
+    analyzer.analyze("Some document text.", use_cache=False)
+
+    assert len(client.calls) == 2
+
+def test_unparseable_responses_are_not_cached(fake_openai):
+    client = fake_openai("not json")
+    cache = MemoryResponseCache()
+    analyzer = DocumentAnalyzer(client=client, cache=cache)
+
+    with pytest.raises(ValueError):
+        analyzer.analyze("Some document text.")
+    assert cache.stats()["entries"] == 0
+
+def test_evaluator_serves_identical_requests_from_cache(fake_openai):
+    client = fake_openai(EVALUATION_JSON)
+    evaluator = DocumentEvaluator(client=client, cache=MemoryResponseCache())
+    analysis = DocumentAnalysis(
+        summary="Test summary",
+        key_topics=["Topic 1"],
+        risks_or_issues=["Risk 1"],
+        recommended_actions=["Action 1"]
+    )
+
+    evaluator.evaluate(analysis)
+    result = evaluator.evaluate(analysis)
+
+    assert result.is_acceptable
+    assert len(client.calls) == 1
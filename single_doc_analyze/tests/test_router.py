@@ -0,0 +1,174 @@
+import asyncio
+import time
+import pytest
+from benchmarks.stub_server import StubServer
+from single_doc_analyze.config import settings
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.clients import get_anthropic_client, get_openai_client
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.services.router import (
+    Backend, anthropic_user_content, aroute, clear_backend_stats, default_backends, get_backend_stats, parse_backends,
+    rank_backends, request, route
+)
+from single_doc_analyze.utils.metrics import REGISTRY
+
+FAST = Backend("openai", "fast")
+SLOW = Backend("groq", "slow")
+CHEAP = Backend("deepseek", "cheap", cost=0.1)
+
+@pytest.fixture(autouse=True)
+def isolated_stats():
+    clear_backend_stats()
+    yield
+    clear_backend_stats()
+
+def _observe(backend: Backend, seconds: float, count: int = 10, failures: int = 0):
+    stats = get_backend_stats(backend)
+    for _ in range(count):
+        stats.record(seconds, True)
+    for _ in range(failures):
+        stats.record(seconds, False)
+
+def test_parse_backends():
+    assert parse_backends(" groq:llama-3.1-8b-instant=0.2, anthropic:claude-3-haiku-20240307 ,") == [
+        Backend("groq", "llama-3.1-8b-instant", 0.2),
+        Backend("anthropic", "claude-3-haiku-20240307"),
+    ]
+    with pytest.raises(ValueError):
+        parse_backends("mistral:large")
+    with pytest.raises(ValueError):
+        parse_backends("groq")
+
+def test_default_backends_start_with_the_configured_model(monkeypatch):
+    monkeypatch.setitem(settings, "ROUTER_BACKENDS", f"openai:{settings['MODEL_NAME']},groq:llama")
+    assert default_backends() == [Backend("openai", settings["MODEL_NAME"]), Backend("groq", "llama")]
+
+def test_route_falls_back_in_order():
+    tried = []
+
+    def call(backend):
+        tried.append(backend)
+        if backend is not CHEAP:
+            raise RuntimeError("unavailable")
+        return "ok"
+
+    assert route([FAST, SLOW, CHEAP], call) == "ok"
+    assert tried == [FAST, SLOW, CHEAP]
+    with pytest.raises(RuntimeError):
+        route([FAST, SLOW], call)
+
+def test_fastest_strategy_ranks_by_latency_then_cost(monkeypatch):
+    monkeypatch.setitem(settings, "ROUTER_STRATEGY", "fastest")
+    _observe(FAST, 1.0)
+    _observe(SLOW, 3.0)
+    assert rank_backends([SLOW, FAST]) == [FAST, SLOW]
+    # Within the latency slack the cheaper backend wins; an unmeasured one is tried first.
+    _observe(CHEAP, 1.1)
+    assert rank_backends([SLOW, FAST, CHEAP]) == [CHEAP, FAST, SLOW]
+    assert rank_backends([SLOW, FAST, Backend("grok", "new")])[0] == Backend("grok", "new")
+
+def test_unhealthy_backends_are_tried_last(monkeypatch):
+    _observe(FAST, 1.0, count=4, failures=6)
+    _observe(SLOW, 3.0)
+    assert rank_backends([FAST, SLOW]) == [SLOW, FAST]
+    monkeypatch.setitem(settings, "ROUTER_MAX_ERROR_RATE", 0.8)
+    assert rank_backends([FAST, SLOW]) == [FAST, SLOW]
+
+def test_slow_request_is_hedged(monkeypatch):
+    monkeypatch.setitem(settings, "ROUTER_HEDGE", True)
+    _observe(FAST, 0.05)
+
+    def call(backend):
+        time.sleep(1.0 if backend is FAST else 0.0)
+        return backend.name
+
+    start = time.perf_counter()
+    assert route([FAST, SLOW], call) == SLOW.name
+    assert time.perf_counter() - start < 0.5
+
+def test_async_hedge_cancels_the_slower_request(monkeypatch):
+    monkeypatch.setitem(settings, "ROUTER_HEDGE", True)
+    _observe(FAST, 0.05)
+    cancelled = []
+
+    async def call(backend):
+        try:
+            await asyncio.sleep(1.0 if backend is FAST else 0.0)
+        except asyncio.CancelledError:
+            cancelled.append(backend)
+            raise
+        return backend.name
+
+    async def main():
+        result = await aroute([FAST, SLOW], call)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == SLOW.name
+    assert cancelled == [FAST]
+
+def test_hedge_that_lost_the_race_is_not_recorded(monkeypatch):
+    monkeypatch.setitem(settings, "ROUTER_HEDGE", True)
+    _observe(FAST, 0.05)
+
+    async def call(backend):
+        with get_backend_stats(backend).track():
+            await asyncio.sleep(1.0 if backend is FAST else 0.0)
+        return backend.name
+
+    async def main():
+        result = await aroute([FAST, SLOW], call)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == SLOW.name
+    assert get_backend_stats(FAST).samples == 10
+    assert get_backend_stats(FAST).p95 == pytest.approx(0.05)
+    assert get_backend_stats(SLOW).samples == 1
+
+def test_analyzer_falls_back_to_another_provider(monkeypatch, fake_openai):
+    monkeypatch.setitem(settings, "ROUTER_BACKENDS", "deepseek:deepseek-chat")
+    deepseek = fake_openai()
+    monkeypatch.setattr("single_doc_analyze.services.analyzer.get_backend_client", lambda provider: deepseek)
+    analyzer = DocumentAnalyzer(client=fake_openai("not json"), cache=MemoryResponseCache())
+
+    result = analyzer.analyze("A short document.")
+
+    assert result.summary == "The document describes a test."
+    assert [call["model"] for call in deepseek.calls] == ["deepseek-chat"]
+    assert get_backend_stats(Backend("deepseek", "deepseek-chat")).samples == 1
+
+def test_retry_feedback_follows_the_cached_prompt_prefix(monkeypatch):
+    monkeypatch.setitem(settings, "METRICS_ENABLED", True)
+    REGISTRY.reset()
+    document = "The supplier may end the agreement with thirty days notice. " * 150
+    with StubServer() as stub:
+        analyzer = DocumentAnalyzer(client=get_openai_client("key", stub.base_url), cache=MemoryResponseCache())
+        analyzer.analyze(document)
+        assert stub.cache_read_tokens == 0
+        analyzer.analyze(document, feedback="Add more risks")
+
+    assert stub.cache_read_tokens >= 1024
+    model = settings["MODEL_NAME"]
+    assert f'llm_cached_tokens_total{{model="{model}",provider="openai",type="cache_read"}} {stub.cache_read_tokens}' \
+        in REGISTRY.render()
+    REGISTRY.reset()
+
+def test_long_anthropic_prompts_get_a_cache_breakpoint_before_the_suffix(monkeypatch):
+    monkeypatch.setitem(settings, "PROMPT_CACHE_MIN_TOKENS", 100)
+    assert anthropic_user_content("System.", "A short prompt.") == "A short prompt."
+    prompt = "Document text. " * 40
+    assert anthropic_user_content("System.", prompt, "\n\nFeedback") == [
+        {"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "\n\nFeedback"}
+    ]
+
+    backend = Backend("anthropic", "claude")
+    with StubServer() as stub:
+        client = get_anthropic_client("key", stub.root_url)
+        request(client, backend, "System.", prompt, "\n\nFirst feedback")
+        request(client, backend, "System.", prompt, "\n\nOther feedback")
+    assert stub.cache_read_tokens > 100
+
+    monkeypatch.setitem(settings, "PROMPT_CACHING", False)
+    assert anthropic_user_content("System.", prompt) == prompt
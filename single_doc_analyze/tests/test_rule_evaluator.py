@@ -0,0 +1,56 @@
+from single_doc_analyze.services.evaluator import DocumentEvaluator
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.services.rule_evaluator import count_sentences, rule_verdict, score_analysis
+from single_doc_analyze.models.schemas import DocumentAnalysis
+
+SOURCE = (
+    "This lease agreement is between Acme Properties and Jane Doe for the apartment at 12 Main Street. "
+    "Monthly rent is $1,800, due on the first day of each month, with a late fee of $75. "
+    "The landlord may enter the premises with notice. The security deposit is refundable within 30 days. "
+    "Early termination requires payment of two months of rent."
+)
+
+GOOD = DocumentAnalysis(
+    summary="The lease rents an apartment at 12 Main Street to Jane Doe. Rent is $1,800 per month with a $75 late fee. "
+            "Ending the lease early costs two months of rent.",
+    key_topics=["Monthly rent and late fee", "Security deposit refund", "Early termination terms"],
+    risks_or_issues=["Landlord entry notice period is not defined", "Early termination penalty of two months rent"],
+    recommended_actions=["Ask the landlord to define the notice period for entry", "Negotiate a lower termination fee"],
+)
+
+def test_count_sentences():
+    assert count_sentences("") == 0
+    assert count_sentences("One sentence without a stop") == 1
+    assert count_sentences("Rent is $1,800. Deposit is 2.5 months! Why?") == 3
+
+def test_specific_analysis_is_accepted_locally(fake_openai):
+    client = fake_openai()
+    evaluator = DocumentEvaluator(client=client, cache=MemoryResponseCache())
+
+    evaluation = evaluator.evaluate(GOOD, source_text=SOURCE)
+
+    assert evaluation.is_acceptable
+    assert client.calls == []
+
+def test_generic_and_duplicate_items_are_rejected_with_feedback():
+    analysis = GOOD.model_copy(update={
+        "risks_or_issues": ["None", "none"],
+        "recommended_actions": ["Review the document", "Consult a lawyer"],
+    })
+
+    rating = score_analysis(analysis, SOURCE)
+    evaluation = rule_verdict(analysis, SOURCE)
+
+    assert rating.criteria["specificity"] < 0.5
+    assert not evaluation.is_acceptable
+    assert "Duplicate risks or issues entry" in evaluation.feedback
+    assert "'Consult a lawyer'" in evaluation.feedback
+
+def test_borderline_analysis_escalates_to_llm(fake_openai):
+    client = fake_openai('{"is_acceptable": true, "feedback": "Fine"}')
+    evaluator = DocumentEvaluator(client=client, cache=MemoryResponseCache())
+    analysis = GOOD.model_copy(update={"summary": "A lease for an apartment.", "risks_or_issues": ["Early termination penalty"]})
+
+    assert rule_verdict(analysis, SOURCE) is None
+    assert evaluator.evaluate(analysis, source_text=SOURCE).feedback == "Fine"
+    assert len(client.calls) == 1
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import random
+from single_doc_analyze.config import settings
+from single_doc_analyze.services.analyzer import AsyncDocumentAnalyzer, DocumentAnalyzer
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.services.similarity_index import SimilarityIndex, minhash_signature
+from single_doc_analyze.services import similarity_index
+
+def _document(seed: int, lines: int = 60) -> list:
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(2000)]
+    return [" ".join(rng.choice(words) for _ in range(10)) for _ in range(lines)]
+
+def _edited(lines: list, count: int) -> str:
+    lines = list(lines)
+    for i in range(count):
+        lines[i * 7] = f"revised clause {i} changes the notice period to {30 + i} days"
+    return "\n".join(lines)
+
+def test_signatures_estimate_similarity():
+    original = _document(1)
+    signature = minhash_signature("\n".join(original))
+    assert (signature == minhash_signature("\n".join(original))).all()
+    assert (signature == minhash_signature(_edited(original, 2))).mean() > 0.8
+    assert (signature == minhash_signature("\n".join(_document(2)))).mean() < 0.1
+    assert minhash_signature("  ... ") is None
+
+def test_query_finds_near_duplicates_within_a_namespace():
+    index = SimilarityIndex()
+    original = _document(1)
+    index.add("\n".join(original), "model-a", "original")
+    for seed in range(2, 50):
+        index.add("\n".join(_document(seed)), "model-a", f"other {seed}")
+
+    match = index.query(_edited(original, 2), "model-a", 0.7)
+
+    assert match.result == "original"
+    assert match.text == "\n".join(original)
+    assert index.query(_edited(original, 2), "model-b", 0.7) is None
+    assert index.query("\n".join(_document(99)), "model-a", 0.7) is None
+
+def test_index_is_persisted(tmp_path):
+    path = str(tmp_path / "similarity.sqlite3")
+    original = "\n".join(_document(1))
+    SimilarityIndex(path).add(original, "model-a", "original")
+
+    reopened = SimilarityIndex(path)
+
+    assert len(reopened) == 1
+    assert reopened.query(original, "model-a", 0.99).result == "original"
+
+def test_recent_additions_are_found_before_and_after_a_merge(monkeypatch):
+    monkeypatch.setattr(similarity_index, "_MIN_BUFFER", 4)
+    index = SimilarityIndex()
+    documents = ["\n".join(_document(seed, lines=10)) for seed in range(22)]
+    for document in documents:
+        index.add(document, "model-a", document[:20])
+    assert index._merged > 0 and index._merged < len(index)
+    assert [index.query(document, "model-a", 0.99).result for document in documents] == [
+        document[:20] for document in documents
+    ]
+
+def test_analyzer_reuses_and_adapts_similar_analyses(monkeypatch, fake_openai):
+    monkeypatch.setitem(settings, "SIMILARITY_REUSE_THRESHOLD", 0.95)
+    adapted = json.dumps({
+        "summary": "The revised document describes a test.",
+        "key_topics": ["Testing"],
+        "risks_or_issues": ["Notice period changed"],
+        "recommended_actions": ["Review the revised clauses"]
+    })
+    client = fake_openai()
+    analyzer = DocumentAnalyzer(client=client, cache=MemoryResponseCache(), similar=SimilarityIndex())
+    original = _document(1)
+
+    analyzer.analyze("\n".join(original))
+    # A whitespace-only change reuses the analysis without a request.
+    assert analyzer.analyze("\n\n".join(original)).summary == "The document describes a test."
+    assert len(client.calls) == 1
+
+    client.responses = [adapted]
+    result = analyzer.analyze(_edited(original, 3))
+
+    assert result.summary == "The revised document describes a test."
+    prompt = client.calls[-1]["messages"][-1]["content"]
+    assert "+revised clause 0 changes the notice period to 30 days" in prompt
+    assert "The document describes a test." in prompt
+    assert len(prompt) < len("\n".join(original))
+
+def test_async_analyzer_skips_the_index_with_use_cache_false(fake_async_openai):
+    client = fake_async_openai()
+    index = SimilarityIndex()
+    analyzer = AsyncDocumentAnalyzer(client=client, cache=MemoryResponseCache(), similar=index)
+    text = "\n".join(_document(1))
+
+    async def main():
+        await analyzer.analyze(text, use_cache=False)
+        await analyzer.analyze(text)
+        await analyzer.analyze(text)
+
+    asyncio.run(main())
+
+    assert len(client.calls) == 2
+    assert len(index) == 1
+
+def test_stream_of_a_reused_analysis_has_only_the_final_update(fake_openai):
+    client = fake_openai()
+    analyzer = DocumentAnalyzer(client=client, cache=MemoryResponseCache(), similar=SimilarityIndex())
+    original = _document(1)
+    assert list(analyzer.analyze_stream("\n".join(original)))[-1].result is not None
+
+    updates = list(analyzer.analyze_stream(" ".join(original)))
+
+    assert len(updates) == 1
+    assert updates[0].result.summary == "The document describes a test."
+    assert len(client.calls) == 1
@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from single_doc_analyze.config import settings
+from single_doc_analyze.main import process_document_stream
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.evaluator import DocumentEvaluator
+from single_doc_analyze.services.pipeline import stream_pipeline
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.utils import json_stream
+from single_doc_analyze.utils.json_stream import PartialJSONParser, parse_partial_json
+from single_doc_analyze.models.schemas import DocumentAnalysis
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+REJECTED = '{"is_acceptable": false, "feedback": "Add more risks"}'
+
+def test_partial_json_parser_fills_in_fields_as_they_stream():
+    document = {"summary": 'Say "hi" \\ bye', "key_topics": ["A", "B"], "score": 1.5, "done": True}
+    text = "```json\n" + json.dumps(document) + "\n```"
+    parser = PartialJSONParser()
+
+    snapshots = [snapshot for snapshot in map(parser.feed, text) if snapshot is not None]
+
+    assert snapshots[0] == {}
+    assert {"summary": "Say"} in snapshots
+    assert {"summary": 'Say "hi" \\ bye', "key_topics": ["A"]} in snapshots
+    assert snapshots[-1] == document
+    assert parse_partial_json('{"summary": "Half a sent') == {"summary": "Half a sent"}
+    assert parse_partial_json('{"summary": "x", "key_to') == {"summary": "x"}
+    assert parse_partial_json('{"score": 12') == {}
+
+def test_partial_json_parser_decodes_each_value_once(monkeypatch):
+    document = {"summary": "A test.", "key_topics": [f"Topic {i}" for i in range(300)]}
+    text = json.dumps(document)
+    decoded = []
+    monkeypatch.setattr(json_stream, "json", SimpleNamespace(
+        loads=lambda literal, **kwargs: decoded.append(len(literal)) or json.loads(literal, **kwargs)
+    ))
+    parser = PartialJSONParser()
+
+    snapshots = [parser.feed(text[i:i + 3]) for i in range(0, len(text), 3)]
+
+    assert snapshots[-1] == document
+    assert sum(decoded) < 3 * len(text)
+
+def test_analyze_stream_yields_partials_then_caches_result(fake_openai):
+    client = fake_openai()
+    analyzer = DocumentAnalyzer(client=client, cache=MemoryResponseCache())
+
+    updates = list(analyzer.analyze_stream("Some document text."))
+    cached = list(analyzer.analyze_stream("Some document text."))
+
+    assert client.calls[0]["stream"] is True
+    assert len(updates) > 5
+    assert all(update.result is None for update in updates[:-1])
+    assert isinstance(updates[-1].result, DocumentAnalysis)
+    assert [update.result for update in cached] == [updates[-1].result]
+    assert len(client.calls) == 1
+
+def test_stream_pipeline_retries_rejected_attempt(fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "RULE_EVALUATION", False)
+    analyzer_client = fake_openai()
+    analyzer = DocumentAnalyzer(client=analyzer_client, cache=MemoryResponseCache())
+    evaluator = DocumentEvaluator(client=fake_openai(REJECTED), cache=MemoryResponseCache())
+
+    updates = list(stream_pipeline("Some document text.", analyzer, evaluator, max_retries=1))
+
+    assert [update.result is not None for update in updates].count(True) == 1
+    assert updates[-1].result is not None
+    assert "Add more risks" in analyzer_client.calls[1]["messages"][1]["content"]
+
+def test_process_document_stream_renders_partial_output(fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "SHOW_TIMINGS", True)
+    monkeypatch.setattr("single_doc_analyze.main.DocumentAnalyzer", lambda: DocumentAnalyzer(
+        client=fake_openai(), cache=MemoryResponseCache()
+    ))
+    monkeypatch.setattr("single_doc_analyze.main.DocumentEvaluator", lambda: DocumentEvaluator(
+        client=fake_openai('{"is_acceptable": true, "feedback": "Good"}'), cache=MemoryResponseCache()
+    ))
+
+    outputs = list(process_document_stream(str(SAMPLE_PDF)))
+
+    assert "Analyzing..." in outputs[0]
+    assert "**Summary**" in outputs[-1] and "Analyzing..." not in outputs[-1]
+    assert "pdf_extract" in outputs[-1]
@@ -0,0 +1,117 @@
+import pytest
+from pathlib import Path
+from single_doc_analyze import main
+from single_doc_analyze.config import settings
+from single_doc_analyze.services import pdf_service
+from single_doc_analyze.services.analyzer import DocumentAnalyzer
+from single_doc_analyze.services.evaluator import DocumentEvaluator
+from single_doc_analyze.services.pdf_service import extract_document
+from single_doc_analyze.services.pipeline import run_pipeline
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.services.text_spool import TextSpool
+from single_doc_analyze.utils.chunking import PAGE_BREAK, chunk_text, estimate_tokens
+
+SAMPLE_PDF = Path(__file__).parent / "test_data" / "sample.pdf"
+ACCEPTED = '{"is_acceptable": true, "feedback": "Good"}'
+
+def _pages(count: int) -> list:
+    return [f"Page {i}\n" + "text " * 30 for i in range(count)]
+
+def test_spool_reads_back_parts_and_packs_chunks():
+    pages = _pages(12)
+    with TextSpool() as spool:
+        for page in pages:
+            spool.append(page)
+
+        assert len(spool) == 12
+        assert spool[3] == pages[3]
+        assert list(spool) == pages
+        chunks = list(spool.chunks(100))
+        assert [chunk.split() for chunk in chunks] == [chunk.split() for chunk in chunk_text(PAGE_BREAK.join(pages), 100)]
+        assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+
+@pytest.fixture
+def spooled(monkeypatch):
+    monkeypatch.setitem(settings, "PROMPT_COMPRESSION", False)
+    monkeypatch.setitem(settings, "PAGE_WINDOW", 8)
+
+def test_small_documents_are_extracted_to_a_string(spooled):
+    assert extract_document(str(SAMPLE_PDF)).startswith("Section 1")
+
+@pytest.fixture
+def parses(monkeypatch):
+    parsed = []
+    reader = pdf_service._reader
+    monkeypatch.setattr(pdf_service, "_reader", lambda data: parsed.append(data) or reader(data))
+    return parsed
+
+def test_documents_are_parsed_once_and_then_served_from_the_cache(spooled, parses):
+    first = extract_document(str(SAMPLE_PDF))
+    second = extract_document(str(SAMPLE_PDF))
+
+    assert first == second
+    assert len(parses) == 1
+
+def test_large_documents_are_spooled_a_window_at_a_time(spooled, parses, monkeypatch):
+    monkeypatch.setitem(settings, "LARGE_PDF_PAGES", 10)
+
+    spool = extract_document(str(SAMPLE_PDF))
+
+    assert len(parses) == 1
+    assert isinstance(spool, TextSpool)
+    assert len(spool) == 3
+    assert spool[0].startswith("Section 1") and "Section 20" in spool[2]
+
+def test_extraction_degrades_to_a_spool_above_the_rss_ceiling(spooled, parses, monkeypatch):
+    monkeypatch.setitem(settings, "LARGE_PDF_PAGES", 0)
+    monkeypatch.setitem(settings, "MAX_RSS_MB", 100)
+    monkeypatch.setattr(pdf_service, "current_rss_mb", lambda: 200.0)
+
+    with SAMPLE_PDF.open("rb") as pdf_file:
+        spool = extract_document(pdf_file)
+
+    text = "\n".join(spool)
+    assert len(parses) == 1
+    assert isinstance(spool, TextSpool)
+    assert all(f"Section {i}" in text for i in range(1, 21))
+
+def test_pipeline_analyzes_a_spool_chunk_by_chunk(fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "CHUNK_MAX_TOKENS", 100)
+    client = fake_openai()
+    with TextSpool() as spool:
+        for page in _pages(6):
+            spool.append(page)
+        result = run_pipeline(
+            spool,
+            DocumentAnalyzer(client=client, cache=MemoryResponseCache()),
+            DocumentEvaluator(client=fake_openai(ACCEPTED), cache=MemoryResponseCache()),
+        )
+
+    prompts = [call["messages"][1]["content"] for call in client.calls]
+    assert result.summary == "The document describes a test."
+    assert len(prompts) == len(chunk_text(PAGE_BREAK.join(_pages(6)), 100)) + 1
+    assert "Partial analyses" in prompts[-1]
+
+def test_handlers_close_the_spool(spooled, fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "LARGE_PDF_PAGES", 10)
+    monkeypatch.setitem(settings, "INCREMENTAL_ANALYSIS", False)
+    monkeypatch.setattr(main, "DocumentAnalyzer", lambda: DocumentAnalyzer(
+        client=fake_openai(), cache=MemoryResponseCache()
+    ))
+    monkeypatch.setattr(main, "DocumentEvaluator", lambda: DocumentEvaluator(
+        client=fake_openai(ACCEPTED), cache=MemoryResponseCache()
+    ))
+    closed = []
+    close = TextSpool.close
+    monkeypatch.setattr(TextSpool, "close", lambda spool: closed.append(spool) or close(spool))
+
+    assert "**Summary**" in main.process_document(str(SAMPLE_PDF))
+    assert "**Summary**" in list(main.process_document_stream(str(SAMPLE_PDF)))[-1]
+    assert len(closed) == 2
+
+def test_empty_spool_is_an_error(fake_openai):
+    client = fake_openai()
+    with TextSpool() as spool, pytest.raises(ValueError, match="No text could be extracted"):
+        DocumentAnalyzer(client=client, cache=MemoryResponseCache()).analyze_spool(spool)
+
+    assert client.calls == []
@@ -0,0 +1,93 @@
+import asyncio
+from io import BytesIO
+import pytest
+from benchmarks.synthetic_pdf import build_pdf, make_page_lines
+from pypdf import PageObject
+from single_doc_analyze.config import settings
+from single_doc_analyze.services.analyzer import AsyncDocumentAnalyzer, DocumentAnalyzer
+from single_doc_analyze.services.pdf_service import extract_pages_incremental
+from single_doc_analyze.services.response_cache import MemoryResponseCache
+from single_doc_analyze.services.version_store import (
+    DocumentVersionStore, changed_pages, page_fingerprint, plan_page_chunks
+)
+
+def _pages(count: int, revision: int = 0, edited: int = -1):
+    return [
+        f"Section {i}. " + f"rate {i} " * 200 + (f"Revised {revision}." if i == edited else "")
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentVersionStore(str(tmp_path / "versions.sqlite3"))
+
+def test_editing_a_page_only_changes_nearby_chunks():
+    before = plan_page_chunks(_pages(60), 2000, "test")
+    after = plan_page_chunks(_pages(60, revision=1, edited=30), 2000, "test")
+    inserted = plan_page_chunks(["A new first page."] + _pages(60), 2000, "test")
+
+    assert len(before) > 5
+    assert len({chunk.key for chunk in before} - {chunk.key for chunk in after}) <= 2
+    assert len({chunk.key for chunk in before} - {chunk.key for chunk in inserted}) <= 2
+
+def test_changed_pages_reports_edits_and_insertions():
+    previous = [page_fingerprint(page) for page in ["a", "b", "c"]]
+    current = [page_fingerprint(page) for page in ["a", "new", "b", "c edited"]]
+
+    assert changed_pages(previous, current) == [1, 3]
+
+def test_store_round_trip_and_eviction(tmp_path):
+    store = DocumentVersionStore(str(tmp_path / "versions.sqlite3"), max_entries=2)
+    store.put_page_texts({"s1": "one", "s2": "two", "s3": "three"})
+    store.put_chunk("k1", [{"summary": "x"}])
+    store.put_version("doc.pdf", ["f1", "f2"])
+
+    assert store.stats()["page_texts"] == 2
+    assert store.get_chunk("k1") == [{"summary": "x"}]
+    assert store.get_chunk("missing") is None
+    assert store.get_version("doc.pdf") == ["f1", "f2"]
+
+def test_revised_pdf_only_extracts_changed_pages(store, monkeypatch):
+    pages = [make_page_lines(i, 10) for i in range(1, 11)]
+    extracted = []
+    original = PageObject.extract_text
+    monkeypatch.setattr(
+        PageObject, "extract_text", lambda self, *a, **k: extracted.append(1) or original(self, *a, **k)
+    )
+
+    first = extract_pages_incremental(BytesIO(build_pdf(pages)), store)
+    pages[4] = pages[4] + ["Revised line."]
+    revised = extract_pages_incremental(BytesIO(build_pdf(pages)), store)
+
+    assert len(extracted) == 11
+    assert revised[4].endswith("Revised line.")
+    assert revised[:4] == first[:4] and revised[5:] == first[5:]
+
+def test_revision_only_reanalyzes_changed_chunks(store, fake_openai, monkeypatch):
+    monkeypatch.setitem(settings, "INCREMENTAL_CHUNK_TOKENS", 2000)
+    client = fake_openai()
+    analyzer = DocumentAnalyzer(client=client, cache=MemoryResponseCache(), versions=store)
+
+    analyzer.analyze_pages(_pages(60), doc_id="schedule.pdf")
+    first_calls = len(client.calls)
+    analyzer.analyze_pages(_pages(60, revision=1, edited=30), doc_id="schedule.pdf")
+    revision_calls = len(client.calls) - first_calls
+
+    assert first_calls == len(plan_page_chunks(_pages(60), 2000, "test")) + 1
+    assert revision_calls <= 3
+    assert first_calls >= 5 * revision_calls
+
+def test_async_revision_reuses_stored_chunks(store, fake_async_openai, monkeypatch):
+    monkeypatch.setitem(settings, "INCREMENTAL_CHUNK_TOKENS", 2000)
+    client = fake_async_openai()
+    analyzer = AsyncDocumentAnalyzer(client=client, cache=MemoryResponseCache(), versions=store)
+
+    async def run():
+        await analyzer.analyze_pages(_pages(60))
+        before = len(client.calls)
+        result = await analyzer.analyze_pages(_pages(60, revision=1, edited=30))
+        return len(client.calls) - before, result
+
+    revision_calls, result = asyncio.run(run())
+    assert revision_calls <= 3
+    assert result.key_topics == ["Testing"]
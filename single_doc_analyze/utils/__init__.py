@@ -1,4 +1,4 @@
 """Utility functions for document analysis."""
-from .json_utils import clean_json_response, parse_json_response
+from .json_utils import clean_json_response, extract_json_object, parse_json_response, repair_json
 
-__all__ = ['clean_json_response', 'parse_json_response'] 
\ No newline at end of file
+__all__ = ['clean_json_response', 'extract_json_object', 'parse_json_response', 'repair_json'] 
\ No newline at end of file
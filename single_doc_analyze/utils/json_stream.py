@@ -0,0 +1,166 @@
+"""Incremental parsing of JSON objects streamed token by token from an LLM."""
+from typing import Any, Generic, List, NamedTuple, Optional, TypeVar
+import json
+import re
+from pydantic import BaseModel
+
+T = TypeVar('T', bound=BaseModel)
+
+# A trailing backslash escape that is not complete yet (an odd run of backslashes,
+# optionally followed by a partial \\uXXXX).
+_UNFINISHED_ESCAPE = re.compile(r'(?<!\\)(?:\\\\)*\\(?:u[0-9a-fA-F]{0,3})?$')
+
+class StreamUpdate(NamedTuple, Generic[T]):
+    """A partial result while a completion streams; ``result`` is set on the final update."""
+    partial: dict
+    result: Optional[T] = None
+
+class _Frame:
+    """An open object or array, the key its next value goes under and whether a key is due."""
+    __slots__ = ("container", "key", "expecting_key")
+
+    def __init__(self, container):
+        self.container = container
+        self.key: Optional[str] = None
+        self.expecting_key = isinstance(container, dict)
+
+def _decode_string(literal: str) -> Optional[str]:
+    try:
+        return json.loads(literal, strict=False)
+    except ValueError:
+        return None
+
+class PartialJSONParser:
+    """Parse a JSON object from a growing prefix of its text.
+
+    ``feed`` scans only the newly received characters and builds the object
+    as values complete, so a stream is parsed in time linear in its length.
+    ``snapshot`` returns the object parsed so far: complete values, plus the
+    string value currently being written. Truncated keys, numbers and
+    literals are left out until they complete. Markdown code fences are
+    ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._scanned = 0
+        self._root: Optional[dict] = None
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._string_start = 0
+        self._scalar_start: Optional[int] = None
+        # The string value being written, as last reported.
+        self._partial: Optional[str] = None
+        self._changed = False
+
+    def feed(self, delta: str) -> Optional[dict]:
+        """Add streamed text; return a new snapshot if the parsed object changed, else None."""
+        self.text += delta
+        self._scan()
+        if self._in_string and not self._string_is_key:
+            # Close the string value being written, minus any escape sequence cut off mid-way.
+            partial = _decode_string(_UNFINISHED_ESCAPE.sub("", self.text[self._string_start:]) + '"')
+            if partial is not None and partial != self._partial:
+                self._partial = partial
+                self._changed = True
+        if not self._changed:
+            return None
+        self._changed = False
+        return self.snapshot()
+
+    def snapshot(self) -> dict:
+        """Return the object parsed so far (empty before the opening brace)."""
+        if self._root is None:
+            return {}
+        if not self._stack:
+            return self._root
+        # Completed values never change again, so only the open containers are copied.
+        copies = [frame.container.copy() for frame in self._stack]
+        for parent, frame, child in zip(copies, self._stack, copies[1:]):
+            if isinstance(parent, dict):
+                parent[frame.key] = child
+            else:
+                parent[-1] = child
+        if self._in_string and not self._string_is_key and self._partial is not None:
+            self._put(self._stack[-1], copies[-1], self._partial)
+        return copies[0]
+
+    @staticmethod
+    def _put(frame: _Frame, container, value: Any) -> None:
+        if isinstance(container, list):
+            container.append(value)
+        elif frame.key is not None:
+            container[frame.key] = value
+
+    def _add(self, value: Any) -> None:
+        self._put(self._stack[-1], self._stack[-1].container, value)
+        self._changed = True
+
+    def _end_scalar(self, end: int) -> None:
+        if self._scalar_start is None:
+            return
+        try:
+            self._add(json.loads(self.text[self._scalar_start:end]))
+        except ValueError:
+            pass
+        self._scalar_start = None
+
+    def _scan(self) -> None:
+        text = self.text
+        i = self._scanned
+        while i < len(text):
+            char = text[i]
+            if self._root is None:
+                if char == "{":
+                    self._root = {}
+                    self._stack.append(_Frame(self._root))
+                    self._changed = True
+                i += 1
+                continue
+            if not self._stack:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    value = _decode_string(text[self._string_start:i + 1])
+                    if self._string_is_key:
+                        self._stack[-1].key = value
+                    else:
+                        self._partial = None
+                        if value is not None:
+                            self._add(value)
+                i += 1
+                continue
+            top = self._stack[-1]
+            if char in '"{}[],:' or char.isspace():
+                self._end_scalar(i)
+            if char == '"':
+                self._in_string = True
+                self._string_is_key = top.expecting_key
+                self._string_start = i
+            elif char in "{[":
+                container = {} if char == "{" else []
+                self._add(container)
+                self._stack.append(_Frame(container))
+            elif char in "}]":
+                self._stack.pop()
+            elif char == ",":
+                top.expecting_key = isinstance(top.container, dict)
+            elif char == ":":
+                top.expecting_key = False
+            elif not char.isspace() and not top.expecting_key and self._scalar_start is None:
+                self._scalar_start = i
+            i += 1
+        self._scanned = i
+
+def parse_partial_json(text: str) -> dict:
+    """Parse the object in a possibly truncated JSON text (see ``PartialJSONParser``)."""
+    parser = PartialJSONParser()
+    parser.feed(text)
+    return parser.snapshot()
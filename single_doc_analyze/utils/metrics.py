@@ -0,0 +1,270 @@
+"""Lightweight per-stage timers, counters and a Prometheus text-format endpoint.
+
+Hot paths wrap their work in ``stage(name)``. With ``METRICS_ENABLED`` off
+and no active ``trace()``, ``stage`` returns a shared no-op context manager,
+so instrumentation costs one dict lookup and one context variable read.
+
+* Process-wide metrics (stage latency histograms, LLM request and token
+  counters, cache hit/miss counters) are served by ``start_metrics_server``.
+* ``trace()`` collects a per-request breakdown of seconds spent in each stage.
+  Concurrent stages (e.g. chunk calls) are summed, so the total can exceed
+  the wall-clock time.
+"""
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+import bisect
+import logging
+import threading
+import time
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+PREFIX = "doc_analyzer"
+
+# Upper bounds (seconds) of the stage latency histogram buckets.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_HELP = {
+    "stage_seconds": ("histogram", "Time spent in each pipeline stage"),
+    "llm_requests_total": ("counter", "LLM requests sent"),
+    "llm_tokens_total": ("counter", "LLM tokens reported by the provider"),
+    "llm_cached_tokens_total": ("counter", "Prompt tokens read from or written to the provider's prompt cache"),
+    "cache_hits_total": ("counter", "Cache hits"),
+    "cache_misses_total": ("counter", "Cache misses"),
+    "rate_limit_throttled_total": ("counter", "Requests throttled by the provider"),
+    "jobs": ("gauge", "Jobs in the job queue by status"),
+    "router_latency_seconds": ("gauge", "Rolling LLM latency quantiles per backend"),
+    "router_error_rate": ("gauge", "Rolling share of failed LLM requests per backend"),
+    "router_hedges_total": ("counter", "Hedged duplicate LLM requests sent"),
+    "document_tokens_total": ("counter", "Estimated document tokens before and after compression"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+_trace: ContextVar[Optional[Dict[str, float]]] = ContextVar("trace", default=None)
+_trace_lock = threading.Lock()
+_NOOP = nullcontext()
+
+class MetricsRegistry:
+    """Thread-safe store of counters and stage histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Labels, List[float]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, stage_name: str, seconds: float) -> None:
+        key = (("stage", stage_name),)
+        with self._lock:
+            # One count per bucket plus +Inf, then the observation count and sum.
+            counts = self._histograms.setdefault(key, [0.0] * (len(BUCKETS) + 3))
+            counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            counts[-2] += 1
+            counts[-1] += seconds
+
+    def stage_totals(self) -> Dict[str, Tuple[float, float]]:
+        """Return the observation count and total seconds of each stage."""
+        with self._lock:
+            return {dict(labels)["stage"]: (counts[-2], counts[-1]) for labels, counts in self._histograms.items()}
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Add a callback returning ``(name, labels, value)`` samples read at scrape time."""
+        self._collectors.append(collector)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        samples: Dict[str, List[str]] = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                samples.setdefault(name, []).append(_sample(name, dict(labels), value))
+            for labels, counts in self._histograms.items():
+                lines = samples.setdefault("stage_seconds", [])
+                cumulative = 0.0
+                for bound, count in zip(BUCKETS + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(_sample("stage_seconds_bucket", {**dict(labels), "le": le}, cumulative))
+                lines.append(_sample("stage_seconds_count", dict(labels), counts[-2]))
+                lines.append(_sample("stage_seconds_sum", dict(labels), counts[-1]))
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    samples.setdefault(name, []).append(_sample(name, labels, value))
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+
+        out = []
+        for name, lines in samples.items():
+            kind, help_text = _HELP.get(name, ("untyped", name))
+            out.append(f"# HELP {PREFIX}_{name} {help_text}")
+            out.append(f"# TYPE {PREFIX}_{name} {kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _sample(name: str, labels: Dict[str, str], value: float) -> str:
+    label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in sorted(labels.items()))
+    return f"{PREFIX}_{name}{{{label_text}}} {value:g}" if label_text else f"{PREFIX}_{name} {value:g}"
+
+REGISTRY = MetricsRegistry()
+
+def enabled() -> bool:
+    return settings["METRICS_ENABLED"]
+
+class _Stage:
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name: str, timings: Optional[Dict[str, float]]):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.timings is not None:
+            with _trace_lock:
+                self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed
+        if enabled():
+            REGISTRY.observe(self.name, elapsed)
+        return False
+
+def stage(name: str):
+    """Time the enclosed block as pipeline stage ``name``."""
+    timings = _trace.get()
+    if timings is None and not enabled():
+        return _NOOP
+    return _Stage(name, timings)
+
+@contextmanager
+def trace(active: bool = True) -> Iterator[Optional[Dict[str, float]]]:
+    """Collect the seconds spent in each stage within the block.
+
+    Yields the dict of stage timings, or None when ``active`` is False.
+    """
+    if not active:
+        yield None
+        return
+    timings: Dict[str, float] = {}
+    token = _trace.set(timings)
+    try:
+        yield timings
+    finally:
+        _trace.reset(token)
+
+def traced_stream(
+    stream: Callable[[], Iterable[T]], active: bool = True
+) -> Iterator[Tuple[T, Optional[Dict[str, float]]]]:
+    """Iterate ``stream()``, yielding each item with the stage timings so far.
+
+    Generators handed to a UI may be resumed from different threads, where a
+    ``with trace()`` block cannot span the yields. Every step here runs in
+    one private copy of the caller's context instead. Timings are None when
+    ``active`` is False.
+    """
+    context = copy_context()
+    timings: Optional[Dict[str, float]] = {} if active else None
+    if active:
+        context.run(_trace.set, timings)
+    iterator = context.run(lambda: iter(stream()))
+    done = object()
+    try:
+        while True:
+            item = context.run(next, iterator, done)
+            if item is done:
+                return
+            yield item, timings
+    finally:
+        # Close an abandoned generator in its own context.
+        if hasattr(iterator, "close"):
+            context.run(iterator.close)
+
+def bind_context(fn: Callable) -> Callable:
+    """Wrap ``fn`` so calls from worker threads record into the caller's trace."""
+    context = copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+def record_llm_call(provider: str, model: str, usage) -> None:
+    """Count an LLM request and the tokens the provider reported for it."""
+    if not enabled():
+        return
+    REGISTRY.inc("llm_requests_total", provider=provider, model=model)
+    if usage is None:
+        return
+    # OpenAI reports prompt/completion tokens, Anthropic input/output tokens.
+    for kind, attribute in (("prompt", "prompt_tokens"), ("completion", "completion_tokens"),
+                            ("prompt", "input_tokens"), ("completion", "output_tokens")):
+        value = getattr(usage, attribute, None)
+        if isinstance(value, (int, float)):
+            REGISTRY.inc("llm_tokens_total", value, provider=provider, model=model, type=kind)
+    cache_read, cache_write = prompt_cache_tokens(usage)
+    if cache_read or cache_write:
+        REGISTRY.inc("llm_cached_tokens_total", cache_read, provider=provider, model=model, type="cache_read")
+        REGISTRY.inc("llm_cached_tokens_total", cache_write, provider=provider, model=model, type="cache_write")
+        logger.debug(f"{provider} {model}: {cache_read} prompt tokens read from cache, {cache_write} written")
+
+def prompt_cache_tokens(usage) -> Tuple[int, int]:
+    """Return the prompt tokens a response reports as read from and written to the provider's prompt cache.
+
+    OpenAI caches prompt prefixes automatically and reports the tokens it
+    read in ``prompt_tokens_details.cached_tokens``, which are part of
+    ``prompt_tokens``. Anthropic reports ``cache_read_input_tokens`` and
+    ``cache_creation_input_tokens`` in addition to ``input_tokens``.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    counts = (
+        getattr(details, "cached_tokens", None) if details is not None
+        else getattr(usage, "cache_read_input_tokens", None),
+        getattr(usage, "cache_creation_input_tokens", None)
+    )
+    return tuple(int(value) if isinstance(value, (int, float)) else 0 for value in counts)
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Render a per-request timing breakdown, slowest stage first."""
+    return "\n".join(
+        f"{name}: {seconds * 1000:.1f} ms" for name, seconds in sorted(timings.items(), key=lambda item: -item[1])
+    )
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread and return the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server